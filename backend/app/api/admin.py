@@ -0,0 +1,121 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel
+
+from ..services.container import get_container
+from ..services.metrics import metrics
+from ..services.profiler import SamplingProfiler, process_usage
+
+router = APIRouter()
+
+# Output format -> (media type, download name)
+PROFILE_FILES = {
+    "speedscope": ("application/json", "profile.speedscope.json"),
+    "collapsed": ("text/plain", "profile.folded"),
+}
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class ProfilerState(BaseModel):
+    running: bool
+    max_seconds: float
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+class PerformanceMetrics(BaseModel):
+    """Server-side numbers for the admin testing dashboard
+
+    Page timings (load, first contentful paint, time to interactive) are
+    measured by the browser and left empty here.
+    """
+    load_time: Optional[float] = None
+    first_contentful_paint: Optional[float] = None
+    time_to_interactive: Optional[float] = None
+    memory_usage: Optional[float] = None  # % of RAM resident in this API process
+    cpu_usage: float  # % of all cores used by this API process since the previous call
+    api_latency_p50: Optional[float] = None  # seconds
+    api_latency_p95: Optional[float] = None  # seconds
+    requests_in_flight: int
+    profiler: ProfilerState
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+def _require_bearer(authorization: Optional[str], *env_names: str):
+    tokens = [token for token in (os.environ.get(name) for name in env_names) if token]
+    if not tokens:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, supplied = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not any(
+        hmac.compare_digest(supplied.encode(), token.encode()) for token in tokens
+    ):
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Admin endpoints need ``Authorization: Bearer $ADMIN_API_TOKEN`` and are off when it is unset"""
+    _require_bearer(authorization, "ADMIN_API_TOKEN")
+
+
+def require_metrics_scraper(authorization: Optional[str] = Header(None)):
+    """``/metrics`` takes ``METRICS_TOKEN`` (scrape-only) or ``ADMIN_API_TOKEN`` and is off when neither is set"""
+    _require_bearer(authorization, "METRICS_TOKEN", "ADMIN_API_TOKEN")
+
+
+def get_profiler() -> SamplingProfiler:
+    return get_container().profiler
+
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def capture_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    output: str = Query("speedscope", alias="format", regex=f"^({'|'.join(PROFILE_FILES)})$"),
+    tasks: bool = True,
+    profiler: SamplingProfiler = Depends(get_profiler)
+):
+    """Sample this API worker for ``seconds`` (capped at ``PROFILER_MAX_SECONDS``) and return the profile
+
+    ``speedscope`` opens at https://www.speedscope.app; ``collapsed`` is the
+    folded-stack text that flamegraph.pl and most flamegraph tools read.
+    With ``tasks``, where each pending asyncio task is suspended is sampled too.
+    """
+    try:
+        profile = await profiler.capture(seconds, interval_ms / 1000, tasks)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    media_type, filename = PROFILE_FILES[output]
+    return Response(
+        profile.render(output),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(profile.sample_count),
+        },
+    )
+
+
+@router.get("/testing/performance", response_model=PerformanceMetrics, dependencies=[Depends(require_admin)])
+async def get_performance_metrics(profiler: SamplingProfiler = Depends(get_profiler)):
+    """CPU, memory and API latency of this worker for the admin testing dashboard"""
+    usage = process_usage()
+    return PerformanceMetrics(
+        memory_usage=usage["memory_usage"],
+        cpu_usage=usage["cpu_usage"],
+        api_latency_p50=metrics.latency_quantile(0.5),
+        api_latency_p95=metrics.latency_quantile(0.95),
+        requests_in_flight=metrics.in_flight_requests(),
+        profiler=ProfilerState(running=profiler.running, max_seconds=profiler.max_seconds),
+    )
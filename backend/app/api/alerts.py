@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List
+
+from ..services.alerts import Alert, AlertEngine, AlertRule, AlertRuleOverride
+from ..services.container import get_container
+
+router = APIRouter()
+
+def get_alert_engine() -> AlertEngine:
+    return get_container().alert_engine
+
+@router.get("/alerts/rules", response_model=List[AlertRule])
+async def get_alert_rules(
+    user_id: str = "anonymous",
+    alert_engine: AlertEngine = Depends(get_alert_engine)
+):
+    """Alert rules in effect for the user, with their overrides applied"""
+    return alert_engine.rules_for(user_id)
+
+@router.put("/alerts/rules/{rule_name}", response_model=AlertRule)
+async def update_alert_rule(
+    rule_name: str,
+    override: AlertRuleOverride,
+    user_id: str = "anonymous",
+    alert_engine: AlertEngine = Depends(get_alert_engine)
+):
+    """Change a rule's threshold or turn it off for one user"""
+    try:
+        return alert_engine.set_override(user_id, rule_name, override)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown alert rule: {rule_name}")
+
+@router.get("/alerts/recent", response_model=List[Alert])
+async def get_recent_alerts(
+    user_id: str = "anonymous",
+    limit: int = Query(50, ge=1, le=1000),
+    alert_engine: AlertEngine = Depends(get_alert_engine)
+):
+    """Alerts raised for the user since this worker started, newest first"""
+    return alert_engine.recent(user_id, limit)
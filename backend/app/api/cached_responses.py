@@ -0,0 +1,45 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from ..services.response_cache import CachedResponse, ResponseCache, body_etag
+from .conditional import etag_matches
+
+Loader = Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]]
+
+
+async def cached_json_response(
+    request: Request,
+    cache: Optional[ResponseCache],
+    scope: str,
+    parts: Tuple,
+    load: Loader
+) -> Response:
+    """Serve a JSON body from the response cache, with ETag revalidation
+
+    ``load`` returns the content and any extra headers on a cache miss.
+    Errors it raises (e.g. HTTPException) are never cached.
+    """
+    if cache is None:
+        content, extra_headers = await load()
+        body = JSONResponse(jsonable_encoder(content)).body
+        entry, status = CachedResponse(body, body_etag(body), extra_headers), "BYPASS"
+    else:
+        key, entry = await cache.get(scope, *parts)
+        status = "HIT"
+        if entry is None:
+            content, extra_headers = await load()
+            entry = await cache.set(key, JSONResponse(jsonable_encoder(content)).body, extra_headers)
+            status = "MISS"
+
+    headers = {
+        **entry.headers,
+        "ETag": entry.etag,
+        "Cache-Control": "private, no-cache",
+        "X-Cache": status,
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
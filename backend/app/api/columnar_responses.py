@@ -0,0 +1,45 @@
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from ..services.columnar import MEDIA_TYPE, encode
+
+
+def _quality(accept: str, media_type: str, wildcards: bool = True) -> float:
+    """q-value the Accept header gives ``media_type``"""
+    names = {media_type, media_type.split("/")[0] + "/*", "*/*"} if wildcards else {media_type}
+    best = 0.0
+    for entry in accept.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        if name not in names:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        best = max(best, q)
+    return best
+
+
+def wants_columnar(request: Request) -> bool:
+    """Whether the client explicitly prefers the columnar encoding to JSON"""
+    accept = request.headers.get("accept", "")
+    columnar = _quality(accept, MEDIA_TYPE, wildcards=False)
+    return columnar > 0 and columnar >= _quality(accept, "application/json")
+
+
+def columnar_response(payload: Any) -> Response:
+    return Response(encode(payload), media_type=MEDIA_TYPE, headers={"Vary": "Accept"})
+
+
+def negotiated_response(request: Request, response: Response, content: Any) -> Any:
+    """``content`` encoded as columns if the client asked for it, else as-is for FastAPI's JSON path"""
+    response.headers["Vary"] = "Accept"
+    if not wants_columnar(request):
+        return content
+    return columnar_response(content.dict(by_alias=True) if isinstance(content, BaseModel) else content)
@@ -0,0 +1,93 @@
+import os
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from .conditional import etag_matches
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    """Yield ``length`` bytes from ``start`` in fixed-size chunks"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive (start, end)
+
+    Returns None for headers we choose to ignore (multiple ranges, other
+    units) and raises ValueError for unsatisfiable ranges.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the final N bytes
+        if not last.isdigit() or int(last) == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - int(last)), size - 1
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def ranged_file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    media_type: str = "application/octet-stream",
+    filename: Optional[str] = None
+) -> Response:
+    """Stream a file with ETag revalidation and single-range support
+
+    The file is read in CHUNK_SIZE pieces, never loaded whole into memory.
+    """
+    size = os.path.getsize(path)
+    quoted_etag = f'"{etag}"'
+    headers = {
+        "ETag": quoted_etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if etag_matches(request.headers.get("if-none-match"), quoted_etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range validator means "send the whole new representation"
+    if range_header and (not if_range or if_range.strip() == quoted_etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(path, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(path, start, length), status_code=206, media_type=media_type, headers=headers
+    )
@@ -1,38 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Optional
 from datetime import datetime, timedelta
+import os
 
-from ..services.report_generator import ReportGenerator, Report
+from ..services.report_generator import ReportGenerator, Report, ReportSummary
 from ..services.email_service import EmailService
+from ..services.report_scheduler import ReportScheduler
+from ..services.task_queue import TaskQueue
+from ..services.container import get_container
+from ..services.db_service import decode_cursor, encode_cursor
+from ..services.artifact_store import ReportArtifactStore
+from .cached_responses import cached_json_response
+from .file_responses import ranged_file_response
 
 router = APIRouter()
 
-# Dependency injection (in a real app, these would be properly initialized)
-def get_report_generator():
-    return ReportGenerator()
+# Dependency injection: shared, application-lifetime instances from the service container
+def get_report_generator() -> ReportGenerator:
+    return get_container().report_generator
 
-def get_email_service():
-    return EmailService()
+def get_email_service() -> EmailService:
+    return get_container().email_service
 
-@router.get("/reports", response_model=List[Report])
+def get_report_scheduler() -> ReportScheduler:
+    return get_container().report_scheduler
+
+def get_task_queue() -> TaskQueue:
+    return get_container().task_queue
+
+@router.get("/reports", response_model=List[ReportSummary])
 async def get_user_reports(
     user_id: str,
+    request: Request,
     report_type: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
     report_generator: ReportGenerator = Depends(get_report_generator)
 ):
-    """Get reports for a user"""
-    # In a real implementation, fetch from database
-    # reports = await report_generator.db.get_user_reports(user_id, report_type, limit, offset)
+    """Get reports for a user, newest first
     
-    # Mock data for development
-    reports = [
-        Report(
-            id=f"report-weekly-{user_id}-2023-11-15",
+    Pages are keyset-paginated: pass the ``X-Next-Cursor`` response header of
+    one page as ``cursor`` to fetch the next. The header is absent on the last
+    page. List entries never include ``html_content``. Responses are cached
+    per user and query, carry an ``ETag`` and answer ``If-None-Match`` with 304.
+    """
+    async def load():
+        if report_generator.db is not None:
+            try:
+                reports, next_cursor = await report_generator.db.get_user_reports(user_id, report_type, limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return reports, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        
+        # Mock data for development
+        reports = [
+            ReportSummary(
+                id=f"report-weekly-{user_id}-2023-11-15",
+                user_id=user_id,
+                title="Weekly Health Summary",
+                date=datetime.fromisoformat("2023-11-15"),
+                type="weekly",
+                highlights=[
+                    "Heart rate stable within normal range",
+                    "Blood pressure slightly elevated",
+                    "Stress levels decreased by 15%"
+                ],
+                recommendations=[
+                    "Continue regular exercise routine",
+                    "Monitor sodium intake to address blood pressure"
+                ],
+                status="generated"
+            ),
+            ReportSummary(
+                id=f"report-monthly-{user_id}-2023-11-01",
+                user_id=user_id,
+                title="Monthly Health Analysis",
+                date=datetime.fromisoformat("2023-11-01"),
+                type="monthly",
+                highlights=[
+                    "Overall health score improved by 8%",
+                    "Sleep quality shows positive trend",
+                    "Respiratory rate normalized"
+                ],
+                recommendations=[
+                    "Maintain current sleep schedule",
+                    "Consider adding meditation to daily routine"
+                ],
+                status="generated"
+            ),
+            ReportSummary(
+                id=f"report-quarterly-{user_id}-2023-10-01",
+                user_id=user_id,
+                title="Quarterly Health Review",
+                date=datetime.fromisoformat("2023-10-01"),
+                type="quarterly",
+                highlights=[
+                    "Significant improvement in cardiovascular health",
+                    "Stress management techniques showing positive results",
+                    "Weight stabilized within healthy range"
+                ],
+                recommendations=[
+                    "Schedule follow-up with primary care physician",
+                    "Continue current health management plan"
+                ],
+                status="generated"
+            ),
+            ReportSummary(
+                id=f"report-weekly-{user_id}-2023-11-22",
+                user_id=user_id,
+                title="Weekly Health Summary",
+                date=datetime.fromisoformat("2023-11-22"),
+                type="weekly",
+                status="scheduled"
+            )
+        ]
+        
+        # Filter by report type if specified
+        if report_type:
+            reports = [r for r in reports if r.type == report_type]
+        
+        # Apply the same newest-first keyset pagination as the database path
+        reports.sort(key=lambda r: (r.date, r.id), reverse=True)
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            reports = [r for r in reports if (r.date, r.id) < after]
+        headers = {}
+        if len(reports) > limit:
+            headers["X-Next-Cursor"] = encode_cursor(reports[limit - 1].date, reports[limit - 1].id)
+        
+        return reports[:limit], headers
+        
+    return await cached_json_response(
+        request,
+        report_generator.response_cache,
+        f"user:{user_id}",
+        ("list", report_type, limit, cursor),
+        load
+    )
+
+@router.get("/reports/cache/stats")
+async def get_cache_stats(report_generator: ReportGenerator = Depends(get_report_generator)):
+    """Hit/miss counters of the reports response cache"""
+    if report_generator.response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **report_generator.response_cache.snapshot()}
+
+@router.get("/reports/{report_id}", response_model=Report)
+async def get_report(
+    report_id: str,
+    request: Request,
+    report_generator: ReportGenerator = Depends(get_report_generator)
+):
+    """Get a specific report by ID"""
+    async def load():
+        if report_generator.db is not None:
+            report = await report_generator.db.get_report(report_id)
+            if not report:
+                raise HTTPException(status_code=404, detail="Report not found")
+            return report, {}
+        
+        # Mock data for development
+        user_id = "user123"  # This would be extracted from the report_id in a real implementation
+        report = Report(
+            id=report_id,
             user_id=user_id,
             title="Weekly Health Summary",
-            date=datetime.fromisoformat("2023-11-15"),
+            date=datetime.now() - timedelta(days=2),
             type="weekly",
             highlights=[
                 "Heart rate stable within normal range",
@@ -44,101 +180,60 @@ async def get_user_reports(
                 "Monitor sodium intake to address blood pressure"
             ],
             status="generated"
-        ),
-        Report(
-            id=f"report-monthly-{user_id}-2023-11-01",
-            user_id=user_id,
-            title="Monthly Health Analysis",
-            date=datetime.fromisoformat("2023-11-01"),
-            type="monthly",
-            highlights=[
-                "Overall health score improved by 8%",
-                "Sleep quality shows positive trend",
-                "Respiratory rate normalized"
-            ],
-            recommendations=[
-                "Maintain current sleep schedule",
-                "Consider adding meditation to daily routine"
-            ],
-            status="generated"
-        ),
-        Report(
-            id=f"report-quarterly-{user_id}-2023-10-01",
-            user_id=user_id,
-            title="Quarterly Health Review",
-            date=datetime.fromisoformat("2023-10-01"),
-            type="quarterly",
-            highlights=[
-                "Significant improvement in cardiovascular health",
-                "Stress management techniques showing positive results",
-                "Weight stabilized within healthy range"
-            ],
-            recommendations=[
-                "Schedule follow-up with primary care physician",
-                "Continue current health management plan"
-            ],
-            status="generated"
-        ),
-        Report(
-            id=f"report-weekly-{user_id}-2023-11-22",
-            user_id=user_id,
-            title="Weekly Health Summary",
-            date=datetime.fromisoformat("2023-11-22"),
-            type="weekly",
-            status="scheduled"
         )
-    ]
-    
-    # Filter by report type if specified
-    if report_type:
-        reports = [r for r in reports if r.type == report_type]
-    
-    # Apply pagination
-    reports = reports[offset:offset+limit]
-    
-    return reports
+        
+        return report, {}
+        
+    return await cached_json_response(
+        request, report_generator.response_cache, f"report:{report_id}", ("report",), load
+    )
 
-@router.get("/reports/{report_id}", response_model=Report)
-async def get_report(
+@router.get("/reports/{report_id}/download")
+async def download_report(
     report_id: str,
+    request: Request,
     report_generator: ReportGenerator = Depends(get_report_generator)
 ):
-    """Get a specific report by ID"""
-    # In a real implementation, fetch from database
-    # report = await report_generator.db.get_report(report_id)
-    # if not report:
-    #     raise HTTPException(status_code=404, detail="Report not found")
+    """Download a report PDF, streamed with ETag and Range support
+
+    Only PDFs that were already generated are served; generation itself runs
+    on the report task queue (``POST /reports/generate``).
+    """
+    report = await report_generator.db.get_report(report_id) if report_generator.db is not None else None
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report.status in ("scheduled", "generating"):
+        raise HTTPException(
+            status_code=409, detail=f"Report is still being generated; see /api/tasks/{report_id}"
+        )
     
-    # Mock data for development
-    user_id = "user123"  # This would be extracted from the report_id in a real implementation
-    report = Report(
-        id=report_id,
-        user_id=user_id,
-        title="Weekly Health Summary",
-        date=datetime.now() - timedelta(days=2),
-        type="weekly",
-        highlights=[
-            "Heart rate stable within normal range",
-            "Blood pressure slightly elevated",
-            "Stress levels decreased by 15%"
-        ],
-        recommendations=[
-            "Continue regular exercise routine",
-            "Monitor sodium intake to address blood pressure"
-        ],
-        status="generated"
-    )
+    pdf_path = report.pdf_path
+    if not pdf_path or not os.path.exists(pdf_path):
+        raise HTTPException(status_code=404, detail="Report PDF not available")
     
-    return report
+    if report_generator.artifact_store is not None and pdf_path.startswith(report_generator.artifact_store.root_dir):
+        etag = ReportArtifactStore.key_from_path(pdf_path)
+    else:
+        stat = os.stat(pdf_path)
+        etag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    
+    return ranged_file_response(
+        request, pdf_path, etag, media_type="application/pdf", filename=f"report_{report_id}.pdf"
+    )
 
 @router.post("/reports/generate", response_model=Report)
 async def generate_report(
     user_id: str,
     report_type: str,
-    background_tasks: BackgroundTasks,
-    report_generator: ReportGenerator = Depends(get_report_generator)
+    report_generator: ReportGenerator = Depends(get_report_generator),
+    task_queue: TaskQueue = Depends(get_task_queue)
 ):
-    """Generate a report on demand"""
+    """Generate a report on demand
+
+    Generation runs on the report worker pool; the report's status follows the
+    task (scheduled, generating, generated or failed) and the task itself can
+    be looked up at ``/tasks/{report_id}``.
+    """
     # Validate report type
     if report_type not in ["weekly", "monthly", "quarterly"]:
         raise HTTPException(status_code=400, detail="Invalid report type")
@@ -154,22 +249,28 @@ async def generate_report(
         status="scheduled"
     )
     
-    # In a real implementation, save to database
-    # await report_generator.db.save_report(report)
+    if report_generator.db is not None:
+        await report_generator.db.save_report(report)
+    # The new scheduled report must show up in the user's cached listings
+    await report_generator.invalidate_cached_report(user_id, report_id)
     
-    # Schedule the report generation
-    background_tasks.add_task(report_generator.generate_report, report_id)
+    # The report ID doubles as the task ID
+    await task_queue.submit("reports.generate", report_id, task_id=report_id)
     
     return report
 
 @router.post("/reports/schedule")
 async def schedule_reports(
-    background_tasks: BackgroundTasks,
-    report_generator: ReportGenerator = Depends(get_report_generator)
+    report_scheduler: ReportScheduler = Depends(get_report_scheduler)
 ):
-    """Schedule reports for all users based on their preferences"""
-    await report_generator.schedule_reports(background_tasks)
-    return {"status": "Reports scheduled successfully"}
+    """Send scheduled reports that are due now without waiting for the scheduler's next tick
+
+    Reports already sent are never sent again, so this is safe to call at any time.
+    """
+    # Generation runs on the batch runner's process pool or the Celery report workers,
+    # not this worker's event loop
+    reports = await report_scheduler.run_due()
+    return {"status": "Reports scheduled successfully", "scheduled": len(reports)}
 
 @router.post("/email/test")
 async def send_test_email(
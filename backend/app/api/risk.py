@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Dict, List
+
+from ..services.container import get_container
+from ..services.forecasting import Forecast, ForecastService
+from ..services.risk_inference import (
+    ASSESSMENT_DAYS,
+    RiskAssessment,
+    RiskFactor,
+    RiskPrediction,
+    RiskService,
+)
+
+router = APIRouter()
+
+def get_risk_service() -> RiskService:
+    return get_container().risk_service
+
+def get_forecast_service() -> ForecastService:
+    return get_container().forecast_service
+
+@router.get("/risk/assessment", response_model=RiskAssessment)
+async def get_risk_assessment(
+    user_id: str = "anonymous",
+    days: int = Query(ASSESSMENT_DAYS, ge=1, le=365),
+    risk_service: RiskService = Depends(get_risk_service)
+):
+    """Overall risk score, risk factors, outlook and recommendations
+    
+    Concurrent requests are scored together in micro-batches, so each model
+    runs once per batch rather than once per request.
+    """
+    return await risk_service.assess(user_id, days)
+
+@router.get("/risk/factors", response_model=List[RiskFactor])
+async def get_risk_factors(
+    user_id: str = "anonymous",
+    risk_service: RiskService = Depends(get_risk_service)
+):
+    """Per-factor scores (0-100, higher is healthier) with their impact"""
+    return (await risk_service.assess(user_id)).risk_factors
+
+@router.get("/risk/predictions", response_model=Dict[str, RiskPrediction])
+async def get_health_predictions(
+    user_id: str = "anonymous",
+    timeframe: str = Query("all", regex="^(all|shortTerm|mediumTerm|longTerm)$"),
+    risk_service: RiskService = Depends(get_risk_service)
+):
+    """Short-, medium- and long-term outlook, or only the requested timeframe"""
+    predictions = (await risk_service.assess(user_id)).predictions
+    if timeframe == "all":
+        return predictions
+    return {timeframe: predictions[timeframe]}
+
+@router.get("/risk/recommendations", response_model=List[str])
+async def get_recommendations(
+    user_id: str = "anonymous",
+    risk_service: RiskService = Depends(get_risk_service)
+):
+    """Personalized recommendations for the user's highest risks"""
+    return (await risk_service.assess(user_id)).recommendations
+
+@router.get("/risk/forecast", response_model=Forecast)
+async def get_vitals_forecast(
+    user_id: str = "anonymous",
+    forecast_service: ForecastService = Depends(get_forecast_service)
+):
+    """Daily forecasts with 95% intervals for each metric over the next 30 days
+    
+    Forecasts are cached per user until the user's next reading arrives.
+    """
+    return await forecast_service.forecast(user_id)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..services.container import get_container
+from ..services.task_queue import TaskQueue, TaskStatus
+
+router = APIRouter()
+
+def get_task_queue() -> TaskQueue:
+    return get_container().task_queue
+
+@router.get("/tasks/{task_id}", response_model=TaskStatus)
+async def get_task_status(
+    task_id: str,
+    task_queue: TaskQueue = Depends(get_task_queue)
+):
+    """State and result of a report generation or email task"""
+    status = await task_queue.status(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return status
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Optional
+from datetime import datetime, timedelta
+
+from ..services.container import get_container
+from ..services.visualizations import (
+    DATA_TYPES,
+    DEFAULT_POINTS,
+    MAX_POINTS,
+    TIME_RANGES,
+    DownsampledSeries,
+    VisualizationData,
+    VisualizationService,
+)
+from ..services.vitals_store import SERIES
+from .columnar_responses import negotiated_response
+
+router = APIRouter()
+
+def get_visualization_service() -> VisualizationService:
+    return get_container().visualization_service
+
+@router.get("/visualizations/series", response_model=DownsampledSeries)
+async def get_series(
+    request: Request,
+    response: Response,
+    series: str = Query(..., regex=f"^({'|'.join(SERIES)})$"),
+    user_id: str = "anonymous",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(DEFAULT_POINTS, ge=10, le=MAX_POINTS),
+    method: str = Query("lttb", regex="^(lttb|minmax)$"),
+    visualization_service: VisualizationService = Depends(get_visualization_service)
+):
+    """One vital-sign series over [start, end) reduced to at most ``points`` points
+
+    ``lttb`` keeps the shape of the line; ``minmax`` keeps every peak and dip.
+    Defaults to the last 7 days. Send ``Accept: application/vnd.vitalsign.columnar``
+    for packed binary columns instead of JSON.
+    """
+    end = end or datetime.now()
+    start = start or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    data = await visualization_service.collect(user_id, [series], start, end, points, method)
+    return negotiated_response(request, response, data.series[series])
+
+@router.get("/visualizations/health-data", response_model=VisualizationData)
+async def get_health_data(
+    request: Request,
+    response: Response,
+    user_id: str = "anonymous",
+    time_range: str = Query("week", alias="timeRange", regex=f"^({'|'.join(TIME_RANGES)})$"),
+    data_type: str = Query("all", alias="dataType", regex=f"^({'|'.join(DATA_TYPES)})$"),
+    points: int = Query(DEFAULT_POINTS, ge=10, le=MAX_POINTS),
+    method: str = Query("lttb", regex="^(lttb|minmax)$"),
+    visualization_service: VisualizationService = Depends(get_visualization_service)
+):
+    """Chart series for a time range and data type, each at most ``points`` points"""
+    end = datetime.now()
+    start = end - timedelta(days=TIME_RANGES[time_range])
+    data = await visualization_service.collect(user_id, DATA_TYPES[data_type], start, end, points, method)
+    return negotiated_response(request, response, data)
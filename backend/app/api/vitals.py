@@ -0,0 +1,296 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from typing import Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from ..services.container import get_container
+from ..services.ingest import (
+    MAX_BATCH_READINGS,
+    IngestBackpressure,
+    IngestBuffer,
+    IngestResult,
+    parse_readings,
+    validate_readings,
+)
+from ..services.pdf_extraction import PdfExtractor, PdfUploadResponse
+from ..services.rppg import ScanEstimate, ScanSignal, analyze_signal, analyze_window
+from ..services.scan_stream import ScanProtocolError, ScanStream
+from ..services.visualizations import (
+    DATA_TYPES,
+    DEFAULT_POINTS,
+    MAX_POINTS,
+    TREND_METRICS,
+    TREND_PERIODS,
+    SeriesHistory,
+    VisualizationData,
+    VisualizationService,
+    VitalsHistory,
+)
+from ..services.vitals_store import SERIES
+from .columnar_responses import columnar_response, negotiated_response, wants_columnar
+
+router = APIRouter()
+
+ESTIMATE_INTERVAL_SECONDS = 1.0
+MAX_SCAN_SESSIONS = int(os.environ.get("SCAN_MAX_SESSIONS", "200"))
+# Raw history is for bounded exports; longer views go through /vitals/trends
+MAX_HISTORY_DAYS = 92
+MAX_HISTORY_ROWS = int(os.environ.get("HISTORY_MAX_ROWS", "1000000"))
+_active_scans = 0
+
+# Dependency injection: shared, application-lifetime instances from the service container
+def get_ingest_buffer() -> Optional[IngestBuffer]:
+    return get_container().ingest_buffer
+
+def get_pdf_extractor() -> PdfExtractor:
+    return get_container().pdf_extractor
+
+def get_visualization_service() -> VisualizationService:
+    return get_container().visualization_service
+
+@router.post("/vitals/batch", response_model=IngestResult)
+async def ingest_vitals_batch(
+    request: Request,
+    response: Response,
+    user_id: Optional[str] = None,
+    wait: bool = True,
+    ingest_buffer: Optional[IngestBuffer] = Depends(get_ingest_buffer)
+):
+    """Ingest many vital-sign readings in one request
+    
+    The body is a JSON array of readings shaped like ``VitalSign`` or NDJSON
+    (``application/x-ndjson``, one reading per line). ``user_id`` fills in
+    readings that omit it. Invalid readings are reported individually and
+    the rest are stored. With ``wait=false`` the response (202) is sent as
+    soon as the readings are buffered rather than written. A saturated
+    buffer answers 503 with ``Retry-After``.
+    """
+    if ingest_buffer is None:
+        raise HTTPException(status_code=503, detail="Vital-sign storage is not configured")
+    
+    try:
+        readings = parse_readings(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {e}")
+    if len(readings) > MAX_BATCH_READINGS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_READINGS} readings per request")
+    
+    partitions, accepted, rejected = validate_readings(readings, user_id)
+    
+    try:
+        await ingest_buffer.submit(partitions, wait=wait)
+    except IngestBackpressure as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion is saturated, retry later",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+    
+    if not wait:
+        response.status_code = 202
+    return IngestResult(received=len(readings), accepted=accepted, rejected=rejected, committed=wait)
+
+@router.post("/vitals/scan/analyze", response_model=ScanEstimate)
+async def analyze_scan_signal(signal: ScanSignal):
+    """Estimate heart and respiratory rate from a face-scan ROI-mean signal
+    
+    Send per-frame RGB means of the face region with either ``timestamps``
+    or ``fps``. Heart rate needs at least 5 s of signal, respiratory rate 15 s.
+    """
+    try:
+        # FFT work runs off the event loop
+        return await asyncio.to_thread(analyze_signal, signal.rgb, signal.timestamps, signal.fps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _save_scan_result(ingest_buffer: IngestBuffer, user_id: str, estimate: ScanEstimate):
+    """Store a confident scan result as regular scan readings"""
+    timestamp = datetime.now().isoformat()
+    readings = [
+        {"user_id": user_id, "type": vital_type, "value": value, "timestamp": timestamp, "source": "scan"}
+        for vital_type, value in (("heart_rate", estimate.heart_rate), ("respiratory_rate", estimate.respiratory_rate))
+        if value is not None
+    ]
+    partitions, _, _ = validate_readings(readings)
+    try:
+        await ingest_buffer.submit(partitions, wait=False)
+    except IngestBackpressure:
+        print(f"Scan result for {user_id} dropped: ingestion is saturated")
+
+@router.websocket("/vitals/scan/ws")
+async def scan_session(
+    websocket: WebSocket,
+    user_id: Optional[str] = None,
+    ingest_buffer: Optional[IngestBuffer] = Depends(get_ingest_buffer)
+):
+    """Streaming face scan with an updated estimate every second
+    
+    The client sends binary ROI-mean or downsampled-frame messages (see
+    ``scan_stream``) and optional JSON control messages:
+    ``{"type": "start", "target_quality": 0.5, "auto_stop": true}`` and
+    ``{"type": "stop"}``. The server pushes ``estimate`` messages with a
+    ``confident`` flag, then a final ``result`` before closing. Results that
+    meet the target quality are stored for ``user_id`` when ingestion is
+    configured.
+    """
+    global _active_scans
+    await websocket.accept()
+    if _active_scans >= MAX_SCAN_SESSIONS:
+        await websocket.close(code=1013, reason="Too many concurrent scans")
+        return
+    
+    _active_scans += 1
+    stream = ScanStream()
+    loop = asyncio.get_running_loop()
+    last_estimate = loop.time()
+    try:
+        while not stream.finished:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            
+            if message.get("bytes") is not None:
+                try:
+                    stream.feed(message["bytes"])
+                except ScanProtocolError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                    if control.get("type") == "start":
+                        stream.configure(control)
+                    elif control.get("type") == "stop":
+                        break
+                except (ValueError, TypeError, AttributeError):
+                    await websocket.send_json({"type": "error", "detail": "Malformed control message"})
+                continue
+            
+            if loop.time() - last_estimate >= ESTIMATE_INTERVAL_SECONDS:
+                last_estimate = loop.time()
+                # The receive loop is paused while this runs, so the window cannot change underneath it
+                estimate = await asyncio.to_thread(analyze_window, *stream.window())
+                await websocket.send_json(stream.record(estimate))
+        
+        result = await asyncio.to_thread(analyze_window, *stream.window())
+        stream.record(result)
+        if user_id and ingest_buffer is not None and result.quality >= stream.target_quality:
+            await _save_scan_result(ingest_buffer, user_id, result)
+        await websocket.send_json({
+            "type": "result",
+            **result.dict(),
+            "elapsed": round(stream.elapsed, 2),
+            "confident": stream.confident,
+            "bytes_received": stream.bytes_received,
+        })
+        await websocket.close(code=1000)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _active_scans -= 1
+
+@router.post("/vitals/pdf/upload", response_model=PdfUploadResponse)
+async def upload_pdf(
+    file: UploadFile = File(...),
+    user_id: str = "anonymous",
+    pdf_extractor: PdfExtractor = Depends(get_pdf_extractor)
+):
+    """Upload a medical PDF and extract vitals and lab results from it
+    
+    The upload is streamed to a temporary file, each page's text layer is read (OCR only
+    for pages without one) and pages are matched in parallel on a process
+    pool, so large reports never block this worker. Results are cached by
+    document and page fingerprint, so re-uploading a file returns at once.
+    """
+    try:
+        path, digest = await pdf_extractor.save_upload(file)
+    except ValueError as e:
+        status_code = 413 if "exceeds" in str(e) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    
+    try:
+        extraction = await pdf_extractor.extract(path, digest, file.filename or "upload.pdf", user_id)
+    except Exception as e:
+        print(f"PDF extraction failed for {file.filename}: {e}")
+        raise HTTPException(status_code=422, detail="Could not read the PDF")
+    finally:
+        # Medical documents are not kept once their values are extracted
+        pdf_extractor.discard_upload(path)
+    return PdfUploadResponse(file_id=extraction.file_id, extracted_data=extraction)
+
+@router.get("/vitals/trends/{metric}", response_model=VisualizationData)
+async def get_health_trends(
+    request: Request,
+    response: Response,
+    metric: str,
+    user_id: str = "anonymous",
+    period: str = Query("1month", regex=f"^({'|'.join(TREND_PERIODS)})$"),
+    points: int = Query(DEFAULT_POINTS, ge=10, le=MAX_POINTS),
+    method: str = Query("lttb", regex="^(lttb|minmax)$"),
+    visualization_service: VisualizationService = Depends(get_visualization_service)
+):
+    """Trend of one metric (e.g. ``heart-rate`` or ``blood-pressure``) downsampled for charting"""
+    if metric not in TREND_METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric: {metric}")
+    end = datetime.now()
+    start = end - timedelta(days=TREND_PERIODS[period])
+    data = await visualization_service.collect(user_id, TREND_METRICS[metric], start, end, points, method)
+    return negotiated_response(request, response, data)
+
+@router.get("/vitals/history", response_model=VitalsHistory)
+async def get_vitals_history(
+    request: Request,
+    response: Response,
+    user_id: str = "anonymous",
+    series: Optional[str] = Query(None, regex=f"^({'|'.join(SERIES)})$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    visualization_service: VisualizationService = Depends(get_visualization_service)
+):
+    """Every reading of one series (default: the report metrics) over [start, end)
+    
+    Defaults to the last 7 days; at most MAX_HISTORY_DAYS and
+    ``HISTORY_MAX_ROWS`` readings are returned. Long histories are much
+    smaller and faster to produce with
+    ``Accept: application/vnd.vitalsign.columnar``, which returns
+    delta-encoded timestamps and float32 values as packed columns.
+    """
+    end = end or datetime.now()
+    start = start or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > timedelta(days=MAX_HISTORY_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"History is limited to {MAX_HISTORY_DAYS} days; use /vitals/trends for longer periods"
+        )
+    try:
+        readings = await visualization_service.readings(
+            user_id, [series] if series else DATA_TYPES["all"], start, end, max_rows=MAX_HISTORY_ROWS
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=413, detail=f"{e}; narrow the range or series, or use /vitals/trends"
+        )
+    if wants_columnar(request):
+        # Arrays go straight into the columns without building Python lists
+        return columnar_response({
+            "userId": user_id,
+            "start": start,
+            "end": end,
+            "series": {name: {"timestamps": ts, "values": values} for name, (ts, values) in readings.items()},
+        })
+    response.headers["Vary"] = "Accept"
+    return VitalsHistory(
+        user_id=user_id,
+        start=start,
+        end=end,
+        series={
+            name: SeriesHistory(timestamps=ts.tolist(), values=np.round(values.astype(np.float64), 2).tolist())
+            for name, (ts, values) in readings.items()
+        },
+    )
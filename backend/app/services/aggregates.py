@@ -0,0 +1,267 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .shared_files import FileVersion, KeyLocks, file_version
+from .statistics import METRICS, PERCENTILES
+from .vitals_store import VitalSignStore
+
+# Fixed histogram range per metric; values outside are clipped into the end bins
+SKETCH_RANGES = {
+    "heart_rate": (20.0, 220.0),
+    "systolic": (60.0, 240.0),
+    "diastolic": (30.0, 150.0),
+    "respiratory_rate": (4.0, 60.0),
+    "stress": (0.0, 100.0),
+}
+SKETCH_BINS = 128
+
+# Timestamps enter the slope sums as days since this reference, keeping the
+# squared terms small enough for float64
+_REFERENCE_MS = int(datetime(2020, 1, 1).timestamp() * 1000)
+_MS_PER_DAY = 86_400_000.0
+
+# Partial layout: scalar fields followed by the histogram sketch
+COUNT, SUM, SUM_SQ, MIN, MAX, T_MIN, T_MAX, SUM_T, SUM_TT, SUM_TV = range(10)
+_SCALARS = 10
+PARTIAL_SIZE = _SCALARS + SKETCH_BINS
+
+
+def empty_partial() -> np.ndarray:
+    partial = np.zeros(PARTIAL_SIZE, dtype=np.float64)
+    partial[[MIN, T_MIN]] = np.inf
+    partial[[MAX, T_MAX]] = -np.inf
+    return partial
+
+
+def build_partial(
+    metric: str, ts_ms: np.ndarray, values: np.ndarray, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Summarize raw samples into a mergeable partial in one vectorized pass
+
+    With ``weights``, every sum (count, moments, slope terms and histogram)
+    is weighted per sample; min and max stay unweighted.
+    """
+    partial = empty_partial()
+    if len(values) == 0:
+        return partial
+    v = np.asarray(values, dtype=np.float64)
+    t = (np.asarray(ts_ms, dtype=np.float64) - _REFERENCE_MS) / _MS_PER_DAY
+    w = np.ones_like(v) if weights is None else np.asarray(weights, dtype=np.float64)
+    wv = w * v
+    partial[COUNT] = w.sum()
+    partial[SUM] = wv.sum()
+    partial[SUM_SQ] = np.dot(wv, v)
+    partial[MIN] = v.min()
+    partial[MAX] = v.max()
+    partial[T_MIN] = t.min()
+    partial[T_MAX] = t.max()
+    partial[SUM_T] = np.dot(w, t)
+    partial[SUM_TT] = np.dot(w * t, t)
+    partial[SUM_TV] = np.dot(wv, t)
+    low, high = SKETCH_RANGES[metric]
+    bins = np.clip(((v - low) / (high - low) * SKETCH_BINS).astype(np.int64), 0, SKETCH_BINS - 1)
+    partial[_SCALARS:] = np.bincount(bins, weights=None if weights is None else w, minlength=SKETCH_BINS)
+    return partial
+
+
+def merge_partials(partials: Iterable[np.ndarray]) -> np.ndarray:
+    """Combine partials; every field is a sum, min or max so merging is exact"""
+    stacked = np.vstack([empty_partial(), *partials])
+    merged = stacked.sum(axis=0)
+    merged[[MIN, T_MIN]] = stacked[:, [MIN, T_MIN]].min(axis=0)
+    merged[[MAX, T_MAX]] = stacked[:, [MAX, T_MAX]].max(axis=0)
+    return merged
+
+
+def partial_statistics(metric: str, partial: np.ndarray) -> Dict[str, float]:
+    """Statistics in the same shape as statistics.compute_statistics, from a partial"""
+    n = partial[COUNT]
+    if n == 0:
+        stats = {key: float("nan") for key in ("mean", "min", "max", "variance", "std")}
+        stats.update({"count": 0.0, "slope": 0.0, "change": 0.0})
+        stats.update({f"p{p}": float("nan") for p in PERCENTILES})
+        return stats
+
+    mean = partial[SUM] / n
+    variance = max(0.0, partial[SUM_SQ] / n - mean * mean)
+    denominator = n * partial[SUM_TT] - partial[SUM_T] ** 2
+    slope = (n * partial[SUM_TV] - partial[SUM_T] * partial[SUM]) / denominator if denominator > 1e-12 else 0.0
+    span = partial[T_MAX] - partial[T_MIN]
+
+    stats = {
+        "count": float(n),
+        "mean": float(mean),
+        "min": float(partial[MIN]),
+        "max": float(partial[MAX]),
+        "variance": float(variance),
+        "std": float(np.sqrt(variance)),
+        "slope": float(slope),
+        "change": float(slope * span) if n > 1 else 0.0,
+    }
+
+    # Percentiles interpolated inside the sketch bins, clamped to the exact min/max
+    low, high = SKETCH_RANGES[metric]
+    width = (high - low) / SKETCH_BINS
+    cumulative = np.cumsum(partial[_SCALARS:])
+    for p in PERCENTILES:
+        rank = p / 100.0 * n
+        b = int(np.searchsorted(cumulative, rank, side="left"))
+        b = min(b, SKETCH_BINS - 1)
+        before = cumulative[b - 1] if b > 0 else 0.0
+        in_bin = cumulative[b] - before
+        fraction = (rank - before) / in_bin if in_bin > 0 else 0.5
+        value = low + (b + fraction) * width
+        stats[f"p{p}"] = float(min(max(value, partial[MIN]), partial[MAX]))
+    return stats
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+class AggregateStore:
+    """Rolling daily and weekly partial aggregates per user and metric
+
+    Daily partials are built from the vital-sign store the first time a
+    completed day is needed and persisted; weekly partials are merges of
+    seven daily ones. A 90-day period then costs ~13 weekly merges plus a
+    few edge days instead of a scan over every raw sample. Today is always
+    summarized fresh because it is still receiving readings, and late
+    readings for an earlier day drop that day's partials.
+
+    Cached partials are checked against their file before use, so a
+    partial dropped or rebuilt by another process is never served stale,
+    and builds and drops of a user's partials hold a lock shared by every
+    process, so a build that read the store before a late reading cannot
+    save after that reading dropped it.
+
+    Layout: ``{root}/{user_id}/{metric}/{YYYY-MM-DD}.d.npy`` and ``.w.npy``
+    """
+
+    def __init__(self, vital_store: VitalSignStore, root_dir: Optional[str] = None, cache_size: int = 50000):
+        self.vital_store = vital_store
+        self.root_dir = root_dir or os.environ.get("AGGREGATES_DATA_DIR", "data/aggregates")
+        self.cache_size = cache_size
+        # Key -> (file version, partial)
+        self._cache: "OrderedDict[Tuple[str, str, str, date], Tuple[FileVersion, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a user's partials are built or dropped, by threads and processes alike
+        self._user_locks = KeyLocks()
+        vital_store.add_listener(self.on_append)
+
+    def _path(self, user_id: str, metric: str, kind: str, day: date) -> str:
+        # Reuse the store's user-id validation before touching the filesystem
+        self.vital_store._user_dir(user_id)
+        return os.path.join(self.root_dir, user_id, metric, f"{day.isoformat()}.{kind}.npy")
+
+    def _user_lock(self, user_id: str):
+        self.vital_store._user_dir(user_id)
+        return self._user_locks.hold(user_id, os.path.join(self.root_dir, user_id, ".lock"))
+
+    def _remember(self, key, version: FileVersion, partial: np.ndarray):
+        with self._lock:
+            self._cache[key] = (version, partial)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, user_id: str, metric: str, kind: str, day: date) -> Optional[np.ndarray]:
+        key = (user_id, metric, kind, day)
+        path = self._path(user_id, metric, kind, day)
+        version = file_version(path)
+        if version is None:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(key)
+                return cached[1]
+        partial = np.load(path)
+        self._remember(key, version, partial)
+        return partial
+
+    def _save(self, user_id: str, metric: str, kind: str, day: date, partial: np.ndarray):
+        path = self._path(user_id, metric, kind, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, partial)
+        os.replace(tmp, path)
+        self._remember((user_id, metric, kind, day), file_version(path), partial)
+
+    def _discard(self, user_id: str, metric: str, kind: str, day: date):
+        with self._lock:
+            self._cache.pop((user_id, metric, kind, day), None)
+        try:
+            os.remove(self._path(user_id, metric, kind, day))
+        except FileNotFoundError:
+            pass
+
+    def _scan_day(self, user_id: str, metric: str, day: date) -> np.ndarray:
+        start = datetime.combine(day, time.min)
+        ts, values = self.vital_store.get_range(user_id, metric, start, start + timedelta(days=1))
+        return build_partial(metric, ts, values)
+
+    def daily_partial(self, user_id: str, metric: str, day: date) -> np.ndarray:
+        """Partial for one day; completed days are built once and persisted"""
+        if day >= datetime.now().date():
+            return self._scan_day(user_id, metric, day)
+        with self._user_lock(user_id):
+            partial = self._load(user_id, metric, "d", day)
+            if partial is None:
+                partial = self._scan_day(user_id, metric, day)
+                self._save(user_id, metric, "d", day, partial)
+            return partial
+
+    def weekly_partial(self, user_id: str, metric: str, monday: date) -> np.ndarray:
+        """Partial for a Monday-aligned week; persisted once the week is over"""
+        days = [monday + timedelta(days=i) for i in range(7)]
+        if days[-1] >= datetime.now().date():
+            return merge_partials(self.daily_partial(user_id, metric, d) for d in days)
+        with self._user_lock(user_id):
+            partial = self._load(user_id, metric, "w", monday)
+            if partial is None:
+                partial = merge_partials(self.daily_partial(user_id, metric, d) for d in days)
+                self._save(user_id, metric, "w", monday, partial)
+            return partial
+
+    def period_partial(self, user_id: str, metric: str, first_day: date, last_day: date) -> np.ndarray:
+        """Merge whole weeks and edge days covering [first_day, last_day]"""
+        parts = []
+        day = first_day
+        while day <= last_day:
+            if day.weekday() == 0 and day + timedelta(days=6) <= last_day:
+                parts.append(self.weekly_partial(user_id, metric, day))
+                day += timedelta(days=7)
+            else:
+                parts.append(self.daily_partial(user_id, metric, day))
+                day += timedelta(days=1)
+        return merge_partials(parts)
+
+    def period_statistics(self, user_id: str, first_day: date, last_day: date) -> Dict[str, Dict[str, float]]:
+        """Statistics for every report metric over the inclusive day range"""
+        return {
+            metric: partial_statistics(metric, self.period_partial(user_id, metric, first_day, last_day))
+            for metric in METRICS
+        }
+
+    def on_append(self, user_id: str, day: date, series: str, rows: np.ndarray):
+        """VitalSignStore append listener: drop the partials late readings change
+
+        The day and its week are rebuilt from the store, which already holds
+        these readings, on next use. Rebuilding instead of merging the new
+        rows in keeps a build that scanned after the append from counting
+        them twice.
+        """
+        if series not in SKETCH_RANGES or day >= datetime.now().date():
+            return
+        with self._user_lock(user_id):
+            self._discard(user_id, series, "d", day)
+            self._discard(user_id, series, "w", week_start(day))
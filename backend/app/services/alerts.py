@@ -0,0 +1,365 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .vitals_store import VitalSignStore, from_epoch_ms, to_epoch_ms
+
+
+class AlertRule(BaseModel):
+    """Fires when ``count`` of the last ``window`` readings of ``metric`` cross ``threshold``"""
+    name: str
+    metric: str
+    condition: str = Field(..., regex="^(above|below)$")
+    threshold: float
+    count: int = Field(1, ge=1)
+    window: int = Field(1, ge=1, le=64)
+    severity: str = Field("warning", regex="^(warning|critical)$")
+    message: str
+    recommendations: List[str] = []
+    enabled: bool = True
+
+
+class AlertRuleOverride(BaseModel):
+    threshold: Optional[float] = None
+    enabled: Optional[bool] = None
+
+
+class Alert(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    user_id: str
+    rule: str
+    severity: str
+    metric: str
+    value: float
+    threshold: float
+    message: str
+    recommendations: List[str]
+    reading_time: datetime
+    detected_at: datetime = Field(default_factory=datetime.now)
+    delivered: bool = False
+
+
+DEFAULT_RULES = [
+    AlertRule(
+        name="hypertensive_crisis", metric="systolic", condition="above", threshold=180,
+        severity="critical",
+        message="Systolic blood pressure of {value:g} mmHg is above {threshold:g} mmHg.",
+        recommendations=[
+            "Sit quietly for five minutes and measure again",
+            "Seek emergency care if it stays this high or you have chest pain, shortness of breath or vision changes",
+        ],
+    ),
+    AlertRule(
+        name="elevated_systolic", metric="systolic", condition="above", threshold=140, count=3, window=5,
+        message="Systolic blood pressure was above {threshold:g} mmHg in {count} of your last {window} readings.",
+        recommendations=["Limit salt and caffeine today", "Share these readings with your doctor"],
+    ),
+    AlertRule(
+        name="elevated_diastolic", metric="diastolic", condition="above", threshold=90, count=3, window=5,
+        message="Diastolic blood pressure was above {threshold:g} mmHg in {count} of your last {window} readings.",
+        recommendations=["Limit salt and caffeine today", "Share these readings with your doctor"],
+    ),
+    AlertRule(
+        name="tachycardia", metric="heart_rate", condition="above", threshold=120, count=3, window=5,
+        message="Resting heart rate was above {threshold:g} bpm in {count} of your last {window} readings.",
+        recommendations=["Rest and hydrate", "Contact your doctor if you feel dizzy or short of breath"],
+    ),
+    AlertRule(
+        name="bradycardia", metric="heart_rate", condition="below", threshold=40, count=3, window=5,
+        message="Heart rate was below {threshold:g} bpm in {count} of your last {window} readings.",
+        recommendations=["Contact your doctor if you feel faint or unusually tired"],
+    ),
+    AlertRule(
+        name="low_oxygen", metric="oxygen_saturation", condition="below", threshold=90, count=2, window=3,
+        severity="critical",
+        message="Blood oxygen was below {threshold:g}% in {count} of your last {window} readings.",
+        recommendations=["Check that the sensor is placed correctly", "Seek medical care if you are short of breath"],
+    ),
+    AlertRule(
+        name="fever", metric="temperature", condition="above", threshold=38.5, count=2, window=3,
+        message="Body temperature was above {threshold:g} °C in {count} of your last {window} readings.",
+        recommendations=["Rest and drink fluids", "Contact your doctor if the fever lasts more than two days"],
+    ),
+    AlertRule(
+        name="rapid_breathing", metric="respiratory_rate", condition="above", threshold=25, count=3, window=5,
+        message="Breathing rate was above {threshold:g} breaths/min in {count} of your last {window} readings.",
+        recommendations=["Sit upright and breathe slowly", "Seek medical care if breathing stays difficult"],
+    ),
+]
+
+# Readings older than this (e.g. history imports) update rule windows but never alert
+MAX_ALERT_AGE_MS = 10 * 60 * 1000
+
+
+def _mock_recipient(user_id: str) -> str:
+    # Mock data for development: real deployments look the address up in the users table
+    return user_id if "@" in user_id else f"{user_id}@example.com"
+
+
+class AlertEngine:
+    """Streaming rule evaluation over every reading appended to the vital-sign store
+
+    Each (user, rule) keeps only the hits of its last ``window - 1``
+    readings, so a batch of appended readings is evaluated in one
+    vectorized pass whatever the user's history. An alert fires when a
+    rule's condition starts to hold, not on every reading while it keeps
+    holding, and is further throttled by a per-rule cooldown and a per-user
+    hourly cap (critical alerts skip the cap). Fired alerts are handed to
+    ``EmailService.send_health_alert`` from the event loop, so evaluation
+    never waits on email. Users who turned off ``alertEmails`` still get
+    in-app alerts but no email; their preferences are looked up once per
+    ``ALERT_USER_CACHE_SECONDS``.
+
+    Per-user threshold overrides are kept in ``ALERT_RULES_PATH`` (JSON)
+    when set, otherwise in memory.
+    """
+
+    def __init__(
+        self,
+        email_service: Any,
+        vital_store: Optional[VitalSignStore] = None,
+        rules: Optional[List[AlertRule]] = None,
+        cooldown_seconds: Optional[float] = None,
+        max_per_hour: Optional[int] = None,
+        overrides_path: Optional[str] = None,
+        recipient: Callable[[str], Optional[str]] = _mock_recipient,
+        user_lookup: Optional[Callable[[str], Awaitable[Any]]] = None,
+        user_cache_seconds: Optional[float] = None
+    ):
+        self.email_service = email_service
+        self.rules = {rule.name: rule for rule in (rules or DEFAULT_RULES)}
+        self.cooldown = cooldown_seconds if cooldown_seconds is not None else float(
+            os.environ.get("ALERT_COOLDOWN_SECONDS", "900")
+        )
+        self.max_per_hour = max_per_hour or int(os.environ.get("ALERT_MAX_PER_HOUR", "6"))
+        self.overrides_path = overrides_path or os.environ.get("ALERT_RULES_PATH")
+        self.recipient = recipient
+        self.user_lookup = user_lookup
+        self.user_cache_seconds = user_cache_seconds if user_cache_seconds is not None else float(
+            os.environ.get("ALERT_USER_CACHE_SECONDS", "300")
+        )
+        # User id -> (looked up at, user or None)
+        self._users: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._by_metric: Dict[str, List[AlertRule]] = {}
+        for rule in self.rules.values():
+            self._by_metric.setdefault(rule.metric, []).append(rule)
+        self._overrides: Dict[str, Dict[str, Dict[str, Any]]] = self._load_overrides()
+
+        # Per (user, rule) with recent hits: hits of the last window - 1 readings
+        # and whether the condition holds. Rules with a clear window keep no state.
+        self._windows: Dict[Tuple[str, str], Tuple[np.ndarray, bool]] = {}
+        self._last_alert: Dict[Tuple[str, str], float] = {}
+        self._sent: Dict[str, Deque[float]] = {}
+        self._recent: Deque[Alert] = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "evaluated": 0, "fired": 0, "throttled": 0, "opted_out": 0, "delivered": 0, "failed": 0,
+            "max_delivery_ms": 0.0
+        }
+        if vital_store is not None:
+            vital_store.add_listener(self.on_append)
+
+    def _load_overrides(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.overrides_path or not os.path.exists(self.overrides_path):
+            return {}
+        with open(self.overrides_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_overrides(self):
+        if not self.overrides_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.overrides_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._overrides, f)
+        os.replace(tmp, self.overrides_path)
+
+    def rules_for(self, user_id: str, metric: Optional[str] = None) -> List[AlertRule]:
+        """The user's rules with their overrides applied"""
+        rules = self._by_metric.get(metric, []) if metric is not None else list(self.rules.values())
+        overrides = self._overrides.get(user_id)
+        if not overrides:
+            return rules
+        return [rule.copy(update=overrides[rule.name]) if rule.name in overrides else rule for rule in rules]
+
+    def set_override(self, user_id: str, rule_name: str, override: AlertRuleOverride) -> AlertRule:
+        if rule_name not in self.rules:
+            raise KeyError(rule_name)
+        with self._lock:
+            current = self._overrides.setdefault(user_id, {}).setdefault(rule_name, {})
+            current.update(override.dict(exclude_none=True))
+            # A new threshold starts a fresh window
+            self._windows.pop((user_id, rule_name), None)
+            self._save_overrides()
+        return self.rules[rule_name].copy(update=current)
+
+    def start(self):
+        """Start delivering alerts from the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Deliver alerts already fired, then stop"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def on_append(self, user_id: str, day: date, series: str, rows: np.ndarray):
+        """VitalSignStore append listener; runs wherever the append happens (e.g. the ingest flusher)"""
+        rules = self.rules_for(user_id, series)
+        if not rules or len(rows) == 0:
+            return
+        values = rows["value"]
+        high, low = float(values.max()), float(values.min())
+        fired = []
+        with self._lock:
+            self.stats["evaluated"] += len(rows)
+            for rule in rules:
+                # Most readings are normal: nothing changes for a clear window no new reading crosses
+                crosses = high > rule.threshold if rule.condition == "above" else low < rule.threshold
+                if rule.enabled and (crosses or (user_id, rule.name) in self._windows):
+                    fired.extend(self._evaluate(user_id, rule, rows, values))
+        for alert in fired:
+            self._dispatch(alert)
+
+    def _evaluate(self, user_id: str, rule: AlertRule, rows: np.ndarray, values: np.ndarray) -> List[Alert]:
+        key = (user_id, rule.name)
+        hits = values > rule.threshold if rule.condition == "above" else values < rule.threshold
+        previous, active = self._windows.get(key, (np.zeros(rule.window - 1, dtype=bool), False))
+        sequence = np.concatenate([previous, hits])
+        # Hits in the window ending at each new reading
+        totals = np.concatenate([[0], np.cumsum(sequence)])
+        holding = totals[rule.window:] - totals[:-rule.window] >= rule.count
+        was_holding = np.concatenate([[active], holding[:-1]])
+        started = np.flatnonzero(holding & ~was_holding)
+
+        recent = sequence[len(sequence) - (rule.window - 1):]
+        if holding[-1] or recent.any():
+            self._windows[key] = (recent, bool(holding[-1]))
+        else:
+            self._windows.pop(key, None)
+
+        alerts = []
+        now_ms = to_epoch_ms(datetime.now())
+        for index in started.tolist():
+            reading_ms = int(rows["ts"][index])
+            if now_ms - reading_ms > MAX_ALERT_AGE_MS:
+                continue
+            if not self._admit(user_id, rule):
+                self.stats["throttled"] += 1
+                continue
+            value = float(values[index])
+            alerts.append(Alert(
+                user_id=user_id,
+                rule=rule.name,
+                severity=rule.severity,
+                metric=rule.metric,
+                value=round(value, 2),
+                threshold=rule.threshold,
+                message=rule.message.format(
+                    value=round(value, 1), threshold=rule.threshold, count=rule.count, window=rule.window
+                ),
+                recommendations=rule.recommendations,
+                reading_time=from_epoch_ms(reading_ms),
+            ))
+        return alerts
+
+    def _admit(self, user_id: str, rule: AlertRule) -> bool:
+        """Cooldown per (user, rule) and, except for critical alerts, an hourly cap per user"""
+        now = time.monotonic()
+        last = self._last_alert.get((user_id, rule.name))
+        if last is not None and now - last < self.cooldown:
+            return False
+        sent = self._sent.setdefault(user_id, deque())
+        while sent and now - sent[0] > 3600:
+            sent.popleft()
+        if rule.severity != "critical" and len(sent) >= self.max_per_hour:
+            return False
+        self._last_alert[(user_id, rule.name)] = now
+        sent.append(now)
+        return True
+
+    def _dispatch(self, alert: Alert):
+        self.stats["fired"] += 1
+        self._recent.append(alert)
+        print(f"Health alert for {alert.user_id}: {alert.rule} ({alert.severity})")
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._queue.put_nowait(alert)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, alert)
+
+    async def _user(self, user_id: str) -> Any:
+        """The user's record (email and preferences), cached for ``user_cache_seconds``"""
+        if self.user_lookup is None:
+            return None
+        now = time.monotonic()
+        cached = self._users.get(user_id)
+        if cached is not None and now - cached[0] < self.user_cache_seconds:
+            return cached[1]
+        user = await self.user_lookup(user_id)
+        self._users[user_id] = (now, user)
+        self._users.move_to_end(user_id)
+        while len(self._users) > 10000:
+            self._users.popitem(last=False)
+        return user
+
+    async def _run(self):
+        while True:
+            alert = await self._queue.get()
+            try:
+                user = await self._user(alert.user_id)
+                if user is not None and not user.preferences.get("alertEmails", True):
+                    self.stats["opted_out"] += 1
+                    continue
+                email = user.email if user is not None else self.recipient(alert.user_id)
+                if email:
+                    await self.email_service.send_health_alert(email, {
+                        "message": alert.message,
+                        "recommendations": alert.recommendations,
+                    })
+                    alert.delivered = True
+                    self.stats["delivered"] += 1
+                    # Detection to hand-off to the mail path
+                    latency = (datetime.now() - alert.detected_at).total_seconds() * 1000
+                    self.stats["max_delivery_ms"] = max(self.stats["max_delivery_ms"], round(latency, 1))
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Error sending health alert {alert.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def recent(self, user_id: str, limit: int = 50) -> List[Alert]:
+        """Most recent alerts for a user, newest first"""
+        with self._lock:
+            alerts = [alert for alert in reversed(self._recent) if alert.user_id == user_id]
+        return alerts[:limit]
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+
+def artifact_key(
+    user_id: str,
+    report_type: str,
+    period: str,
+    data_version: str,
+    template_version: str
+) -> str:
+    """Content address of a rendered report
+
+    Two reports with the same user, period, underlying data and template
+    render to the same artifact, so regenerating them is a cache hit.
+    """
+    material = "\x1f".join([user_id, report_type, period, data_version, template_version])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def data_version(period_data: Any) -> str:
+    """Stable hash of the values a report is rendered from"""
+    encoded = json.dumps(period_data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+
+class ReportArtifactStore:
+    """Content-addressed on-disk store for rendered report HTML and PDF files
+
+    Layout: ``{root}/{key[:2]}/{key}.{html|pdf}``. Files are written once
+    (atomically) and never modified, so the key doubles as a strong ETag.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or os.environ.get("REPORT_ARTIFACTS_DIR", "data/reports")
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path(self, key: str, kind: str) -> str:
+        if not key.isalnum() or kind not in ("html", "pdf"):
+            raise ValueError("Invalid artifact reference")
+        return os.path.join(self.root_dir, key[:2], f"{key}.{kind}")
+
+    def get(self, key: str, kind: str) -> Optional[str]:
+        """Path of a stored artifact, or None on a cache miss"""
+        path = self.path(key, kind)
+        return path if os.path.exists(path) else None
+
+    def put(self, key: str, kind: str, data: bytes) -> str:
+        """Store an artifact atomically and return its path"""
+        path = self.path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    def read_text(self, key: str, kind: str = "html") -> Optional[str]:
+        path = self.get(key, kind)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    @staticmethod
+    def key_from_path(path: str) -> str:
+        """Recover the content key (used as the ETag) from an artifact path"""
+        return os.path.splitext(os.path.basename(path))[0]
@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .aggregates import AggregateStore
+from .artifact_store import ReportArtifactStore
+from .db_service import DatabaseService
+from .feature_store import FeatureStore
+from .report_generator import REPORT_TITLES, Report, ReportGenerator, scheduled_report_id
+from .response_cache import RedisCacheBackend, ResponseCache
+from .risk_inference import RiskService
+from .risk_models import load_models
+from .vitals_store import VitalSignStore
+
+# Per-process generator, built once by the pool initializer
+_worker_generator: Optional[ReportGenerator] = None
+
+
+class BatchJobResult(BaseModel):
+    report_id: str
+    user_id: str
+    type: str
+    status: str  # generated, failed
+    pdf_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchRunSummary(BaseModel):
+    total: int
+    generated: int
+    failed: int
+    duration_seconds: float
+    results: List[BatchJobResult]
+
+
+def _init_worker(
+    vitals_data_dir: Optional[str],
+    aggregates_data_dir: Optional[str],
+    features_data_dir: Optional[str] = None,
+    artifacts_data_dir: Optional[str] = None,
+    cache_url: Optional[str] = None
+):
+    """Build the ReportGenerator used by every chunk this worker process runs"""
+    global _worker_generator
+    store = VitalSignStore(vitals_data_dir) if vitals_data_dir else None
+    aggregates = AggregateStore(store, aggregates_data_dir) if store and aggregates_data_dir else None
+    features = FeatureStore(store, features_data_dir) if store and features_data_dir else None
+    # Risk models are loaded once per worker, not once per chunk
+    risk_service = RiskService(load_models(), vital_store=store, aggregate_store=aggregates, feature_store=features)
+    _worker_generator = ReportGenerator(
+        vital_store=store,
+        aggregate_store=aggregates,
+        # Same content-addressed artifacts as the API, so unchanged reports are not re-rendered
+        artifact_store=ReportArtifactStore(artifacts_data_dir),
+        # Only a shared cache can be invalidated from here; an in-memory one lives in the API process
+        response_cache=ResponseCache(RedisCacheBackend(cache_url)) if cache_url else None,
+        risk_service=risk_service
+    )
+
+
+async def _generate_chunk(generator: ReportGenerator, reports: List[Report]) -> List[BatchJobResult]:
+    results = []
+
+    # Fetch and summarize every user of the same report type in one batch
+    by_type: Dict[str, List[Report]] = {}
+    for report in reports:
+        by_type.setdefault(report.type, []).append(report)
+
+    for report_type, group in by_type.items():
+        try:
+            period_data = await generator._get_batch_data_for_period(
+                [r.user_id for r in group], report_type
+            )
+        except Exception as e:
+            results.extend(
+                BatchJobResult(report_id=r.id, user_id=r.user_id, type=r.type, status="failed", error=str(e))
+                for r in group
+            )
+            continue
+
+        for report in group:
+            try:
+                generated = await generator._build_report(
+                    report.id, report.user_id, report_type, period_data[report.user_id]
+                )
+                if generator.db is not None:
+                    await generator.db.update_report(generated)
+                await generator.invalidate_cached_report(report.user_id, report.id)
+                results.append(BatchJobResult(
+                    report_id=report.id,
+                    user_id=report.user_id,
+                    type=report_type,
+                    status="generated",
+                    pdf_path=generated.pdf_path
+                ))
+            except Exception as e:
+                results.append(BatchJobResult(
+                    report_id=report.id, user_id=report.user_id, type=report_type, status="failed", error=str(e)
+                ))
+    return results
+
+
+async def _run_chunk_async(reports: List[Report]) -> List[BatchJobResult]:
+    generator = _worker_generator or ReportGenerator()
+    # Async engines are bound to the event loop, so each chunk gets its own pool
+    generator.db = DatabaseService() if os.environ.get("DATABASE_URL") else None
+    try:
+        return await _generate_chunk(generator, reports)
+    finally:
+        if generator.db is not None:
+            await generator.db.close()
+
+
+def _run_chunk(reports: List[Report]) -> List[BatchJobResult]:
+    """Process-pool entry point: generate one chunk of reports"""
+    return asyncio.run(_run_chunk_async(reports))
+
+
+class BatchReportRunner:
+    """Generates large batches of reports on a multi-process worker pool
+
+    Each worker process owns its own ReportGenerator and handles whole chunks
+    of reports, so data fetch, statistics, highlight/recommendation rules, HTML
+    rendering and PDF output all run outside the API worker's event loop.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 100,
+        vitals_data_dir: Optional[str] = None,
+        aggregates_data_dir: Optional[str] = None,
+        features_data_dir: Optional[str] = None,
+        artifacts_data_dir: Optional[str] = None,
+        cache_url: Optional[str] = None
+    ):
+        self.max_workers = max_workers or int(os.environ.get("REPORT_WORKERS", os.cpu_count() or 1))
+        self.chunk_size = max(1, chunk_size)
+        self.vitals_data_dir = vitals_data_dir or os.environ.get("VITALS_DATA_DIR")
+        self.aggregates_data_dir = aggregates_data_dir or os.environ.get("AGGREGATES_DATA_DIR")
+        self.features_data_dir = features_data_dir or os.environ.get("FEATURES_DATA_DIR")
+        self.artifacts_data_dir = artifacts_data_dir or os.environ.get("REPORT_ARTIFACTS_DIR")
+        self.cache_url = cache_url or os.environ.get("REPORT_CACHE_URL")
+
+    def _chunks(self, reports: List[Report]) -> List[List[Report]]:
+        # Sort by type so each chunk summarizes its users in one batch per metric
+        ordered = sorted(reports, key=lambda r: r.type)
+        return [ordered[i:i + self.chunk_size] for i in range(0, len(ordered), self.chunk_size)]
+
+    def run(self, reports: List[Report]) -> BatchRunSummary:
+        """Generate all reports and block until the pool has finished"""
+        started = time.perf_counter()
+        results: List[BatchJobResult] = []
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(
+                self.vitals_data_dir,
+                self.aggregates_data_dir,
+                self.features_data_dir,
+                self.artifacts_data_dir,
+                self.cache_url
+            )
+        ) as pool:
+            futures = {pool.submit(_run_chunk, chunk): chunk for chunk in self._chunks(reports)}
+            for future in as_completed(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    # A crashed worker fails its whole chunk but not the run
+                    results.extend(
+                        BatchJobResult(report_id=r.id, user_id=r.user_id, type=r.type, status="failed", error=str(e))
+                        for r in futures[future]
+                    )
+
+        generated = sum(1 for r in results if r.status == "generated")
+        return BatchRunSummary(
+            total=len(results),
+            generated=generated,
+            failed=len(results) - generated,
+            duration_seconds=time.perf_counter() - started,
+            results=results
+        )
+
+    async def run_async(self, reports: List[Report]) -> BatchRunSummary:
+        """Run a batch from async code without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run, reports)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point: python -m app.services.batch_reports"""
+    parser = argparse.ArgumentParser(description="Generate scheduled health reports outside the API process")
+    parser.add_argument("--type", choices=["weekly", "monthly", "quarterly"], action="append", dest="types",
+                        help="Only generate these report types (default: whatever is due on --date)")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="Run as if today were this ISO date")
+    parser.add_argument("--users", default=None, help="Comma-separated user IDs (default: all users)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Reports per worker task")
+    parser.add_argument("--data-dir", default=None, help="Vital-sign store directory")
+    args = parser.parse_args(argv)
+
+    run_date = args.date or datetime.now().date()
+    generator = ReportGenerator()
+
+    if args.types:
+        users = asyncio.run(generator._get_all_users())
+        reports = [
+            Report(
+                id=scheduled_report_id(report_type, user.id, run_date),
+                user_id=user.id,
+                title=REPORT_TITLES[report_type],
+                date=datetime.now(),
+                type=report_type,
+                status="scheduled"
+            )
+            for user in users for report_type in args.types
+        ]
+    else:
+        reports = asyncio.run(generator.collect_due_reports(run_date))
+
+    if args.users:
+        wanted = set(args.users.split(","))
+        reports = [r for r in reports if r.user_id in wanted]
+
+    runner = BatchReportRunner(
+        max_workers=args.workers, chunk_size=args.chunk_size, vitals_data_dir=args.data_dir
+    )
+    summary = runner.run(reports)
+    print(f"Generated {summary.generated}/{summary.total} reports "
+          f"({summary.failed} failed) in {summary.duration_seconds:.1f}s")
+    for result in summary.results:
+        if result.status == "failed":
+            print(f"  {result.report_id}: {result.error}")
+    return 0 if summary.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""Celery workers for report generation and email
+
+Start one worker per queue so each gets its own pool and concurrency:
+
+    celery -A app.services.celery_worker worker -Q reports -c 2 -n reports@%h
+    celery -A app.services.celery_worker worker -Q email -c 8 -n email@%h
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from celery import Celery
+
+from .container import get_container
+from .db_service import DatabaseService
+from .email_service import EmailService
+from .report_generator import ReportGenerator
+from .task_queue import TASK_QUEUES, run_task
+
+celery_app = Celery(
+    "vitalsign",
+    broker=os.environ.get("CELERY_BROKER_URL", "memory://"),
+    backend=os.environ.get("CELERY_RESULT_BACKEND", "cache+memory://"),
+)
+celery_app.conf.update(
+    task_routes={name: {"queue": queue} for name, queue in TASK_QUEUES.items()},
+    task_track_started=True,
+    # A task is only acknowledged once it has run, so a crashed worker's task is redelivered
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_extended=True,
+    result_expires=int(os.environ.get("CELERY_RESULT_EXPIRES", "86400")),
+)
+
+# Per-process services, built on the first task this worker runs
+_worker_generator: Optional[ReportGenerator] = None
+_worker_email_service: Optional[EmailService] = None
+
+
+def _services():
+    global _worker_generator, _worker_email_service
+    if _worker_generator is None:
+        container = get_container()
+        _worker_generator = ReportGenerator(
+            vital_store=container.vital_store,
+            aggregate_store=container.aggregate_store,
+            artifact_store=container.artifact_store,
+            response_cache=container.response_cache,
+            risk_service=container.risk_service
+        )
+        # Workers send directly; queueing already happened on the broker
+        _worker_email_service = EmailService()
+    return _worker_generator, _worker_email_service
+
+
+async def _run(name: str, args: List[Any]) -> Any:
+    generator, email_service = _services()
+    # Async engines are bound to the event loop, so each task gets its own pool
+    generator.db = DatabaseService() if os.environ.get("DATABASE_URL") else None
+    try:
+        return await run_task(name, args, generator, email_service)
+    finally:
+        if generator.db is not None:
+            await generator.db.close()
+
+
+@celery_app.task(name="reports.generate")
+def generate_report(report_id: str) -> Dict[str, Any]:
+    return asyncio.run(_run("reports.generate", [report_id]))
+
+
+@celery_app.task(name="email.send")
+def send_email(method: str, kwargs: Dict[str, Any]) -> Any:
+    return asyncio.run(_run("email.send", [method, kwargs]))
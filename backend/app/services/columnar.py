@@ -0,0 +1,125 @@
+import json
+import struct
+from datetime import date, datetime
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+MEDIA_TYPE = "application/vnd.vitalsign.columnar"
+MAGIC = b"VSC1"
+_ALIGNMENT = 8
+_DTYPES = {"int32": "<i4", "int64": "<i8", "float32": "<f4"}
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _pad(length: int) -> int:
+    return -length % _ALIGNMENT
+
+
+def _is_numeric_list(value: Any) -> bool:
+    return (
+        isinstance(value, list) and len(value) > 0
+        and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)
+    )
+
+
+def split_columns(payload: Any, path: str = "") -> Tuple[Any, Dict[str, np.ndarray]]:
+    """Lift numeric arrays (and non-empty numeric lists) out of a JSON-shaped payload
+
+    Returns the payload with each lifted value replaced by ``{"$column": path}``
+    and the arrays by dotted path. Integer lists become int64 columns and
+    any other numeric list a float32 column.
+    """
+    if isinstance(payload, np.ndarray):
+        return {"$column": path}, {path: payload}
+    if _is_numeric_list(payload):
+        integral = all(isinstance(v, int) for v in payload)
+        return {"$column": path}, {path: np.asarray(payload, dtype=np.int64 if integral else np.float32)}
+    if isinstance(payload, dict):
+        meta, columns = {}, {}
+        for key, value in payload.items():
+            meta[key], found = split_columns(value, f"{path}.{key}" if path else str(key))
+            columns.update(found)
+        return meta, columns
+    return payload, {}
+
+
+def join_columns(meta: Any, columns: Dict[str, np.ndarray]) -> Any:
+    """Inverse of split_columns: put the arrays back in place of their references"""
+    if isinstance(meta, dict):
+        if set(meta) == {"$column"}:
+            return columns[meta["$column"]]
+        return {key: join_columns(value, columns) for key, value in meta.items()}
+    return meta
+
+
+def _encode_column(array: np.ndarray) -> Tuple[Dict[str, Any], np.ndarray]:
+    array = np.asarray(array)
+    if array.dtype.kind in "iu":
+        array = array.astype(np.int64, copy=False)
+        deltas = np.diff(array)
+        if len(array) > 0 and (len(deltas) == 0 or deltas.min() >= 0):
+            # Sorted integers (timestamps) become a base plus small non-negative steps
+            wide = len(deltas) > 0 and deltas.max() >= 2 ** 31
+            steps = deltas.astype(_DTYPES["int64" if wide else "int32"])
+            return {"type": steps.dtype.name, "encoding": "delta", "base": int(array[0]), "length": len(array)}, steps
+        return {"type": "int64", "length": len(array)}, array.astype(_DTYPES["int64"])
+    return {"type": "float32", "length": len(array)}, array.astype(_DTYPES["float32"])
+
+
+def encode(payload: Any) -> bytes:
+    """Serialize a JSON-shaped payload with its numeric arrays as packed typed columns
+
+    Layout (little-endian): ``VSC1``, a uint32 header length, a UTF-8 JSON
+    header ``{"meta": ..., "columns": [...]}``, then the body, which starts
+    at the next 8-byte boundary. Each column buffer starts on an 8-byte
+    boundary too, so a browser can view it directly as a typed array. A
+    column descriptor gives its ``path``, ``type`` (``int32``, ``int64`` or
+    ``float32``), ``length`` and ``offset`` within the body; with
+    ``encoding: "delta"`` the buffer holds the ``length - 1`` steps to add
+    to ``base``. ``meta`` is the payload with every column replaced by
+    ``{"$column": path}``.
+    """
+    meta, columns = split_columns(payload)
+    descriptors, buffers = [], []
+    offset = 0
+    for path, array in columns.items():
+        descriptor, buffer = _encode_column(array)
+        descriptor.update(path=path, offset=offset)
+        descriptors.append(descriptor)
+        buffers.append(buffer.tobytes())
+        offset += buffer.nbytes + _pad(buffer.nbytes)
+
+    header = json.dumps({"meta": meta, "columns": descriptors}, separators=(",", ":"), default=_json_default).encode()
+    parts = [MAGIC, struct.pack("<I", len(header)), header, b"\0" * _pad(len(MAGIC) + 4 + len(header))]
+    for buffer in buffers:
+        parts.append(buffer)
+        parts.append(b"\0" * _pad(len(buffer)))
+    return b"".join(parts)
+
+
+def decode(data: bytes) -> Any:
+    """Parse an encoded payload back into its JSON shape with NumPy arrays as columns"""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a columnar payload")
+    (length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8:8 + length])
+    body = 8 + length + _pad(8 + length)
+    columns = {}
+    for column in header["columns"]:
+        dtype = _DTYPES[column["type"]]
+        if column.get("encoding") == "delta":
+            steps = np.frombuffer(data, dtype=dtype, count=max(column["length"] - 1, 0), offset=body + column["offset"])
+            values = np.empty(column["length"], dtype=np.int64)
+            values[0] = column["base"]
+            np.cumsum(steps, out=values[1:])
+            values[1:] += column["base"]
+        else:
+            values = np.frombuffer(data, dtype=dtype, count=column["length"], offset=body + column["offset"])
+        columns[column["path"]] = values
+    return join_columns(header["meta"], columns)
@@ -0,0 +1,299 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .aggregates import AggregateStore
+from .alerts import AlertEngine
+from .artifact_store import ReportArtifactStore
+from .batch_reports import BatchReportRunner
+from .db_service import DatabaseService
+from .document_cache import DocumentCache
+from .email_service import EmailService
+from .feature_store import FeatureStore
+from .forecasting import ForecastService
+from .ingest import IngestBuffer
+from .mail_queue import LocalTransport, MailQueue, ResendTransport
+from .metrics import metrics
+from .pdf_extraction import PdfExtractor
+from .profiler import SamplingProfiler
+from .report_generator import ReportGenerator
+from .report_scheduler import ReportScheduler
+from .response_cache import RedisCacheBackend, ResponseCache
+from .risk_inference import RiskService
+from .risk_models import load_models
+from .rollups import RollupStore
+from .task_queue import TaskQueue, build_task_queue, run_task
+from .visualizations import VisualizationService
+from .vitals_store import VitalSignStore
+
+_MISSING = object()
+
+# Service name -> its counters, exposed on /metrics while the service exists
+SERVICE_STATS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "alert_engine": lambda service: service.stats,
+    "document_cache": lambda service: service.snapshot(),
+    "feature_store": lambda service: service.stats,
+    "forecast_service": lambda service: service.stats,
+    "ingest_buffer": lambda service: service.stats,
+    "mail_queue": lambda service: service.stats,
+    "report_scheduler": lambda service: service.stats,
+    "response_cache": lambda service: service.snapshot(),
+    "risk_service": lambda service: service.batcher.stats,
+    "task_queue": lambda service: getattr(service, "stats", {}),
+}
+
+
+class ServiceContainer:
+    """Application-lifetime owner of shared services
+
+    Each service is built once, either eagerly by ``startup`` or on first
+    use, and the same instance is handed to every request. ``shutdown``
+    drains the mail queue and disposes the database pool.
+
+    Optional services are enabled by environment:
+    ``DATABASE_URL`` (report persistence), ``VITALS_DATA_DIR`` (vitals
+    ingestion and real vital data instead of mock data), ``AGGREGATES_DATA_DIR`` (rolling report
+    aggregates), ``FEATURES_DATA_DIR`` (materialized risk features),
+    ``ROLLUPS_DATA_DIR`` (where chart rollups of stored vitals are kept),
+    ``MAIL_TRANSPORT`` = ``resend`` | ``local`` (queued email),
+    ``REPORT_CACHE_URL`` (a Redis response cache shared by all workers),
+    ``CELERY_BROKER_URL`` (report generation and email on Celery workers
+    instead of in-process task pools) and
+    ``REPORT_SCHEDULER_INTERVAL_SECONDS`` (``0`` turns off automatic scheduled reports).
+    """
+
+    def __init__(self):
+        self._services: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.started = False
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        service = self._services.get(name, _MISSING)
+        if service is _MISSING:
+            with self._lock:
+                service = self._services.get(name, _MISSING)
+                if service is _MISSING:
+                    service = factory()
+                    self._services[name] = service
+        return service
+
+    @property
+    def db(self) -> Optional[DatabaseService]:
+        return self._get("db", lambda: DatabaseService() if os.environ.get("DATABASE_URL") else None)
+
+    @property
+    def vital_store(self) -> Optional[VitalSignStore]:
+        return self._get(
+            "vital_store", lambda: VitalSignStore() if os.environ.get("VITALS_DATA_DIR") else None
+        )
+
+    @property
+    def aggregate_store(self) -> Optional[AggregateStore]:
+        def build():
+            if self.vital_store is None or not os.environ.get("AGGREGATES_DATA_DIR"):
+                return None
+            return AggregateStore(self.vital_store)
+        return self._get("aggregate_store", build)
+
+    @property
+    def feature_store(self) -> Optional[FeatureStore]:
+        def build():
+            if self.vital_store is None or not os.environ.get("FEATURES_DATA_DIR"):
+                return None
+            return FeatureStore(self.vital_store)
+        return self._get("feature_store", build)
+
+    @property
+    def rollup_store(self) -> Optional[RollupStore]:
+        return self._get(
+            "rollup_store", lambda: RollupStore(self.vital_store) if self.vital_store is not None else None
+        )
+
+    @property
+    def visualization_service(self) -> VisualizationService:
+        return self._get("visualization_service", lambda: VisualizationService(self.rollup_store))
+
+    @property
+    def ingest_buffer(self) -> Optional[IngestBuffer]:
+        return self._get(
+            "ingest_buffer", lambda: IngestBuffer(self.vital_store) if self.vital_store is not None else None
+        )
+
+    @property
+    def document_cache(self) -> DocumentCache:
+        return self._get("document_cache", DocumentCache)
+
+    @property
+    def pdf_extractor(self) -> PdfExtractor:
+        return self._get("pdf_extractor", lambda: PdfExtractor(cache=self.document_cache))
+
+    @property
+    def artifact_store(self) -> ReportArtifactStore:
+        return self._get("artifact_store", ReportArtifactStore)
+
+    @property
+    def mail_queue(self) -> Optional[MailQueue]:
+        def build():
+            transport_name = os.environ.get("MAIL_TRANSPORT", "").lower()
+            if transport_name == "resend":
+                transport = ResendTransport(os.environ.get("RESEND_API_KEY", ""))
+            elif transport_name == "local":
+                transport = LocalTransport()
+            else:
+                return None
+            return MailQueue(transport, rate_per_second=float(os.environ.get("MAIL_RATE_PER_SECOND", "2")))
+        return self._get("mail_queue", build)
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        def build():
+            url = os.environ.get("REPORT_CACHE_URL")
+            if not url and (int(os.environ.get("WEB_CONCURRENCY", "1")) > 1 or os.environ.get("CELERY_BROKER_URL")):
+                # Other processes' invalidations never reach a per-process cache
+                print("Warning: REPORT_CACHE_URL is unset with several worker processes; "
+                      "cached report responses may stay stale for up to REPORT_CACHE_TTL")
+            return ResponseCache(RedisCacheBackend(url) if url else None)
+        return self._get("response_cache", build)
+
+    @property
+    def forecast_service(self) -> ForecastService:
+        # Registered as a store listener so new readings invalidate cached forecasts
+        def build():
+            if not os.environ.get("FORECASTS_DATA_DIR") and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+                # Other workers' readings never invalidate a per-process cache
+                print("Warning: FORECASTS_DATA_DIR is unset with several worker processes; "
+                      "cached forecasts may not reflect readings received by other workers")
+            return ForecastService(vital_store=self.vital_store)
+        return self._get("forecast_service", build)
+
+    @property
+    def risk_service(self) -> RiskService:
+        # Model artifacts (RISK_MODEL_DIR) are loaded once per worker process
+        return self._get("risk_service", lambda: RiskService(
+            load_models(),
+            vital_store=self.vital_store,
+            aggregate_store=self.aggregate_store,
+            feature_store=self.feature_store,
+            forecaster=self.forecast_service
+        ))
+
+    @property
+    def task_queue(self) -> TaskQueue:
+        # Task bodies resolve services when they run, not when the queue is built
+        return self._get("task_queue", lambda: build_task_queue(
+            lambda name, args: run_task(name, args, self.report_generator, self.email_sender)
+        ))
+
+    @property
+    def email_service(self) -> EmailService:
+        return self._get(
+            "email_service", lambda: EmailService(mail_queue=self.mail_queue, task_queue=self.task_queue)
+        )
+
+    @property
+    def email_sender(self) -> EmailService:
+        # Sends inline; used by the in-process email task pool
+        return self._get("email_sender", lambda: EmailService(mail_queue=self.mail_queue))
+
+    @property
+    def alert_engine(self) -> AlertEngine:
+        # Registered as a store listener so every appended reading is evaluated
+        return self._get("alert_engine", lambda: AlertEngine(
+            self.email_service, vital_store=self.vital_store, user_lookup=self.report_generator.get_user
+        ))
+
+    @property
+    def report_generator(self) -> ReportGenerator:
+        return self._get("report_generator", lambda: ReportGenerator(
+            db_service=self.db,
+            email_service=self.email_service,
+            vital_store=self.vital_store,
+            aggregate_store=self.aggregate_store,
+            artifact_store=self.artifact_store,
+            response_cache=self.response_cache,
+            risk_service=self.risk_service
+        ))
+
+    @property
+    def batch_runner(self) -> BatchReportRunner:
+        return self._get("batch_runner", BatchReportRunner)
+
+    @property
+    def profiler(self) -> SamplingProfiler:
+        # Only samples during an admin-requested capture
+        return self._get("profiler", SamplingProfiler)
+
+    @property
+    def report_scheduler(self) -> ReportScheduler:
+        return self._get("report_scheduler", lambda: ReportScheduler(
+            self.report_generator, batch_runner=self.batch_runner, task_queue=self.task_queue
+        ))
+
+    def _register_metrics(self):
+        for name, read in SERVICE_STATS.items():
+            def collect(name=name, read=read):
+                service = self._services.get(name)
+                return read(service) if service is not None else {}
+            metrics.register_collector(name, collect)
+
+    async def startup(self):
+        """Build every service eagerly and start background workers"""
+        if self.started:
+            return
+        if self.db is not None:
+            await self.db.init_models()
+        if self.mail_queue is not None:
+            self.mail_queue.start()
+        if self.ingest_buffer is not None:
+            self.ingest_buffer.start()
+        self.risk_service.batcher.start()
+        self.task_queue.start()
+        self._register_metrics()
+        self.alert_engine.start()
+        self.report_scheduler.start()
+        # Touch the remaining services so the first request pays no construction cost
+        self.report_generator
+        self.visualization_service
+        self.batch_runner
+        self.started = True
+
+    async def shutdown(self):
+        """Flush buffered readings, drain queued email and release pooled connections"""
+        report_scheduler = self._services.get("report_scheduler")
+        if report_scheduler is not None:
+            await report_scheduler.stop()
+        ingest_buffer = self._services.get("ingest_buffer")
+        if ingest_buffer is not None:
+            await ingest_buffer.stop()
+        feature_store = self._services.get("feature_store")
+        if feature_store is not None:
+            # After the last ingest flush, so its folds are written too
+            feature_store.close()
+        alert_engine = self._services.get("alert_engine")
+        if alert_engine is not None:
+            await alert_engine.stop()
+        task_queue = self._services.get("task_queue")
+        if task_queue is not None:
+            await task_queue.stop()
+        risk_service = self._services.get("risk_service")
+        if risk_service is not None:
+            await risk_service.batcher.stop()
+        mail_queue = self._services.get("mail_queue")
+        if mail_queue is not None:
+            await mail_queue.stop(drain=True)
+        db = self._services.get("db")
+        if db is not None:
+            await db.close()
+        pdf_extractor = self._services.get("pdf_extractor")
+        if pdf_extractor is not None:
+            pdf_extractor.close()
+        with self._lock:
+            self._services.clear()
+        self.started = False
+
+
+container = ServiceContainer()
+
+
+def get_container() -> ServiceContainer:
+    return container
@@ -0,0 +1,153 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import JSON, DateTime, Index, String, Text, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, undefer
+
+from .report_generator import Report, ReportSummary
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class ReportRecord(Base):
+    __tablename__ = "reports"
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    type: Mapped[str] = mapped_column(String(16), nullable=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    highlights: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    recommendations: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    # Large blob: never loaded unless a query explicitly undefers it
+    html_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
+    pdf_path: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination for "reports of one type" and "all reports" listings
+        Index("ix_reports_user_type_date", "user_id", "type", "date", "id"),
+        Index("ix_reports_user_date", "user_id", "date", "id"),
+    )
+
+
+def encode_cursor(date: datetime, report_id: str) -> str:
+    """Opaque cursor pointing just after (date, id) in newest-first order"""
+    raw = json.dumps({"d": date.isoformat(), "i": report_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["d"]), data["i"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def _async_url(database_url: str) -> str:
+    """Map plain driver URLs onto their async drivers"""
+    if database_url.startswith("postgresql://") or database_url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    if database_url.startswith("sqlite://") and "+aiosqlite" not in database_url:
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
+
+def _summary(record: ReportRecord) -> ReportSummary:
+    return ReportSummary(
+        id=record.id,
+        user_id=record.user_id,
+        title=record.title,
+        date=record.date,
+        type=record.type,
+        highlights=record.highlights,
+        recommendations=record.recommendations,
+        status=record.status,
+        pdf_path=record.pdf_path
+    )
+
+
+class DatabaseService:
+    """Async SQLAlchemy persistence for reports, backed by a pooled engine"""
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        echo: bool = False
+    ):
+        url = _async_url(database_url or os.environ.get("DATABASE_URL", "sqlite:///./vitalsign.db"))
+        engine_options = {"echo": echo, "pool_pre_ping": True}
+        if not url.startswith("sqlite"):
+            engine_options.update(pool_size=pool_size, max_overflow=max_overflow)
+        self.engine = create_async_engine(url, **engine_options)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def init_models(self):
+        """Create tables and indexes that do not exist yet"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    async def save_report(self, report: Report):
+        """Insert or replace a report"""
+        async with self.session_factory() as session:
+            await session.merge(ReportRecord(**report.dict()))
+            await session.commit()
+
+    async def update_report(self, report: Report):
+        await self.save_report(report)
+
+    async def get_report(self, report_id: str) -> Optional[Report]:
+        """Fetch one report including its HTML content"""
+        async with self.session_factory() as session:
+            record = await session.scalar(
+                select(ReportRecord)
+                .options(undefer(ReportRecord.html_content))
+                .where(ReportRecord.id == report_id)
+            )
+            if record is None:
+                return None
+            return Report(**_summary(record).dict(), html_content=record.html_content)
+
+    async def get_user_reports(
+        self,
+        user_id: str,
+        report_type: Optional[str] = None,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ReportSummary], Optional[str]]:
+        """Newest-first page of a user's reports using keyset pagination
+
+        Returns the page (without ``html_content``) and the cursor for the next
+        page, or None on the last page. Each page is an index range scan from
+        the cursor position, so deep pages cost the same as the first.
+        """
+        query = select(ReportRecord).where(ReportRecord.user_id == user_id)
+        if report_type:
+            query = query.where(ReportRecord.type == report_type)
+        if cursor:
+            after_date, after_id = decode_cursor(cursor)
+            query = query.where(tuple_(ReportRecord.date, ReportRecord.id) < tuple_(after_date, after_id))
+        query = query.order_by(ReportRecord.date.desc(), ReportRecord.id.desc()).limit(limit + 1)
+
+        async with self.session_factory() as session:
+            records = list(await session.scalars(query))
+
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = encode_cursor(records[-1].date, records[-1].id)
+        return [_summary(record) for record in records], next_cursor
+
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+KINDS = ("document", "page")
+
+
+class DocumentCache:
+    """Size-bounded on-disk cache of PDF extraction results keyed by content hash
+
+    Layout: ``{root}/{kind}/{key[:2]}/{key}.json`` where ``kind`` is
+    ``document`` (whole-file results) or ``page`` (one page's matches). Reads
+    bump the file's mtime, so eviction removes the least recently used
+    entries once the cache grows past ``max_bytes``.
+
+    Lookups are plain file reads and are safe from pool workers; writes and
+    eviction happen in the API process only.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root_dir = root_dir or os.environ.get("PDF_CACHE_DIR", "data/pdf_cache")
+        self.max_bytes = max_bytes or int(os.environ.get("PDF_CACHE_MAX_MB", "256")) * 1024 * 1024
+        self.low_watermark = int(self.max_bytes * 0.9)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(size for _, size, _ in self._entries())
+        self.hits = {kind: 0 for kind in KINDS}
+        self.misses = {kind: 0 for kind in KINDS}
+        self.evictions = 0
+
+    def __getstate__(self):
+        # Pool workers only need the location for lookups
+        return {"root_dir": self.root_dir}
+
+    def __setstate__(self, state):
+        self.root_dir = state["root_dir"]
+
+    def path(self, kind: str, key: str) -> str:
+        if kind not in KINDS or not key.isalnum():
+            raise ValueError("Invalid cache reference")
+        return os.path.join(self.root_dir, kind, key[:2], f"{key}.json")
+
+    def lookup(self, kind: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss; does not update the counters"""
+        path = self.path(kind, key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        value = self.lookup(kind, key)
+        with self._lock:
+            if value is None:
+                self.misses[kind] += 1
+            else:
+                self.hits[kind] += 1
+        return value
+
+    def record(self, kind: str, hits: int, misses: int):
+        """Add lookups made elsewhere (e.g. in pool workers) to the counters"""
+        with self._lock:
+            self.hits[kind] += hits
+            self.misses[kind] += misses
+
+    def put(self, kind: str, key: str, value: Any):
+        """Store a JSON-serializable value atomically, evicting old entries if needed"""
+        path = self.path(kind, key)
+        data = json.dumps(value, separators=(",", ":"), default=str).encode()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for kind in KINDS:
+            for dirpath, _, filenames in os.walk(os.path.join(self.root_dir, kind)):
+                for name in filenames:
+                    if not name.endswith(".json"):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _evict(self):
+        # Trim to the low watermark so a full cache does not rescan on every write
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.low_watermark:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,76 @@
+from typing import Tuple
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. Every other bucket keeps the
+    point forming the largest triangle with the point kept before it and the
+    average of the next bucket, which preserves the visual shape of a line
+    far better than striding or averaging.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # threshold - 2 buckets over the interior points
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Averages of each bucket, computed up front; the last bucket's "next" is the final point
+    sizes = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x: np.ndarray, low: np.ndarray, high: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(x, value) pairs for the lowest and highest point of each of ``bins`` equal time bins
+
+    Unlike averaging, every spike and dip survives, so the result is at most
+    ``2 * bins`` points in time order. ``low`` and ``high`` are the same array
+    for raw readings, or bucket minima and maxima for rolled-up data.
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0, dtype=np.asarray(x).dtype), np.empty(0, dtype=np.float64)
+    x = np.asarray(x)
+    low = np.asarray(low, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    if 2 * bins >= n and np.array_equal(low, high):
+        return x, low
+
+    span = float(x[-1] - x[0]) or 1.0
+    b = np.minimum(((x - x[0]) / span * bins).astype(np.int64), bins - 1)
+    # x is sorted, so b is too: group starts are where the bin changes
+    starts = np.r_[0, np.flatnonzero(np.diff(b)) + 1]
+    lowest = np.lexsort((low, b))[starts]
+    highest = np.lexsort((-high, b))[starts]
+
+    # Emit the two extremes of each bin in time order
+    first = np.minimum(lowest, highest)
+    second = np.maximum(lowest, highest)
+    first_value = np.where(first == lowest, low[first], high[first])
+    second_value = np.where(second == highest, high[second], low[second])
+    # A bucket holding both extremes contributes its low then its high at one x
+    both = (lowest != highest) | (low[lowest] != high[highest])
+    xs = np.column_stack([x[first], x[second]])
+    values = np.column_stack([first_value, second_value])
+    mask = np.column_stack([np.ones(len(first), dtype=bool), both])
+    return xs[mask], values[mask]
@@ -1,11 +1,16 @@
+import json
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr
 
 # Resend email library
 import resend
 
+from .mail_queue import MailQueue, OutboundEmail
+from .metrics import span
+from .templates import template_cache
+
 class EmailTemplate(BaseModel):
     subject: str
     html_content: str
@@ -14,11 +19,18 @@ class EmailTemplate(BaseModel):
 class EmailService:
     """Service for sending emails to users"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self, api_key: Optional[str] = None, mail_queue: Optional[MailQueue] = None, task_queue: Any = None
+    ):
         self.api_key = api_key or os.environ.get("RESEND_API_KEY", "re_cB6iuhbb_KK7uMMfXsxLSTmH4SA7cWmud")
         # Initialize the Resend client
         resend.api_key = self.api_key
         
+        # When set, messages go through the async outbound queue instead of being sent inline
+        self.mail_queue = mail_queue
+        # When set, send_* methods run as tasks on the email worker pool and return the task ID
+        self.task_queue = task_queue
+        
         # Load email templates
         self._load_templates()
     
@@ -236,9 +248,29 @@ class EmailService:
                 """
             )
         }
+        
+        # Compile each template once (cached process-wide) with indentation stripped
+        self.compiled_templates = {
+            name: (
+                template_cache.compile(f"email_{name}_html", template.html_content),
+                template_cache.compile(f"email_{name}_text", template.text_content, keep_blank_lines=True)
+            )
+            for name, template in self.templates.items()
+        }
+    
+    def _render(self, name: str, **values) -> Tuple[str, str, str]:
+        """Render a template's subject, HTML and text bodies"""
+        html_template, text_template = self.compiled_templates[name]
+        return self.templates[name].subject, html_template.render(**values), text_template.render(**values)
+    
+    async def _offload(self, method: str, **kwargs) -> str:
+        return await self.task_queue.submit("email.send", method, kwargs)
     
     async def send_report_email(self, email: EmailStr, report: Any, user: Any = None):
         """Send a report email to a user"""
+        if self.task_queue is not None:
+            return await self._offload("send_report_email", email=email, report=json.loads(report.json()), user=user)
+        
         # In a real implementation, fetch user if not provided
         # if user is None:
         #     user = await self.db.get_user_by_email(email)
@@ -252,9 +284,9 @@ class EmailService:
             }
         
         # Get the appropriate template
-        template = self.templates.get(f"{report.type}_report")
-        if not template:
-            template = self.templates["weekly_report"]  # Default to weekly
+        template_name = f"{report.type}_report"
+        if template_name not in self.templates:
+            template_name = "weekly_report"  # Default to weekly
         
         # Format date range
         today = datetime.now().date()
@@ -272,15 +304,11 @@ class EmailService:
         
         # Format the email content
         report_url = f"https://vitalsignguardian.com/reports/{report.id}"
-        html_content = template.html_content.format(
+        subject, html_content, text_content = self._render(
+            template_name,
             first_name=user["first_name"],
             date_range=date_range,
             highlights=highlights_html,
-            report_url=report_url
-        )
-        text_content = template.text_content.format(
-            first_name=user["first_name"],
-            date_range=date_range,
             text_highlights=text_highlights,
             report_url=report_url
         )
@@ -288,7 +316,7 @@ class EmailService:
         # Send the email
         await self._send_email(
             to_email=email,
-            subject=template.subject,
+            subject=subject,
             html_content=html_content,
             text_content=text_content
         )
@@ -297,6 +325,9 @@ class EmailService:
     
     async def send_health_alert(self, email: EmailStr, alert_data: Dict[str, Any], user: Any = None):
         """Send a health alert email"""
+        if self.task_queue is not None:
+            return await self._offload("send_health_alert", email=email, alert_data=alert_data, user=user)
+        
         # Mock user for development
         if user is None:
             user = {
@@ -305,23 +336,17 @@ class EmailService:
                 "email": email
             }
         
-        template = self.templates["health_alert"]
-        
         # Format recommendations
         recommendations_html = "".join([f"<li>{rec}</li>" for rec in alert_data["recommendations"]])
         text_recommendations = "\n".join([f"- {rec}" for rec in alert_data["recommendations"]])
         
         # Format the email content
         dashboard_url = "https://vitalsignguardian.com/dashboard"
-        html_content = template.html_content.format(
+        subject, html_content, text_content = self._render(
+            "health_alert",
             first_name=user["first_name"],
             alert_message=alert_data["message"],
             recommendations=recommendations_html,
-            dashboard_url=dashboard_url
-        )
-        text_content = template.text_content.format(
-            first_name=user["first_name"],
-            alert_message=alert_data["message"],
             text_recommendations=text_recommendations,
             dashboard_url=dashboard_url
         )
@@ -329,7 +354,7 @@ class EmailService:
         # Send the email
         await self._send_email(
             to_email=email,
-            subject=template.subject,
+            subject=subject,
             html_content=html_content,
             text_content=text_content
         )
@@ -338,6 +363,11 @@ class EmailService:
     
     async def send_recommendation_email(self, email: EmailStr, recommendations: List[str], user: Any = None):
         """Send a personalized recommendations email"""
+        if self.task_queue is not None:
+            return await self._offload(
+                "send_recommendation_email", email=email, recommendations=recommendations, user=user
+            )
+        
         # Mock user for development
         if user is None:
             user = {
@@ -346,21 +376,16 @@ class EmailService:
                 "email": email
             }
         
-        template = self.templates["recommendation"]
-        
         # Format recommendations
         recommendations_html = "".join([f"<li>{rec}</li>" for rec in recommendations])
         text_recommendations = "\n".join([f"- {rec}" for rec in recommendations])
         
         # Format the email content
         dashboard_url = "https://vitalsignguardian.com/dashboard"
-        html_content = template.html_content.format(
+        subject, html_content, text_content = self._render(
+            "recommendation",
             first_name=user["first_name"],
             recommendations=recommendations_html,
-            dashboard_url=dashboard_url
-        )
-        text_content = template.text_content.format(
-            first_name=user["first_name"],
             text_recommendations=text_recommendations,
             dashboard_url=dashboard_url
         )
@@ -368,7 +393,7 @@ class EmailService:
         # Send the email
         await self._send_email(
             to_email=email,
-            subject=template.subject,
+            subject=subject,
             html_content=html_content,
             text_content=text_content
         )
@@ -377,6 +402,9 @@ class EmailService:
     
     async def send_reminder_email(self, email: EmailStr, user: Any = None):
         """Send a reminder email to a user who hasn't logged in recently"""
+        if self.task_queue is not None:
+            return await self._offload("send_reminder_email", email=email, user=user)
+        
         # Mock user for development
         if user is None:
             user = {
@@ -385,15 +413,10 @@ class EmailService:
                 "email": email
             }
         
-        template = self.templates["reminder"]
-        
         # Format the email content
         login_url = "https://vitalsignguardian.com/login"
-        html_content = template.html_content.format(
-            first_name=user["first_name"],
-            login_url=login_url
-        )
-        text_content = template.text_content.format(
+        subject, html_content, text_content = self._render(
+            "reminder",
             first_name=user["first_name"],
             login_url=login_url
         )
@@ -401,7 +424,7 @@ class EmailService:
         # Send the email
         await self._send_email(
             to_email=email,
-            subject=template.subject,
+            subject=subject,
             html_content=html_content,
             text_content=text_content
         )
@@ -410,6 +433,20 @@ class EmailService:
     
     async def _send_email(self, to_email: EmailStr, subject: str, html_content: str, text_content: str):
         """Send an email using Resend email service"""
+        with span("email.send"):
+            return await self._deliver(to_email, subject, html_content, text_content)
+    
+    async def _deliver(self, to_email: EmailStr, subject: str, html_content: str, text_content: str):
+        if self.mail_queue is not None:
+            # Hand off to the queue; batching, rate limiting and retries happen off the request path
+            await self.mail_queue.enqueue(OutboundEmail(
+                to=[to_email],
+                subject=subject,
+                html=html_content,
+                text=text_content
+            ))
+            return True
+        
         try:
             # Send email using Resend
             params = {
@@ -0,0 +1,370 @@
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .aggregates import (
+    COUNT,
+    MAX,
+    MIN,
+    PARTIAL_SIZE,
+    T_MAX,
+    T_MIN,
+    build_partial,
+    empty_partial,
+    partial_statistics,
+)
+from .shared_files import FileVersion, KeyLocks, file_version
+from .statistics import METRICS
+from .vitals_store import VitalSignStore, to_epoch_ms
+
+# Rolling windows, in days. Each is an exponentially decayed partial whose
+# samples have the same mean age as a plain window of that length, so a new
+# reading updates it in O(1) without re-reading history.
+WINDOWS = {"7d": 7, "30d": 30}
+STATS = ("count", "mean", "std", "p5", "p95", "change")
+SHORT_STATS = ("count", "mean")
+
+# Feature-set definition: (name, metric, statistic, window) ... Counts are
+# decayed sample weights, so they only tell whether a window has readings.
+FEATURE_DEFINITIONS: Tuple[Tuple[str, str, str, str], ...] = (
+    *((f"{metric}_{stat}", metric, stat, "30d") for metric in METRICS for stat in STATS),
+    *((f"{metric}_{stat}_7d", metric, stat, "7d") for metric in METRICS for stat in SHORT_STATS),
+)
+# ... followed by differences of two of those features
+DERIVED_FEATURES: Tuple[Tuple[str, str, str], ...] = (
+    ("pulse_pressure_mean", "systolic_mean", "diastolic_mean"),
+    ("pulse_pressure_mean_7d", "systolic_mean_7d", "diastolic_mean_7d"),
+    ("heart_rate_delta", "heart_rate_mean_7d", "heart_rate_mean"),
+    ("stress_delta", "stress_mean_7d", "stress_mean"),
+)
+FEATURE_NAMES = [name for name, *_ in FEATURE_DEFINITIONS] + [name for name, *_ in DERIVED_FEATURES]
+_FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Changes whenever the definition does, so stored vectors of an older feature
+# set are never read as the current one
+FEATURE_SET_VERSION = hashlib.sha256(
+    json.dumps([FEATURE_DEFINITIONS, DERIVED_FEATURES, WINDOWS]).encode()
+).hexdigest()[:12]
+
+BACKFILL_DAYS = 90  # history folded in when a user's vector is first built
+REFRESH_AFTER_MS = 3_600_000  # re-evaluate window cut-offs of idle users hourly
+
+_MS_PER_DAY = 86_400_000.0
+# Fields of a partial that are sums and therefore decay; min/max and the time range do not
+_DECAYING = np.ones(PARTIAL_SIZE, dtype=bool)
+_DECAYING[[MIN, MAX, T_MIN, T_MAX]] = False
+
+
+def _time_constant_ms(days: int) -> float:
+    # Exponential weights with time constant tau have mean sample age tau,
+    # the same as a uniform window of 2 * tau
+    return days / 2 * _MS_PER_DAY
+
+
+class UserFeatures:
+    """Decayed partials for one user plus the feature vector derived from them"""
+
+    def __init__(self, as_of_ms: float = -math.inf):
+        self.as_of_ms = as_of_ms
+        self.last_reading_ms = np.full(len(METRICS), -np.inf)
+        self.partials = np.stack([
+            np.stack([empty_partial() for _ in WINDOWS]) for _ in METRICS
+        ])  # (metrics x windows x PARTIAL_SIZE)
+        self.vector = np.full(len(FEATURE_NAMES), np.nan)
+        self.refreshed_ms = -math.inf
+        # Newest reading the last rebuild from history saw; appends reported
+        # later for readings up to it are already included
+        self.backfill_ms = -math.inf
+        # Version of the file these partials were read from or last written to
+        self.version: Optional[FileVersion] = None
+
+    def fold(self, metric: str, ts_ms: np.ndarray, values: np.ndarray):
+        """Add readings, decaying what is already summarized to the newest timestamp"""
+        if len(values) == 0:
+            return
+        m = METRICS.index(metric)
+        ts = np.asarray(ts_ms, dtype=np.float64)
+        reference = max(self.as_of_ms, float(ts.max()))
+        for w, days in enumerate(WINDOWS.values()):
+            tau = _time_constant_ms(days)
+            if np.isfinite(self.as_of_ms) and reference > self.as_of_ms:
+                # Every metric shares the user's reference time
+                self.partials[:, w, _DECAYING] *= math.exp(-(reference - self.as_of_ms) / tau)
+            update = build_partial(metric, ts, values, weights=np.exp(-(reference - ts) / tau))
+            current = self.partials[m, w]
+            merged = current + update
+            merged[[MIN, T_MIN]] = np.minimum(current[[MIN, T_MIN]], update[[MIN, T_MIN]])
+            merged[[MAX, T_MAX]] = np.maximum(current[[MAX, T_MAX]], update[[MAX, T_MAX]])
+            self.partials[m, w] = merged
+        self.as_of_ms = reference
+        self.last_reading_ms[m] = max(self.last_reading_ms[m], float(ts.max()))
+
+    def statistics(self, window: str = "30d", now_ms: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """partial_statistics-shaped statistics per metric for one window
+
+        A metric without readings inside the window counts as having none,
+        however much older history its decayed partial still holds.
+        """
+        w = list(WINDOWS).index(window)
+        cutoff = (now_ms if now_ms is not None else to_epoch_ms(datetime.now())) - WINDOWS[window] * _MS_PER_DAY
+        result = {}
+        for m, metric in enumerate(METRICS):
+            partial = self.partials[m, w] if self.last_reading_ms[m] >= cutoff else empty_partial()
+            stats = partial_statistics(metric, partial)
+            # Fitted change across the window rather than across all history
+            stats["change"] = stats["slope"] * WINDOWS[window] if partial[COUNT] > 0 else 0.0
+            result[metric] = stats
+        return result
+
+    def refresh(self, now_ms: Optional[float] = None):
+        """Recompute the feature vector from the partials"""
+        now_ms = now_ms if now_ms is not None else to_epoch_ms(datetime.now())
+        vector = np.full(len(FEATURE_NAMES), np.nan)
+        by_window = {window: self.statistics(window, now_ms) for window in WINDOWS}
+        for i, (_, metric, stat, window) in enumerate(FEATURE_DEFINITIONS):
+            vector[i] = by_window[window][metric][stat]
+        for i, (_, left, right) in enumerate(DERIVED_FEATURES, start=len(FEATURE_DEFINITIONS)):
+            vector[i] = vector[_FEATURE_INDEX[left]] - vector[_FEATURE_INDEX[right]]
+        self.vector = vector
+        self.refreshed_ms = now_ms
+
+
+class FeatureStore:
+    """Materialized, versioned per-user feature vectors
+
+    Each user's vector (rolling means, variability, percentiles, trends,
+    pulse pressure and short-vs-long deltas; see FEATURE_DEFINITIONS) is
+    updated incrementally from VitalSignStore appends and stored under the
+    feature-set version, so risk scoring and reports read it in O(1)
+    instead of scanning raw readings. A user seen for the first time (or
+    for the first time under a new feature-set version) is backfilled from
+    the last BACKFILL_DAYS of readings. Updates are kept in memory and
+    written every ``FEATURES_PERSIST_SECONDS``.
+
+    Several API workers may share the directory: cached features are
+    checked against their file before use, and a worker whose file was
+    rewritten by another since it was read rebuilds the user from history
+    instead of overwriting the other's readings.
+
+    Layout: ``{root}/{FEATURE_SET_VERSION}/{user_id}.npz``
+    """
+
+    def __init__(
+        self,
+        vital_store: VitalSignStore,
+        root_dir: Optional[str] = None,
+        cache_size: int = 10000,
+        persist_interval: Optional[float] = None
+    ):
+        self.vital_store = vital_store
+        self.root_dir = root_dir or os.environ.get("FEATURES_DATA_DIR", "data/features")
+        self.version_dir = os.path.join(self.root_dir, FEATURE_SET_VERSION)
+        os.makedirs(self.version_dir, exist_ok=True)
+        self.cache_size = cache_size
+        self.persist_interval = persist_interval or float(os.environ.get("FEATURES_PERSIST_SECONDS", "5"))
+        self._cache: "OrderedDict[str, UserFeatures]" = OrderedDict()
+        # Users whose cached features are newer than their file
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        # Serializes writers so an older snapshot never replaces a newer one
+        self._persist_lock = threading.Lock()
+        # Held while a user's file is checked and rewritten, across processes
+        self._file_locks = KeyLocks()
+        self._closed = threading.Event()
+        self._persister: Optional[threading.Thread] = None
+        self.stats = {"folds": 0, "persisted": 0, "rebuilt": 0}
+        vital_store.add_listener(self.on_append)
+
+    def _path(self, user_id: str) -> str:
+        # Reuse the store's user-id validation before touching the filesystem
+        self.vital_store._user_dir(user_id)
+        return os.path.join(self.version_dir, f"{user_id}.npz")
+
+    def _file_lock(self, user_id: str):
+        return self._file_locks.hold(user_id, self._path(user_id)[:-len(".npz")] + ".lock")
+
+    def _remember(self, user_id: str, features: UserFeatures):
+        self._cache[user_id] = features
+        self._cache.move_to_end(user_id)
+        self._trim()
+
+    def _trim(self):
+        # Unsaved users stay cached until the next flush has written them
+        if len(self._cache) <= self.cache_size:
+            return
+        for user_id in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if user_id not in self._dirty:
+                del self._cache[user_id]
+
+    def _mark_dirty(self, user_id: str):
+        self._dirty.add(user_id)
+        if self._persister is None and not self._closed.is_set():
+            self._persister = threading.Thread(target=self._persist_loop, name="feature-store-persist", daemon=True)
+            self._persister.start()
+
+    def _load(self, user_id: str) -> Optional[UserFeatures]:
+        path = self._path(user_id)
+        version = file_version(path)
+        features = self._cache.get(user_id)
+        # Unsaved folds are reconciled with another worker's write by the next flush
+        if features is not None and (features.version == version or user_id in self._dirty):
+            self._cache.move_to_end(user_id)
+            return features
+        if version is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                with np.load(f) as data:
+                    features = UserFeatures(float(data["as_of_ms"]))
+                    features.last_reading_ms = data["last_reading_ms"]
+                    features.partials = data["partials"]
+                    features.vector = data["vector"]
+                    features.backfill_ms = float(data["backfill_ms"]) if "backfill_ms" in data.files else -math.inf
+        except FileNotFoundError:
+            return None
+        features.version = (stat.st_mtime_ns, stat.st_ino)
+        self._remember(user_id, features)
+        return features
+
+    def _save(
+        self, user_id: str, as_of_ms: float, backfill_ms: float, last_reading_ms: np.ndarray,
+        partials: np.ndarray, vector: np.ndarray
+    ) -> Optional[FileVersion]:
+        """Write a snapshot; callers hold the user's file lock"""
+        path = self._path(user_id)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp, as_of_ms=as_of_ms, backfill_ms=backfill_ms, last_reading_ms=last_reading_ms,
+            partials=partials, vector=vector
+        )
+        os.replace(tmp, path)
+        return file_version(path)
+
+    def _build(self, user_id: str) -> UserFeatures:
+        """Features from the last BACKFILL_DAYS of readings in the store"""
+        features = UserFeatures()
+        end = datetime.now() + timedelta(days=1)
+        start = end - timedelta(days=BACKFILL_DAYS + 1)
+        for metric in METRICS:
+            ts, values = self.vital_store.get_range(user_id, metric, start, end)
+            features.fold(metric, ts, values)
+        features.backfill_ms = features.as_of_ms
+        features.refresh()
+        return features
+
+    def _backfill(self, user_id: str) -> UserFeatures:
+        features = self._build(user_id)
+        # Nothing to persist for users without readings (e.g. unknown ids)
+        if np.isfinite(features.as_of_ms):
+            self._mark_dirty(user_id)
+        self._remember(user_id, features)
+        return features
+
+    def get(self, user_id: str) -> UserFeatures:
+        """The user's materialized features, built from history on first use"""
+        with self._lock:
+            features = self._load(user_id)
+            if features is None:
+                features = self._backfill(user_id)
+            elif to_epoch_ms(datetime.now()) - features.refreshed_ms > REFRESH_AFTER_MS:
+                # New readings were folded in, or some aged out of a window, since the last update
+                features.refresh()
+            return features
+
+    def on_append(self, user_id: str, day, series: str, rows: np.ndarray):
+        """VitalSignStore append listener: fold new readings into the user's partials
+
+        This runs in the ingest flush, so it only updates memory: the vector
+        is recomputed on the next read and the file is rewritten by the
+        periodic flush. Users without a materialized vector are left alone:
+        their first read backfills from the store, which already contains
+        these readings. For the same reason, readings no newer than the last
+        backfill were already there when it ran and are not folded twice.
+        """
+        if series not in METRICS:
+            return
+        with self._lock:
+            features = self._load(user_id)
+            if features is None:
+                return
+            rows = rows[rows["ts"] > features.backfill_ms]
+            if len(rows) == 0:
+                return
+            features.fold(series, rows["ts"], rows["value"])
+            features.refreshed_ms = -math.inf
+            self._mark_dirty(user_id)
+            self.stats["folds"] += 1
+
+    @staticmethod
+    def _snapshot(features: UserFeatures) -> Tuple[float, float, np.ndarray, np.ndarray, np.ndarray]:
+        if features.refreshed_ms == -math.inf:
+            features.refresh()
+        return (
+            features.as_of_ms, features.backfill_ms, features.last_reading_ms.copy(),
+            features.partials.copy(), features.vector.copy()
+        )
+
+    def flush(self):
+        """Write every user changed since the last flush"""
+        with self._persist_lock:
+            with self._lock:
+                snapshots = [
+                    (user_id, self._cache[user_id], self._cache[user_id].version, self._snapshot(self._cache[user_id]))
+                    for user_id in self._dirty
+                ]
+                self._dirty.clear()
+                self._trim()
+            for user_id, features, base, snapshot in snapshots:
+                try:
+                    with self._file_lock(user_id):
+                        if file_version(self._path(user_id)) != base:
+                            # Another worker wrote this user since it was read here, so
+                            # each copy lacks the other's readings; the store has them all
+                            with self._lock:
+                                features = self._build(user_id)
+                                self._remember(user_id, features)
+                                snapshot = self._snapshot(features)
+                            self.stats["rebuilt"] += 1
+                        version = self._save(user_id, *snapshot)
+                    with self._lock:
+                        # Later folds build on the file just written
+                        features.version = version
+                    self.stats["persisted"] += 1
+                except OSError as e:
+                    # The partials are rebuilt from history if the file is missing
+                    print(f"Error persisting features for {user_id}: {e}")
+
+    def _persist_loop(self):
+        while not self._closed.wait(self.persist_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the periodic flush and write what is still pending"""
+        self._closed.set()
+        if self._persister is not None:
+            self._persister.join()
+        self.flush()
+
+    def vector(self, user_id: str) -> Dict[str, float]:
+        """Current feature vector by name"""
+        features = self.get(user_id)
+        return {name: float(value) for name, value in zip(FEATURE_NAMES, features.vector)}
+
+    def matrix(self, user_ids: List[str], names: List[str]) -> np.ndarray:
+        """(users x names) slice of the stored vectors, NaN where a metric has no readings"""
+        columns = [_FEATURE_INDEX[name] for name in names]
+        return np.vstack([self.get(user_id).vector[columns] for user_id in user_ids])
+
+    def statistics(self, user_id: str) -> Dict[str, Dict[str, float]]:
+        """30-day statistics per metric from the stored partials"""
+        return self.get(user_id).statistics("30d")
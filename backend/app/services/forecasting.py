@@ -0,0 +1,440 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .shared_files import FileVersion, KeyLocks, file_version
+from .statistics import METRICS
+from .vitals_store import VitalSignStore, to_epoch_ms
+
+LOOKBACK_DAYS = 28
+HORIZON_DAYS = 30
+Z_95 = 1.959964
+_MS_PER_DAY = 86_400_000
+# File modification times come from a coarse clock that can trail time.time_ns()
+_FILE_CLOCK_SLACK_NS = 20_000_000
+
+# Typical adult daily means, used for metrics without any reading
+NORMALS = np.array([72.0, 118.0, 76.0, 15.0, 35.0], dtype=np.float32)
+# Day-to-day spread assumed when a series is too short to estimate its own
+MIN_DAILY_STD = np.array([2.0, 3.0, 2.0, 0.5, 3.0], dtype=np.float32)
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class MetricForecast(BaseModel):
+    metric: str
+    dates: List[date]
+    mean: List[float]
+    lower: List[float]  # 95% interval
+    upper: List[float]
+
+
+class Forecast(BaseModel):
+    user_id: str
+    generated_at: datetime
+    model_version: str
+    horizon_days: int
+    last_observed: Dict[str, Optional[float]]  # mean of the last 7 daily means
+    metrics: Dict[str, MetricForecast]
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+def daily_means(ts_ms: np.ndarray, values: np.ndarray, start_ms: int, days: int) -> np.ndarray:
+    """Mean value per day over ``days`` days from ``start_ms``; NaN for days without readings"""
+    day = (np.asarray(ts_ms, dtype=np.int64) - start_ms) // _MS_PER_DAY
+    inside = (day >= 0) & (day < days)
+    day = day[inside]
+    totals = np.bincount(day, weights=np.asarray(values, dtype=np.float64)[inside], minlength=days)
+    counts = np.bincount(day, minlength=days)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def fill_forward(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Forward-fill NaNs along the time axis of a (users x days x metrics) array
+
+    Days before a metric's first reading take that first reading, and
+    metrics never observed take their NORMALS value. Returns the filled
+    array and the mask of observed days.
+    """
+    observed = ~np.isnan(series)
+    index = np.where(observed, np.arange(series.shape[1])[None, :, None], 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = np.take_along_axis(series, index, axis=1)
+    first = np.take_along_axis(series, observed.argmax(axis=1)[:, None, :], axis=1)
+    filled = np.where(np.isnan(filled), first, filled)
+    filled = np.where(np.isnan(filled), NORMALS, filled)
+    return filled.astype(np.float32), observed
+
+
+class HoltForecaster:
+    """Damped-trend exponential smoothing, vectorized across users and metrics
+
+    Used when no trained recurrent model is deployed.
+    """
+
+    version = "holt-damped-1"
+
+    def __init__(self, alpha: float = 0.3, beta: float = 0.1, phi: float = 0.9):
+        self.alpha, self.beta, self.phi = alpha, beta, phi
+
+    def predict(self, series: np.ndarray, observed: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(users x horizon x metrics) means and standard deviations"""
+        level = series[:, 0].astype(np.float64)
+        trend = np.zeros_like(level)
+        squared_error = np.zeros_like(level)
+        errors = np.zeros_like(level)
+        for t in range(1, series.shape[1]):
+            forecast = level + self.phi * trend
+            error = np.where(observed[:, t], series[:, t] - forecast, 0.0)
+            squared_error += error * error
+            errors += observed[:, t]
+            # Missing days carry the state forward without an update
+            new_level = forecast + self.alpha * error
+            trend = np.where(observed[:, t], self.phi * trend + self.beta * (new_level - level), self.phi * trend)
+            level = new_level
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sigma = np.sqrt(squared_error / np.maximum(errors, 1))
+        sigma = np.maximum(sigma, MIN_DAILY_STD)
+
+        steps = np.arange(1, horizon + 1)
+        damping = np.cumsum(self.phi ** steps)
+        mean = level[:, None, :] + damping[None, :, None] * trend[:, None, :]
+        # h-step variance of additive damped-trend smoothing: 1 + sum of c_j^2 for j < h
+        c = self.alpha * (1 + self.beta * damping)
+        spread = np.sqrt(1 + np.concatenate([[0.0], np.cumsum(c * c)[:-1]]))
+        std = sigma[:, None, :] * spread[None, :, None]
+        return mean.astype(np.float32), std.astype(np.float32)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+class LSTMForecaster:
+    """Single-layer LSTM with a dense head, run as a pure-NumPy recurrent step
+
+    Weights use the Keras layout (gates i, f, c, o), so a trained Keras model
+    converts with ``export_keras_lstm``; inference needs neither TensorFlow
+    nor a GPU. Inputs per day are the normalized daily means and the observed
+    mask; the head predicts the normalized next-day change and its log
+    standard deviation for every metric, rolled out autoregressively.
+    """
+
+    def __init__(self, weights: Dict[str, np.ndarray], version: str):
+        self.kernel = weights["kernel"].astype(np.float32)
+        self.recurrent_kernel = weights["recurrent_kernel"].astype(np.float32)
+        self.bias = weights["bias"].astype(np.float32)
+        self.dense_kernel = weights["dense_kernel"].astype(np.float32)
+        self.dense_bias = weights["dense_bias"].astype(np.float32)
+        self.norm_mean = weights["norm_mean"].astype(np.float32)
+        self.norm_scale = weights["norm_scale"].astype(np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.version = version
+        metrics = len(METRICS)
+        if self.kernel.shape != (2 * metrics, 4 * self.units) or self.dense_kernel.shape != (self.units, 2 * metrics):
+            raise ValueError("LSTM weights do not match the forecasting inputs")
+
+    @classmethod
+    def load(cls, path: str) -> "LSTMForecaster":
+        with np.load(path) as data:
+            weights = {key: data[key] for key in data.files}
+        return cls(weights, str(weights.pop("version", os.path.basename(path))))
+
+    def _step(self, x: np.ndarray, h: np.ndarray, c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        z = x @ self.kernel + h @ self.recurrent_kernel + self.bias
+        i, f, g, o = np.split(z, 4, axis=1)
+        c = _sigmoid(f) * c + _sigmoid(i) * np.tanh(g)
+        h = _sigmoid(o) * np.tanh(c)
+        return h, c
+
+    def predict(self, series: np.ndarray, observed: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        users, days, metrics = series.shape
+        x = (series - self.norm_mean) / self.norm_scale
+        mask = observed.astype(np.float32)
+        h = np.zeros((users, self.units), dtype=np.float32)
+        c = np.zeros_like(h)
+        for t in range(days):
+            h, c = self._step(np.concatenate([x[:, t], mask[:, t]], axis=1), h, c)
+
+        current = x[:, -1]
+        ones = np.ones((users, metrics), dtype=np.float32)
+        means = np.empty((users, horizon, metrics), dtype=np.float32)
+        variance = np.zeros((users, metrics), dtype=np.float32)
+        stds = np.empty_like(means)
+        for step in range(horizon):
+            out = h @ self.dense_kernel + self.dense_bias
+            delta, log_sigma = out[:, :metrics], np.clip(out[:, metrics:], -6.0, 3.0)
+            current = current + delta
+            variance += np.exp(2 * log_sigma)
+            means[:, step] = current
+            stds[:, step] = np.sqrt(variance)
+            h, c = self._step(np.concatenate([current, ones], axis=1), h, c)
+        return means * self.norm_scale + self.norm_mean, np.maximum(stds * self.norm_scale, MIN_DAILY_STD)
+
+
+def export_keras_lstm(model, path: str, norm_mean: np.ndarray, norm_scale: np.ndarray, version: str):
+    """Save a Keras ``Sequential([LSTM(units), Dense(2 * len(METRICS))])`` for NumPy inference"""
+    lstm, dense = model.layers[0], model.layers[-1]
+    kernel, recurrent_kernel, bias = lstm.get_weights()
+    dense_kernel, dense_bias = dense.get_weights()
+    np.savez(
+        path,
+        kernel=kernel,
+        recurrent_kernel=recurrent_kernel,
+        bias=bias,
+        dense_kernel=dense_kernel,
+        dense_bias=dense_bias,
+        norm_mean=np.asarray(norm_mean, dtype=np.float32),
+        norm_scale=np.asarray(norm_scale, dtype=np.float32),
+        version=np.array(version),
+    )
+
+
+def load_forecast_model(path: Optional[str] = None):
+    """The deployed LSTM (FORECAST_MODEL_PATH) or the damped-trend fallback"""
+    path = path or os.environ.get("FORECAST_MODEL_PATH")
+    if path:
+        try:
+            model = LSTMForecaster.load(path)
+            print(f"Loaded forecasting model {model.version} from {path}")
+            return model
+        except Exception as e:
+            print(f"Error loading forecasting model {path}: {e}")
+    return HoltForecaster()
+
+
+class ForecastService:
+    """Per-user metric forecasts, cached until the user's next reading
+
+    Forecasts are computed for many users at once: their daily series form
+    one (users x days x metrics) array and the model runs once per batch.
+    With ``root_dir`` (FORECASTS_DATA_DIR) forecasts are also kept on disk,
+    so a nightly bulk run pre-computes them for every API worker. A new
+    reading then replaces the user's file with an empty one, which every
+    worker's cache is checked against; without ``root_dir`` only this
+    process' cache is invalidated. A forecast whose inputs were read before
+    the latest invalidation is returned but never cached.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        vital_store: Optional[VitalSignStore] = None,
+        root_dir: Optional[str] = None,
+        cache_size: int = 10000,
+        batch_size: Optional[int] = None
+    ):
+        self.model = model or load_forecast_model()
+        self.vital_store = vital_store
+        self.root_dir = root_dir or os.environ.get("FORECASTS_DATA_DIR")
+        self.cache_size = cache_size
+        self.batch_size = batch_size or int(os.environ.get("FORECAST_BATCH_SIZE", "512"))
+        # User -> (version of the file it was read from or written to, forecast)
+        self._cache: "OrderedDict[str, Tuple[Optional[FileVersion], Forecast]]" = OrderedDict()
+        # User -> time.time_ns() of the latest reading-triggered invalidation
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_locks = KeyLocks()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        if self.root_dir:
+            os.makedirs(self._version_dir(), exist_ok=True)
+        if vital_store is not None:
+            vital_store.add_listener(self.on_append)
+
+    def _version_dir(self) -> str:
+        return os.path.join(self.root_dir, self.model.version)
+
+    def _path(self, user_id: str) -> str:
+        if self.vital_store is not None:
+            # Reuse the store's user-id validation before touching the filesystem
+            self.vital_store._user_dir(user_id)
+        return os.path.join(self._version_dir(), f"{user_id}.json")
+
+    def _file_lock(self, user_id: str):
+        return self._file_locks.hold(user_id, os.path.join(self._version_dir(), f"{user_id}.lock"))
+
+    def on_append(self, user_id: str, day, series: str, rows: np.ndarray):
+        """VitalSignStore append listener: a new reading invalidates the user's forecast"""
+        if series in METRICS:
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            if self._cache.pop(user_id, None) is not None:
+                self.stats["invalidations"] += 1
+            self._invalidated[user_id] = time.time_ns()
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.cache_size:
+                self._invalidated.popitem(last=False)
+        if self.root_dir:
+            # Emptied rather than removed: its new mtime tells other workers, and
+            # forecasts still being computed, that the readings changed
+            with self._file_lock(user_id):
+                open(self._path(user_id), "w").close()
+
+    def _lookup(self, user_id: str) -> Optional[Forecast]:
+        version = file_version(self._path(user_id)) if self.root_dir else None
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(user_id)
+                return cached[1]
+        if version is None:
+            return None
+        try:
+            with open(self._path(user_id), encoding="utf-8") as f:
+                stat = os.fstat(f.fileno())
+                forecast = Forecast.parse_raw(f.read())
+        except (OSError, ValueError):
+            # Missing, or emptied by a new reading
+            return None
+        # Yesterday's nightly run is still valid if nothing new arrived since
+        self._remember(forecast, (stat.st_mtime_ns, stat.st_ino))
+        return forecast
+
+    def _remember(self, forecast: Forecast, version: Optional[FileVersion]):
+        with self._lock:
+            self._cache[forecast.user_id] = (version, forecast)
+            self._cache.move_to_end(forecast.user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _store(self, forecast: Forecast, started_ns: int):
+        """Cache a forecast whose inputs were read from ``started_ns`` on, unless a reading arrived since"""
+        version = None
+        if self.root_dir:
+            path = self._path(forecast.user_id)
+            with self._file_lock(forecast.user_id):
+                current = file_version(path)
+                if current is not None and current[0] >= started_ns - _FILE_CLOCK_SLACK_NS:
+                    # Emptied by a new reading, or replaced by a newer forecast, meanwhile
+                    return
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(forecast.json())
+                os.replace(tmp, path)
+                version = file_version(path)
+        with self._lock:
+            if self._invalidated.get(forecast.user_id, -1) >= started_ns:
+                return
+        self._remember(forecast, version)
+
+    def _load_series(self, user_ids: List[str], today: date) -> np.ndarray:
+        """(users x LOOKBACK_DAYS x metrics) daily means ending today, NaN where missing"""
+        first_day = today - timedelta(days=LOOKBACK_DAYS - 1)
+        start = datetime.combine(first_day, datetime.min.time())
+        end = start + timedelta(days=LOOKBACK_DAYS)
+        series = np.full((len(user_ids), LOOKBACK_DAYS, len(METRICS)), np.nan)
+        if self.vital_store is None:
+            # Mock data for development
+            mock = np.array([
+                [72, 75, 71, 74, 73, 70, 72],
+                [125, 128, 124, 130, 126, 122, 125],
+                [82, 84, 80, 86, 83, 81, 82],
+                [16, 15, 16, 17, 16, 15, 16],
+                [45, 60, 40, 55, 35, 30, 42],
+            ], dtype=np.float64).T
+            series[:, -7:] = mock
+            return series
+        start_ms = to_epoch_ms(start)
+        for row, user_id in enumerate(user_ids):
+            for m, metric in enumerate(METRICS):
+                ts, values = self.vital_store.get_range(user_id, metric, start, end)
+                series[row, :, m] = daily_means(ts, values, start_ms, LOOKBACK_DAYS)
+        return series
+
+    def forecast_many(self, user_ids: List[str]) -> List[Forecast]:
+        """Compute (and cache) forecasts, one model run per ``batch_size`` users"""
+        results: List[Forecast] = []
+        for offset in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[offset:offset + self.batch_size]
+            today = datetime.now().date()
+            started_ns = time.time_ns()
+            raw = self._load_series(batch, today)
+            filled, observed = fill_forward(raw)
+            mean, std = self.model.predict(filled, observed, HORIZON_DAYS)
+            dates = [today + timedelta(days=d) for d in range(1, HORIZON_DAYS + 1)]
+            recent = raw[:, -7:]
+            with np.errstate(invalid="ignore"):
+                recent_counts = (~np.isnan(recent)).sum(axis=1)
+                recent_mean = np.nansum(recent, axis=1) / np.maximum(recent_counts, 1)
+            generated_at = datetime.now()
+            for row, user_id in enumerate(batch):
+                forecast = Forecast(
+                    user_id=user_id,
+                    generated_at=generated_at,
+                    model_version=self.model.version,
+                    horizon_days=HORIZON_DAYS,
+                    last_observed={
+                        metric: round(float(recent_mean[row, m]), 2) if recent_counts[row, m] else None
+                        for m, metric in enumerate(METRICS)
+                    },
+                    metrics={
+                        metric: MetricForecast(
+                            metric=metric,
+                            dates=dates,
+                            mean=np.round(mean[row, :, m], 2).tolist(),
+                            lower=np.round(mean[row, :, m] - Z_95 * std[row, :, m], 2).tolist(),
+                            upper=np.round(mean[row, :, m] + Z_95 * std[row, :, m], 2).tolist(),
+                        )
+                        # Metrics never observed in the lookback window are not forecast
+                        for m, metric in enumerate(METRICS) if observed[row, :, m].any()
+                    },
+                )
+                self._store(forecast, started_ns)
+                results.append(forecast)
+        return results
+
+    async def forecast(self, user_id: str) -> Forecast:
+        """Cached forecast for one user, computed off the event loop on a miss"""
+        forecast = await asyncio.to_thread(self._lookup, user_id)
+        if forecast is not None:
+            self.stats["hits"] += 1
+            return forecast
+        self.stats["misses"] += 1
+        return (await asyncio.to_thread(self.forecast_many, [user_id]))[0]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Nightly bulk forecasting: python -m app.services.forecasting"""
+    parser = argparse.ArgumentParser(description="Pre-compute vital-sign forecasts for every user")
+    parser.add_argument("--batch-size", type=int, default=None, help="Users per model run")
+    parser.add_argument("--users", nargs="*", help="Only these users (default: every user in the store)")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("VITALS_DATA_DIR") or not os.environ.get("FORECASTS_DATA_DIR"):
+        parser.error("VITALS_DATA_DIR and FORECASTS_DATA_DIR must be set")
+    store = VitalSignStore()
+    service = ForecastService(vital_store=store, batch_size=args.batch_size)
+    user_ids = args.users or store.list_users()
+
+    started = time.perf_counter()
+    forecasts = service.forecast_many(user_ids)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "users": len(forecasts),
+        "model_version": service.model.version,
+        "duration_seconds": round(elapsed, 2),
+    }))
+
+
+if __name__ == "__main__":
+    main()
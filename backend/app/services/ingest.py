@@ -0,0 +1,313 @@
+import asyncio
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .vitals_store import RECORD_DTYPE, SERIES, VitalSignStore, _SAFE_ID, from_epoch_ms, to_epoch_ms
+
+# Physiologically plausible bounds; readings outside them are rejected as
+# sensor or transcription errors rather than stored.
+VALID_RANGES = {
+    "heart_rate": (20.0, 300.0),
+    "systolic": (40.0, 300.0),
+    "diastolic": (20.0, 200.0),
+    "respiratory_rate": (2.0, 80.0),
+    "stress": (0.0, 100.0),
+    "oxygen_saturation": (50.0, 100.0),
+    "temperature": (25.0, 45.0),
+}
+SOURCES = {"manual", "scan", "pdf", "device"}
+MAX_BATCH_READINGS = 50000
+# Oldest accepted reading: 2000-01-01T00:00:00Z
+MIN_TIMESTAMP_MS = 946684800000
+MAX_CLOCK_SKEW_MS = 24 * 3600 * 1000
+
+_SERIES_INDEX = {series: i for i, series in enumerate(SERIES)}
+_LOWER = np.array([VALID_RANGES[s][0] for s in SERIES], dtype="<f4")
+_UPPER = np.array([VALID_RANGES[s][1] for s in SERIES], dtype="<f4")
+
+PartitionKey = Tuple[str, date, str]
+
+
+class IngestRejection(BaseModel):
+    index: int
+    reason: str
+
+
+class IngestResult(BaseModel):
+    received: int
+    accepted: int
+    rejected: List[IngestRejection]
+    committed: bool  # False when the readings were only buffered (wait=false)
+
+
+class IngestBackpressure(Exception):
+    """The ingest buffer is saturated; the client should retry later"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Ingest buffer is full")
+        self.retry_after = retry_after
+
+
+def parse_readings(body: bytes, content_type: str = "") -> List[Any]:
+    """Decode a JSON array or NDJSON (one reading per line) request body"""
+    text = body.strip()
+    if not text:
+        return []
+    if "ndjson" in content_type or "jsonlines" in content_type or not text.startswith(b"["):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    readings = json.loads(text)
+    if not isinstance(readings, list):
+        raise ValueError("Expected a JSON array of readings")
+    return readings
+
+
+def _parse_timestamp(value: Any) -> Tuple[int, date]:
+    """Epoch milliseconds and partition day of an ISO string or epoch-ms number"""
+    if isinstance(value, str):
+        ms = to_epoch_ms(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        ms = int(value)
+    else:
+        raise ValueError("timestamp must be an ISO 8601 string or epoch milliseconds")
+    # Same local-day partition whatever offset (or none) the sender used
+    return ms, from_epoch_ms(ms).date()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_readings(
+    readings: List[Any], default_user_id: Optional[str] = None
+) -> Tuple[Dict[PartitionKey, np.ndarray], int, List[IngestRejection]]:
+    """Validate a batch and group accepted readings into store partitions
+
+    Structural checks (fields, types, timestamps) run in one pass over the
+    batch; value-range and clock checks then run vectorized over the whole
+    batch at once. A blood_pressure reading is accepted or rejected as a unit.
+
+    Returns ``(partitions, accepted_count, rejections)`` where ``partitions``
+    maps (user_id, day, series) to packed records ready for the store.
+    """
+    rejected: List[IngestRejection] = []
+    row_reading: List[int] = []
+    row_key: List[PartitionKey] = []
+    row_series: List[int] = []
+    row_ts: List[int] = []
+    row_value: List[float] = []
+
+    for index, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            rejected.append(IngestRejection(index=index, reason="reading must be an object"))
+            continue
+        user_id = reading.get("user_id") or default_user_id
+        vital_type = reading.get("type")
+        value = reading.get("value")
+        source = reading.get("source", "device")
+        if not isinstance(user_id, str) or not _SAFE_ID.match(user_id):
+            reason = "missing or invalid user_id"
+        elif source not in SOURCES:
+            reason = f"unknown source: {source!r}"
+        elif vital_type == "blood_pressure":
+            if (
+                not isinstance(value, dict)
+                or not _is_number(value.get("systolic"))
+                or not _is_number(value.get("diastolic"))
+            ):
+                reason = "blood_pressure needs numeric systolic and diastolic values"
+            else:
+                components = [("systolic", value["systolic"]), ("diastolic", value["diastolic"])]
+                reason = None
+        elif vital_type in _SERIES_INDEX:
+            if not _is_number(value):
+                reason = f"{vital_type} needs a numeric value"
+            else:
+                components = [(vital_type, value)]
+                reason = None
+        else:
+            reason = f"unknown type: {vital_type!r}"
+
+        if reason is None:
+            try:
+                ts, day = _parse_timestamp(reading.get("timestamp"))
+            except (ValueError, TypeError, OverflowError, OSError) as e:
+                reason = str(e) if isinstance(e, ValueError) else "invalid timestamp"
+
+        if reason is not None:
+            rejected.append(IngestRejection(index=index, reason=reason))
+            continue
+
+        for series, component in components:
+            row_reading.append(index)
+            row_key.append((user_id, day, series))
+            row_series.append(_SERIES_INDEX[series])
+            row_ts.append(ts)
+            row_value.append(component)
+
+    if not row_reading:
+        return {}, 0, rejected
+
+    # Vectorized range and clock checks over every component of the batch
+    readings_idx = np.array(row_reading, dtype=np.int64)
+    series_idx = np.array(row_series, dtype=np.int64)
+    ts = np.array(row_ts, dtype="<i8")
+    values = np.array(row_value, dtype="<f4")
+    now_ms = to_epoch_ms(datetime.now())
+    out_of_range = ~((values >= _LOWER[series_idx]) & (values <= _UPPER[series_idx]))
+    bad_clock = (ts < MIN_TIMESTAMP_MS) | (ts > now_ms + MAX_CLOCK_SKEW_MS)
+    bad_rows = out_of_range | bad_clock
+
+    if bad_rows.any():
+        bad_row_idx = np.flatnonzero(bad_rows)
+        # Report the first offending component of each rejected reading
+        _, first = np.unique(readings_idx[bad_row_idx], return_index=True)
+        for row in bad_row_idx[first].tolist():
+            if bad_clock[row]:
+                reason = "timestamp outside the accepted window"
+            else:
+                series = SERIES[series_idx[row]]
+                reason = f"{series} value {float(values[row]):g} outside {VALID_RANGES[series]}"
+            rejected.append(IngestRejection(index=row_reading[row], reason=reason))
+        rejected.sort(key=lambda r: r.index)
+        keep = ~np.isin(readings_idx, readings_idx[bad_row_idx])
+    else:
+        keep = np.ones(len(readings_idx), dtype=bool)
+
+    records = np.empty(len(ts), dtype=RECORD_DTYPE)
+    records["ts"] = ts
+    records["value"] = values
+
+    groups: Dict[PartitionKey, List[int]] = {}
+    for row in np.flatnonzero(keep).tolist():
+        groups.setdefault(row_key[row], []).append(row)
+    partitions = {key: records[rows] for key, rows in groups.items()}
+
+    accepted = len(readings) - len(rejected)
+    return partitions, accepted, rejected
+
+
+class IngestBuffer:
+    """Group-commit buffer between the ingestion API and the vital-sign store
+
+    Requests add their validated partitions to a shared in-memory buffer and
+    a single flusher writes it with one append per (user, day, series)
+    partition for all requests combined. A waiting caller wakes the flusher
+    right away; everything submitted while a write is in progress rides on
+    the next one, so batches grow with load instead of with a fixed delay.
+    Buffered-only (``wait=False``) rows are written within ``flush_interval``
+    seconds or once ``max_batch_rows`` rows are pending.
+
+    When buffered plus in-flight rows would exceed ``max_pending_rows``,
+    ``submit`` raises IngestBackpressure instead of growing without bound.
+    """
+
+    def __init__(
+        self,
+        store: VitalSignStore,
+        max_batch_rows: int = 20000,
+        flush_interval: float = 0.05,
+        max_pending_rows: int = 200000
+    ):
+        self.store = store
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval = flush_interval
+        self.max_pending_rows = max_pending_rows
+        self._pending: Dict[PartitionKey, List[np.ndarray]] = {}
+        self._pending_rows = 0
+        self._flushing_rows = 0
+        self._waiters: List[asyncio.Future] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.stats = {"submitted": 0, "committed": 0, "flushes": 0, "rejected_busy": 0}
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending_rows(self) -> int:
+        return self._pending_rows + self._flushing_rows
+
+    async def submit(self, partitions: Dict[PartitionKey, np.ndarray], wait: bool = True):
+        """Buffer rows for the next flush, optionally waiting until they are written"""
+        rows = sum(len(records) for records in partitions.values())
+        if rows == 0:
+            return
+        if self.pending_rows + rows > self.max_pending_rows:
+            self.stats["rejected_busy"] += 1
+            raise IngestBackpressure(retry_after=max(1.0, self.flush_interval * 4))
+        self.start()
+
+        for key, records in partitions.items():
+            self._pending.setdefault(key, []).append(records)
+        self._pending_rows += rows
+        self.stats["submitted"] += rows
+
+        waiter = None
+        if wait:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        if waiter is not None or self._pending_rows >= self.max_batch_rows:
+            self._wakeup.set()
+        if waiter is not None:
+            await waiter
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+
+    async def flush(self):
+        """Write everything buffered so far in one group commit"""
+        if not self._pending:
+            return
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, []
+        self._flushing_rows, self._pending_rows = self._pending_rows, 0
+        try:
+            # File appends run off the event loop so requests keep being accepted
+            written = await asyncio.to_thread(self._write, pending)
+        except Exception as e:
+            print(f"Vitals flush failed: {e}")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            self.stats["committed"] += written
+            self.stats["flushes"] += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            self._flushing_rows = 0
+
+    def _write(self, pending: Dict[PartitionKey, List[np.ndarray]]) -> int:
+        written = 0
+        for (user_id, day, series), chunks in pending.items():
+            records = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+            written += self.store.append_rows(user_id, day, series, records)
+        return written
+
+    async def stop(self):
+        """Stop the flusher after writing whatever is still buffered"""
+        if self._task is None:
+            await self.flush()
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+DEFAULT_SENDER = "VitalSign Guardian <health@vitalsignguardian.com>"
+
+
+class OutboundEmail(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    to: List[str]
+    subject: str
+    html: str
+    text: str
+    sender: str = DEFAULT_SENDER
+    attempts: int = 0
+    last_error: Optional[str] = None
+    queued_at: datetime = Field(default_factory=datetime.now)
+
+    def to_provider_payload(self) -> Dict[str, Any]:
+        return {
+            "from": self.sender,
+            "to": self.to,
+            "subject": self.subject,
+            "html": self.html,
+            "text": self.text,
+        }
+
+
+class TransportError(Exception):
+    """Raised by a transport when a send fails; ``retryable`` marks transient failures"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MailTransport:
+    """Base class for outbound mail transports"""
+
+    # Largest number of messages accepted by one send_batch call
+    max_batch_size = 1
+
+    async def send_batch(self, messages: List[OutboundEmail]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class ResendTransport(MailTransport):
+    """Resend HTTP API over a pooled keep-alive client, using the batch endpoint"""
+
+    max_batch_size = 100
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.resend.com",
+        max_connections: int = 10,
+        timeout: float = 10.0
+    ):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def idempotency_key(messages: List[OutboundEmail]) -> str:
+        """Same key for a retry of the same messages, so Resend drops the duplicate send"""
+        return hashlib.sha256(",".join(m.id for m in messages).encode()).hexdigest()
+
+    async def send_batch(self, messages: List[OutboundEmail]) -> None:
+        headers = {"Idempotency-Key": self.idempotency_key(messages)}
+        if len(messages) == 1:
+            request = self.client.post("/emails", json=messages[0].to_provider_payload(), headers=headers)
+        else:
+            request = self.client.post(
+                "/emails/batch", json=[m.to_provider_payload() for m in messages], headers=headers
+            )
+        try:
+            response = await request
+        except httpx.HTTPError as e:
+            raise TransportError(f"Resend request failed: {e}") from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransportError(f"Resend returned {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise TransportError(f"Resend rejected batch ({response.status_code}): {response.text[:200]}", retryable=False)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class LocalTransport(MailTransport):
+    """In-process stand-in for Resend used in development and tests
+
+    Delivered messages are kept in ``sent``. ``fail_next`` makes the next N
+    batches raise a retryable TransportError.
+    """
+
+    def __init__(self, max_batch_size: int = 100, fail_next: int = 0, latency: float = 0.0):
+        self.max_batch_size = max_batch_size
+        self.fail_next = fail_next
+        self.latency = latency
+        self.sent: List[OutboundEmail] = []
+        self.batches = 0
+
+    async def send_batch(self, messages: List[OutboundEmail]) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise TransportError("Simulated transport failure")
+        self.batches += 1
+        self.sent.extend(messages)
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class DeadLetterStore:
+    """Messages that exhausted their retries, kept in memory and appended to a JSONL file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.messages: List[OutboundEmail] = []
+
+    def add(self, message: OutboundEmail):
+        self.messages.append(message)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(message.json() + "\n")
+
+    def load(self) -> List[OutboundEmail]:
+        """Read dead letters persisted by earlier runs"""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [OutboundEmail(**json.loads(line)) for line in f if line.strip()]
+
+
+class MailQueue:
+    """Asynchronous outbound mail queue
+
+    ``enqueue`` returns immediately; worker tasks drain the queue in batches
+    sized for the transport, pace provider calls with a token bucket, retry
+    transient failures with exponential backoff and move messages that
+    exhaust their retries to the dead-letter store. A batch the provider
+    rejects outright is resent one message at a time, so only the bad
+    messages are dead-lettered.
+    """
+
+    def __init__(
+        self,
+        transport: MailTransport,
+        rate_per_second: float = 2.0,
+        burst: Optional[float] = None,
+        workers: int = 2,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 60.0,
+        max_queue_size: int = 10000,
+        dead_letters: Optional[DeadLetterStore] = None
+    ):
+        self.transport = transport
+        self.rate_limiter = TokenBucket(rate_per_second, burst)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letters = dead_letters or DeadLetterStore(os.environ.get("MAIL_DEAD_LETTER_PATH"))
+        self._queue: "asyncio.Queue[OutboundEmail]" = asyncio.Queue(maxsize=max_queue_size)
+        self._tasks: List[asyncio.Task] = []
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead_lettered": 0, "batches": 0, "split_batches": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def enqueue(self, message: OutboundEmail):
+        """Queue a message, waiting only if the queue is full"""
+        await self._queue.put(message)
+        self.stats["enqueued"] += 1
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def join(self):
+        """Wait until every queued message has been sent or dead-lettered"""
+        while True:
+            await self._queue.join()
+            if not self._retry_handles:
+                return
+            # Messages waiting out a backoff delay will be re-queued shortly
+            await asyncio.sleep(0.05)
+
+    async def stop(self, drain: bool = True):
+        """Stop workers (optionally after draining) and close the transport"""
+        if drain and self._tasks:
+            await self.join()
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.transport.close()
+
+    async def _next_batch(self) -> List[OutboundEmail]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.transport.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._send(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send(self, batch: List[OutboundEmail]):
+        try:
+            await self.rate_limiter.acquire()
+            await self.transport.send_batch(batch)
+            self.stats["sent"] += len(batch)
+            self.stats["batches"] += 1
+        except TransportError as e:
+            if not e.retryable and len(batch) > 1:
+                # One malformed message fails the whole batch: send each on its own
+                self.stats["split_batches"] += 1
+                for message in batch:
+                    await self._send([message])
+                return
+            for message in batch:
+                self._handle_failure(message, str(e), e.retryable)
+        except Exception as e:
+            for message in batch:
+                self._handle_failure(message, str(e), True)
+
+    def _handle_failure(self, message: OutboundEmail, error: str, retryable: bool):
+        message.attempts += 1
+        message.last_error = error
+        if not retryable or message.attempts > self.max_retries:
+            self.dead_letters.add(message)
+            self.stats["dead_lettered"] += 1
+            print(f"Email {message.id} to {message.to} moved to dead letters: {error}")
+            return
+
+        # Exponential backoff with full jitter
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (message.attempts - 1)))
+        delay = random.uniform(0, delay)
+        self.stats["retried"] += 1
+        loop = asyncio.get_running_loop()
+        self._retry_handles[message.id] = loop.call_later(delay, self._requeue, message)
+
+    def _requeue(self, message: OutboundEmail):
+        self._retry_handles.pop(message.id, None)
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dead_letters.add(message)
+            self.stats["dead_lettered"] += 1
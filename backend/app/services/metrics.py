@@ -0,0 +1,278 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; request latencies and report/email stage timings
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes; request and response bodies
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in Prometheus' layout"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile over all label sets, interpolated within its bucket"""
+        counts = [sum(column) for column in zip(*(series[0] for series in self._series.values()))]
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic count per label set; also used for gauges that go up and down"""
+
+    def __init__(self, name: str, help_text: str, kind: str = "counter"):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._values: Dict[Labels, float] = {}
+
+    def add(self, labels: Labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(
+            f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        )
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide request, span and service metrics in Prometheus text format
+
+    Updates take one lock and a dict lookup, so they are cheap enough for
+    every request. Services that already keep a ``stats`` dict register a
+    collector and are read only when ``/metrics`` is scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            "vitalsign_http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS
+        )
+        self.request_bytes = Histogram(
+            "vitalsign_http_request_size_bytes", "HTTP request body size by route", SIZE_BUCKETS
+        )
+        self.response_bytes = Histogram(
+            "vitalsign_http_response_size_bytes", "HTTP response body size by route", SIZE_BUCKETS
+        )
+        self.requests = Counter("vitalsign_http_requests_total", "HTTP requests by route and status")
+        self.in_flight = Counter("vitalsign_http_requests_in_flight", "HTTP requests being served", kind="gauge")
+        self.span_seconds = Histogram(
+            "vitalsign_span_duration_seconds", "Duration of named stages, e.g. report generation steps", LATENCY_BUCKETS
+        )
+        self.span_errors = Counter("vitalsign_span_errors_total", "Named stages that raised")
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight.add((), 1)
+
+    def request_finished(
+        self, method: str, route: str, status: int, seconds: float, request_size: int, response_size: int
+    ):
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self.in_flight.add((), -1)
+            self.requests.add(labels + (("status", str(status)),))
+            self.request_seconds.observe(labels, seconds)
+            self.request_bytes.observe(labels, request_size)
+            self.response_bytes.observe(labels, response_size)
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """Seconds under which ``q`` of all requests so far completed"""
+        with self._lock:
+            return self.request_seconds.quantile(q)
+
+    def in_flight_requests(self) -> int:
+        with self._lock:
+            return int(self.in_flight.value())
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time a named stage; usable in sync and async code alike"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.span_errors.add((("span", name),))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.span_seconds.observe((("span", name),), elapsed)
+
+    def register_collector(self, service: str, collect: Callable[[], Dict[str, Any]]):
+        """Expose a service's numeric stats as ``vitalsign_service_stat{service, stat}``"""
+        self._collectors[service] = collect
+
+    def _collected(self) -> List[str]:
+        lines = [
+            "# HELP vitalsign_service_stat Counters and gauges kept by individual services",
+            "# TYPE vitalsign_service_stat gauge",
+        ]
+        for service, collect in sorted(self._collectors.items()):
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"Metrics collector {service} failed: {e}")
+                continue
+            flat: Dict[str, Any] = {}
+            for stat, value in stats.items():
+                # One level of nesting, e.g. per-kind hit counts
+                if isinstance(value, dict):
+                    flat.update({f"{stat}_{key}": inner for key, inner in value.items()})
+                else:
+                    flat[stat] = value
+            for stat, value in sorted(flat.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                labels = _labels({"service": service, "stat": stat})
+                lines.append(f"vitalsign_service_stat{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in (
+                self.requests, self.in_flight, self.request_seconds, self.request_bytes,
+                self.response_bytes, self.span_seconds, self.span_errors
+            ):
+                lines.extend(metric.render())
+        lines.extend(self._collected())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def span(name: str):
+    """``with span("report.pdf"):`` records the block's duration on the process-wide registry"""
+    return metrics.span(name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and body sizes per route
+
+    Routes are labelled by their path template (``/api/reports/{report_id}``),
+    never the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: Any, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in getattr(scope.get("app"), "routes", []):
+                if getattr(candidate, "endpoint", None) is not None:
+                    self._routes[candidate.endpoint] = candidate.path
+            route = self._routes.setdefault(endpoint, getattr(endpoint, "__name__", "unknown"))
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        self.registry.request_started()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            self.registry.request_finished(
+                scope["method"],
+                self._route(scope),
+                status["code"],
+                time.perf_counter() - started,
+                sizes["request"],
+                sizes["response"],
+            )
@@ -0,0 +1,491 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from pydantic import BaseModel
+from pypdf import PdfReader
+
+from .document_cache import DocumentCache
+from .report_generator import VitalSign
+
+# Pages without a text layer are OCR'd when both pypdfium2 (rendering) and
+# pytesseract (plus the tesseract binary) are installed; otherwise they are
+# reported in ``ocr_unavailable_pages``.
+try:
+    import pypdfium2
+    import pytesseract
+except ImportError:  # pragma: no cover - optional dependency
+    pypdfium2 = None
+    pytesseract = None
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_PDF_BYTES = 50 * 1024 * 1024
+# Uploads are deleted once extracted; any older than this were left by a crash
+UPLOAD_MAX_AGE_SECONDS = 3600
+MIN_TEXT_CHARS = 20  # fewer characters than this means a scanned page
+INLINE_MAX_PAGES = 4  # small documents skip the process pool round trip
+OCR_DPI_SCALE = 300 / 72
+# Part of every cache key; bump when the pattern tables or page parsing change
+EXTRACTION_VERSION = "1"
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class LabResult(BaseModel):
+    name: str
+    value: str
+    range: Optional[str] = None
+    status: str  # low, normal, high
+
+
+class PdfExtraction(BaseModel):
+    file_id: str
+    file_name: str
+    patient_name: Optional[str] = None
+    patient_id: Optional[str] = None
+    date: Optional[str] = None
+    vitals: Dict[str, str] = {}
+    lab_results: List[LabResult] = []
+    vital_signs: List[VitalSign] = []
+    pages: int = 0
+    text_pages: int = 0
+    ocr_pages: int = 0
+    ocr_unavailable_pages: List[int] = []
+    cached: bool = False  # whole document served from the fingerprint cache
+    cached_pages: int = 0
+    duration_seconds: float = 0.0
+
+    class Config:
+        # The upload page reads camelCase keys (patientName, labResults, ...)
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+class PdfUploadResponse(BaseModel):
+    file_id: str
+    extracted_data: PdfExtraction
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+# ---------------------------------------------------------------------------
+# Pattern and unit-normalization tables, compiled once per process
+# ---------------------------------------------------------------------------
+
+_NUMBER = r"(\d{1,3}(?:\.\d+)?)"
+# Values outside these bounds are treated as a mis-match (e.g. a page number)
+VITAL_BOUNDS = {"heart_rate": (25, 250), "respiratory_rate": (4, 60), "oxygen_saturation": (50, 100)}
+
+
+@dataclass(frozen=True)
+class VitalPattern:
+    vital_type: str
+    display_key: str
+    pattern: Pattern
+    unit: str
+
+
+@dataclass(frozen=True)
+class LabPattern:
+    name: str
+    pattern: Pattern
+    unit: str
+    conversions: Dict[str, float]  # lower-cased source unit -> factor into ``unit``
+    normal_range: Tuple[float, float]
+
+
+VITAL_PATTERNS = [
+    VitalPattern("heart_rate", "heartRate", re.compile(
+        r"\b(?:heart\s*rate|pulse(?:\s*rate)?|HR)\b[^\d\n]{0,15}" + _NUMBER + r"\s*(?:bpm|beats?\s*/\s*min|/min)?",
+        re.IGNORECASE), "bpm"),
+    VitalPattern("blood_pressure", "bloodPressure", re.compile(
+        r"\b(?:blood\s*pressure|BP)\b[^\d\n]{0,15}(\d{2,3})\s*/\s*(\d{2,3})\s*(mm\s*Hg|kPa)?",
+        re.IGNORECASE), "mmHg"),
+    VitalPattern("respiratory_rate", "respiratoryRate", re.compile(
+        r"\b(?:resp(?:iratory|iration)?\s*rate|RR)\b[^\d\n]{0,15}" + _NUMBER,
+        re.IGNORECASE), "breaths/min"),
+    VitalPattern("oxygen_saturation", "oxygenSaturation", re.compile(
+        r"\b(?:SpO2|SaO2|O2\s*sat(?:uration)?|oxygen\s*saturation)\b[^\d\n]{0,15}" + _NUMBER + r"\s*%?",
+        re.IGNORECASE), "%"),
+    VitalPattern("temperature", "temperature", re.compile(
+        r"\b(?:temp(?:erature)?)\b[^\d\n]{0,15}" + _NUMBER + r"\s*°?\s*([CF])?\b",
+        re.IGNORECASE), "°C"),
+]
+
+
+def _lab(name: str, aliases: str, unit: str, normal_range: Tuple[float, float], conversions=None) -> LabPattern:
+    units = {unit.lower(): 1.0, **{u.lower(): f for u, f in (conversions or {}).items()}}
+    unit_alternatives = "|".join(re.escape(u) for u in sorted(units, key=len, reverse=True))
+    pattern = re.compile(
+        rf"\b(?:{aliases})\b[^\d\n]{{0,20}}(\d+(?:\.\d+)?)\s*({unit_alternatives})?"
+        r"(?:[^\d\n<>]{0,25}((?:<|>)\s*\d+(?:\.\d+)?|\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?))?",
+        re.IGNORECASE,
+    )
+    return LabPattern(name, pattern, unit, units, normal_range)
+
+
+LAB_PATTERNS = [
+    _lab("Glucose", r"(?:fasting\s+)?glucose", "mg/dL", (70, 100), {"mmol/L": 18.016}),
+    _lab("Hemoglobin", r"ha?emoglobin|Hgb|Hb", "g/dL", (12.0, 17.5), {"g/L": 0.1}),
+    _lab("HbA1c", r"HbA1c|A1c|glycated\s+ha?emoglobin", "%", (4.0, 5.6)),
+    _lab("White Blood Cells", r"white\s+blood\s+cells?|WBC|leukocytes", "x10^9/L", (4.5, 11.0),
+         {"x10^3/uL": 1.0, "K/uL": 1.0, "x10^3/µL": 1.0}),
+    _lab("Cholesterol", r"total\s+cholesterol|cholesterol", "mg/dL", (0, 200), {"mmol/L": 38.67}),
+    _lab("LDL", r"LDL(?:[-\s]C)?", "mg/dL", (0, 100), {"mmol/L": 38.67}),
+    _lab("HDL", r"HDL(?:[-\s]C)?", "mg/dL", (40, 200), {"mmol/L": 38.67}),
+    _lab("Triglycerides", r"triglycerides|TG", "mg/dL", (0, 150), {"mmol/L": 88.57}),
+    _lab("Creatinine", r"creatinine", "mg/dL", (0.6, 1.3), {"µmol/L": 1 / 88.4, "umol/L": 1 / 88.4}),
+]
+
+PATIENT_NAME = re.compile(r"\b(?i:patient(?:\s+name)?)[ \t]*:[ \t]*([A-Z][A-Za-z'.-]+(?:[ \t]+[A-Z][A-Za-z'.-]+){0,3})")
+PATIENT_ID = re.compile(r"\b(?:patient\s+id|MRN|medical\s+record\s+(?:no\.?|number))\s*[:#]?\s*([A-Z0-9-]{3,20})",
+                        re.IGNORECASE)
+REPORT_DATE = re.compile(
+    r"\b(?:date(?:\s+of\s+(?:service|report|collection|visit))?|collected|reported)\s*:?\s*"
+    r"(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4})",
+    re.IGNORECASE,
+)
+
+
+def _format(value: float) -> str:
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _parse_date(raw: str) -> Optional[str]:
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(raw, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _match_vital(spec: VitalPattern, text: str) -> Optional[Tuple[Any, str]]:
+    """(normalized value, display string) for the first plausible match"""
+    for match in spec.pattern.finditer(text):
+        if spec.vital_type == "blood_pressure":
+            systolic, diastolic = float(match.group(1)), float(match.group(2))
+            if (match.group(3) or "").lower() == "kpa":
+                systolic, diastolic = systolic * 7.50062, diastolic * 7.50062
+            if 60 <= systolic <= 260 and 30 <= diastolic <= 160 and diastolic < systolic:
+                value = {"systolic": round(systolic), "diastolic": round(diastolic)}
+                return value, f"{value['systolic']}/{value['diastolic']} mmHg"
+            continue
+        value = float(match.group(1))
+        if spec.vital_type == "temperature":
+            unit = (match.group(2) or "").upper()
+            if unit == "F" or (not unit and value > 50):
+                value = (value - 32) * 5 / 9
+            if 30 <= value <= 45:
+                return round(value, 1), f"{value:.1f}°C"
+            continue
+        low, high = VITAL_BOUNDS[spec.vital_type]
+        if low <= value <= high:
+            unit = spec.unit if spec.unit == "%" else f" {spec.unit}"
+            return value, f"{_format(value)}{unit}"
+    return None
+
+
+def _match_lab(spec: LabPattern, text: str) -> Optional[Dict[str, Any]]:
+    match = spec.pattern.search(text)
+    if match is None:
+        return None
+    factor = spec.conversions.get((match.group(2) or spec.unit).lower(), 1.0)
+    value = float(match.group(1)) * factor
+    reported_range = match.group(3)
+    low, high = spec.normal_range
+    if reported_range and factor == 1.0:
+        bounds = re.findall(r"\d+(?:\.\d+)?", reported_range)
+        if reported_range.strip().startswith("<"):
+            low, high = 0.0, float(bounds[0])
+        elif reported_range.strip().startswith(">"):
+            low, high = float(bounds[0]), float("inf")
+        else:
+            low, high = float(bounds[0]), float(bounds[1])
+    status = "low" if value < low else "high" if value > high else "normal"
+    if high == float("inf"):
+        range_text = f">{_format(low)} {spec.unit}"
+    elif low == 0:
+        range_text = f"<{_format(high)} {spec.unit}"
+    else:
+        range_text = f"{_format(low)}-{_format(high)} {spec.unit}"
+    return {"name": spec.name, "value": f"{_format(value)} {spec.unit}", "range": range_text, "status": status}
+
+
+def match_text(text: str) -> Dict[str, Any]:
+    """Apply the pattern tables to one page of text"""
+    found: Dict[str, Any] = {"vitals": {}, "labs": []}
+    for spec in VITAL_PATTERNS:
+        result = _match_vital(spec, text)
+        if result is not None:
+            found["vitals"][spec.vital_type] = (spec.display_key, *result)
+    for spec in LAB_PATTERNS:
+        result = _match_lab(spec, text)
+        if result is not None:
+            found["labs"].append(result)
+    for key, pattern in (("patient_name", PATIENT_NAME), ("patient_id", PATIENT_ID), ("date", REPORT_DATE)):
+        match = pattern.search(text)
+        if match:
+            found[key] = _parse_date(match.group(1)) if key == "date" else match.group(1).strip()
+    return found
+
+
+def _ocr_page(path: str, page_number: int) -> Optional[str]:
+    if pypdfium2 is None or pytesseract is None:
+        return None
+    document = pypdfium2.PdfDocument(path)
+    try:
+        image = document[page_number].render(scale=OCR_DPI_SCALE).to_pil()
+        return pytesseract.image_to_string(image)
+    finally:
+        document.close()
+
+
+def document_key(digest: str) -> str:
+    """Cache key of a whole uploaded file"""
+    return hashlib.sha256(f"{EXTRACTION_VERSION}:{digest}".encode()).hexdigest()
+
+
+def _stream_bytes(obj) -> bytes:
+    try:
+        return obj.get_data()
+    except Exception:
+        return b""
+
+
+def page_fingerprint(page) -> str:
+    """Cache key of one page: its content streams, images and fonts
+
+    The same scanned page embedded in two different PDFs (e.g. a clinic
+    report forwarded for several patients) hashes the same, so its OCR
+    result is reused even though the files differ.
+    """
+    digest = hashlib.sha256(EXTRACTION_VERSION.encode())
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(_stream_bytes(contents))
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    xobjects = resources.get("/XObject")
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            digest.update(name.encode())
+            digest.update(_stream_bytes(xobjects[name].get_object()))
+    fonts = resources.get("/Font")
+    if fonts is not None:
+        fonts = fonts.get_object()
+        for name in sorted(fonts):
+            digest.update(f"{name}={fonts[name].get_object().get('/BaseFont')}".encode())
+    return digest.hexdigest()
+
+
+def extract_pages(path: str, page_numbers: List[int], cache: Optional[DocumentCache] = None) -> List[Dict[str, Any]]:
+    """Text layer (or OCR) plus pattern matches for some pages of a PDF
+
+    Runs inside pool workers; only the small match results cross the process
+    boundary, never the page text or images. Pages found in ``cache`` are
+    returned with ``cached`` set; the others carry their ``fingerprint`` so
+    the caller can store them.
+    """
+    reader = PdfReader(path)
+    results = []
+    for page_number in page_numbers:
+        page = reader.pages[page_number]
+        fingerprint = page_fingerprint(page) if cache is not None else None
+        cached = cache.lookup("page", fingerprint) if cache is not None else None
+        if cached is not None:
+            results.append({**cached, "page": page_number, "cached": True})
+            continue
+        text = page.extract_text() or ""
+        source = "text"
+        if len(text.strip()) < MIN_TEXT_CHARS:
+            ocr_text = _ocr_page(path, page_number)
+            source = "ocr" if ocr_text is not None else "none"
+            text = ocr_text or text
+        results.append({"page": page_number, "source": source, "fingerprint": fingerprint, **match_text(text)})
+    return results
+
+
+def merge_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-page matches; the first page that mentions a value wins"""
+    merged: Dict[str, Any] = {"vitals": {}, "labs": {}}
+    for page in sorted(pages, key=lambda p: p["page"]):
+        for vital_type, match in page["vitals"].items():
+            merged["vitals"].setdefault(vital_type, match)
+        for lab in page["labs"]:
+            merged["labs"].setdefault(lab["name"], lab)
+        for key in ("patient_name", "patient_id", "date"):
+            if page.get(key) and key not in merged:
+                merged[key] = page[key]
+    return merged
+
+
+class PdfExtractor:
+    """Streams uploads to disk and extracts vitals from them on a process pool
+
+    With a ``cache``, results are kept per document and per page fingerprint,
+    so a repeated upload skips parsing and a known page skips OCR. Uploaded
+    files are only kept while they are being extracted.
+    """
+
+    def __init__(
+        self,
+        upload_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[DocumentCache] = None
+    ):
+        self.upload_dir = upload_dir or os.environ.get("PDF_UPLOAD_DIR", "data/uploads")
+        self.max_workers = max_workers or int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+        self.cache = cache
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._sweep()
+
+    def _sweep(self):
+        """Delete uploads a crashed process never got to discard"""
+        cutoff = time.time() - UPLOAD_MAX_AGE_SECONDS
+        for entry in os.scandir(self.upload_dir):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Another worker swept it first
+                pass
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Started on first use and kept warm, so uploads do not pay process start-up
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def save_upload(self, upload, max_bytes: int = MAX_PDF_BYTES) -> Tuple[str, str]:
+        """Copy an UploadFile to disk in chunks, hashing as it goes
+
+        Returns (path, sha256 hex digest). The file is this upload's own,
+        even when the same document is uploaded concurrently; hand it to
+        ``discard_upload`` once extracted. Raises ValueError when the file
+        exceeds ``max_bytes`` or is not a PDF.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if size == 0 and not chunk.startswith(b"%PDF-"):
+                        raise ValueError("File is not a PDF")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"PDF exceeds {max_bytes // (1024 * 1024)} MB")
+                    digest.update(chunk)
+                    out.write(chunk)
+            if size == 0:
+                raise ValueError("File is empty")
+            path = tmp_path[:-len(".part")] + ".pdf"
+            os.replace(tmp_path, path)
+            return path, digest.hexdigest()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def discard_upload(self, path: str):
+        """Delete a saved upload; results live on in the document cache"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _chunks(self, page_count: int) -> List[List[int]]:
+        # A few chunks per worker keeps the pool busy when page costs differ (OCR vs text)
+        chunk_count = min(page_count, self.max_workers * 3)
+        return [list(range(i, page_count, chunk_count)) for i in range(chunk_count)]
+
+    async def _extract_pages(self, path: str) -> List[Dict[str, Any]]:
+        page_count = await asyncio.to_thread(lambda: len(PdfReader(path).pages))
+        if page_count <= INLINE_MAX_PAGES:
+            return await asyncio.to_thread(extract_pages, path, list(range(page_count)), self.cache)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, extract_pages, path, chunk, self.cache)
+            for chunk in self._chunks(page_count)
+        ))
+        return [page for chunk in chunks for page in chunk]
+
+    def _store(self, key: str, pages: List[Dict[str, Any]]):
+        fresh = [page for page in pages if not page.get("cached")]
+        self.cache.record("page", len(pages) - len(fresh), len(fresh))
+        for page in fresh:
+            # Pages that needed OCR we could not run are retried next time
+            if page["source"] != "none":
+                self.cache.put("page", page["fingerprint"], {
+                    k: v for k, v in page.items() if k not in ("page", "fingerprint")
+                })
+        if all(page["source"] != "none" for page in pages):
+            self.cache.put("document", key, [
+                {k: v for k, v in page.items() if k not in ("cached", "fingerprint")} for page in pages
+            ])
+
+    async def extract(self, path: str, digest: str, file_name: str, user_id: str) -> PdfExtraction:
+        """Extract vitals from a saved upload, reusing cached results for known content"""
+        started = time.perf_counter()
+        key = document_key(digest)
+        pages = None
+        if self.cache is not None:
+            pages = await asyncio.to_thread(self.cache.get, "document", key)
+        document_cached = pages is not None
+        if pages is None:
+            pages = await self._extract_pages(path)
+            if self.cache is not None:
+                await asyncio.to_thread(self._store, key, pages)
+
+        merged = merge_pages(pages)
+        timestamp = datetime.fromisoformat(merged["date"]) if merged.get("date") else datetime.now()
+        vital_signs = [
+            VitalSign(user_id=user_id, type=vital_type, value=value, timestamp=timestamp, source="pdf")
+            for vital_type, (_, value, _) in merged["vitals"].items()
+        ]
+        vitals = {display_key: display for display_key, _, display in merged["vitals"].values()}
+        glucose = merged["labs"].get("Glucose")
+        if glucose:
+            vitals["glucose"] = glucose["value"]
+
+        return PdfExtraction(
+            file_id=digest[:32],
+            file_name=file_name,
+            patient_name=merged.get("patient_name"),
+            patient_id=merged.get("patient_id"),
+            date=merged.get("date"),
+            vitals=vitals,
+            lab_results=[LabResult(**lab) for lab in merged["labs"].values()],
+            vital_signs=vital_signs,
+            pages=len(pages),
+            text_pages=sum(1 for p in pages if p["source"] == "text"),
+            ocr_pages=sum(1 for p in pages if p["source"] == "ocr"),
+            ocr_unavailable_pages=sorted(p["page"] + 1 for p in pages if p["source"] == "none"),
+            cached=document_cached,
+            cached_pages=len(pages) if document_cached else sum(1 for p in pages if p.get("cached")),
+            duration_seconds=round(time.perf_counter() - started, 3),
+        )
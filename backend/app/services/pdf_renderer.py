@@ -0,0 +1,89 @@
+import html
+import re
+import textwrap
+from typing import List
+
+# WeasyPrint gives full HTML/CSS layout when it is installed; otherwise a
+# plain-text PDF is written so reports are always downloadable.
+try:
+    from weasyprint import HTML as WeasyHTML
+except ImportError:  # pragma: no cover - optional dependency
+    WeasyHTML = None
+
+_BLOCK_TAGS = re.compile(r"</?(?:p|div|h[1-6]|li|ul|tr|br|title)[^>]*>", re.IGNORECASE)
+_ANY_TAG = re.compile(r"<[^>]+>")
+_HEAD = re.compile(r"<(style|script)[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+
+_PAGE_WIDTH, _PAGE_HEIGHT = 612, 792  # US Letter, points
+_MARGIN = 54
+_FONT_SIZE = 11
+_LEADING = 15
+_WRAP = 90
+
+
+def html_to_text_lines(html_content: str) -> List[str]:
+    """Reduce report HTML to wrapped text lines"""
+    text = _HEAD.sub("", html_content)
+    text = _BLOCK_TAGS.sub("\n", text)
+    text = html.unescape(_ANY_TAG.sub("", text))
+    lines: List[str] = []
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if line:
+            lines.extend(textwrap.wrap(line, _WRAP) or [""])
+        elif lines and lines[-1]:
+            lines.append("")
+    return lines
+
+
+def _escape_pdf_text(line: str) -> str:
+    line = line.replace("\u2022", "-").encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_text_pdf(lines: List[str]) -> bytes:
+    """Minimal multi-page PDF with the given lines in Helvetica"""
+    per_page = (_PAGE_HEIGHT - 2 * _MARGIN) // _LEADING
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+    objects: List[bytes] = []
+    font_id = 3
+    page_ids = []
+    for index, page_lines in enumerate(pages):
+        content_id = 4 + index * 2
+        page_ids.append(content_id + 1)
+        stream = [f"BT /F1 {_FONT_SIZE} Tf {_LEADING} TL {_MARGIN} {_PAGE_HEIGHT - _MARGIN} Td"]
+        stream.extend(f"({_escape_pdf_text(line)}) '" for line in page_lines)
+        stream.append("ET")
+        body = "\n".join(stream).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(body), body))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (_PAGE_WIDTH, _PAGE_HEIGHT, content_id, font_id)
+        )
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    header_objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(header_objects + objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref)
+    return bytes(out)
+
+
+def html_to_pdf(html_content: str) -> bytes:
+    """Render report HTML to PDF bytes (CPU-bound; call from a worker thread)"""
+    if WeasyHTML is not None:
+        return WeasyHTML(string=html_content).write_pdf()
+    return render_text_pdf(html_to_text_lines(html_content))
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Frame label: (function, file, first line); a stack is a root-first tuple of labels
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+_ROOTS = sorted({os.path.dirname(path) for path in sys.path if path}, key=len, reverse=True)
+
+
+def _short(path: str) -> str:
+    for root in _ROOTS:
+        if path.startswith(root + os.sep):
+            return path[len(root) + 1:]
+    return path
+
+
+def _frame(frame: Any) -> Frame:
+    code = frame.f_code
+    return code.co_qualname if hasattr(code, "co_qualname") else code.co_name, _short(code.co_filename), code.co_firstlineno
+
+
+def _thread_stack(frame: Any) -> Stack:
+    stack = []
+    while frame is not None:
+        stack.append(_frame(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _task_stack(task: asyncio.Task) -> Stack:
+    """Where a suspended task is parked: its coroutine chain down to the awaited future"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            if not hasattr(awaitable, "cr_frame") and not hasattr(awaitable, "gi_frame"):
+                name = type(awaitable).__name__
+                # Awaiting a Future suspends on its iterator
+                stack.append((f"<await {'Future' if name == 'FutureIter' else name}>", "", 0))
+            break
+        stack.append(_frame(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return tuple(stack)
+
+
+class Profile:
+    """Aggregated samples of one capture, per thread and for the event loop's tasks"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.time()
+        self.duration = 0.0
+        self.sample_count = 0
+        self.stacks: Dict[str, Counter] = {}
+
+    def add(self, track: str, stack: Stack):
+        self.stacks.setdefault(track, Counter())[stack] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: ``track;outer;...;inner count`` per line"""
+        lines = []
+        for track, stacks in sorted(self.stacks.items()):
+            for stack, count in stacks.most_common():
+                names = [track] + [f"{name} ({path}:{line})" if path else name for name, path, line in stack]
+                lines.append(f"{';'.join(name.replace(';', ':') for name in names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> str:
+        """speedscope.app file with one sampled profile per thread, plus one for asyncio tasks"""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Frame, int] = {}
+        profiles = []
+        for track, stacks in sorted(self.stacks.items()):
+            samples, weights = [], []
+            for stack, count in stacks.most_common():
+                ids = []
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        name, path, line = frame
+                        frames.append({"name": name, "file": path, "line": line} if path else {"name": name})
+                    ids.append(index[frame])
+                samples.append(ids)
+                weights.append(round(count * self.interval, 6))
+            profiles.append({
+                "type": "sampled",
+                "name": track,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            })
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"vitalsign-api pid {os.getpid()} ({self.duration:.1f}s @ {self.interval * 1000:g}ms)",
+            "exporter": "vitalsign-guardian",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        })
+
+    def render(self, fmt: str) -> str:
+        return self.speedscope() if fmt == "speedscope" else self.collapsed()
+
+
+class SamplingProfiler:
+    """Time-boxed wall-clock sampling of the live process
+
+    While a capture runs, a background thread records every thread's stack
+    each ``interval`` seconds, whether it is running or waiting, and
+    optionally where each pending asyncio task of the event loop is
+    suspended, which shows what slow requests are waiting on. Nothing is
+    installed or running between captures, so an idle profiler costs
+    nothing. One capture runs at a time and lasts at most
+    ``PROFILER_MAX_SECONDS``.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None):
+        self.max_seconds = max_seconds or float(os.environ.get("PROFILER_MAX_SECONDS", "60"))
+        self._running = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._running.locked()
+
+    async def capture(self, seconds: float, interval: float = 0.005, tasks: bool = True) -> Profile:
+        """Sample for ``seconds`` without blocking the event loop being profiled"""
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A profile is already being captured")
+        try:
+            loop = asyncio.get_running_loop() if tasks else None
+            return await asyncio.to_thread(self._sample, min(seconds, self.max_seconds), interval, loop)
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds: float, interval: float, loop: Optional[asyncio.AbstractEventLoop]) -> Profile:
+        profile = Profile(interval)
+        me = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_at = started
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    profile.add(f"thread {names.get(ident, ident)}", _thread_stack(frame))
+            if loop is not None:
+                for task in asyncio.all_tasks(loop):
+                    stack = _task_stack(task)
+                    if stack:
+                        profile.add("asyncio tasks", stack)
+            profile.sample_count += 1
+            next_at += interval
+            now = time.perf_counter()
+            if next_at >= deadline:
+                break
+            if next_at > now:
+                time.sleep(next_at - now)
+            else:
+                # Fell behind (e.g. many tasks); skip missed ticks rather than burst
+                next_at = now
+        profile.duration = time.perf_counter() - started
+        return profile
+
+
+_last_usage: Dict[str, float] = {"wall": time.monotonic(), "cpu": time.process_time()}
+
+
+def process_usage() -> Dict[str, Optional[float]]:
+    """This process' CPU use (% of all cores since the previous call) and resident memory (% of RAM)"""
+    wall, cpu = time.monotonic(), time.process_time()
+    elapsed = wall - _last_usage["wall"]
+    cpu_percent = 100 * (cpu - _last_usage["cpu"]) / elapsed / (os.cpu_count() or 1) if elapsed > 0 else 0.0
+    _last_usage.update(wall=wall, cpu=cpu)
+
+    memory_percent = None
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1]) * page_size
+        memory_percent = 100 * resident / (page_size * os.sysconf("SC_PHYS_PAGES"))
+    except (OSError, ValueError, AttributeError):
+        # Not Linux; leave memory unknown rather than guess
+        pass
+    return {
+        "cpu_usage": round(cpu_percent, 1),
+        "memory_usage": round(memory_percent, 1) if memory_percent is not None else None,
+    }
@@ -1,17 +1,36 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import date, datetime, timedelta
+import hashlib
 import json
+import math
 import os
 from typing import Dict, List, Optional, Any, Union
 
-from fastapi import BackgroundTasks
 from pydantic import BaseModel
 
+from .aggregates import AggregateStore
+from .artifact_store import ReportArtifactStore, artifact_key, data_version
+from .metrics import span
+from .pdf_renderer import html_to_pdf
+from .response_cache import ResponseCache
+from .risk_inference import RiskService
+from .statistics import (
+    RAGGED_SAMPLE_BUDGET,
+    compute_health_score,
+    summarize_batch,
+    summarize_statistics,
+    summarize_vital_signs,
+)
+from .templates import CompiledTemplate, template_cache
+from .vitals_store import VitalSignStore
+
 # These would be imported from your actual models
 class User(BaseModel):
     id: str
     email: str
     first_name: str
     last_name: str
+    timezone: str = "UTC"  # IANA name; scheduled reports go out on the user's local calendar
     preferences: Dict[str, bool] = {
         "weeklyReport": True,
         "monthlyReport": True,
@@ -36,7 +55,8 @@ class HealthRisk(BaseModel):
     timestamp: datetime
     recommendations: List[str]
 
-class Report(BaseModel):
+class ReportSummary(BaseModel):
+    """Report list view; omits the HTML body"""
     id: str
     user_id: str
     title: str
@@ -44,111 +64,328 @@ class Report(BaseModel):
     type: str  # weekly, monthly, quarterly
     highlights: Optional[List[str]] = None
     recommendations: Optional[List[str]] = None
-    status: str  # scheduled, generated
-    html_content: Optional[str] = None
+    status: str  # scheduled, generating, generated, failed
     pdf_path: Optional[str] = None
 
+class Report(ReportSummary):
+    html_content: Optional[str] = None
+
+REPORT_TITLES = {
+    "weekly": "Weekly Health Summary",
+    "monthly": "Monthly Health Analysis",
+    "quarterly": "Quarterly Health Review"
+}
+
+# Scheduled reports: weekly on Wednesdays, monthly on the 1st, quarterly on the 1st of Jan/Apr/Jul/Oct
+QUARTER_MONTHS = (1, 4, 7, 10)
+
+
+def report_due_on(report_type: str, day: date) -> bool:
+    """Whether a scheduled report of this type falls on the given calendar date"""
+    if report_type == "weekly":
+        return day.weekday() == 2
+    if report_type == "monthly":
+        return day.day == 1
+    if report_type == "quarterly":
+        return day.day == 1 and day.month in QUARTER_MONTHS
+    return False
+
+
+def next_report_date(report_type: str, on_or_after: date) -> date:
+    """First date on or after ``on_or_after`` a scheduled report of this type falls on"""
+    if report_due_on(report_type, on_or_after):
+        return on_or_after
+    if report_type == "weekly":
+        return on_or_after + timedelta(days=(2 - on_or_after.weekday()) % 7)
+    months = QUARTER_MONTHS if report_type == "quarterly" else range(1, 13)
+    for month in months:
+        if month > on_or_after.month:
+            return date(on_or_after.year, month, 1)
+    return date(on_or_after.year + 1, 1, 1)
+
+
+def scheduled_report_id(report_type: str, user_id: str, day: date) -> str:
+    """Idempotent ID of a user's scheduled report for one calendar date"""
+    return f"report-{report_type}-{user_id}-{day.isoformat()}"
+
+# Report page; {title} is bound per report type when the template is compiled
+REPORT_HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+        .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
+        .header {{ text-align: center; margin-bottom: 30px; }}
+        .section {{ margin-bottom: 30px; }}
+        .highlight {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 10px; }}
+        .recommendation {{ background-color: #e8f4f8; padding: 15px; border-radius: 5px; margin-bottom: 10px; }}
+        .chart {{ background-color: #eee; height: 300px; margin: 20px 0; border-radius: 5px; display: flex; align-items: center; justify-content: center; }}
+        .footer {{ text-align: center; margin-top: 50px; font-size: 0.8em; color: #777; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>{title}</h1>
+            <p>Generated on {generated_on}</p>
+        </div>
+        
+        <div class="section">
+            <h2>Health Score</h2>
+            <p>Your current health score is <strong>{health_score}</strong>, which is 
+            {score_delta} points 
+            {score_direction} 
+            than your previous score.</p>
+            <div class="chart">[Health Score Chart Visualization]</div>
+        </div>
+        
+        <div class="section">
+            <h2>Highlights</h2>
+            {highlights}
+        </div>
+        
+        <div class="section">
+            <h2>Vital Signs Summary</h2>
+            <div class="chart">[Vital Signs Chart]</div>
+            <p>Your heart rate has averaged {heart_rate_mean} bpm.</p>
+            <p>Your blood pressure has averaged {systolic_mean}/{diastolic_mean} mmHg.</p>
+        </div>
+        
+        <div class="section">
+            <h2>Health Risk Assessment</h2>
+            <div class="chart">[Risk Assessment Chart]</div>
+            <p>Based on your vital signs and health data, we've assessed the following risk factors:</p>
+            <ul>
+                {health_risks}
+            </ul>
+        </div>
+        
+        <div class="section">
+            <h2>Recommendations</h2>
+            {recommendations}
+        </div>
+        
+        <div class="footer">
+            <p>This report is generated based on your health data and is intended for informational purposes only.</p>
+            <p>It is not a substitute for professional medical advice. Please consult with your healthcare provider for medical advice.</p>
+            <p>© {year} VitalSign Guardian</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Part of every artifact key, so template edits never serve stale cached reports
+TEMPLATE_VERSION = hashlib.sha256(REPORT_HTML_TEMPLATE.encode()).hexdigest()[:16]
+
+_report_variants: Dict[str, CompiledTemplate] = {}
+
+def report_template(report_type: str) -> CompiledTemplate:
+    """Compiled report template for a report type, with the title folded in"""
+    template = _report_variants.get(report_type)
+    if template is None:
+        base = template_cache.compile("report_html", REPORT_HTML_TEMPLATE)
+        template = base.bind(title=f"{report_type.capitalize()} Health Report")
+        _report_variants[report_type] = template
+    return template
+
+# Days covered by each report period
+PERIOD_DAYS = {"weekly": 7, "monthly": 30, "quarterly": 90}
+
+def _stack_periods(periods: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Regroup per-user period data into per-metric lists for summarize_batch"""
+    return {
+        "heart_rate": [p["heart_rate"] for p in periods],
+        "systolic": [p["blood_pressure"]["systolic"] for p in periods],
+        "diastolic": [p["blood_pressure"]["diastolic"] for p in periods],
+        "respiratory_rate": [p["respiratory_rate"] for p in periods],
+        "stress": [p["stress"] for p in periods],
+    }
+
+def _format_stat(value: float) -> str:
+    """Format a statistic for display, tolerating periods without readings"""
+    return "n/a" if math.isnan(value) else f"{value:.1f}"
+
 class ReportGenerator:
     """Service for generating health reports based on user data"""
     
-    def __init__(self, db_service=None, email_service=None):
+    def __init__(
+        self,
+        db_service=None,
+        email_service=None,
+        vital_store: Optional[VitalSignStore] = None,
+        aggregate_store: Optional[AggregateStore] = None,
+        artifact_store: Optional[ReportArtifactStore] = None,
+        response_cache: Optional[ResponseCache] = None,
+        risk_service: Optional[RiskService] = None
+    ):
         self.db = db_service
         self.email_service = email_service
+        self.vital_store = vital_store
+        # When present, period statistics are merged from stored partials
+        self.aggregate_store = aggregate_store
+        # Content-addressed cache of rendered HTML/PDF
+        self.artifact_store = artifact_store
+        # API response cache, invalidated whenever a report is (re)generated
+        self.response_cache = response_cache
+        # Scores the period's health risks; mock scores are used without it
+        self.risk_service = risk_service
         self.report_templates = {
             "weekly": "weekly_report_template.html",
             "monthly": "monthly_report_template.html", 
             "quarterly": "quarterly_report_template.html"
         }
     
-    async def schedule_reports(self, background_tasks: BackgroundTasks):
-        """Schedule reports for all users based on their preferences"""
+    async def _get_all_users(self) -> List[User]:
+        """Fetch every user that may receive scheduled reports"""
         # In a real implementation, this would fetch users from the database
-        # users = await self.db.get_all_users()
+        # return await self.db.get_all_users()
         
         # Mock users for development
-        users = [
+        return [
             User(id="user1", email="user1@example.com", first_name="John", last_name="Doe"),
-            User(id="user2", email="user2@example.com", first_name="Jane", last_name="Smith", 
+            User(id="user2", email="user2@example.com", first_name="Jane", last_name="Smith",
+                 timezone="America/New_York",
                  preferences={"weeklyReport": True, "monthlyReport": False, "quarterlyReport": True,
                              "alertEmails": False, "recommendationEmails": True, "reminderEmails": False})
         ]
+    
+    async def get_user(self, user_id: str) -> Optional[User]:
+        """Fetch one user's address, timezone and email preferences"""
+        # In a real implementation: return await self.db.get_user(user_id)
+        for user in await self._get_all_users():
+            if user.id == user_id:
+                return user
+        return None
+    
+    def _due_report_types(self, user: User, today) -> List[str]:
+        """Report types due for a user on the given date"""
+        due = []
+        for report_type in REPORT_TITLES:
+            if user.preferences.get(f"{report_type}Report", True) and report_due_on(report_type, today):
+                due.append(report_type)
+        return due
+    
+    async def collect_due_reports(self, today=None) -> List[Report]:
+        """Build the scheduled Report records due today for all users"""
+        users = await self._get_all_users()
+        today = today or datetime.now().date()
         
-        today = datetime.now().date()
-        
+        reports = []
         for user in users:
-            # Schedule weekly reports (every Wednesday)
-            if user.preferences.get("weeklyReport", True) and today.weekday() == 2:  # Wednesday
-                report_id = f"report-weekly-{user.id}-{today.isoformat()}"
-                report = Report(
-                    id=report_id,
-                    user_id=user.id,
-                    title="Weekly Health Summary",
-                    date=datetime.now(),
-                    type="weekly",
-                    status="scheduled"
-                )
-                # In a real implementation, save to database
-                # await self.db.save_report(report)
-                
-                # Schedule the report generation
-                background_tasks.add_task(self.generate_report, report.id)
-            
-            # Schedule monthly reports (1st of month)
-            if user.preferences.get("monthlyReport", True) and today.day == 1:
-                report_id = f"report-monthly-{user.id}-{today.isoformat()}"
-                report = Report(
-                    id=report_id,
-                    user_id=user.id,
-                    title="Monthly Health Analysis",
-                    date=datetime.now(),
-                    type="monthly",
-                    status="scheduled"
-                )
-                # await self.db.save_report(report)
-                background_tasks.add_task(self.generate_report, report.id)
-            
-            # Schedule quarterly reports (1st of Jan, Apr, Jul, Oct)
-            if (user.preferences.get("quarterlyReport", True) and 
-                today.day == 1 and today.month in [1, 4, 7, 10]):
-                report_id = f"report-quarterly-{user.id}-{today.isoformat()}"
-                report = Report(
-                    id=report_id,
-                    user_id=user.id,
-                    title="Quarterly Health Review",
-                    date=datetime.now(),
-                    type="quarterly",
-                    status="scheduled"
-                )
-                # await self.db.save_report(report)
-                background_tasks.add_task(self.generate_report, report.id)
+            for report_type in self._due_report_types(user, today):
+                reports.append(await self.create_scheduled_report(user.id, report_type, today))
+        return reports
+    
+    async def create_scheduled_report(self, user_id: str, report_type: str, day: date) -> Report:
+        """Record a scheduled report; saving the same user, type and date twice keeps one report"""
+        report = Report(
+            id=scheduled_report_id(report_type, user_id, day),
+            user_id=user_id,
+            title=REPORT_TITLES[report_type],
+            date=datetime.now(),
+            type=report_type,
+            status="scheduled"
+        )
+        if self.db is not None:
+            await self.db.save_report(report)
+        return report
+    
+    async def _run_batch(self, batch_runner, reports: List[Report]):
+        summary = await batch_runner.run_async(reports)
+        for result in summary.results:
+            if result.status == "generated":
+                await self.invalidate_cached_report(result.user_id, result.report_id)
+        return summary
+    
+    async def set_report_status(self, report_id: str, status: str):
+        """Record the state of a report's generation task"""
+        if self.db is None:
+            return
+        report = await self.db.get_report(report_id)
+        if report is None:
+            return
+        await self.db.update_report(report.copy(update={"status": status}))
+        await self.invalidate_cached_report(report.user_id, report_id)
+    
+    async def invalidate_cached_report(self, user_id: str, report_id: str):
+        """Drop cached API responses that include this report"""
+        if self.response_cache is not None:
+            await self.response_cache.invalidate(f"user:{user_id}", f"report:{report_id}")
     
     async def generate_report(self, report_id: str):
         """Generate a health report based on user data"""
-        # In a real implementation, fetch the report from the database
-        # report = await self.db.get_report(report_id)
-        # user = await self.db.get_user(report.user_id)
-        
-        # Mock data for development
-        report_type = report_id.split("-")[1]
-        user_id = report_id.split("-")[2]
+        scheduled = await self.db.get_report(report_id) if self.db is not None else None
+        if scheduled is not None:
+            report_type, user_id = scheduled.type, scheduled.user_id
+        else:
+            # Mock data for development
+            report_type = report_id.split("-")[1]
+            user_id = report_id.split("-")[2]
         
         # Get user data for the report period
-        period_data = await self._get_user_data_for_period(user_id, report_type)
+        with span("report.fetch"):
+            period_data = await self._get_user_data_for_period(user_id, report_type)
         
+        report = await self._build_report(report_id, user_id, report_type, period_data)
+        
+        # Save updated report
+        if self.db is not None:
+            await self.db.update_report(report)
+        await self.invalidate_cached_report(user_id, report_id)
+        
+        # Send email if user has email preferences enabled
+        # user = await self.db.get_user(user_id)
+        # if user.preferences.get(f"{report_type}Report", True):
+        #     await self.email_service.send_report_email(user.email, report)
+        return report
+    
+    async def _build_report(
+        self, report_id: str, user_id: str, report_type: str, period_data: Dict[str, Any]
+    ) -> Report:
+        """Run the highlight, recommendation, HTML and PDF stages for prepared period data"""
         # Generate highlights and recommendations
-        highlights = self._generate_highlights(period_data)
-        recommendations = self._generate_recommendations(period_data)
+        with span("report.highlights"):
+            highlights = self._generate_highlights(period_data)
+            recommendations = self._generate_recommendations(period_data)
+        
+        # Identical inputs map to the same artifact, so regeneration is a cache hit
+        key, html_content, pdf_path = None, None, None
+        if self.artifact_store is not None:
+            start_date, end_date = self._period_range(report_type)
+            key = artifact_key(
+                user_id,
+                report_type,
+                f"{start_date.date().isoformat()}/{end_date.date().isoformat()}",
+                data_version({
+                    "statistics": period_data["statistics"],
+                    "trends": period_data["trends"],
+                    "health_risks": period_data["health_risks"],
+                    "health_score": period_data["health_score"],
+                    "previous_health_score": period_data["previous_health_score"],
+                    "highlights": highlights,
+                    "recommendations": recommendations
+                }),
+                TEMPLATE_VERSION
+            )
+            html_content = self.artifact_store.read_text(key, "html")
+            pdf_path = self.artifact_store.get(key, "pdf")
         
         # Generate HTML content
-        html_content = await self._generate_html_report(
-            user_id, report_type, period_data, highlights, recommendations
-        )
+        if html_content is None:
+            with span("report.html"):
+                html_content = await self._generate_html_report(
+                    user_id, report_type, period_data, highlights, recommendations
+                )
         
         # Generate PDF
-        pdf_path = await self._generate_pdf(html_content, report_id)
+        if pdf_path is None:
+            with span("report.pdf"):
+                pdf_path = await self._generate_pdf(html_content, report_id, key)
         
-        # Update report
-        report = Report(
+        return Report(
             id=report_id,
             user_id=user_id,
             title=f"{report_type.capitalize()} Health Report",
@@ -160,35 +397,23 @@ class ReportGenerator:
             html_content=html_content,
             pdf_path=pdf_path
         )
-        
-        # Save updated report
-        # await self.db.update_report(report)
-        
-        # Send email if user has email preferences enabled
-        # user = await self.db.get_user(user_id)
-        # if user.preferences.get(f"{report_type}Report", True):
-        #     await self.email_service.send_report_email(user.email, report)
+    
+    def _period_range(self, period: str):
+        """Return the [start, end) datetimes covered by a report period"""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=PERIOD_DAYS.get(period, 7))  # Default to weekly
+        return start_date, end_date
     
     async def _get_user_data_for_period(self, user_id: str, period: str) -> Dict[str, Any]:
         """Get user health data for the specified period"""
-        # In a real implementation, fetch from database
-        # Calculate date range based on period
-        end_date = datetime.now()
-        if period == "weekly":
-            start_date = end_date - timedelta(days=7)
-        elif period == "monthly":
-            start_date = end_date - timedelta(days=30)
-        elif period == "quarterly":
-            start_date = end_date - timedelta(days=90)
-        else:
-            start_date = end_date - timedelta(days=7)  # Default to weekly
+        if self.aggregate_store is not None:
+            return await self._get_aggregated_data_for_period(user_id, period)
         
-        # vital_signs = await self.db.get_vital_signs(user_id, start_date, end_date)
-        # health_risks = await self.db.get_health_risks(user_id, start_date, end_date)
+        start_date, end_date = self._period_range(period)
         
-        # Mock data for development
-        return {
-            "vital_signs": {
+        if self.vital_store is None:
+            # Mock data for development
+            vital_signs = {
                 "heart_rate": [72, 75, 71, 74, 73, 70, 72],
                 "blood_pressure": {
                     "systolic": [125, 128, 124, 130, 126, 122, 125],
@@ -196,20 +421,129 @@ class ReportGenerator:
                 },
                 "respiratory_rate": [16, 15, 16, 17, 16, 15, 16],
                 "stress": [45, 60, 40, 55, 35, 30, 42]
-            },
-            "health_risks": {
+            }
+            summary = summarize_vital_signs(vital_signs)
+            return self._build_period_data(
+                vital_signs, summary, 78, 72, await self._score_risks(user_id, summary["statistics"])
+            )
+        
+        # Contiguous arrays straight from the columnar store
+        vital_signs = self.vital_store.get_period(user_id, start_date, end_date)
+        summary = summarize_vital_signs(vital_signs)
+        previous = summarize_vital_signs(
+            self.vital_store.get_period(user_id, start_date - (end_date - start_date), start_date)
+        )
+        return self._build_period_data(
+            vital_signs,
+            summary,
+            compute_health_score(summary["statistics"]),
+            compute_health_score(previous["statistics"]),
+            await self._score_risks(user_id, summary["statistics"])
+        )
+    
+    async def _score_risks(
+        self, user_id: str, statistics: Dict[str, Dict[str, float]]
+    ) -> Optional[Dict[str, float]]:
+        """Risk scores for one user's period, batched with concurrent requests"""
+        if self.risk_service is None:
+            return None
+        return await self.risk_service.score_user(user_id, statistics)
+    
+    async def _get_aggregated_data_for_period(self, user_id: str, period: str) -> Dict[str, Any]:
+        """Period data merged from stored daily/weekly partials instead of raw samples"""
+        days = PERIOD_DAYS.get(period, 7)
+        last_day = datetime.now().date()
+        first_day = last_day - timedelta(days=days - 1)
+        
+        statistics = self.aggregate_store.period_statistics(user_id, first_day, last_day)
+        previous_statistics = self.aggregate_store.period_statistics(
+            user_id, first_day - timedelta(days=days), first_day - timedelta(days=1)
+        )
+        return self._build_period_data(
+            None,
+            summarize_statistics(statistics),
+            compute_health_score(statistics),
+            compute_health_score(previous_statistics),
+            await self._score_risks(user_id, statistics)
+        )
+    
+    def _summarize_stored_periods(self, user_ids: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """summarize_batch over users' stored [start, end) periods
+
+        Raw readings are fetched user by user and summarized whenever about
+        RAGGED_SAMPLE_BUDGET samples are held, so a chunk of long periods
+        never sits in memory at once.
+        """
+        summaries: List[Dict[str, Any]] = []
+        pending: List[Dict[str, Any]] = []
+        held = 0
+        for user_id in user_ids:
+            period = self.vital_store.get_period(user_id, start, end)
+            pending.append(period)
+            held += sum(len(series[0]) for series in _stack_periods([period]).values())
+            if held >= RAGGED_SAMPLE_BUDGET:
+                summaries.extend(summarize_batch(_stack_periods(pending)))
+                pending, held = [], 0
+        if pending:
+            summaries.extend(summarize_batch(_stack_periods(pending)))
+        return summaries
+    
+    async def _get_batch_data_for_period(self, user_ids: List[str], period: str) -> Dict[str, Dict[str, Any]]:
+        """Get period data for many users, reducing each metric for the whole batch at once"""
+        if self.vital_store is None or self.aggregate_store is not None:
+            return {user_id: await self._get_user_data_for_period(user_id, period) for user_id in user_ids}
+        
+        start_date, end_date = self._period_range(period)
+        previous_start = start_date - (end_date - start_date)
+        summaries = self._summarize_stored_periods(user_ids, start_date, end_date)
+        previous_summaries = self._summarize_stored_periods(user_ids, previous_start, start_date)
+        # The whole chunk is already one batch: score it with a single call per model
+        risks = [None] * len(user_ids)
+        if self.risk_service is not None:
+            features, _ = self.risk_service.features_for(user_ids, [summary["statistics"] for summary in summaries])
+            risks = self.risk_service.score_now(features)
+        # Raw readings are not kept: nothing downstream of the statistics reads them
+        return {
+            user_id: self._build_period_data(
+                None,
+                summary,
+                compute_health_score(summary["statistics"]),
+                compute_health_score(previous["statistics"]),
+                health_risks
+            )
+            for user_id, summary, previous, health_risks
+            in zip(user_ids, summaries, previous_summaries, risks)
+        }
+    
+    def _build_period_data(
+        self,
+        vital_signs: Optional[Dict[str, Any]],
+        summary: Dict[str, Any],
+        health_score: Optional[int],
+        previous_health_score: Optional[int],
+        health_risks: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """Assemble the period data dict consumed by the highlight, recommendation and HTML stages"""
+        if health_score is None:
+            health_score = 0
+        if previous_health_score is None:
+            # No readings in the previous period: report no change
+            previous_health_score = health_score
+        if health_risks is None:
+            # Mock data for development
+            health_risks = {
                 "heart_disease": 0.15,
                 "hypertension": 0.25,
                 "stress_related": 0.35
-            },
-            "trends": {
-                "heart_rate": "stable",
-                "blood_pressure": "slightly_elevated",
-                "respiratory_rate": "normal",
-                "stress": "improving"
-            },
-            "health_score": 78,
-            "previous_health_score": 72
+            }
+        
+        return {
+            "vital_signs": vital_signs,
+            "statistics": summary["statistics"],
+            "health_risks": health_risks,
+            "trends": summary["trends"],
+            "health_score": health_score,
+            "previous_health_score": previous_health_score
         }
     
     def _generate_highlights(self, period_data: Dict[str, Any]) -> List[str]:
@@ -286,95 +620,41 @@ class ReportGenerator:
         highlights: List[str],
         recommendations: List[str]
     ) -> str:
-        """Generate HTML report content"""
-        # In a real implementation, use a template engine like Jinja2
-        # template_path = os.path.join("templates", self.report_templates[report_type])
-        # with open(template_path, "r") as f:
-        #     template = f.read()
-        
-        # Replace placeholders with actual data
-        # html_content = template.replace("{{user_name}}", user.first_name)
-        # ...
-        
-        # Mock HTML content for development
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{report_type.capitalize()} Health Report</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
-                .header {{ text-align: center; margin-bottom: 30px; }}
-                .section {{ margin-bottom: 30px; }}
-                .highlight {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 10px; }}
-                .recommendation {{ background-color: #e8f4f8; padding: 15px; border-radius: 5px; margin-bottom: 10px; }}
-                .chart {{ background-color: #eee; height: 300px; margin: 20px 0; border-radius: 5px; display: flex; align-items: center; justify-content: center; }}
-                .footer {{ text-align: center; margin-top: 50px; font-size: 0.8em; color: #777; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>{report_type.capitalize()} Health Report</h1>
-                    <p>Generated on {datetime.now().strftime('%B %d, %Y')}</p>
-                </div>
-                
-                <div class="section">
-                    <h2>Health Score</h2>
-                    <p>Your current health score is <strong>{period_data['health_score']}</strong>, which is 
-                    {period_data['health_score'] - period_data['previous_health_score']} points 
-                    {'higher' if period_data['health_score'] > period_data['previous_health_score'] else 'lower'} 
-                    than your previous score.</p>
-                    <div class="chart">[Health Score Chart Visualization]</div>
-                </div>
-                
-                <div class="section">
-                    <h2>Highlights</h2>
-                    {''.join([f'<div class="highlight">• {highlight}</div>' for highlight in highlights])}
-                </div>
-                
-                <div class="section">
-                    <h2>Vital Signs Summary</h2>
-                    <div class="chart">[Vital Signs Chart]</div>
-                    <p>Your heart rate has averaged {sum(period_data['vital_signs']['heart_rate']) / len(period_data['vital_signs']['heart_rate']):.1f} bpm.</p>
-                    <p>Your blood pressure has averaged {sum(period_data['vital_signs']['blood_pressure']['systolic']) / len(period_data['vital_signs']['blood_pressure']['systolic']):.1f}/{sum(period_data['vital_signs']['blood_pressure']['diastolic']) / len(period_data['vital_signs']['blood_pressure']['diastolic']):.1f} mmHg.</p>
-                </div>
-                
-                <div class="section">
-                    <h2>Health Risk Assessment</h2>
-                    <div class="chart">[Risk Assessment Chart]</div>
-                    <p>Based on your vital signs and health data, we've assessed the following risk factors:</p>
-                    <ul>
-                        {''.join([f'<li><strong>{risk.replace("_", " ").title()}</strong>: {score*100:.1f}% risk</li>' for risk, score in period_data['health_risks'].items()])}
-                    </ul>
-                </div>
-                
-                <div class="section">
-                    <h2>Recommendations</h2>
-                    {''.join([f'<div class="recommendation">• {recommendation}</div>' for recommendation in recommendations])}
-                </div>
-                
-                <div class="footer">
-                    <p>This report is generated based on your health data and is intended for informational purposes only.</p>
-                    <p>It is not a substitute for professional medical advice. Please consult with your healthcare provider for medical advice.</p>
-                    <p>© {datetime.now().year} VitalSign Guardian</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_content
+        """Generate HTML report content from the precompiled report template"""
+        stats = period_data["statistics"]
+        now = datetime.now()
+        score_delta = period_data['health_score'] - period_data['previous_health_score']
+        
+        return report_template(report_type).render(
+            generated_on=now.strftime('%B %d, %Y'),
+            health_score=period_data['health_score'],
+            score_delta=score_delta,
+            score_direction='higher' if score_delta > 0 else 'lower',
+            highlights=''.join([f'<div class="highlight">• {highlight}</div>' for highlight in highlights]),
+            heart_rate_mean=_format_stat(stats['heart_rate']['mean']),
+            systolic_mean=_format_stat(stats['systolic']['mean']),
+            diastolic_mean=_format_stat(stats['diastolic']['mean']),
+            health_risks=''.join([
+                f'<li><strong>{risk.replace("_", " ").title()}</strong>: {score*100:.1f}% risk</li>'
+                for risk, score in period_data['health_risks'].items()
+            ]),
+            recommendations=''.join([f'<div class="recommendation">• {recommendation}</div>' for recommendation in recommendations]),
+            year=now.year
+        )
     
-    async def _generate_pdf(self, html_content: str, report_id: str) -> str:
+    async def _generate_pdf(self, html_content: str, report_id: str, key: Optional[str] = None) -> str:
         """Generate PDF from HTML content"""
-        # In a real implementation, use a library like WeasyPrint or wkhtmltopdf
-        # pdf_path = f"reports/{report_id}.pdf"
-        # html_to_pdf(html_content, pdf_path)
+        # Rendering is CPU-bound; keep it off the event loop
+        pdf_bytes = await asyncio.to_thread(html_to_pdf, html_content)
+        
+        if self.artifact_store is not None and key is not None:
+            self.artifact_store.put(key, "html", html_content.encode("utf-8"))
+            return self.artifact_store.put(key, "pdf", pdf_bytes)
         
-        # Mock implementation
         pdf_path = f"/tmp/reports/{report_id}.pdf"
+        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_bytes)
         return pdf_path
     
     async def generate_report_on_demand(self, user_id: str, report_type: str) -> Report:
@@ -0,0 +1,395 @@
+import asyncio
+import hashlib
+import heapq
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single API worker
+    fcntl = None
+
+from .batch_reports import BatchJobResult
+from .report_generator import REPORT_TITLES, Report, ReportGenerator, User, next_report_date, scheduled_report_id
+
+# Journal entries older than this are dropped when the journal is compacted
+JOURNAL_RETENTION_DAYS = 40
+
+# Stored report states that mean an interrupted job needs no second run
+COMPLETED_REPORT_STATES = ("generated", "sent")
+
+# (due timestamp, job key, user ID, report type, user's local date)
+Job = Tuple[float, str, str, str, date]
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        print(f"Unknown timezone {name!r}, scheduling in UTC")
+        return ZoneInfo("UTC")
+
+
+@lru_cache(maxsize=4096)
+def _first_report_date(timezone: str, report_type: str, since: float) -> date:
+    """First report date on or after the local date at ``since``; shared by every user in the timezone"""
+    return next_report_date(report_type, datetime.fromtimestamp(since, _zone(timezone)).date())
+
+
+def _jitter(user_id: str, report_type: str) -> float:
+    """Stable fraction in [0, 1) for a user and report type, the same in every process and after restarts"""
+    digest = hashlib.sha1(f"{user_id}:{report_type}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32
+
+
+class JobJournal:
+    """Append-only record of scheduled report jobs, one JSON line per state change
+
+    A job is ``claimed`` before its report is handed to generation and
+    ``done`` or ``failed`` once generation has finished, so a restart knows
+    which jobs already went out and which were cut short.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.states: Dict[str, str] = {}
+        self.days: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                self.states[entry["key"]] = entry["state"]
+                self.days[entry["key"]] = entry["day"]
+        self._compact()
+
+    def _compact(self):
+        cutoff = (date.today() - timedelta(days=JOURNAL_RETENTION_DAYS)).isoformat()
+        for key in [key for key, day in self.days.items() if day < cutoff]:
+            del self.states[key], self.days[key]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, state in self.states.items():
+                f.write(json.dumps({"key": key, "day": self.days[key], "state": state}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def record(self, jobs: List[Tuple[str, str]], state: str):
+        """Durably record a state for several (key, ISO date) jobs with one write and fsync"""
+        if not jobs:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for key, day in jobs:
+                f.write(json.dumps({"key": key, "day": day, "state": state}) + "\n")
+                self.states[key] = state
+                self.days[key] = day
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self) -> List[str]:
+        """Jobs claimed by a previous run whose outcome was never recorded"""
+        return [key for key, state in self.states.items() if state == "claimed"]
+
+
+class ReportScheduler:
+    """Sends scheduled reports when they fall due on each user's local calendar
+
+    Every (user, report type) has one next-due time in a priority queue, so a
+    tick pops only the jobs that are due instead of scanning every user.
+    Due times fall between ``REPORT_SCHEDULE_START_HOUR`` and that hour plus
+    ``REPORT_SCHEDULE_SPREAD_HOURS`` in the user's timezone, at a fixed
+    per-user offset, which spreads a day's reports over the window. Jobs use
+    the ``report-{type}-{user}-{date}`` report IDs as keys and are claimed in
+    a journal under ``REPORT_SCHEDULER_DIR`` before they are dispatched, so a
+    restart never sends the same report twice; jobs a restart cut short are
+    run again unless their report was already generated. Reports are
+    generated as ``reports.generate`` tasks, so each one can be followed at
+    ``/tasks/{report_id}``: on the Celery workers with a broker, otherwise
+    on the batch runner's process pool, off the API event loop. When several API workers run, a file lock lets
+    only one of them dispatch.
+    """
+
+    def __init__(
+        self,
+        report_generator: ReportGenerator,
+        batch_runner: Any = None,
+        task_queue: Any = None,
+        data_dir: Optional[str] = None,
+        start_hour: Optional[float] = None,
+        spread_hours: Optional[float] = None,
+        interval_seconds: Optional[float] = None,
+        catchup_hours: float = 24
+    ):
+        self.report_generator = report_generator
+        # Without a broker, each tick's reports are generated on the batch runner's process pool
+        self.batch_runner = batch_runner
+        # Where reports are tracked as tasks, and generated when it is broker-backed
+        self.task_queue = task_queue
+        self.data_dir = data_dir or os.environ.get("REPORT_SCHEDULER_DIR", "data/scheduler")
+        self.start_seconds = 3600 * (
+            start_hour if start_hour is not None else float(os.environ.get("REPORT_SCHEDULE_START_HOUR", "6"))
+        )
+        self.spread_seconds = 3600 * (
+            spread_hours if spread_hours is not None else float(os.environ.get("REPORT_SCHEDULE_SPREAD_HOURS", "12"))
+        )
+        self.interval = interval_seconds if interval_seconds is not None else float(
+            os.environ.get("REPORT_SCHEDULER_INTERVAL_SECONDS", "60")
+        )
+        # Reports missed while no scheduler was running are still sent if this recent
+        self.catchup_seconds = catchup_hours * 3600
+
+        self.journal: Optional[JobJournal] = None
+        self._users: Dict[str, User] = {}
+        self._heap: List[Job] = []
+        # The live job of each (user, type); heap entries that differ are stale
+        self._next: Dict[Tuple[str, str], str] = {}
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self.stats = {"dispatched": 0, "generated": 0, "failed": 0, "recovered": 0}
+
+    def due_at(self, user: User, report_type: str, day: date) -> float:
+        """Timestamp the user's report of this type for local date ``day`` is due"""
+        offset = self.start_seconds + _jitter(user.id, report_type) * self.spread_seconds
+        local = datetime(day.year, day.month, day.day) + timedelta(seconds=offset)
+        return local.replace(tzinfo=_zone(user.timezone)).timestamp()
+
+    def _schedule(self, user: User, report_type: str, day: date, due: Optional[float] = None):
+        key = scheduled_report_id(report_type, user.id, day)
+        self._next[(user.id, report_type)] = key
+        if due is None:
+            due = self.due_at(user, report_type, day)
+        heapq.heappush(self._heap, (due, key, user.id, report_type, day))
+
+    def _first_job(self, user: User, report_type: str, now: float):
+        """Schedule the earliest occurrence that is unsent and not older than the catch-up window"""
+        since = now - self.catchup_seconds
+        day = _first_report_date(user.timezone, report_type, since)
+        due = self.due_at(user, report_type, day)
+        while due < since or scheduled_report_id(report_type, user.id, day) in self.journal.states:
+            day = next_report_date(report_type, day + timedelta(days=1))
+            due = self.due_at(user, report_type, day)
+        self._schedule(user, report_type, day, due)
+
+    def set_user(self, user: User, now: Optional[float] = None):
+        """Add a user or apply changed report preferences or timezone"""
+        self._users[user.id] = user
+        for report_type in REPORT_TITLES:
+            self._next.pop((user.id, report_type), None)
+            if self.journal is not None and user.preferences.get(f"{report_type}Report", True):
+                self._first_job(user, report_type, now or time.time())
+
+    def remove_user(self, user_id: str):
+        self._users.pop(user_id, None)
+        for report_type in REPORT_TITLES:
+            self._next.pop((user_id, report_type), None)
+
+    def _acquire(self) -> bool:
+        """Become the dispatching worker; loads the schedule on first success"""
+        if self.journal is not None:
+            return True
+        os.makedirs(self.data_dir, exist_ok=True)
+        if fcntl is not None:
+            lock_file = open(os.path.join(self.data_dir, "scheduler.lock"), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        self.journal = JobJournal(os.path.join(self.data_dir, "jobs.jsonl"))
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.journal = None
+        self._heap.clear()
+        self._next.clear()
+
+    async def _load(self, now: float):
+        users = list(self._users.values()) if self._users else await self.report_generator._get_all_users()
+
+        def build():
+            for user in users:
+                self.set_user(user, now)
+
+        # One pass over all users when this worker takes over; ticks only touch due jobs
+        await asyncio.to_thread(build)
+        await self._recover()
+
+    async def _recover(self):
+        """Settle jobs a previous run claimed but did not see finish
+
+        Jobs whose report was already generated are done; the others are
+        dispatched again under the same report ID.
+        """
+        db = self.report_generator.db
+        done: List[Tuple[str, str]] = []
+        retry: List[Job] = []
+        for key in self.journal.pending():
+            day = self.journal.days[key]
+            report = await db.get_report(key) if db is not None else None
+            if report is not None and report.status in COMPLETED_REPORT_STATES:
+                done.append((key, day))
+                continue
+            if report is not None:
+                user_id, report_type = report.user_id, report.type
+            else:
+                # report-{type}-{user}-{date}; user IDs may contain dashes
+                report_type = key.split("-")[1]
+                user_id = key[len(f"report-{report_type}-"):-len(day) - 1]
+            retry.append((time.time(), key, user_id, report_type, date.fromisoformat(day)))
+            print(f"Scheduled report {key} was interrupted by a restart and is sent again")
+        self.journal.record(done, "done")
+        self.stats["recovered"] += len(done) + len(retry)
+        if retry:
+            await self._dispatch(retry)
+
+    def pop_due(self, now: float) -> List[Job]:
+        """Remove and return every job due by ``now``, scheduling each one's next occurrence"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            job = heapq.heappop(self._heap)
+            _, key, user_id, report_type, day = job
+            if self._next.get((user_id, report_type)) != key:
+                continue
+            due.append(job)
+            self._schedule(self._users[user_id], report_type, next_report_date(report_type, day + timedelta(days=1)))
+        return due
+
+    async def run_due(self, now: Optional[float] = None) -> List[Report]:
+        """Dispatch every report due by ``now``; a worker that is not the scheduler dispatches nothing"""
+        now = now or time.time()
+        if self.journal is None:
+            if not self._acquire():
+                return []
+            await self._load(now)
+        jobs = [job for job in self.pop_due(now) if job[1] not in self.journal.states]
+        if not jobs:
+            return []
+        self.journal.record([(key, day.isoformat()) for _, key, _, _, day in jobs], "claimed")
+        return await self._dispatch(jobs)
+
+    async def _dispatch(self, jobs: List[Job]) -> List[Report]:
+        """Record the claimed jobs' reports as scheduled and start generating them"""
+        reports = [
+            await self.report_generator.create_scheduled_report(user_id, report_type, day)
+            for _, _, user_id, report_type, day in jobs
+        ]
+        for report in reports:
+            await self.report_generator.invalidate_cached_report(report.user_id, report.id)
+        self.stats["dispatched"] += len(reports)
+        task = asyncio.create_task(self._generate(jobs, reports))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+        return reports
+
+    async def _generate(self, jobs: List[Job], reports: List[Report]):
+        generated: Set[str] = set()
+        try:
+            if self.task_queue is not None and self.task_queue.remote:
+                # Handed to the broker, which redelivers a task whose worker dies
+                for report in reports:
+                    await self.task_queue.submit("reports.generate", report.id, task_id=report.id)
+                generated = {report.id for report in reports}
+            elif self.batch_runner is not None:
+                generated = await self._generate_on_pool(reports)
+            elif self.task_queue is not None:
+                for report in reports:
+                    await self.task_queue.submit("reports.generate", report.id, task_id=report.id)
+                # In-process tasks die with this process; the job stays claimed until they finish
+                for report in reports:
+                    status = await self.task_queue.wait(report.id)
+                    if status is not None and status.state == "success":
+                        generated.add(report.id)
+            else:
+                for report in reports:
+                    try:
+                        await self.report_generator.generate_report(report.id)
+                        generated.add(report.id)
+                    except Exception as e:
+                        print(f"Scheduled report {report.id} failed: {e}")
+        except Exception as e:
+            print(f"Scheduled report batch of {len(reports)} failed: {e}")
+        if self.journal is None:
+            return
+        self.journal.record([(key, day.isoformat()) for _, key, _, _, day in jobs if key in generated], "done")
+        self.journal.record([(key, day.isoformat()) for _, key, _, _, day in jobs if key not in generated], "failed")
+        self.stats["generated"] += len(generated)
+        self.stats["failed"] += len(jobs) - len(generated)
+
+    async def _generate_on_pool(self, reports: List[Report]) -> Set[str]:
+        """Generate on the batch runner's processes, tracking each report as a task like the task queue does"""
+        statuses = {}
+        for report in reports:
+            await self.report_generator.set_report_status(report.id, "generating")
+            if self.task_queue is not None:
+                statuses[report.id] = self.task_queue.track("reports.generate", report.id)
+        try:
+            results = (await self.report_generator._run_batch(self.batch_runner, reports)).results
+        except Exception as e:
+            # A pool that failed to start fails the whole tick
+            results = [
+                BatchJobResult(report_id=r.id, user_id=r.user_id, type=r.type, status="failed", error=str(e))
+                for r in reports
+            ]
+        generated = set()
+        for result in results:
+            if result.status == "generated":
+                generated.add(result.report_id)
+            else:
+                await self.report_generator.set_report_status(result.report_id, "failed")
+                print(f"Scheduled report {result.report_id} failed: {result.error}")
+            status = statuses.get(result.report_id)
+            if status is None:
+                continue
+            if result.status == "generated":
+                self.task_queue.finish(status, {"report_id": result.report_id, "status": result.status, "pdf_path": result.pdf_path})
+            else:
+                self.task_queue.finish(status, error=result.error or "Report generation failed")
+        return generated
+
+    def start(self):
+        """Tick every ``REPORT_SCHEDULER_INTERVAL_SECONDS`` (0 disables the background loop)"""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop ticking, wait for reports already dispatched and give up the scheduler lock"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        self._release()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                print(f"Report scheduler tick failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# A Redis backend lets several API workers share one cache; install ``redis``
+# to enable it. The in-process LRU backend needs nothing extra.
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - optional dependency
+    redis_asyncio = None
+
+
+class CacheBackend:
+    """Storage interface for cached response bodies"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        """Atomically move a counter to a value it has never held before"""
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return 0
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache with per-entry TTL
+
+    Counters are kept for the ``max_entries`` most recently used keys too.
+    They all draw from one clock, and a key whose counter was evicted reads
+    as the clock value at the latest eviction, which is at least anything
+    it held before, so an evicted counter never revives older entries.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = 0
+        self._evicted_at = 0
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._clock += 1
+            self._counters[key] = self._clock
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_entries:
+                self._counters.popitem(last=False)
+                self._evicted_at = self._clock
+            return self._clock
+
+    async def get_counter(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key)
+            if value is None:
+                return self._evicted_at
+            self._counters.move_to_end(key)
+            return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache shared by every worker through Redis"""
+
+    def __init__(self, url: str, prefix: str = "vsg:"):
+        if redis_asyncio is None:
+            raise RuntimeError("The redis package is required for a Redis response cache")
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self.prefix + key)
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.client.get(self.prefix + key)
+        return int(value) if value else 0
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+    def encode(self) -> bytes:
+        meta = json.dumps({"etag": self.etag, "headers": self.headers}).encode()
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedResponse":
+        meta, _, body = raw.partition(b"\n")
+        data = json.loads(meta)
+        return cls(body, data["etag"], data["headers"])
+
+
+class ResponseCache:
+    """Read-through cache of serialized API responses, invalidated by scope
+
+    Entries live under a scope such as ``user:<id>`` or ``report:<id>``. Each
+    scope has a generation counter that is part of every entry key, so
+    ``invalidate`` drops all of a scope's entries at once by bumping the
+    counter; orphaned entries simply age out of the LRU or TTL. This works the
+    same way for the in-process and the shared Redis backend.
+
+    The in-process backend only sees invalidations made in its own process.
+    With several API workers (or batch/Celery workers generating reports),
+    use the Redis backend so an update in one process invalidates all.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None):
+        # Backends define __len__, so an empty one is falsy: compare with None
+        self.backend = backend if backend is not None else MemoryCacheBackend(
+            int(os.environ.get("REPORT_CACHE_SIZE", "1024"))
+        )
+        self.ttl = ttl if ttl is not None else float(os.environ.get("REPORT_CACHE_TTL", "60"))
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    async def _key(self, scope: str, parts: Tuple) -> str:
+        generation = await self.backend.get_counter(f"gen:{scope}")
+        material = "\x1f".join(str(part) for part in parts)
+        return f"{scope}:{generation}:{hashlib.sha256(material.encode()).hexdigest()[:32]}"
+
+    async def get(self, scope: str, *parts) -> Tuple[str, Optional[CachedResponse]]:
+        """Return the entry key (for a later ``set``) and the cached response, if any"""
+        key = await self._key(scope, parts)
+        raw = await self.backend.get(key)
+        self.stats["hits" if raw is not None else "misses"] += 1
+        return key, CachedResponse.decode(raw) if raw is not None else None
+
+    async def set(self, key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        entry = CachedResponse(body, body_etag(body), headers or {})
+        await self.backend.set(key, entry.encode(), self.ttl)
+        self.stats["stores"] += 1
+        return entry
+
+    async def invalidate(self, *scopes: str):
+        for scope in scopes:
+            await self.backend.incr(f"gen:{scope}")
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Counters for monitoring"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self.backend),
+        }
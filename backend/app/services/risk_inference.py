@@ -0,0 +1,375 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .aggregates import AggregateStore
+from .feature_store import FeatureStore
+from .forecasting import Z_95, Forecast, ForecastService
+from .risk_models import (
+    COUNT_NAMES,
+    FEATURE_NAMES,
+    RISK_TYPES,
+    RiskModel,
+    build_features,
+    features_from_statistics,
+    impute_features,
+    model_versions,
+    predict_all,
+    unpack_scores,
+)
+from .statistics import RESPIRATORY_RATE_RANGE, compute_health_score, summarize_statistics, summarize_vital_signs
+from .vitals_store import VitalSignStore
+
+ASSESSMENT_DAYS = 30
+TIMEFRAMES = ("shortTerm", "mediumTerm", "longTerm")
+# Forecast day used for the outlook of each timeframe; longTerm is risk-based
+FORECAST_DAYS = {"shortTerm": 7, "mediumTerm": 30}
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class RiskFactor(BaseModel):
+    name: str
+    score: int  # 0-100, higher is healthier
+    impact: str  # Low, Medium, High
+
+
+class RiskPrediction(BaseModel):
+    prediction: str
+    confidence: float
+
+
+class RiskAssessment(BaseModel):
+    user_id: str
+    overall_score: int
+    risk_level: str  # Low, Moderate, High
+    risks: Dict[str, float]
+    risk_factors: List[RiskFactor]
+    predictions: Dict[str, RiskPrediction]
+    recommendations: List[str]
+    data_coverage: float
+    model_versions: Dict[str, str]
+    generated_at: datetime
+
+    class Config:
+        # The risk pages read camelCase keys (overallScore, riskFactors, ...)
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+RECOMMENDATIONS = {
+    "heart_disease": [
+        "Aim for 150 minutes of moderate aerobic activity per week",
+        "Discuss your heart rate trends with your healthcare provider",
+    ],
+    "hypertension": [
+        "Monitor blood pressure daily, at the same time of day",
+        "Reduce sodium intake and limit alcohol",
+    ],
+    "stress_related": [
+        "Consider stress reduction techniques such as breathing exercises or meditation",
+        "Improve sleep hygiene and keep a regular sleep schedule",
+    ],
+}
+
+
+class RiskBatcher:
+    """Coalesces concurrent inference requests into micro-batches
+
+    Callers queue feature rows and await their scores. A single runner takes
+    up to ``max_batch_size`` rows, waiting at most ``max_wait`` seconds after
+    the first arrival for the batch to fill, and invokes each model once for
+    the whole batch. Requests arriving while a batch is being scored join the
+    next one.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, RiskModel],
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ):
+        self.models = models
+        self.max_batch_size = max_batch_size or int(os.environ.get("RISK_MAX_BATCH_SIZE", "64"))
+        self.max_wait = max_wait if max_wait is not None else float(os.environ.get("RISK_MAX_WAIT_MS", "5")) / 1000
+        self._queue: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._queued_rows = 0
+        self._arrived: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+        self.stats = {"requests": 0, "rows": 0, "batches": 0, "largest_batch": 0}
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        # (Re)bind to the current loop, e.g. a new asyncio.run in a batch worker
+        self._loop = loop
+        self._closing = False
+        self._queue, self._queued_rows = [], 0
+        self._arrived, self._full = asyncio.Event(), asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._closing = True
+        self._arrived.set()
+        await self._task
+        self._task = None
+
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        """(rows x risks) probabilities for ``features``, scored with other callers' rows"""
+        if len(features) == 0:
+            return np.zeros((0, len(RISK_TYPES)))
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((features, future))
+        self._queued_rows += len(features)
+        self.stats["requests"] += 1
+        self._arrived.set()
+        if self._queued_rows >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    def _take_batch(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        batch, rows = [], 0
+        while self._queue and (not batch or rows + len(self._queue[0][0]) <= self.max_batch_size):
+            features, future = self._queue.pop(0)
+            batch.append((features, future))
+            rows += len(features)
+        self._queued_rows -= rows
+        if self._queued_rows < self.max_batch_size:
+            self._full.clear()
+        if not self._queue:
+            self._arrived.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._arrived.wait()
+            if not self._queue:
+                if self._closing:
+                    return
+                self._arrived.clear()
+                continue
+            if self._queued_rows < self.max_batch_size and not self._closing:
+                # Give concurrent requests a moment to join this batch
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            await self._score(self._take_batch())
+
+    async def _score(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        features = np.vstack([rows for rows, _ in batch])
+        try:
+            # Model calls run off the event loop; sklearn and TensorFlow release the GIL
+            scores = await asyncio.to_thread(predict_all, self.models, features)
+        except Exception as e:
+            print(f"Risk inference failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["rows"] += len(features)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(features))
+        offset = 0
+        for rows, future in batch:
+            if not future.done():
+                future.set_result(scores[offset:offset + len(rows)])
+            offset += len(rows)
+
+
+class RiskService:
+    """Risk scores and assessments built from a user's recent vital signs"""
+
+    def __init__(
+        self,
+        models: Dict[str, RiskModel],
+        vital_store: Optional[VitalSignStore] = None,
+        aggregate_store: Optional[AggregateStore] = None,
+        feature_store: Optional[FeatureStore] = None,
+        forecaster: Optional[ForecastService] = None,
+        batcher: Optional[RiskBatcher] = None
+    ):
+        self.models = models
+        self.vital_store = vital_store
+        self.aggregate_store = aggregate_store
+        # Precomputed 30-day feature vectors; replaces scanning readings when present
+        self.feature_store = feature_store
+        # Metric forecasts drive the short- and medium-term outlook when present
+        self.forecaster = forecaster
+        self.batcher = batcher or RiskBatcher(models)
+
+    async def score(self, features: np.ndarray) -> List[Dict[str, float]]:
+        """Risk probabilities per row, coalesced with concurrent requests"""
+        return unpack_scores(await self.batcher.predict(features))
+
+    def score_now(self, features: np.ndarray) -> List[Dict[str, float]]:
+        """Score an already-batched matrix directly (e.g. a batch report chunk)"""
+        return unpack_scores(predict_all(self.models, features))
+
+    def features_for(
+        self, user_ids: List[str], statistics: List[Dict[str, Dict[str, float]]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Model inputs for users: their stored vectors, or else built from ``statistics``"""
+        if self.feature_store is not None:
+            return impute_features(
+                self.feature_store.matrix(user_ids, FEATURE_NAMES),
+                self.feature_store.matrix(user_ids, COUNT_NAMES)
+            )
+        return features_from_statistics(statistics)
+
+    async def score_user(self, user_id: str, statistics: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Risk scores for one user, from the feature store or the given period statistics"""
+        features, _ = await asyncio.to_thread(self.features_for, [user_id], [statistics])
+        return (await self.score(features))[0]
+
+    def _load_period(self, user_id: str, days: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Features, data coverage and summary for the last ``days`` days"""
+        if self.feature_store is not None and days == ASSESSMENT_DAYS:
+            # O(1): the materialized vector already covers the default window
+            features, coverage = self.features_for([user_id], [])
+            return features, coverage, summarize_statistics(self.feature_store.statistics(user_id))
+        if self.aggregate_store is not None:
+            last_day = datetime.now().date()
+            statistics = self.aggregate_store.period_statistics(user_id, last_day - timedelta(days=days - 1), last_day)
+            features, coverage = features_from_statistics([statistics])
+            return features, coverage, summarize_statistics(statistics)
+        if self.vital_store is None:
+            # Mock data for development
+            period = {
+                "heart_rate": [72, 75, 71, 74, 73, 70, 72],
+                "blood_pressure": {
+                    "systolic": [125, 128, 124, 130, 126, 122, 125],
+                    "diastolic": [82, 84, 80, 86, 83, 81, 82]
+                },
+                "respiratory_rate": [16, 15, 16, 17, 16, 15, 16],
+                "stress": [45, 60, 40, 55, 35, 30, 42]
+            }
+        else:
+            end = datetime.now()
+            period = self.vital_store.get_period(user_id, end - timedelta(days=days), end)
+        features, coverage = build_features([period])
+        return features, coverage, summarize_vital_signs(period)
+
+    async def assess(self, user_id: str, days: int = ASSESSMENT_DAYS) -> RiskAssessment:
+        """Full assessment for the risk pages: scores, factors, outlook and advice"""
+        features, coverage, summary = await asyncio.to_thread(self._load_period, user_id, days)
+        risks = (await self.score(features))[0]
+        coverage = float(coverage[0])
+        predictions = _predictions(risks, summary["trends"], coverage, summary["statistics"])
+        if self.forecaster is not None:
+            predictions.update(_forecast_predictions(await self.forecaster.forecast(user_id)))
+
+        mean_risk = float(np.mean(list(risks.values())))
+        overall_score = int(round(100 * (1 - mean_risk)))
+        risk_level = "Low" if overall_score >= 80 else "Moderate" if overall_score >= 60 else "High"
+
+        return RiskAssessment(
+            user_id=user_id,
+            overall_score=overall_score,
+            risk_level=risk_level,
+            risks=risks,
+            risk_factors=_risk_factors(risks, summary["statistics"]),
+            predictions=predictions,
+            recommendations=_recommendations(risks),
+            data_coverage=round(coverage, 2),
+            model_versions=model_versions(self.models),
+            generated_at=datetime.now()
+        )
+
+
+def _impact(risk: float) -> str:
+    return "High" if risk >= 0.3 else "Medium" if risk >= 0.15 else "Low"
+
+
+def _risk_factors(risks: Dict[str, float], statistics: Dict[str, Dict[str, float]]) -> List[RiskFactor]:
+    factors = [
+        RiskFactor(name="Heart Rate Trends", score=round(100 * (1 - risks["heart_disease"])),
+                   impact=_impact(risks["heart_disease"])),
+        RiskFactor(name="Blood Pressure Trends", score=round(100 * (1 - risks["hypertension"])),
+                   impact=_impact(risks["hypertension"])),
+        RiskFactor(name="Stress Indicators", score=round(100 * (1 - risks["stress_related"])),
+                   impact=_impact(risks["stress_related"])),
+    ]
+    respiratory_rate = statistics["respiratory_rate"]["mean"]
+    if not np.isnan(respiratory_rate):
+        low, high = RESPIRATORY_RATE_RANGE
+        deviation = max(0.0, low - respiratory_rate, respiratory_rate - high)
+        factors.append(RiskFactor(
+            name="Respiratory Patterns",
+            score=round(max(0.0, 100 - deviation * 10)),
+            impact="High" if deviation > 4 else "Medium" if deviation > 0 else "Low"
+        ))
+    return factors
+
+
+def _predictions(
+    risks: Dict[str, float],
+    trends: Dict[str, str],
+    coverage: float,
+    statistics: Dict[str, Dict[str, float]]
+) -> Dict[str, RiskPrediction]:
+    worsening = sum(trend in ("concerning", "elevated") for trend in trends.values())
+    improving = sum(trend == "improving" for trend in trends.values())
+    highest = max(risks.values())
+    samples = statistics["heart_rate"]["count"]
+
+    # Confidence grows with data and shrinks with the horizon
+    base = min(0.95, 0.5 + 0.1 * np.log10(1 + samples)) * (0.6 + 0.4 * coverage)
+    outlook = {
+        "shortTerm": "Stable" if not worsening else "Monitoring Recommended",
+        "mediumTerm": "Slight Improvement" if improving > worsening else
+                      "Stable" if highest < 0.3 and not worsening else "Monitoring Recommended",
+        "longTerm": "Stable" if highest < 0.2 else
+                    "Elevated Risk" if highest >= 0.5 else "Monitoring Recommended",
+    }
+    return {
+        timeframe: RiskPrediction(prediction=outlook[timeframe], confidence=round(float(base * decay), 2))
+        for timeframe, decay in zip(TIMEFRAMES, (1.0, 0.85, 0.7))
+    }
+
+
+def _forecast_predictions(forecast: Forecast) -> Dict[str, RiskPrediction]:
+    """Outlook from the health score of forecast means versus the last week's means"""
+    current = {metric: {"mean": np.nan if value is None else value} for metric, value in forecast.last_observed.items()}
+    current_score = compute_health_score(current)
+    predictions = {}
+    for timeframe, day in FORECAST_DAYS.items():
+        if current_score is None or not forecast.metrics or day > forecast.horizon_days:
+            continue
+        projected = {metric: {"mean": f.mean[day - 1]} for metric, f in forecast.metrics.items()}
+        change = compute_health_score(projected) - current_score
+        prediction = "Slight Improvement" if change >= 3 else "Stable" if change > -3 else "Monitoring Recommended"
+        # Narrower forecast intervals mean more confidence
+        relative_std = np.mean([
+            (f.upper[day - 1] - f.lower[day - 1]) / (2 * Z_95) / max(abs(f.mean[day - 1]), 1.0)
+            for f in forecast.metrics.values()
+        ])
+        confidence = float(np.clip(1 - 4 * relative_std, 0.3, 0.95))
+        predictions[timeframe] = RiskPrediction(prediction=prediction, confidence=round(confidence, 2))
+    return predictions
+
+
+def _recommendations(risks: Dict[str, float]) -> List[str]:
+    recommendations = []
+    for name in sorted(RISK_TYPES, key=lambda n: risks[n], reverse=True):
+        if risks[name] >= 0.15:
+            recommendations.extend(RECOMMENDATIONS[name])
+    if not recommendations:
+        recommendations.append("Keep up your current routine and continue regular check-ins")
+    if max(risks.values()) >= 0.5:
+        recommendations.append("Schedule a consultation with your healthcare provider")
+    return recommendations
@@ -0,0 +1,244 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .statistics import METRICS, compute_ragged_statistics
+
+# Trained artifacts are optional: scikit-learn estimators are read with joblib
+# and Keras models with TensorFlow (imported only when a Keras artifact exists).
+try:
+    import joblib
+except ImportError:  # pragma: no cover - optional dependency
+    joblib = None
+
+RISK_TYPES = ("heart_disease", "hypertension", "stress_related")
+
+# Model inputs: one column per (metric, statistic), in this order
+FEATURES: Tuple[Tuple[str, str], ...] = (
+    ("heart_rate", "mean"),
+    ("heart_rate", "std"),
+    ("heart_rate", "p5"),
+    ("heart_rate", "p95"),
+    ("heart_rate", "change"),
+    ("systolic", "mean"),
+    ("systolic", "p95"),
+    ("systolic", "change"),
+    ("diastolic", "mean"),
+    ("diastolic", "p95"),
+    ("respiratory_rate", "mean"),
+    ("respiratory_rate", "std"),
+    ("stress", "mean"),
+    ("stress", "p95"),
+    ("stress", "change"),
+)
+FEATURE_NAMES = [f"{metric}_{stat}" for metric, stat in FEATURES]
+COUNT_NAMES = [f"{metric}_count" for metric in METRICS]
+
+# Typical adult values, substituted for metrics without readings
+FEATURE_DEFAULTS = np.array([
+    72.0, 6.0, 60.0, 88.0, 0.0,
+    118.0, 128.0, 0.0,
+    76.0, 84.0,
+    15.0, 1.5,
+    35.0, 55.0, 0.0,
+])
+
+
+def features_from_batch(batch: Dict[str, Dict[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(users x features) matrix from per-metric statistic arrays
+
+    Returns the matrix with missing values imputed from FEATURE_DEFAULTS and
+    the fraction of metrics that had readings for each user.
+    """
+    matrix = np.column_stack([np.asarray(batch[metric][stat], dtype=np.float64) for metric, stat in FEATURES])
+    counts = np.column_stack([np.asarray(batch[metric]["count"], dtype=np.float64) for metric in METRICS])
+    return impute_features(matrix, counts)
+
+
+def impute_features(matrix: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Fill missing features with FEATURE_DEFAULTS; coverage is the share of metrics with readings"""
+    return np.where(np.isnan(matrix), FEATURE_DEFAULTS, matrix), (counts > 0).mean(axis=1)
+
+
+def build_features(periods: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Features for many users straight from their period arrays
+
+    ``periods`` are VitalSignStore.get_period dicts; each metric is reduced
+    for all users at once without padding them to a common length.
+    """
+    series = {
+        "heart_rate": [p["heart_rate"] for p in periods],
+        "systolic": [p["blood_pressure"]["systolic"] for p in periods],
+        "diastolic": [p["blood_pressure"]["diastolic"] for p in periods],
+        "respiratory_rate": [p["respiratory_rate"] for p in periods],
+        "stress": [p["stress"] for p in periods],
+    }
+    batch = {metric: compute_ragged_statistics(series[metric]) for metric in METRICS}
+    return features_from_batch(batch)
+
+
+def features_from_statistics(statistics: Sequence[Dict[str, Dict[str, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Features from already-computed period statistics (e.g. merged partials)"""
+    batch = {
+        metric: {
+            stat: np.array([s.get(metric, {}).get(stat, np.nan) for s in statistics], dtype=np.float64)
+            for stat in {"count"} | {stat for m, stat in FEATURES if m == metric}
+        }
+        for metric in METRICS
+    }
+    return features_from_batch(batch)
+
+
+class RiskModel:
+    """A model mapping a (users x features) matrix to one probability per user"""
+
+    def __init__(self, name: str, version: str):
+        self.name = name
+        self.version = version
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class LogisticRiskModel(RiskModel):
+    """Logistic model over centred features; also the format of ``.json`` artifacts
+
+    ``terms`` maps feature names to ``(center, coefficient)`` pairs.
+    """
+
+    def __init__(self, name: str, version: str, intercept: float, terms: Dict[str, Sequence[float]]):
+        super().__init__(name, version)
+        unknown = set(terms) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown features for {name}: {sorted(unknown)}")
+        self.intercept = float(intercept)
+        self.centers = np.array([terms.get(f, (0.0, 0.0))[0] for f in FEATURE_NAMES], dtype=np.float64)
+        self.weights = np.array([terms.get(f, (0.0, 0.0))[1] for f in FEATURE_NAMES], dtype=np.float64)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        logits = self.intercept + (features - self.centers) @ self.weights
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class SklearnRiskModel(RiskModel):
+    """A fitted scikit-learn classifier (or pipeline) exposing predict_proba"""
+
+    def __init__(self, name: str, version: str, estimator: Any):
+        super().__init__(name, version)
+        self.estimator = estimator
+        # Estimators fitted on a DataFrame remember their column order
+        names = getattr(estimator, "feature_names_in_", None)
+        self.columns = None if names is None else [FEATURE_NAMES.index(str(n)) for n in names]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        if self.columns is not None:
+            features = features[:, self.columns]
+        return self.estimator.predict_proba(features)[:, 1]
+
+
+class KerasRiskModel(RiskModel):
+    """A Keras model with a single sigmoid output"""
+
+    def __init__(self, name: str, version: str, model: Any):
+        super().__init__(name, version)
+        self.model = model
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model(features.astype(np.float32), training=False)).reshape(-1)
+
+
+# Baseline coefficients used when no trained artifact is deployed for a risk
+BASELINE_MODELS = {
+    "heart_disease": {
+        "intercept": -1.75,
+        "terms": {
+            "heart_rate_mean": (72.0, 0.035),
+            "heart_rate_p5": (60.0, 0.03),
+            "systolic_mean": (118.0, 0.025),
+            "diastolic_mean": (76.0, 0.02),
+            "stress_mean": (35.0, 0.01),
+        },
+    },
+    "hypertension": {
+        "intercept": -1.5,
+        "terms": {
+            "systolic_mean": (118.0, 0.07),
+            "systolic_p95": (128.0, 0.02),
+            "systolic_change": (0.0, 0.03),
+            "diastolic_mean": (76.0, 0.08),
+        },
+    },
+    "stress_related": {
+        "intercept": -1.2,
+        "terms": {
+            "stress_mean": (35.0, 0.05),
+            "stress_p95": (55.0, 0.02),
+            "heart_rate_mean": (72.0, 0.02),
+            "heart_rate_std": (6.0, 0.03),
+            "respiratory_rate_mean": (15.0, 0.08),
+        },
+    },
+}
+
+
+def _load_artifact(name: str, path: str) -> RiskModel:
+    version = os.path.basename(path)
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return LogisticRiskModel(name, spec.get("version", version), spec["intercept"], spec["terms"])
+    if path.endswith(".joblib"):
+        if joblib is None:
+            raise RuntimeError("joblib is not installed")
+        return SklearnRiskModel(name, version, joblib.load(path))
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise RuntimeError("tensorflow is not installed")
+    return KerasRiskModel(name, version, tf.keras.models.load_model(path, compile=False))
+
+
+def load_models(model_dir: Optional[str] = None) -> Dict[str, RiskModel]:
+    """Load one model per risk type, falling back to the baseline coefficients
+
+    For each risk, the first of ``{risk}.joblib``, ``{risk}.keras``,
+    ``{risk}.h5`` or ``{risk}.json`` found in ``model_dir`` (default
+    RISK_MODEL_DIR) is used. Called once per worker at startup.
+    """
+    model_dir = model_dir or os.environ.get("RISK_MODEL_DIR")
+    models: Dict[str, RiskModel] = {}
+    for name in RISK_TYPES:
+        for extension in (".joblib", ".keras", ".h5", ".json"):
+            path = os.path.join(model_dir, name + extension) if model_dir else None
+            if path is None or not os.path.exists(path):
+                continue
+            try:
+                models[name] = _load_artifact(name, path)
+                print(f"Loaded {name} risk model from {path}")
+                break
+            except Exception as e:
+                print(f"Error loading risk model {path}: {e}")
+        if name not in models:
+            baseline = BASELINE_MODELS[name]
+            models[name] = LogisticRiskModel(name, "baseline-1", baseline["intercept"], baseline["terms"])
+    return models
+
+
+def model_versions(models: Dict[str, RiskModel]) -> Dict[str, str]:
+    return {name: model.version for name, model in models.items()}
+
+
+def predict_all(models: Dict[str, RiskModel], features: np.ndarray) -> np.ndarray:
+    """(users x risks) probabilities, one model call per risk for the whole batch"""
+    if len(features) == 0:
+        return np.zeros((0, len(RISK_TYPES)))
+    scores = np.column_stack([
+        np.asarray(models[name].predict(features), dtype=np.float64).reshape(-1) for name in RISK_TYPES
+    ])
+    return np.clip(scores, 0.0, 1.0)
+
+
+def unpack_scores(scores: np.ndarray) -> List[Dict[str, float]]:
+    return [{name: round(float(value), 4) for name, value in zip(RISK_TYPES, row)} for row in scores]
@@ -0,0 +1,222 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .shared_files import FileVersion, KeyLocks, file_version
+from .vitals_store import VitalSignStore, to_epoch_ms
+
+# One row per non-empty bucket: start (epoch ms), reading count, sum and extremes
+BUCKET_DTYPE = np.dtype([("ts", "<i8"), ("count", "<u4"), ("sum", "<f8"), ("min", "<f4"), ("max", "<f4")])
+
+# Bucket width of each tier, finest first. A tier is built from the one
+# before it (minute from raw readings), and one stored partition of it
+# covers a day, a month or a year respectively.
+TIERS = {"minute": 60_000, "hour": 3_600_000, "day": 86_400_000}
+_SOURCE_TIER = {"hour": "minute", "day": "hour"}
+
+
+def partition_start(tier: str, day: date) -> date:
+    """First day of the partition of ``tier`` holding ``day``"""
+    if tier == "minute":
+        return day
+    if tier == "hour":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def partition_days(tier: str, first: date) -> List[date]:
+    """Every day covered by the partition starting on ``first``"""
+    if tier == "minute":
+        return [first]
+    if tier == "hour":
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    else:
+        last = first.replace(year=first.year + 1)
+    return [first + timedelta(days=i) for i in range((last - first).days)]
+
+
+def bucket_edges(tier: str, days: List[date]) -> np.ndarray:
+    """Bucket boundaries (epoch ms) over whole local days, ending with the end of the last day
+
+    Boundaries restart at each local midnight, so day buckets stay aligned
+    to calendar days across DST changes.
+    """
+    starts = [to_epoch_ms(datetime.combine(day, time.min)) for day in days]
+    starts.append(to_epoch_ms(datetime.combine(days[-1] + timedelta(days=1), time.min)))
+    if tier == "day":
+        return np.array(starts, dtype=np.int64)
+    width = TIERS[tier]
+    return np.concatenate([
+        np.arange(start, end, width, dtype=np.int64) for start, end in zip(starts[:-1], starts[1:])
+    ] + [np.array(starts[-1:], dtype=np.int64)])
+
+
+def raw_buckets(ts_ms: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Readings as one-sample buckets, so raw data and rollups share one code path"""
+    records = np.empty(len(values), dtype=BUCKET_DTYPE)
+    records["ts"] = ts_ms
+    records["count"] = 1
+    records["sum"] = values
+    records["min"] = values
+    records["max"] = values
+    return records
+
+
+def rollup(records: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Merge time-sorted bucket records into the buckets delimited by ``edges``"""
+    if len(records) == 0:
+        return np.empty(0, dtype=BUCKET_DTYPE)
+    index = np.searchsorted(edges, records["ts"], side="right") - 1
+    inside = (index >= 0) & (index < len(edges) - 1)
+    records, index = records[inside], index[inside]
+    if len(records) == 0:
+        return np.empty(0, dtype=BUCKET_DTYPE)
+    starts = np.r_[0, np.flatnonzero(np.diff(index)) + 1]
+    result = np.empty(len(starts), dtype=BUCKET_DTYPE)
+    result["ts"] = edges[index[starts]]
+    result["count"] = np.add.reduceat(records["count"], starts)
+    result["sum"] = np.add.reduceat(records["sum"], starts)
+    result["min"] = np.minimum.reduceat(records["min"], starts)
+    result["max"] = np.maximum.reduceat(records["max"], starts)
+    return result
+
+
+class RollupStore:
+    """Pre-rolled minute, hour and day buckets per user and series
+
+    Charts read buckets at the coarsest tier that still has enough points
+    instead of scanning raw readings, so a 90-day chart touches a few
+    thousand hourly buckets whatever the device sampling rate. Completed
+    partitions are built once, from the next finer tier, and persisted;
+    partitions still receiving readings (today, this month, this year) are
+    rolled up fresh from their completed parts and today's readings.
+
+    As with AggregateStore, cached partitions are checked against their
+    file, and builds and drops of a user's partitions hold a lock shared by
+    every process, so late readings reach every API worker.
+
+    Layout: ``{root}/{user_id}/{series}/{tier}/{partition start}.npy``
+    """
+
+    def __init__(self, vital_store: VitalSignStore, root_dir: Optional[str] = None, cache_size: int = 20000):
+        self.vital_store = vital_store
+        self.root_dir = root_dir or os.environ.get("ROLLUPS_DATA_DIR", "data/rollups")
+        self.cache_size = cache_size
+        # Key -> (file version, records)
+        self._cache: "OrderedDict[Tuple[str, str, str, date], Tuple[FileVersion, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks = KeyLocks()
+        vital_store.add_listener(self.on_append)
+
+    def _path(self, user_id: str, series: str, tier: str, first: date) -> str:
+        # Reuse the store's user-id validation before touching the filesystem
+        self.vital_store._user_dir(user_id)
+        return os.path.join(self.root_dir, user_id, series, tier, f"{first.isoformat()}.npy")
+
+    def _user_lock(self, user_id: str):
+        self.vital_store._user_dir(user_id)
+        return self._user_locks.hold(user_id, os.path.join(self.root_dir, user_id, ".lock"))
+
+    def _remember(self, key, version: FileVersion, records: np.ndarray):
+        with self._lock:
+            self._cache[key] = (version, records)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, user_id: str, series: str, tier: str, first: date) -> Optional[np.ndarray]:
+        key = (user_id, series, tier, first)
+        version = file_version(self._path(user_id, series, tier, first))
+        if version is None:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(key)
+                return cached[1]
+        try:
+            records = np.load(self._path(user_id, series, tier, first))
+        except FileNotFoundError:
+            # Dropped by a late reading since the stat
+            return None
+        self._remember(key, version, records)
+        return records
+
+    def _save(self, user_id: str, series: str, tier: str, first: date, records: np.ndarray):
+        path = self._path(user_id, series, tier, first)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp, path)
+        self._remember((user_id, series, tier, first), file_version(path), records)
+
+    def _discard(self, user_id: str, series: str, tier: str, first: date):
+        with self._lock:
+            self._cache.pop((user_id, series, tier, first), None)
+        try:
+            os.remove(self._path(user_id, series, tier, first))
+        except FileNotFoundError:
+            pass
+
+    def partition(self, user_id: str, series: str, tier: str, first: date) -> np.ndarray:
+        """Buckets of one partition; completed partitions are built once and persisted"""
+        today = datetime.now().date()
+        days = [day for day in partition_days(tier, first) if day <= today]
+        if not days:
+            return np.empty(0, dtype=BUCKET_DTYPE)
+        if days[-1] < today:
+            records = self._load(user_id, series, tier, first)
+            if records is not None:
+                return records
+            # Built and saved under the lock late readings take to drop it
+            with self._user_lock(user_id):
+                records = self._load(user_id, series, tier, first)
+                if records is None:
+                    records = self._build(user_id, series, tier, days)
+                    self._save(user_id, series, tier, first, records)
+                return records
+        return self._build(user_id, series, tier, days)
+
+    def _build(self, user_id: str, series: str, tier: str, days: List[date]) -> np.ndarray:
+        first = days[0]
+        if tier == "minute":
+            start = datetime.combine(first, time.min)
+            source = raw_buckets(*self.vital_store.get_range(user_id, series, start, start + timedelta(days=1)))
+        else:
+            lower = _SOURCE_TIER[tier]
+            parts = sorted({partition_start(lower, day) for day in days})
+            source = np.concatenate([self.partition(user_id, series, lower, part) for part in parts])
+        return rollup(source, bucket_edges(tier, days))
+
+    def buckets(self, user_id: str, series: str, tier: str, start: datetime, end: datetime) -> np.ndarray:
+        """Buckets of ``tier`` starting within [start, end)"""
+        last_day = (end - timedelta(microseconds=1)).date()
+        parts = []
+        first = partition_start(tier, start.date())
+        while first <= last_day:
+            parts.append(self.partition(user_id, series, tier, first))
+            first = partition_days(tier, first)[-1] + timedelta(days=1)
+        if not parts:
+            return np.empty(0, dtype=BUCKET_DTYPE)
+        records = np.concatenate(parts)
+        ts = records["ts"]
+        return records[(ts >= to_epoch_ms(start)) & (ts < to_epoch_ms(end))]
+
+    def on_append(self, user_id: str, day: date, series: str, rows: np.ndarray):
+        """VitalSignStore append listener: drop persisted partitions that late readings change
+
+        Only completed partitions are stored, so readings for today need no
+        work; the dropped ones are rebuilt on next use.
+        """
+        if day >= datetime.now().date():
+            return
+        with self._user_lock(user_id):
+            for tier in TIERS:
+                self._discard(user_id, series, tier, partition_start(tier, day))
@@ -0,0 +1,426 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+# Face detection uses MediaPipe when installed, OpenCV's Haar cascade as a
+# fallback, and a centred box when neither is available. Detection runs once
+# per scan; the ROI is then followed incrementally (see FaceROITracker).
+try:
+    import cv2
+except ImportError:  # pragma: no cover - optional dependency
+    cv2 = None
+
+HR_BAND = (0.7, 4.0)  # 42-240 bpm
+RR_BAND = (0.1, 0.5)  # 6-30 breaths/min
+MIN_HR_SECONDS = 5.0
+MIN_RR_SECONDS = 15.0
+MIN_RR_PEAK_SHARE = 0.6
+MIN_RR_AMPLITUDE = 1e-6  # relative brightness modulation
+POS_WINDOW_SECONDS = 1.6
+HR_SEGMENT_SECONDS = 8.0
+HR_NFFT = 2048
+RR_NFFT = 4096
+
+Roi = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+
+class ScanSignal(BaseModel):
+    rgb: List[List[float]]  # per-frame [r, g, b] means over the face ROI
+    timestamps: Optional[List[float]] = None  # seconds
+    fps: Optional[float] = None
+
+
+class ScanEstimate(BaseModel):
+    heart_rate: Optional[float] = None  # beats per minute
+    respiratory_rate: Optional[float] = None  # breaths per minute
+    quality: float = 0.0  # 0-1, share of pulse-band power at the heart-rate peak
+    samples: int = 0
+    duration_seconds: float = 0.0
+    fps: float = 0.0
+
+
+def resample_uniform(rgb: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Resample irregularly timed (n, 3) ROI means onto a uniform grid"""
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        raise ValueError("Timestamps must span a positive duration")
+    fs = (len(timestamps) - 1) / float(timestamps[-1] - timestamps[0])
+    steps = np.diff(timestamps)
+    # Already uniform within 10% jitter: skip the interpolation
+    if steps.min() > 0 and steps.max() - steps.min() <= 0.1 / fs:
+        return rgb, fs
+    grid = timestamps[0] + np.arange(len(timestamps)) / fs
+    uniform = np.empty_like(rgb, dtype=np.float64)
+    for channel in range(3):
+        uniform[:, channel] = np.interp(grid, timestamps, rgb[:, channel])
+    return uniform, fs
+
+
+def pos_pulse(rgb: np.ndarray, fs: float) -> np.ndarray:
+    """Plane-orthogonal-to-skin pulse signal for (sessions, n, 3) ROI means
+
+    Each 1.6 s window is normalised by its own mean, projected onto the two
+    POS axes, combined with a per-window alpha and overlap-added. All windows
+    of all sessions are processed at once.
+    """
+    sessions, n, _ = rgb.shape
+    length = max(2, min(n, int(round(POS_WINDOW_SECONDS * fs))))
+    windows = np.lib.stride_tricks.sliding_window_view(rgb, length, axis=1)  # (s, m, 3, length)
+    normalized = windows / np.maximum(windows.mean(axis=-1, keepdims=True), 1e-9)
+    s1 = normalized[:, :, 1] - normalized[:, :, 2]
+    s2 = normalized[:, :, 1] + normalized[:, :, 2] - 2.0 * normalized[:, :, 0]
+    alpha = s1.std(axis=-1, keepdims=True) / np.maximum(s2.std(axis=-1, keepdims=True), 1e-12)
+    h = s1 + alpha * s2
+    h -= h.mean(axis=-1, keepdims=True)
+
+    pulse = np.zeros((sessions, n))
+    count = h.shape[1]
+    for offset in range(length):
+        pulse[:, offset:offset + count] += h[:, :, offset]
+    return pulse
+
+
+def bandpass(signal: np.ndarray, fs: float, band: Tuple[float, float]) -> np.ndarray:
+    """Zero-phase FFT band-pass along the last axis"""
+    n = signal.shape[-1]
+    spectrum = np.fft.rfft(signal - signal.mean(axis=-1, keepdims=True), axis=-1)
+    freqs = np.fft.rfftfreq(n, 1.0 / fs)
+    spectrum[..., (freqs < band[0]) | (freqs > band[1])] = 0
+    return np.fft.irfft(spectrum, n=n, axis=-1)
+
+
+def welch_psd(signal: np.ndarray, fs: float, segment: int, nfft: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Welch power spectrum (Hann, 50% overlap) along the last axis"""
+    n = signal.shape[-1]
+    segment = max(8, min(segment, n))
+    nfft = max(nfft, segment)
+    starts = np.arange(0, n - segment + 1, max(1, segment // 2))
+    segments = signal[..., starts[:, None] + np.arange(segment)]
+    segments = (segments - segments.mean(axis=-1, keepdims=True)) * np.hanning(segment)
+    power = np.abs(np.fft.rfft(segments, n=nfft, axis=-1)) ** 2
+    return np.fft.rfftfreq(nfft, 1.0 / fs), power.mean(axis=-2)
+
+
+def _peak_frequency(freqs: np.ndarray, psd: np.ndarray, band: Tuple[float, float]) -> np.ndarray:
+    """Peak frequency per row within ``band``, refined by parabolic interpolation"""
+    in_band = np.flatnonzero((freqs >= band[0]) & (freqs <= band[1]))
+    local = psd[:, in_band]
+    peak = local.argmax(axis=1)
+    rows = np.arange(len(psd))
+    left = local[rows, np.maximum(peak - 1, 0)]
+    center = local[rows, peak]
+    right = local[rows, np.minimum(peak + 1, local.shape[1] - 1)]
+    denominator = left - 2 * center + right
+    safe = np.where(denominator != 0, denominator, 1.0)
+    offset = np.where(denominator != 0, 0.5 * (left - right) / safe, 0.0)
+    return freqs[in_band[peak]] + np.clip(offset, -0.5, 0.5) * (freqs[1] - freqs[0])
+
+
+def _pulse_quality(freqs: np.ndarray, psd: np.ndarray, f0: np.ndarray) -> np.ndarray:
+    """Share of 0.7-8 Hz power within 0.1 Hz of the peak and 0.2 Hz of its harmonic"""
+    f = freqs[None, :]
+    total_mask = (f >= HR_BAND[0]) & (f <= 8.0)
+    signal_mask = (np.abs(f - f0[:, None]) <= 0.1) | (np.abs(f - 2 * f0[:, None]) <= 0.2)
+    total = (psd * total_mask).sum(axis=1)
+    return np.where(total > 0, (psd * (signal_mask & total_mask)).sum(axis=1) / np.maximum(total, 1e-30), 0.0)
+
+
+def _peak_share(
+    freqs: np.ndarray, psd: np.ndarray, f0: np.ndarray, band: Tuple[float, float], width: float
+) -> np.ndarray:
+    """Share of in-band power within ``width`` Hz of each row's peak"""
+    f = freqs[None, :]
+    band_mask = (f >= band[0]) & (f <= band[1])
+    total = (psd * band_mask).sum(axis=1)
+    peak = (psd * (band_mask & (np.abs(f - f0[:, None]) <= width))).sum(axis=1)
+    return np.where(total > 0, peak / np.maximum(total, 1e-30), 0.0)
+
+
+def analyze_batch(rgb: np.ndarray, fs: float) -> List[ScanEstimate]:
+    """Estimate vitals for many scans of equal length and rate in one pass
+
+    ``rgb`` is (sessions, n, 3) uniformly sampled ROI means. Every stage is
+    vectorized over sessions, so a batch costs about as much as one FFT of
+    the stacked matrix.
+    """
+    rgb = np.asarray(rgb, dtype=np.float64)
+    sessions, n, _ = rgb.shape
+    duration = n / fs
+    estimates = [
+        ScanEstimate(samples=n, duration_seconds=round(duration, 2), fps=round(fs, 2))
+        for _ in range(sessions)
+    ]
+    if duration < MIN_HR_SECONDS:
+        return estimates
+
+    pulse = bandpass(pos_pulse(rgb, fs), fs, HR_BAND)
+    freqs, psd = welch_psd(pulse, fs, int(HR_SEGMENT_SECONDS * fs), HR_NFFT)
+    f0 = _peak_frequency(freqs, psd, HR_BAND)
+    quality = _pulse_quality(freqs, psd, f0)
+
+    breaths = None
+    if duration >= MIN_RR_SECONDS:
+        # Breathing modulates overall skin brightness well below the pulse band
+        luminance = rgb.mean(axis=2)
+        luminance = luminance / np.maximum(luminance.mean(axis=1, keepdims=True), 1e-9)
+        respiration = bandpass(luminance, fs, RR_BAND)
+        rr_freqs, rr_psd = welch_psd(respiration, fs, n, RR_NFFT)
+        breaths = _peak_frequency(rr_freqs, rr_psd, RR_BAND)
+        # No clear breathing peak (e.g. talking or motion): report nothing rather than noise
+        clear = (_peak_share(rr_freqs, rr_psd, breaths, RR_BAND, 0.05) >= MIN_RR_PEAK_SHARE) & (
+            respiration.std(axis=1) >= MIN_RR_AMPLITUDE
+        )
+        breaths = np.where(clear, breaths, np.nan)
+
+    for i, estimate in enumerate(estimates):
+        estimate.heart_rate = round(float(f0[i]) * 60.0, 1)
+        estimate.quality = round(float(quality[i]), 3)
+        if breaths is not None and not np.isnan(breaths[i]):
+            estimate.respiratory_rate = round(float(breaths[i]) * 60.0, 1)
+    return estimates
+
+
+def analyze_signal(
+    rgb: Sequence[Sequence[float]],
+    timestamps: Optional[Sequence[float]] = None,
+    fps: Optional[float] = None
+) -> ScanEstimate:
+    """Estimate vitals from a compact (n, 3) RGB ROI-mean signal
+
+    Pass either per-sample ``timestamps`` in seconds or a constant ``fps``.
+    """
+    rgb = np.asarray(rgb, dtype=np.float64)
+    if rgb.ndim != 2 or rgb.shape[1] != 3:
+        raise ValueError("rgb must be a list of [r, g, b] samples")
+    if timestamps is not None:
+        ts = np.asarray(timestamps, dtype=np.float64)
+        if ts.shape != (len(rgb),):
+            raise ValueError("timestamps must have one entry per sample")
+        rgb, fs = resample_uniform(rgb, ts)
+    elif fps and fps > 0:
+        fs = float(fps)
+    else:
+        raise ValueError("Either timestamps or fps is required")
+    return analyze_batch(rgb[None], fs)[0]
+
+
+_face_detector = None
+_mediapipe_detector = None
+
+
+def _detect_with_mediapipe(frame: np.ndarray) -> Optional[Roi]:
+    global _mediapipe_detector
+    if _mediapipe_detector is None:
+        try:
+            import mediapipe as mp
+        except ImportError:  # pragma: no cover - optional dependency
+            _mediapipe_detector = False
+            return None
+        _mediapipe_detector = mp.solutions.face_detection.FaceDetection(
+            model_selection=0, min_detection_confidence=0.5
+        )
+    if _mediapipe_detector is False:
+        return None
+    result = _mediapipe_detector.process(frame)
+    if not result.detections:
+        return None
+    height, width = frame.shape[:2]
+    box = result.detections[0].location_data.relative_bounding_box
+    x0, y0 = int(box.xmin * width), int(box.ymin * height)
+    return x0, y0, x0 + int(box.width * width), y0 + int(box.height * height)
+
+
+def detect_face(frame: np.ndarray) -> Roi:
+    """Bounding box of the most prominent face in an RGB frame"""
+    global _face_detector
+    height, width = frame.shape[:2]
+    face = _detect_with_mediapipe(frame)
+    if face is not None:
+        return face
+    if cv2 is not None:
+        if _face_detector is None:
+            _face_detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        faces = _face_detector.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), 1.1, 5)
+        if len(faces):
+            x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+            return int(x), int(y), int(x + w), int(y + h)
+    # Centred default box: the scan UI asks users to centre their face
+    return width * 3 // 10, height // 5, width * 7 // 10, height * 4 // 5
+
+
+def skin_roi(face: Roi) -> Roi:
+    """Forehead-and-cheeks part of a face box, trimmed of hair, jaw and background"""
+    x0, y0, x1, y1 = face
+    w, h = x1 - x0, y1 - y0
+    return x0 + w // 5, y0 + h // 10, x1 - w // 5, y1 - h // 5
+
+
+class FaceROITracker:
+    """Locate the face once, then follow the ROI with projection matching
+
+    Every ``track_interval`` frames the ROI's row and column intensity
+    profiles are matched against the previous ones within ``search`` pixels,
+    which follows small head movements at a fraction of a detector's cost.
+    """
+
+    def __init__(self, track_interval: int = 5, search: int = 8):
+        self.track_interval = track_interval
+        self.search = search
+        self.roi: Optional[Roi] = None
+        self._frames = 0
+        self._row_profile: Optional[np.ndarray] = None
+        self._col_profile: Optional[np.ndarray] = None
+
+    def reset(self):
+        self.roi = None
+        self._frames = 0
+
+    def update(self, frame: np.ndarray) -> Roi:
+        self._frames += 1
+        if self.roi is None:
+            self.roi = self._clip(skin_roi(detect_face(frame)), frame)
+            self._row_profile, self._col_profile = self._profiles(frame, self.roi)
+        elif self._frames % self.track_interval == 0:
+            self._follow(frame)
+        return self.roi
+
+    @staticmethod
+    def _clip(roi: Roi, frame: np.ndarray) -> Roi:
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi
+        return max(0, x0), max(0, y0), min(width, x1), min(height, y1)
+
+    @staticmethod
+    def _profiles(frame: np.ndarray, roi: Roi) -> Tuple[np.ndarray, np.ndarray]:
+        x0, y0, x1, y1 = roi
+        patch = frame[y0:y1, x0:x1, 1]  # green carries most of the facial contrast
+        return (
+            np.add.reduce(patch, axis=1, dtype=np.uint32) / (x1 - x0),
+            np.add.reduce(patch, axis=0, dtype=np.uint32) / (y1 - y0),
+        )
+
+    def _best_shift(self, profile: np.ndarray, reference: np.ndarray) -> int:
+        """Shift (in px) that best aligns a search-padded profile with the reference"""
+        candidates = np.lib.stride_tricks.sliding_window_view(profile, len(reference))
+        errors = np.abs(candidates - reference).mean(axis=1)
+        return int(errors.argmin()) - (len(candidates) - 1) // 2
+
+    def _follow(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = self.roi
+        s = self.search
+        if x0 - s < 0 or y0 - s < 0 or x1 + s > width or y1 + s > height:
+            return
+        green = frame[:, :, 1]
+        rows = np.add.reduce(green[y0 - s:y1 + s, x0:x1], axis=1, dtype=np.uint32) / (x1 - x0)
+        cols = np.add.reduce(green[y0:y1, x0 - s:x1 + s], axis=0, dtype=np.uint32) / (y1 - y0)
+        dy = self._best_shift(rows, self._row_profile)
+        dx = self._best_shift(cols, self._col_profile)
+        if dx or dy:
+            self.roi = self._clip((x0 + dx, y0 + dy, x1 + dx, y1 + dy), frame)
+            self._row_profile, self._col_profile = self._profiles(frame, self.roi)
+
+
+class RPPGSession:
+    """Per-scan state: ROI tracker plus preallocated ring buffers
+
+    ``push_frame`` and ``push_means`` only write into fixed arrays, so the
+    per-frame path allocates nothing beyond the ROI reduction. ``estimate``
+    runs the vectorized analysis over the buffered window and is meant to be
+    called at a much lower rate (e.g. once a second).
+    """
+
+    def __init__(self, fps_hint: float = 30.0, window_seconds: float = 30.0):
+        self.capacity = int(fps_hint * window_seconds * 1.25) + 1
+        self.window_seconds = window_seconds
+        self.tracker = FaceROITracker()
+        self._rgb = np.zeros((self.capacity, 3), dtype=np.float64)
+        self._ts = np.zeros(self.capacity, dtype=np.float64)
+        self._ordered_rgb = np.zeros_like(self._rgb)
+        self._ordered_ts = np.zeros_like(self._ts)
+        # ROI reduction scratch: column sums, then channel totals
+        self._column_sums = np.zeros((0, 3), dtype=np.uint32)
+        self._totals = np.zeros(3, dtype=np.uint64)
+        self._head = 0
+        self.count = 0
+
+    def push_means(self, r: float, g: float, b: float, timestamp: float):
+        """Append one ROI-mean sample (timestamp in seconds)"""
+        row = self._rgb[self._head]
+        row[0], row[1], row[2] = r, g, b
+        self._ts[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def push_many(self, rgb: np.ndarray, timestamps: np.ndarray):
+        """Append a block of (n, 3) ROI means with one or two slice copies"""
+        n = min(len(timestamps), self.capacity)
+        rgb, timestamps = rgb[-n:], timestamps[-n:]
+        first = min(n, self.capacity - self._head)
+        self._rgb[self._head:self._head + first] = rgb[:first]
+        self._ts[self._head:self._head + first] = timestamps[:first]
+        self._rgb[:n - first] = rgb[first:]
+        self._ts[:n - first] = timestamps[first:]
+        self._head = (self._head + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def push_frame(self, frame: np.ndarray, timestamp: float):
+        """Track the face in an RGB frame and append its ROI mean"""
+        x0, y0, x1, y1 = self.tracker.update(frame)
+        width, pixels = x1 - x0, (x1 - x0) * (y1 - y0)
+        if pixels <= 0:
+            return
+        if len(self._column_sums) < frame.shape[1]:
+            self._column_sums = np.zeros((frame.shape[1], 3), dtype=np.uint32)
+        # Two contiguous integer reductions are ~15x faster than mean(axis=(0, 1))
+        columns = self._column_sums[:width]
+        np.add.reduce(frame[y0:y1, x0:x1], axis=0, dtype=np.uint32, out=columns)
+        np.add.reduce(columns, axis=0, dtype=np.uint64, out=self._totals)
+        self.push_means(
+            self._totals[0] / pixels, self._totals[1] / pixels, self._totals[2] / pixels, timestamp
+        )
+
+    def window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Buffered (rgb, timestamps) in time order, limited to ``window_seconds``
+
+        Returns views of internal buffers that the next call overwrites.
+        """
+        n, start = self.count, (self._head - self.count) % self.capacity
+        first = min(n, self.capacity - start)
+        self._ordered_rgb[:first] = self._rgb[start:start + first]
+        self._ordered_rgb[first:n] = self._rgb[:n - first]
+        self._ordered_ts[:first] = self._ts[start:start + first]
+        self._ordered_ts[first:n] = self._ts[:n - first]
+        ts = self._ordered_ts[:n]
+        begin = int(np.searchsorted(ts, ts[-1] - self.window_seconds)) if n else 0
+        return self._ordered_rgb[begin:n], ts[begin:]
+
+    def estimate(self) -> ScanEstimate:
+        return analyze_window(*self.window())
+
+
+def analyze_window(rgb: np.ndarray, timestamps: np.ndarray) -> ScanEstimate:
+    """Estimate vitals for one buffered window of timestamped ROI means"""
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        return ScanEstimate(samples=len(timestamps))
+    uniform, fs = resample_uniform(rgb, timestamps)
+    return analyze_batch(uniform[None], fs)[0]
+
+
+def estimate_many(sessions: Sequence[RPPGSession]) -> List[ScanEstimate]:
+    """Estimate many sessions, analysing those with the same sample count and rate together"""
+    results: List[Optional[ScanEstimate]] = [None] * len(sessions)
+    groups = {}
+    for i, session in enumerate(sessions):
+        rgb, ts = session.window()
+        if len(ts) < 2 or ts[-1] <= ts[0]:
+            results[i] = ScanEstimate(samples=len(ts))
+            continue
+        uniform, fs = resample_uniform(rgb, ts)
+        groups.setdefault((len(ts), round(fs, 1)), []).append((i, np.array(uniform)))
+    for (_, fs), members in groups.items():
+        batch = analyze_batch(np.stack([rgb for _, rgb in members]), fs)
+        for (i, _), estimate in zip(members, batch):
+            results[i] = estimate
+    return results
@@ -0,0 +1,136 @@
+import struct
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .rppg import RPPGSession, ScanEstimate
+
+# Binary client messages. The first byte selects the payload:
+#   0x01  ROI means: any number of packed MEANS_DTYPE records (20 bytes each)
+#   0x02  downsampled frame: FRAME_HEADER then width * height * 3 RGB bytes
+# Timestamps are seconds on the client's clock (e.g. performance.now() / 1000).
+MSG_MEANS = 0x01
+MSG_FRAME = 0x02
+MEANS_DTYPE = np.dtype([("ts", "<f8"), ("r", "<f4"), ("g", "<f4"), ("b", "<f4")])
+FRAME_HEADER = struct.Struct("<BHHd")  # type, width, height, timestamp
+MAX_FRAME_PIXELS = 320 * 240
+
+
+class ScanProtocolError(ValueError):
+    """A client message that does not follow the scan wire format"""
+
+
+class ScanStream:
+    """Sliding-window state of one streaming face scan
+
+    Wraps an RPPGSession with wire decoding and the confidence rule that
+    lets a client stop early: the scan is confident once ``stable_estimates``
+    consecutive estimates reach ``target_quality`` and agree within
+    ``tolerance_bpm``.
+    """
+
+    def __init__(
+        self,
+        fps_hint: float = 30.0,
+        window_seconds: float = 30.0,
+        target_quality: float = 0.5,
+        stable_estimates: int = 3,
+        tolerance_bpm: float = 3.0,
+        max_seconds: float = 60.0
+    ):
+        self.session = RPPGSession(fps_hint=fps_hint, window_seconds=window_seconds)
+        self.target_quality = target_quality
+        self.stable_estimates = stable_estimates
+        self.tolerance_bpm = tolerance_bpm
+        self.max_seconds = max_seconds
+        self.auto_stop = False
+        self.latest: Optional[ScanEstimate] = None
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.samples = 0
+        self.bytes_received = 0
+        self._recent = deque(maxlen=stable_estimates)
+
+    def configure(self, options: Dict[str, Any]):
+        """Apply client options from a ``start`` control message"""
+        if "target_quality" in options:
+            self.target_quality = min(1.0, max(0.0, float(options["target_quality"])))
+        if "max_seconds" in options:
+            self.max_seconds = min(120.0, max(5.0, float(options["max_seconds"])))
+        if "auto_stop" in options:
+            self.auto_stop = bool(options["auto_stop"])
+
+    def feed(self, data: bytes) -> int:
+        """Decode one binary message into the signal buffer; returns samples added"""
+        if not data:
+            raise ScanProtocolError("Empty message")
+        self.bytes_received += len(data)
+        kind = data[0]
+        if kind == MSG_MEANS:
+            payload = memoryview(data)[1:]
+            if len(payload) % MEANS_DTYPE.itemsize:
+                raise ScanProtocolError(f"ROI-mean payload must be a multiple of {MEANS_DTYPE.itemsize} bytes")
+            records = np.frombuffer(payload, dtype=MEANS_DTYPE)
+            if len(records) == 0:
+                return 0
+            ts = records["ts"]
+            rgb = np.column_stack((records["r"], records["g"], records["b"]))
+            self.session.push_many(rgb, ts)
+            self._advance(float(ts[0]), float(ts[-1]), len(records))
+            return len(records)
+        if kind == MSG_FRAME:
+            if len(data) < FRAME_HEADER.size:
+                raise ScanProtocolError("Truncated frame header")
+            _, width, height, timestamp = FRAME_HEADER.unpack_from(data)
+            if width * height > MAX_FRAME_PIXELS:
+                raise ScanProtocolError(f"Frames are limited to {MAX_FRAME_PIXELS} pixels; downsample first")
+            if len(data) - FRAME_HEADER.size != width * height * 3:
+                raise ScanProtocolError("Frame size does not match its header")
+            frame = np.frombuffer(data, dtype=np.uint8, offset=FRAME_HEADER.size).reshape(height, width, 3)
+            self.session.push_frame(frame, timestamp)
+            self._advance(timestamp, timestamp, 1)
+            return 1
+        raise ScanProtocolError(f"Unknown message type 0x{kind:02x}")
+
+    def _advance(self, first: float, last: float, count: int):
+        if self.first_ts is None:
+            self.first_ts = first
+        self.last_ts = last if self.last_ts is None else max(self.last_ts, last)
+        self.samples += count
+
+    @property
+    def elapsed(self) -> float:
+        if self.first_ts is None:
+            return 0.0
+        return self.last_ts - self.first_ts
+
+    def window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Current signal window; valid until the next ``feed``"""
+        return self.session.window()
+
+    @property
+    def confident(self) -> bool:
+        if len(self._recent) < self.stable_estimates:
+            return False
+        rates = [estimate.heart_rate for estimate in self._recent]
+        return (
+            all(rate is not None for rate in rates)
+            and all(estimate.quality >= self.target_quality for estimate in self._recent)
+            and max(rates) - min(rates) <= self.tolerance_bpm
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.elapsed >= self.max_seconds or (self.auto_stop and self.confident)
+
+    def record(self, estimate: ScanEstimate) -> Dict[str, Any]:
+        """Register a new estimate and build the message pushed to the client"""
+        self.latest = estimate
+        self._recent.append(estimate)
+        return {
+            "type": "estimate",
+            **estimate.dict(),
+            "elapsed": round(self.elapsed, 2),
+            "confident": self.confident,
+        }
@@ -0,0 +1,58 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# (mtime_ns, inode): changes whenever a file is rewritten or replaced
+FileVersion = Tuple[int, int]
+
+
+def file_version(path: str) -> Optional[FileVersion]:
+    """Version of the file at ``path``, or None when there is none"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_ino
+
+
+class KeyLocks:
+    """Exclusive per-key locks that hold across threads and processes
+
+    Threads of one process are serialized by striped RLocks and processes
+    by an ``flock`` on a lock file per key, so API workers and batch
+    processes sharing a data directory never interleave a build with the
+    discard of what it read. A thread may re-enter a lock it holds.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._stripes = [threading.RLock() for _ in range(stripes)]
+        # Keys whose file lock this process holds; only touched under the key's stripe
+        self._held: Dict[str, int] = {}
+
+    @contextmanager
+    def hold(self, key: str, lock_path: str) -> Iterator[None]:
+        with self._stripes[hash(key) % len(self._stripes)]:
+            if key in self._held:
+                self._held[key] += 1
+                try:
+                    yield
+                finally:
+                    self._held[key] -= 1
+                return
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            with open(lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._held[key] = 0
+                try:
+                    yield
+                finally:
+                    del self._held[key]
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
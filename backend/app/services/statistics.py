@@ -0,0 +1,290 @@
+import warnings
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Series summarized for every report period
+METRICS = ("heart_rate", "systolic", "diastolic", "respiratory_rate", "stress")
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Clinical reference ranges used by the trend classifier
+HEART_RATE_RANGE = (50.0, 100.0)
+RESPIRATORY_RATE_RANGE = (12.0, 20.0)
+SYSTOLIC_ELEVATED = (120.0, 140.0)
+DIASTOLIC_ELEVATED = (80.0, 90.0)
+STRESS_ELEVATED = 60.0
+
+
+# Samples reduced together by compute_ragged_statistics; bounds its temporaries
+# however many users a batch holds or how long their periods are
+RAGGED_SAMPLE_BUDGET = 1 << 22
+
+
+def compute_batch_statistics(
+    matrix: np.ndarray, timestamps: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """Reduce a NaN-padded (users x samples) matrix in a single vectorized pass
+
+    Returns one array of length ``users`` per statistic. ``slope`` is in units
+    per sample, or per day when ``timestamps`` (epoch ms, same shape) is given.
+    ``change`` is the fitted change across the whole period.
+    """
+    values = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+
+    if timestamps is None:
+        x = np.broadcast_to(np.arange(values.shape[1], dtype=np.float64), values.shape)
+    else:
+        x = np.atleast_2d(np.asarray(timestamps, dtype=np.float64)) / 86_400_000.0
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(values, axis=1)
+        variance = np.nanvar(values, axis=1)
+        minimum = np.nanmin(values, axis=1) if values.shape[1] else np.full(len(values), np.nan)
+        maximum = np.nanmax(values, axis=1) if values.shape[1] else np.full(len(values), np.nan)
+        percentiles = (
+            np.nanpercentile(values, PERCENTILES, axis=1)
+            if values.shape[1] else np.full((len(PERCENTILES), len(values)), np.nan)
+        )
+
+        # Least-squares slope per row, ignoring padding
+        x_valid = np.where(valid, x, np.nan)
+        x_centered = x_valid - np.nanmean(x_valid, axis=1, keepdims=True)
+        y_centered = values - mean[:, None]
+        sxy = np.nansum(x_centered * y_centered, axis=1)
+        sxx = np.nansum(x_centered * x_centered, axis=1)
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        span = np.nanmax(x_valid, axis=1) - np.nanmin(x_valid, axis=1) if values.shape[1] else np.zeros(len(values))
+        change = np.where(count > 1, slope * span, 0.0)
+
+    stats = {
+        "count": count,
+        "mean": mean,
+        "min": minimum,
+        "max": maximum,
+        "variance": variance,
+        "std": np.sqrt(variance),
+        "slope": slope,
+        "change": change,
+    }
+    for p, row in zip(PERCENTILES, percentiles):
+        stats[f"p{p}"] = row
+    return stats
+
+
+def _ragged_group_statistics(series: Sequence[Any]) -> Dict[str, np.ndarray]:
+    users = len(series)
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    values = (
+        np.concatenate([np.asarray(s, dtype=np.float64) for s in series])
+        if lengths.sum() else np.empty(0, dtype=np.float64)
+    )
+    rows = np.repeat(np.arange(users), lengths)
+    # Sample index within its own series, the x axis of the slope
+    x = np.arange(len(values), dtype=np.float64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    valid = ~np.isnan(values)
+    values, rows, x = values[valid], rows[valid], x[valid]
+
+    count = np.bincount(rows, minlength=users)
+    has = count > 0
+    # Rows stay grouped after concatenation, so a row's samples are contiguous
+    starts = np.cumsum(count) - count
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(rows, weights=values, minlength=users) / count
+        deviation = values - mean[rows]
+        variance = np.bincount(rows, weights=deviation * deviation, minlength=users) / count
+        x_centered = x - (np.bincount(rows, weights=x, minlength=users) / count)[rows]
+        sxy = np.bincount(rows, weights=x_centered * deviation, minlength=users)
+        sxx = np.bincount(rows, weights=x_centered * x_centered, minlength=users)
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+
+    span = np.zeros(users)
+    if has.any():
+        span[has] = np.maximum.reduceat(x, starts[has]) - np.minimum.reduceat(x, starts[has])
+    # Order statistics per row from one partial sort around the ranks needed,
+    # interpolated between closest ranks as np.percentile does
+    positions = np.outer(np.maximum(count - 1, 0), (0,) + PERCENTILES + (100,)) / 100.0
+    low, high = np.floor(positions).astype(np.int64), np.ceil(positions).astype(np.int64)
+    order = np.full(positions.shape, np.nan)
+    for row in np.flatnonzero(has):
+        kth = np.union1d(low[row], high[row])
+        segment = np.partition(values[starts[row]:starts[row] + count[row]], kth)
+        order[row] = segment[low[row]] + (segment[high[row]] - segment[low[row]]) * (positions[row] - low[row])
+
+    stats = {
+        "count": count,
+        "mean": mean,
+        "min": order[:, 0],
+        "max": order[:, -1],
+        "variance": variance,
+        "std": np.sqrt(variance),
+        "slope": slope,
+        "change": np.where(count > 1, slope * span, 0.0),
+    }
+    for i, p in enumerate(PERCENTILES, start=1):
+        stats[f"p{p}"] = order[:, i]
+    return stats
+
+
+def compute_ragged_statistics(series: Sequence[Any]) -> Dict[str, np.ndarray]:
+    """compute_batch_statistics for per-user series of different lengths, without padding
+
+    Series are concatenated and reduced per user with bincount, a few users
+    at a time so that at most ~RAGGED_SAMPLE_BUDGET samples (or one longer
+    series) are held as float64 at once. NaN values count as missing, and
+    the slope is per sample.
+    """
+    groups, group, held = [], [], 0
+    for values in series:
+        if group and held + len(values) > RAGGED_SAMPLE_BUDGET:
+            groups.append(group)
+            group, held = [], 0
+        group.append(values)
+        held += len(values)
+    groups.append(group)
+    reduced = [_ragged_group_statistics(group) for group in groups]
+    return {key: np.concatenate([stats[key] for stats in reduced]) for key in reduced[0]}
+
+
+def compute_statistics(values: Sequence[float], timestamps: Optional[Sequence[int]] = None) -> Dict[str, float]:
+    """Statistics for a single series, as plain floats"""
+    values = np.asarray(values, dtype=np.float64)[None, :]
+    ts = None if timestamps is None else np.asarray(timestamps, dtype=np.float64)[None, :]
+    return {key: float(arr[0]) for key, arr in compute_batch_statistics(values, ts).items()}
+
+
+def _relative_change(stats: Dict[str, np.ndarray]) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(stats["mean"] > 0, stats["change"] / stats["mean"], 0.0)
+
+
+def classify_trends(
+    metric: str,
+    stats: Dict[str, np.ndarray],
+    diastolic: Optional[Dict[str, np.ndarray]] = None,
+) -> np.ndarray:
+    """Vectorized trend labels for one metric across a batch of users
+
+    For ``blood_pressure`` pass the systolic statistics as ``stats`` and the
+    diastolic statistics as ``diastolic``. Rows without readings are labelled
+    ``insufficient_data``.
+    """
+    mean = stats["mean"]
+    no_data = stats["count"] == 0
+
+    if metric == "heart_rate":
+        low, high = HEART_RATE_RANGE
+        conditions = [no_data, (mean < low) | (mean > high) | (stats["std"] > 15), _relative_change(stats) < -0.05]
+        choices = ["insufficient_data", "concerning", "improving"]
+        default = "stable"
+    elif metric == "blood_pressure":
+        dia = diastolic["mean"] if diastolic is not None else np.zeros_like(mean)
+        conditions = [
+            no_data,
+            (mean >= SYSTOLIC_ELEVATED[1]) | (dia >= DIASTOLIC_ELEVATED[1]),
+            (mean >= SYSTOLIC_ELEVATED[0]) | (dia >= DIASTOLIC_ELEVATED[0]),
+        ]
+        choices = ["insufficient_data", "elevated", "slightly_elevated"]
+        default = "normal"
+    elif metric == "respiratory_rate":
+        low, high = RESPIRATORY_RATE_RANGE
+        conditions = [no_data, (mean < low) | (mean > high)]
+        choices = ["insufficient_data", "abnormal"]
+        default = "normal"
+    elif metric == "stress":
+        conditions = [no_data, mean >= STRESS_ELEVATED, _relative_change(stats) < -0.10]
+        choices = ["insufficient_data", "elevated", "improving"]
+        default = "stable"
+    else:
+        raise ValueError(f"No trend classifier for metric: {metric}")
+
+    return np.select(conditions, choices, default=default)
+
+
+def _classify_all(batch: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    return {
+        "heart_rate": classify_trends("heart_rate", batch["heart_rate"]),
+        "blood_pressure": classify_trends("blood_pressure", batch["systolic"], batch["diastolic"]),
+        "respiratory_rate": classify_trends("respiratory_rate", batch["respiratory_rate"]),
+        "stress": classify_trends("stress", batch["stress"]),
+    }
+
+
+def summarize_batch(series_by_metric: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Statistics and trend labels for many users at once
+
+    ``series_by_metric`` maps each name in METRICS to a list of per-user value
+    arrays (all lists in the same user order). Each metric is reduced for all
+    users in a few vectorized passes over the concatenated samples. Returns
+    one ``{"statistics", "trends"}`` dict per user.
+    """
+    batch = {metric: compute_ragged_statistics(series_by_metric[metric]) for metric in METRICS}
+    trends = _classify_all(batch)
+
+    users = len(series_by_metric[METRICS[0]])
+    return [
+        {
+            "statistics": {
+                metric: {key: float(arr[i]) for key, arr in batch[metric].items()}
+                for metric in METRICS
+            },
+            "trends": {name: str(labels[i]) for name, labels in trends.items()},
+        }
+        for i in range(users)
+    ]
+
+
+def summarize_vital_signs(vital_signs: Dict[str, Any]) -> Dict[str, Any]:
+    """Statistics and trends for a single user's period data"""
+    bp = vital_signs["blood_pressure"]
+    return summarize_batch({
+        "heart_rate": [vital_signs["heart_rate"]],
+        "systolic": [bp["systolic"]],
+        "diastolic": [bp["diastolic"]],
+        "respiratory_rate": [vital_signs["respiratory_rate"]],
+        "stress": [vital_signs["stress"]],
+    })[0]
+
+
+def summarize_statistics(statistics: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Trend labels for statistics that were computed elsewhere (e.g. merged partials)"""
+    batch = {
+        metric: {key: np.array([value]) for key, value in statistics[metric].items()}
+        for metric in METRICS
+    }
+    return {
+        "statistics": statistics,
+        "trends": {name: str(labels[0]) for name, labels in _classify_all(batch).items()},
+    }
+
+
+def compute_health_score(statistics: Dict[str, Dict[str, float]]) -> Optional[int]:
+    """0-100 score penalizing period means outside healthy ranges
+
+    Metrics without readings are skipped; returns None when no metric has data.
+    """
+    def mean(metric):
+        value = statistics.get(metric, {}).get("mean", float("nan"))
+        return None if np.isnan(value) else value
+
+    readings = [mean(metric) for metric in METRICS]
+    if all(value is None for value in readings):
+        return None
+    heart_rate, systolic, diastolic, respiratory_rate, stress = readings
+
+    penalty = 0.0
+    if heart_rate is not None:
+        penalty += min(20.0, max(0.0, 60.0 - heart_rate, heart_rate - 100.0))
+    if systolic is not None:
+        penalty += min(25.0, max(0.0, systolic - SYSTOLIC_ELEVATED[0]) * 0.8)
+    if diastolic is not None:
+        penalty += min(15.0, max(0.0, diastolic - DIASTOLIC_ELEVATED[0]) * 0.8)
+    if respiratory_rate is not None:
+        low, high = RESPIRATORY_RATE_RANGE
+        penalty += min(15.0, max(0.0, low - respiratory_rate, respiratory_rate - high) * 3.0)
+    if stress is not None:
+        penalty += min(25.0, max(0.0, stress - 30.0) * 0.4)
+    return int(round(max(0.0, 100.0 - penalty)))
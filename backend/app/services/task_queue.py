@@ -0,0 +1,239 @@
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from .report_generator import Report
+
+REPORTS_QUEUE = "reports"
+EMAIL_QUEUE = "email"
+
+# Task name -> queue; each queue has its own worker pool
+TASK_QUEUES = {
+    "reports.generate": REPORTS_QUEUE,
+    "email.send": EMAIL_QUEUE,
+}
+
+EMAIL_METHODS = ("send_report_email", "send_health_alert", "send_recommendation_email", "send_reminder_email")
+
+# Celery task states -> TaskStatus.state
+CELERY_STATES = {
+    "PENDING": "pending",
+    "RECEIVED": "pending",
+    "RETRY": "pending",
+    "STARTED": "started",
+    "SUCCESS": "success",
+    "FAILURE": "failure",
+    "REVOKED": "failure",
+}
+
+TaskRunner = Callable[[str, List[Any]], Awaitable[Any]]
+
+
+class TaskStatus(BaseModel):
+    id: str
+    name: Optional[str] = None
+    queue: Optional[str] = None
+    state: str  # pending, started, success, failure
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    submitted_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+def queue_concurrency(spec: Optional[str] = None) -> Dict[str, int]:
+    """Workers per queue from ``TASK_QUEUE_CONCURRENCY``, e.g. ``reports=2,email=8``"""
+    concurrency = {REPORTS_QUEUE: 2, EMAIL_QUEUE: 8}
+    spec = spec if spec is not None else os.environ.get("TASK_QUEUE_CONCURRENCY", "")
+    for entry in spec.split(","):
+        queue, _, count = entry.partition("=")
+        if queue.strip() and count.strip():
+            concurrency[queue.strip()] = max(1, int(count))
+    return concurrency
+
+
+async def run_task(name: str, args: List[Any], report_generator: Any, email_service: Any) -> Any:
+    """Execute one task; shared by the in-process pools and the Celery workers"""
+    if name == "reports.generate":
+        (report_id,) = args
+        await report_generator.set_report_status(report_id, "generating")
+        try:
+            report = await report_generator.generate_report(report_id)
+        except Exception:
+            await report_generator.set_report_status(report_id, "failed")
+            raise
+        return {"report_id": report.id, "status": report.status, "pdf_path": report.pdf_path}
+    if name == "email.send":
+        method, kwargs = args
+        if method not in EMAIL_METHODS:
+            raise ValueError(f"Unknown email method: {method}")
+        if method == "send_report_email":
+            kwargs = {**kwargs, "report": Report(**kwargs["report"])}
+        return await getattr(email_service, method)(**kwargs)
+    raise ValueError(f"Unknown task: {name}")
+
+
+class LocalTaskQueue:
+    """In-process task queue with one asyncio worker pool per queue
+
+    Used when no broker is configured (development and tests). Statuses of
+    the last ``max_results`` tasks are kept in memory.
+    """
+
+    remote = False
+
+    def __init__(
+        self, runner: TaskRunner, concurrency: Optional[Dict[str, int]] = None, max_results: int = 10000
+    ):
+        self.runner = runner
+        self.concurrency = concurrency or queue_concurrency()
+        self.max_results = max_results
+        self._statuses: "OrderedDict[str, TaskStatus]" = OrderedDict()
+        # Set when a pending or running task finishes
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0}
+
+    def start(self):
+        if self._workers:
+            return
+        for queue in set(TASK_QUEUES.values()):
+            self._queues[queue] = asyncio.Queue()
+            for _ in range(self.concurrency.get(queue, 1)):
+                self._workers.append(asyncio.create_task(self._work(self._queues[queue])))
+
+    async def stop(self):
+        """Finish queued tasks, then stop the workers"""
+        for queue in self._queues.values():
+            await queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def submit(self, name: str, *args: Any, task_id: Optional[str] = None) -> str:
+        """Queue a task; a task ID that is still pending or running is not queued twice"""
+        task_id = task_id or str(uuid4())
+        current = self._statuses.get(task_id)
+        if current is not None and current.state in ("pending", "started"):
+            return task_id
+        self.start()
+        status = TaskStatus(
+            id=task_id, name=name, queue=TASK_QUEUES[name], state="pending", submitted_at=datetime.now()
+        )
+        self._remember(status)
+        self._finished[task_id] = asyncio.Event()
+        await self._queues[status.queue].put((status, list(args)))
+        return task_id
+
+    def track(self, name: str, task_id: str) -> TaskStatus:
+        """Record a task run elsewhere, e.g. on a process pool, so its status can be looked up"""
+        status = TaskStatus(
+            id=task_id, name=name, queue=TASK_QUEUES[name], state="started", submitted_at=datetime.now()
+        )
+        self._remember(status)
+        return status
+
+    def finish(self, status: TaskStatus, result: Any = None, error: Optional[str] = None):
+        """Settle a task recorded with ``track``"""
+        if error is None:
+            status.state, status.result = "success", result
+            self.stats["succeeded"] += 1
+        else:
+            status.state, status.error = "failure", error
+            self.stats["failed"] += 1
+        status.finished_at = datetime.now()
+
+    async def status(self, task_id: str) -> Optional[TaskStatus]:
+        return self._statuses.get(task_id)
+
+    async def wait(self, task_id: str) -> Optional[TaskStatus]:
+        """Final status of a task, once it has finished"""
+        finished = self._finished.get(task_id)
+        if finished is not None:
+            await finished.wait()
+        return self._statuses.get(task_id)
+
+    def _remember(self, status: TaskStatus):
+        self._statuses[status.id] = status
+        self._statuses.move_to_end(status.id)
+        while len(self._statuses) > self.max_results:
+            self._statuses.popitem(last=False)
+        self.stats["submitted"] += 1
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            status, args = await queue.get()
+            status.state = "started"
+            try:
+                status.result = await self.runner(status.name, args)
+                status.state = "success"
+                self.stats["succeeded"] += 1
+            except Exception as e:
+                status.state, status.error = "failure", str(e)
+                self.stats["failed"] += 1
+                print(f"Task {status.name} {status.id} failed: {e}")
+            finally:
+                status.finished_at = datetime.now()
+                finished = self._finished.pop(status.id, None)
+                if finished is not None:
+                    finished.set()
+                queue.task_done()
+
+
+class CeleryTaskQueue:
+    """Submits tasks to Celery workers through ``CELERY_BROKER_URL``
+
+    Workers are started per queue, e.g.
+    ``celery -A app.services.celery_worker worker -Q reports -c 2``, so
+    report generation and email each get their own pool and concurrency.
+    """
+
+    remote = True
+
+    def __init__(self, celery_app: Any):
+        self.app = celery_app
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def submit(self, name: str, *args: Any, task_id: Optional[str] = None) -> str:
+        # Publishing is blocking broker I/O
+        result = await asyncio.to_thread(
+            self.app.send_task, name, args=list(args), task_id=task_id, queue=TASK_QUEUES[name]
+        )
+        return result.id
+
+    async def status(self, task_id: str) -> Optional[TaskStatus]:
+        def lookup() -> TaskStatus:
+            result = self.app.AsyncResult(task_id)
+            state = CELERY_STATES.get(result.state, "pending")
+            return TaskStatus(
+                id=task_id,
+                name=getattr(result, "name", None),
+                queue=getattr(result, "queue", None),
+                state=state,
+                result=result.result if state == "success" else None,
+                error=str(result.result) if state == "failure" else None,
+                finished_at=result.date_done,
+            )
+        return await asyncio.to_thread(lookup)
+
+
+TaskQueue = Union[LocalTaskQueue, CeleryTaskQueue]
+
+
+def build_task_queue(runner: TaskRunner) -> TaskQueue:
+    """Celery when ``CELERY_BROKER_URL`` is set, otherwise in-process pools"""
+    if os.environ.get("CELERY_BROKER_URL"):
+        from .celery_worker import celery_app
+        return CeleryTaskQueue(celery_app)
+    return LocalTaskQueue(runner)
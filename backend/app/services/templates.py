@@ -0,0 +1,115 @@
+import textwrap
+import threading
+from string import Formatter
+from typing import Any, Dict, List, Tuple
+
+_formatter = Formatter()
+
+
+def _strip_whitespace(source: str, keep_blank_lines: bool) -> str:
+    """Remove source indentation and trailing spaces, optionally dropping blank lines"""
+    lines = [line.strip() for line in textwrap.dedent(source).strip().splitlines()]
+    if keep_blank_lines:
+        # Collapse runs of blank lines to a single paragraph break
+        out: List[str] = []
+        for line in lines:
+            if line or (out and out[-1]):
+                out.append(line)
+        return "\n".join(out)
+    return "\n".join(line for line in lines if line)
+
+
+class CompiledTemplate:
+    """A ``str.format``-style template split once into literal fragments and slots
+
+    Rendering only converts the slot values and joins them with the
+    pre-split literals; the template text is never re-parsed.
+    """
+
+    __slots__ = ("name", "fragments", "slots")
+
+    def __init__(self, name: str, fragments: Tuple[str, ...], slots: Tuple[Tuple[str, str], ...]):
+        self.name = name
+        self.fragments = fragments
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, source: str, name: str = "<template>", strip: bool = True,
+                keep_blank_lines: bool = False) -> "CompiledTemplate":
+        """Parse a template once into fragments and (field, format_spec) slots"""
+        if strip:
+            source = _strip_whitespace(source, keep_blank_lines)
+
+        fragments: List[str] = [""]
+        slots: List[Tuple[str, str]] = []
+        for literal, field, spec, conversion in _formatter.parse(source):
+            fragments[-1] += literal
+            if field is None:
+                continue
+            if not field or conversion:
+                raise ValueError(f"Template {name!r} only supports named fields without conversions")
+            slots.append((field, spec or ""))
+            fragments.append("")
+        return cls(name, tuple(fragments), tuple(slots))
+
+    @property
+    def fields(self) -> List[str]:
+        """Slot names in the order they appear"""
+        return [field for field, _ in self.slots]
+
+    def bind(self, **values: Any) -> "CompiledTemplate":
+        """Fold fixed slot values into the literals, returning a new template"""
+        fragments = [self.fragments[0]]
+        slots = []
+        for (field, spec), literal in zip(self.slots, self.fragments[1:]):
+            if field in values:
+                fragments[-1] += format(values[field], spec) + literal
+            else:
+                slots.append((field, spec))
+                fragments.append(literal)
+        return CompiledTemplate(self.name, tuple(fragments), tuple(slots))
+
+    def render(self, **values: Any) -> str:
+        """Fill the slots; raises KeyError for a missing slot like str.format"""
+        fragments = self.fragments
+        out = [fragments[0]]
+        append = out.append
+        i = 1
+        for field, spec in self.slots:
+            value = values[field]
+            append(format(value, spec) if spec else str(value))
+            append(fragments[i])
+            i += 1
+        return "".join(out)
+
+
+class TemplateCache:
+    """Process-wide cache of compiled templates
+
+    Templates are compiled the first time a (name, source, options) triple is
+    seen and reused afterwards, so creating services repeatedly does not
+    re-parse template text.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, str, bool, bool], CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def compile(self, name: str, source: str, strip: bool = True,
+                keep_blank_lines: bool = False) -> CompiledTemplate:
+        key = (name, source, strip, keep_blank_lines)
+        template = self._compiled.get(key)
+        if template is None:
+            with self._lock:
+                template = self._compiled.get(key)
+                if template is None:
+                    template = CompiledTemplate.compile(source, name, strip, keep_blank_lines)
+                    self._compiled[key] = template
+        return template
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+# Shared by ReportGenerator and EmailService
+template_cache = TemplateCache()
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .downsampling import lttb, minmax
+from .rollups import BUCKET_DTYPE, TIERS, RollupStore, raw_buckets
+from .vitals_store import to_epoch_ms
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+# Chart time ranges, in days
+TIME_RANGES = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+TREND_PERIODS = {"1week": 7, "1month": 30, "3months": 90, "6months": 180, "1year": 365}
+
+# Series behind each chart data type and each /vitals/trends metric
+DATA_TYPES = {
+    "all": ("heart_rate", "systolic", "diastolic", "respiratory_rate", "stress"),
+    "heart": ("heart_rate",),
+    "blood": ("systolic", "diastolic"),
+    "respiratory": ("respiratory_rate",),
+    "stress": ("stress",),
+}
+TREND_METRICS = {
+    "heart-rate": ("heart_rate",),
+    "blood-pressure": ("systolic", "diastolic"),
+    "respiratory-rate": ("respiratory_rate",),
+    "stress": ("stress",),
+    "oxygen-saturation": ("oxygen_saturation",),
+    "temperature": ("temperature",),
+}
+
+# Mock data for development: typical level and spread of each series
+MOCK_LEVELS = {
+    "heart_rate": (72.0, 8.0),
+    "systolic": (120.0, 8.0),
+    "diastolic": (78.0, 5.0),
+    "respiratory_rate": (15.0, 1.5),
+    "stress": (40.0, 12.0),
+    "oxygen_saturation": (97.0, 1.0),
+    "temperature": (36.7, 0.3),
+}
+_MS_PER_DAY = 86_400_000
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.capitalize() for part in rest)
+
+
+class DownsampledSeries(BaseModel):
+    series: str
+    method: str
+    tier: str  # raw, minute, hour or day
+    source_points: int
+    timestamps: List[int]  # epoch milliseconds
+    values: List[float]
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+class VisualizationData(BaseModel):
+    user_id: str
+    start: datetime
+    end: datetime
+    points: int
+    series: Dict[str, DownsampledSeries]
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+class SeriesHistory(BaseModel):
+    timestamps: List[int]  # epoch milliseconds
+    values: List[float]
+
+
+class VitalsHistory(BaseModel):
+    user_id: str
+    start: datetime
+    end: datetime
+    series: Dict[str, SeriesHistory]
+
+    class Config:
+        alias_generator = _camel
+        allow_population_by_field_name = True
+
+
+def choose_tier(start: datetime, end: datetime, points: int) -> str:
+    """Coarsest tier that still has ``points`` buckets over the range, else raw readings
+
+    Reading at most one tier step finer than needed bounds the work per
+    chart by the point count, not by the length of the range.
+    """
+    span = to_epoch_ms(end) - to_epoch_ms(start)
+    for tier in reversed(list(TIERS)):
+        if span / TIERS[tier] >= points:
+            return tier
+    return "raw"
+
+
+def downsample(records: np.ndarray, points: int, method: str = "lttb"):
+    """(timestamps, values) of at most ``points`` points from bucket records
+
+    ``lttb`` keeps the most shape-defining bucket means; ``minmax`` keeps the
+    lowest and highest value of ``points / 2`` equal time bins.
+    """
+    if len(records) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ts = records["ts"]
+    if method == "minmax":
+        return minmax(ts, records["min"], records["max"], max(1, points // 2))
+    mean = records["sum"] / records["count"]
+    selected = lttb(ts, mean, points)
+    return ts[selected], mean[selected]
+
+
+def _mock_buckets(user_id: str, series: str, tier: str, start: datetime, end: datetime) -> np.ndarray:
+    width = TIERS.get(tier, 10_000)
+    start_ms = to_epoch_ms(start) // width * width
+    ts = np.arange(start_ms, to_epoch_ms(end), width, dtype=np.int64)
+    rng = np.random.default_rng(int(hashlib.sha256(f"{user_id}:{series}".encode()).hexdigest()[:8], 16))
+    level, spread = MOCK_LEVELS[series]
+    # Daily rhythm plus noise, repeatable per user and series
+    rhythm = np.sin(2 * np.pi * (ts % _MS_PER_DAY) / _MS_PER_DAY)
+    values = level + spread * (0.5 * rhythm + 0.5 * rng.standard_normal(len(ts)))
+    jitter = np.abs(rng.standard_normal(len(ts))) * spread * (0.3 if tier != "raw" else 0.0)
+    records = np.empty(len(ts), dtype=BUCKET_DTYPE)
+    records["ts"] = ts
+    records["count"] = 1
+    records["sum"] = values
+    records["min"] = values - jitter
+    records["max"] = values + jitter
+    return records
+
+
+class VisualizationService:
+    """Chart-sized series read from pre-rolled buckets
+
+    Every series is reduced to at most the requested number of points, so
+    chart payloads and response times stay flat however long the range or
+    however fast the device samples. Without a rollup store (no
+    VITALS_DATA_DIR) mock series are served.
+    """
+
+    def __init__(self, rollup_store: Optional[RollupStore] = None):
+        self.rollup_store = rollup_store
+
+    def _records(self, user_id: str, series: str, tier: str, start: datetime, end: datetime) -> np.ndarray:
+        if self.rollup_store is None:
+            return _mock_buckets(user_id, series, tier, start, end)
+        if tier == "raw":
+            return raw_buckets(*self.rollup_store.vital_store.get_range(user_id, series, start, end))
+        return self.rollup_store.buckets(user_id, series, tier, start, end)
+
+    def series(
+        self,
+        user_id: str,
+        series: str,
+        start: datetime,
+        end: datetime,
+        points: int = DEFAULT_POINTS,
+        method: str = "lttb"
+    ) -> DownsampledSeries:
+        """One series over [start, end) reduced to at most ``points`` points"""
+        tier = choose_tier(start, end, points)
+        records = self._records(user_id, series, tier, start, end)
+        timestamps, values = downsample(records, points, method)
+        return DownsampledSeries(
+            series=series,
+            method=method,
+            tier=tier,
+            source_points=len(records),
+            timestamps=timestamps.tolist(),
+            values=np.round(values, 2).tolist(),
+        )
+
+    async def collect(
+        self,
+        user_id: str,
+        series: Sequence[str],
+        start: datetime,
+        end: datetime,
+        points: int = DEFAULT_POINTS,
+        method: str = "lttb"
+    ) -> VisualizationData:
+        """Several series for one chart, read off the event loop"""
+        def build():
+            return {name: self.series(user_id, name, start, end, points, method) for name in series}
+        return VisualizationData(
+            user_id=user_id,
+            start=start,
+            end=end,
+            points=points,
+            series=await asyncio.to_thread(build),
+        )
+
+    async def readings(
+        self, user_id: str, series: Sequence[str], start: datetime, end: datetime, max_rows: Optional[int] = None
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Every reading of each series over [start, end) as (timestamps_ms, values)
+
+        Raises ``ValueError`` before reading anything when there are more than
+        ``max_rows`` readings in total.
+        """
+        def load():
+            if max_rows is not None and self.rollup_store is not None:
+                store = self.rollup_store.vital_store
+                rows = sum(store.count_range(user_id, name, start, end) for name in series)
+                if rows > max_rows:
+                    raise ValueError(f"{rows} readings exceed the limit of {max_rows}")
+            result = {}
+            for name in series:
+                if self.rollup_store is None:
+                    # Mock data for development: one reading per minute
+                    records = _mock_buckets(user_id, name, "minute", start, end)
+                    result[name] = (records["ts"], records["sum"].astype(np.float32))
+                else:
+                    result[name] = self.rollup_store.vital_store.get_range(user_id, name, start, end)
+            return result
+        return await asyncio.to_thread(load)
@@ -0,0 +1,207 @@
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Series persisted by the store. A blood_pressure reading is split into its
+# systolic and diastolic components so every series is a flat float column.
+SERIES = (
+    "heart_rate",
+    "systolic",
+    "diastolic",
+    "respiratory_rate",
+    "stress",
+    "oxygen_saturation",
+    "temperature",
+)
+
+# One row per reading: epoch milliseconds + value
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("value", "<f4")])
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.@-]+$")
+
+
+def to_epoch_ms(ts: datetime) -> int:
+    """Convert a datetime to integer epoch milliseconds"""
+    return int(ts.timestamp() * 1000)
+
+
+def from_epoch_ms(ms: int) -> datetime:
+    """Convert integer epoch milliseconds back to a datetime"""
+    return datetime.fromtimestamp(ms / 1000.0)
+
+
+def flatten_vital(vital) -> List[Tuple[str, float]]:
+    """Map a VitalSign onto (series, value) pairs understood by the store"""
+    if vital.type == "blood_pressure":
+        if not isinstance(vital.value, dict):
+            raise ValueError("blood_pressure readings need systolic and diastolic values")
+        return [
+            ("systolic", float(vital.value["systolic"])),
+            ("diastolic", float(vital.value["diastolic"])),
+        ]
+    if vital.type not in SERIES:
+        return []
+    if isinstance(vital.value, dict):
+        raise ValueError(f"{vital.type} readings must be a single value")
+    return [(vital.type, float(vital.value))]
+
+
+class VitalSignStore:
+    """Append-only columnar store for vital-sign time series
+
+    Readings are partitioned by user and by calendar day. Each partition holds
+    one binary file per series containing packed (ts, value) records, so a
+    range query is a handful of memory-mapped reads instead of building
+    pydantic objects for every reading.
+
+    Layout: ``{root}/{user_id}/{YYYY-MM-DD}/{series}.bin``
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or os.environ.get("VITALS_DATA_DIR", "data/vitals")
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._listeners: List[Callable[[str, date, str, np.ndarray], None]] = []
+
+    def add_listener(self, listener: Callable[[str, date, str, np.ndarray], None]):
+        """Register a callback invoked with (user_id, day, series, rows) after each append"""
+        self._listeners.append(listener)
+
+    def _user_dir(self, user_id: str) -> str:
+        if not _SAFE_ID.match(user_id):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+        return os.path.join(self.root_dir, user_id)
+
+    def _partition_path(self, user_id: str, day: date, series: str) -> str:
+        return os.path.join(self._user_dir(user_id), day.isoformat(), f"{series}.bin")
+
+    def append(self, vital) -> int:
+        """Append a single VitalSign reading"""
+        return self.append_many([vital])
+
+    def append_many(self, vitals: Iterable) -> int:
+        """Append a batch of VitalSign readings, grouped into one write per partition"""
+        grouped: Dict[Tuple[str, date, str], List[Tuple[int, float]]] = {}
+        for vital in vitals:
+            ts = to_epoch_ms(vital.timestamp)
+            # Partitions are local days of the instant, whatever offset the sender used
+            day = from_epoch_ms(ts).date()
+            for series, value in flatten_vital(vital):
+                grouped.setdefault((vital.user_id, day, series), []).append((ts, value))
+
+        written = 0
+        for (user_id, day, series), rows in grouped.items():
+            written += self.append_rows(user_id, day, series, np.array(rows, dtype=RECORD_DTYPE))
+        return written
+
+    def append_rows(self, user_id: str, day: date, series: str, rows: np.ndarray) -> int:
+        """Append packed records to a single (user, day, series) partition"""
+        if series not in SERIES:
+            raise ValueError(f"Unknown series: {series}")
+        if len(rows) == 0:
+            return 0
+        path = self._partition_path(user_id, day, series)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = np.ascontiguousarray(rows, dtype=RECORD_DTYPE)
+        with open(path, "ab") as f:
+            # Drop a partial record left by an interrupted append so new rows stay aligned
+            end = f.seek(0, os.SEEK_END)
+            if end % RECORD_DTYPE.itemsize:
+                f.truncate(end - end % RECORD_DTYPE.itemsize)
+            rows.tofile(f)
+        # The rows are committed; a failing derived store must not fail the write
+        for listener in self._listeners:
+            try:
+                listener(user_id, day, series, rows)
+            except Exception as e:
+                print(f"Vital-sign store listener {getattr(listener, '__qualname__', listener)} failed for {user_id} {day} {series}: {e}")
+        return len(rows)
+
+    def _read_partition(self, user_id: str, day: date, series: str) -> Optional[np.ndarray]:
+        path = self._partition_path(user_id, day, series)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        # Ignore a trailing partial record left by an interrupted append
+        count = size // RECORD_DTYPE.itemsize
+        if count == 0:
+            return None
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+    def get_range(
+        self, user_id: str, series: str, start: datetime, end: datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (timestamps_ms, values) for a series over [start, end)"""
+        if series not in SERIES:
+            raise ValueError(f"Unknown series: {series}")
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+
+        chunks = []
+        first_day = day = from_epoch_ms(start_ms).date()
+        last_day = from_epoch_ms(end_ms - 1).date()
+        while day <= last_day:
+            records = self._read_partition(user_id, day, series)
+            if records is not None:
+                if day == first_day or day == last_day:
+                    ts = records["ts"]
+                    records = records[(ts >= start_ms) & (ts < end_ms)]
+                chunks.append(records)
+            day += timedelta(days=1)
+
+        if not chunks:
+            return np.empty(0, dtype="<i8"), np.empty(0, dtype="<f4")
+
+        records = np.concatenate(chunks)
+        ts = records["ts"]
+        # Partitions are append-ordered; only sort when late readings arrived
+        if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+            records = records[np.argsort(ts, kind="stable")]
+        return np.ascontiguousarray(records["ts"]), np.ascontiguousarray(records["value"])
+
+    def count_range(self, user_id: str, series: str, start: datetime, end: datetime) -> int:
+        """Number of readings get_range would return, from file sizes except on the edge days"""
+        if series not in SERIES:
+            raise ValueError(f"Unknown series: {series}")
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        first_day = day = from_epoch_ms(start_ms).date()
+        last_day = from_epoch_ms(end_ms - 1).date()
+        count = 0
+        while day <= last_day:
+            records = self._read_partition(user_id, day, series)
+            if records is not None:
+                if day == first_day or day == last_day:
+                    ts = records["ts"]
+                    count += int(np.count_nonzero((ts >= start_ms) & (ts < end_ms)))
+                else:
+                    count += len(records)
+            day += timedelta(days=1)
+        return count
+
+    def get_series(self, user_id: str, series: str, start: datetime, end: datetime) -> np.ndarray:
+        """Return only the values for a series over [start, end)"""
+        return self.get_range(user_id, series, start, end)[1]
+
+    def get_period(self, user_id: str, start: datetime, end: datetime) -> Dict[str, object]:
+        """Return all series for [start, end) shaped like ReportGenerator period data"""
+        return {
+            "heart_rate": self.get_series(user_id, "heart_rate", start, end),
+            "blood_pressure": {
+                "systolic": self.get_series(user_id, "systolic", start, end),
+                "diastolic": self.get_series(user_id, "diastolic", start, end),
+            },
+            "respiratory_rate": self.get_series(user_id, "respiratory_rate", start, end),
+            "stress": self.get_series(user_id, "stress", start, end),
+        }
+
+    def list_users(self) -> List[str]:
+        """List users that have at least one partition"""
+        try:
+            return sorted(
+                name for name in os.listdir(self.root_dir)
+                if os.path.isdir(os.path.join(self.root_dir, name))
+            )
+        except OSError:
+            return []
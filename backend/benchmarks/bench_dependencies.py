@@ -0,0 +1,65 @@
+"""Per-request overhead of fresh vs. shared service dependencies
+
+Run from the backend directory: python benchmarks/bench_dependencies.py
+Set DATABASE_URL (e.g. sqlite:///./bench.db) to include connection-pool setup,
+which dominates the cost of building services per request.
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api import reports  # noqa: E402
+from app.services.artifact_store import ReportArtifactStore  # noqa: E402
+from app.services.db_service import DatabaseService  # noqa: E402
+from app.services.email_service import EmailService  # noqa: E402
+from app.services.report_generator import ReportGenerator  # noqa: E402
+from main import app  # noqa: E402
+
+REQUESTS = 500
+
+
+def _fresh_report_generator():
+    # Everything built per request: a new engine (and pool) for every call
+    db = DatabaseService() if os.environ.get("DATABASE_URL") else None
+    return ReportGenerator(db_service=db, artifact_store=ReportArtifactStore())
+
+
+def _fresh_email_service():
+    return EmailService()
+
+
+def _per_request_ms(client: TestClient, method: str, url: str) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(20):
+            client.request(method, url)
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            client.request(method, url)
+        elapsed = time.perf_counter() - started
+    return elapsed / REQUESTS * 1000
+
+
+def main():
+    endpoints = [
+        ("GET", "/api/reports?user_id=user123"),
+        ("POST", "/api/email/test?email=a@example.com&email_type=welcome"),
+    ]
+    with TestClient(app) as client:
+        print(f"{'endpoint':<40}{'fresh ms':>10}{'shared ms':>11}{'speedup':>10}")
+        for method, url in endpoints:
+            app.dependency_overrides[reports.get_report_generator] = _fresh_report_generator
+            app.dependency_overrides[reports.get_email_service] = _fresh_email_service
+            fresh = _per_request_ms(client, method, url)
+            app.dependency_overrides.clear()
+            shared = _per_request_ms(client, method, url)
+            print(f"{method + ' ' + url.split('?')[0]:<40}{fresh:>10.3f}{shared:>11.3f}{fresh / shared:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Vitals ingestion throughput: one reading per request vs. batched requests
+
+Run from the backend directory: python benchmarks/bench_ingest.py
+Readings are written to a temporary VITALS_DATA_DIR that is removed afterwards.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = tempfile.mkdtemp(prefix="bench-vitals-")
+os.environ["VITALS_DATA_DIR"] = DATA_DIR
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+USERS = 20
+
+
+def _readings(count: int):
+    start = datetime.now() - timedelta(days=2)
+    for i in range(count):
+        reading = {
+            "user_id": f"user{i % USERS}",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "source": "device",
+        }
+        if i % 4 == 3:
+            reading.update(type="blood_pressure", value={"systolic": 118 + i % 9, "diastolic": 76 + i % 5})
+        else:
+            reading.update(type="heart_rate", value=60 + i % 40)
+        yield reading
+
+
+def _post_rate(client: TestClient, batch_size: int, total: int, ndjson: bool = False) -> float:
+    readings = list(_readings(total))
+    batches = [readings[i:i + batch_size] for i in range(0, total, batch_size)]
+    if ndjson:
+        bodies = ["\n".join(json.dumps(r) for r in batch) for batch in batches]
+        headers = {"Content-Type": "application/x-ndjson"}
+    else:
+        bodies = [json.dumps(batch) for batch in batches]
+        headers = {"Content-Type": "application/json"}
+    started = time.perf_counter()
+    for body in bodies:
+        response = client.post("/api/vitals/batch", content=body, headers=headers)
+        assert response.status_code == 200, response.text
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    try:
+        with TestClient(app) as client:
+            print(f"{'mode':<28}{'readings/s':>14}")
+            print(f"{'1 reading per request':<28}{_post_rate(client, 1, 500):>14,.0f}")
+            for batch_size in (100, 1000, 10000):
+                rate = _post_rate(client, batch_size, 50000)
+                print(f"{f'JSON batches of {batch_size}':<28}{rate:>14,.0f}")
+            print(f"{'NDJSON batches of 10000':<28}{_post_rate(client, 10000, 50000, ndjson=True):>14,.0f}")
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Per-frame and per-estimate cost of the rPPG engine, and scans per core
+
+Run from the backend directory: python benchmarks/bench_rppg.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rppg import RPPGSession  # noqa: E402
+
+FPS = 30
+ESTIMATES_PER_SECOND = 1
+
+
+def _frames(count: int, height: int = 480, width: int = 640):
+    """Synthetic 72 bpm face on a static background"""
+    t = np.arange(count) / FPS
+    pulse = np.sin(2 * np.pi * 1.2 * t)
+    frame = np.full((height, width, 3), 40, dtype=np.uint8)
+    for i in range(count):
+        frame[120:400, 200:440] = (150 + 2 * pulse[i], 110 + 4 * pulse[i], 90 + pulse[i])
+        yield frame, t[i]
+
+
+def main():
+    session = RPPGSession(fps_hint=FPS)
+    count, elapsed = 30 * FPS, 0.0
+    for frame, ts in _frames(count):
+        started = time.perf_counter()
+        session.push_frame(frame, ts)
+        elapsed += time.perf_counter() - started
+    per_frame = elapsed / count
+
+    started = time.perf_counter()
+    for _ in range(50):
+        estimate = session.estimate()
+    per_estimate = (time.perf_counter() - started) / 50
+
+    per_scan_second = FPS * per_frame + ESTIMATES_PER_SECOND * per_estimate
+    print(f"push_frame (640x480):       {per_frame * 1e6:8.1f} us")
+    print(f"estimate (30 s window):     {per_estimate * 1e3:8.2f} ms")
+    print(f"CPU per scan-second:        {per_scan_second * 1e3:8.2f} ms")
+    print(f"concurrent 30 fps scans/core: {1 / per_scan_second:6.0f}")
+    print(f"last estimate: {estimate.heart_rate} bpm, quality {estimate.quality}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Render throughput of the compiled report and email templates
+
+Run from the backend directory: python benchmarks/bench_templates.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.email_service import EmailService  # noqa: E402
+from app.services.report_generator import REPORT_HTML_TEMPLATE, report_template  # noqa: E402
+
+REPORT_VALUES = dict(
+    generated_on="November 15, 2023",
+    health_score=78,
+    score_delta=6,
+    score_direction="higher",
+    highlights='<div class="highlight">• Heart rate has remained stable within normal range</div>' * 4,
+    heart_rate_mean="72.4",
+    systolic_mean="125.7",
+    diastolic_mean="82.6",
+    health_risks="<li><strong>Hypertension</strong>: 25.0% risk</li>" * 3,
+    recommendations='<div class="recommendation">• Maintain your current health routine</div>' * 2,
+    year=2023,
+)
+
+
+def _rate(fn, seconds: float = 1.0) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(200):
+            fn()
+        count += 200
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    print(f"{'template':<28}{'compiled/s':>14}{'str.format/s':>16}{'speedup':>10}")
+    for report_type in ("weekly", "monthly", "quarterly"):
+        compiled = report_template(report_type)
+        title = f"{report_type.capitalize()} Health Report"
+        fast = _rate(lambda: compiled.render(**REPORT_VALUES))
+        slow = _rate(lambda: REPORT_HTML_TEMPLATE.format(title=title, **REPORT_VALUES))
+        print(f"{'report_' + report_type:<28}{fast:>14,.0f}{slow:>16,.0f}{fast / slow:>9.2f}x")
+
+    service = EmailService()
+    email_values = dict(
+        first_name="John", date_range="Nov 08 - Nov 15, 2023", highlights="<li>Stable</li>" * 3,
+        text_highlights="- Stable\n" * 3, report_url="https://vitalsignguardian.com/reports/r1",
+    )
+    for name in ("weekly_report", "monthly_report", "quarterly_report"):
+        raw = service.templates[name]
+        fast = _rate(lambda: service._render(name, **email_values))
+        slow = _rate(lambda: (raw.html_content.format(**email_values), raw.text_content.format(**email_values)))
+        print(f"{'email_' + name:<28}{fast:>14,.0f}{slow:>16,.0f}{fast / slow:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
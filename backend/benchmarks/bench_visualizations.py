@@ -0,0 +1,70 @@
+"""Chart series from raw readings vs. pre-rolled buckets, for 1 Hz device data
+
+Run from the backend directory: python benchmarks/bench_visualizations.py
+Readings are written to a temporary directory that is removed afterwards.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.downsampling import lttb  # noqa: E402
+from app.services.rollups import RollupStore  # noqa: E402
+from app.services.visualizations import VisualizationService  # noqa: E402
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, to_epoch_ms  # noqa: E402
+
+DAYS = 30
+POINTS = 500
+
+
+def _fill(store: VitalSignStore, now: datetime):
+    for offset in range(DAYS, -1, -1):
+        day = (now - timedelta(days=offset)).date()
+        start = to_epoch_ms(datetime.combine(day, datetime.min.time()))
+        ts = np.arange(start, min(start + 86_400_000, to_epoch_ms(now)), 1000, dtype=np.int64)
+        rows = np.empty(len(ts), dtype=RECORD_DTYPE)
+        rows["ts"] = ts
+        rows["value"] = 72 + 8 * np.sin(ts / 3.6e6) + np.random.standard_normal(len(ts))
+        store.append_rows("user0", day, "heart_rate", rows)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="bench-rollups-")
+    try:
+        store = VitalSignStore(os.path.join(root, "vitals"))
+        service = VisualizationService(RollupStore(store, os.path.join(root, "rollups")))
+        now = datetime.now()
+        _fill(store, now)
+
+        print(f"{'range':<8}{'raw points':>12}{'raw ms':>9}{'tier':>8}{'cold ms':>9}{'warm ms':>9}{'payload B':>11}")
+        for days in (1, 7, DAYS):
+            start = now - timedelta(days=days)
+
+            def raw():
+                ts, values = store.get_range("user0", "heart_rate", start, now)
+                return ts[lttb(ts, values, POINTS)]
+            raw_points = len(store.get_series("user0", "heart_rate", start, now))
+            _, raw_ms = _timed(raw)
+            _, cold_ms = _timed(lambda: service.series("user0", "heart_rate", start, now, POINTS))
+            series, warm_ms = _timed(lambda: service.series("user0", "heart_rate", start, now, POINTS))
+            payload = len(json.dumps(series.dict(by_alias=True)))
+            print(f"{f'{days}d':<8}{raw_points:>12,}{raw_ms:>9.1f}{series.tier:>8}{cold_ms:>9.1f}{warm_ms:>9.1f}{payload:>11,}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Vitals history payloads: pydantic/JSON vs. the packed columnar encoding
+
+Run from the backend directory: python benchmarks/bench_wire_format.py
+Times only serialization, the way /api/vitals/history does it for each
+Accept type, on one series of 1 Hz readings.
+"""
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.services.columnar import decode, encode  # noqa: E402
+from app.services.visualizations import SeriesHistory, VitalsHistory  # noqa: E402
+from app.services.vitals_store import to_epoch_ms  # noqa: E402
+
+
+def _readings(count: int):
+    end = datetime.now()
+    start = end - timedelta(seconds=count)
+    ts = to_epoch_ms(start) + np.arange(count, dtype=np.int64) * 1000
+    values = (72 + 8 * np.sin(ts / 3.6e6) + np.random.standard_normal(count)).astype(np.float32)
+    return start, end, ts, values
+
+
+def _as_json(start, end, ts, values) -> bytes:
+    history = VitalsHistory(
+        user_id="user0",
+        start=start,
+        end=end,
+        series={"heart_rate": SeriesHistory(
+            timestamps=ts.tolist(), values=np.round(values.astype(np.float64), 2).tolist()
+        )},
+    )
+    # FastAPI re-validates against the response model before encoding
+    history = VitalsHistory.parse_obj(history.dict())
+    return json.dumps(jsonable_encoder(history, by_alias=True), separators=(",", ":")).encode()
+
+
+def _as_columns(start, end, ts, values) -> bytes:
+    return encode({
+        "userId": "user0",
+        "start": start,
+        "end": end,
+        "series": {"heart_rate": {"timestamps": ts, "values": values}},
+    })
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    print(f"{'points':>10}{'format':>9}{'bytes':>14}{'gzip bytes':>14}{'encode ms':>11}{'decode ms':>11}")
+    for count in (10_000, 100_000, 1_000_000):
+        readings = _readings(count)
+        body, encode_ms = _timed(_as_json, *readings)
+        _, decode_ms = _timed(json.loads, body)
+        print(f"{count:>10,}{'json':>9}{len(body):>14,}{len(gzip.compress(body, 6)):>14,}{encode_ms:>11.1f}{decode_ms:>11.1f}")
+        body, encode_ms = _timed(_as_columns, *readings)
+        _, decode_ms = _timed(decode, body)
+        print(f"{count:>10,}{'columns':>9}{len(body):>14,}{len(gzip.compress(body, 6)):>14,}{encode_ms:>11.1f}{decode_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
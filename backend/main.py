@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api import admin, alerts, reports, risk, tasks, visualizations, vitals
+from app.services.container import get_container
+from app.services.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+
 app = FastAPI(
     title="VitalSign Guardian API",
     description="API for the VitalSign Guardian health monitoring system",
@@ -15,6 +19,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency, in-flight requests and body sizes, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(reports.router, prefix="/api", tags=["reports"])
+app.include_router(vitals.router, prefix="/api", tags=["vitals"])
+app.include_router(risk.router, prefix="/api", tags=["risk"])
+app.include_router(visualizations.router, prefix="/api", tags=["visualizations"])
+app.include_router(alerts.router, prefix="/api", tags=["alerts"])
+app.include_router(tasks.router, prefix="/api", tags=["tasks"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
+
+@app.on_event("startup")
+async def start_services():
+    # Build shared services once per worker process
+    await get_container().startup()
+
+@app.on_event("shutdown")
+async def stop_services():
+    await get_container().shutdown()
 
 @app.get("/")
 async def root():
@@ -22,4 +45,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(admin.require_metrics_scraper)])
+async def prometheus_metrics():
+    """Prometheus scrape endpoint; each API worker process reports its own metrics
+
+    Needs a bearer token (``METRICS_TOKEN`` or ``ADMIN_API_TOKEN``), since
+    route names, traffic and service counters are not public.
+    """
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,128 @@
+import threading
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.aggregates import (
+    AggregateStore, build_partial, empty_partial, merge_partials, partial_statistics
+)
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, to_epoch_ms
+
+
+def random_partials(count, seed=3):
+    rng = np.random.default_rng(seed)
+    partials = []
+    for i in range(count):
+        n = int(rng.integers(1, 500))
+        ts = np.sort(rng.integers(1_700_000_000_000, 1_710_000_000_000, n))
+        partials.append(build_partial("heart_rate", ts, rng.normal(70, 15, n)))
+    return partials
+
+
+def test_merge_is_associative_and_commutative():
+    a, b, c = random_partials(3)
+    left = merge_partials([merge_partials([a, b]), c])
+    right = merge_partials([a, merge_partials([b, c])])
+    np.testing.assert_allclose(left, right, rtol=1e-12)
+    np.testing.assert_allclose(merge_partials([c, a, b]), left, rtol=1e-12)
+
+
+def test_empty_partial_is_the_identity():
+    (a,) = random_partials(1)
+    np.testing.assert_array_equal(merge_partials([a, empty_partial()]), a)
+    np.testing.assert_array_equal(merge_partials([]), empty_partial())
+
+
+def test_merged_partials_equal_one_partial_over_all_samples():
+    rng = np.random.default_rng(11)
+    ts = np.sort(rng.integers(1_700_000_000_000, 1_700_900_000_000, 3000))
+    values = rng.normal(120, 20, 3000)
+    chunks = np.array_split(np.arange(3000), [400, 1700, 2900])
+    merged = merge_partials(build_partial("systolic", ts[i], values[i]) for i in chunks)
+    whole = build_partial("systolic", ts, values)
+    np.testing.assert_allclose(merged, whole, rtol=1e-9)
+    stats = partial_statistics("systolic", merged)
+    assert stats["count"] == 3000
+    assert stats["mean"] == pytest.approx(values.mean())
+    assert stats["std"] == pytest.approx(values.std(), rel=1e-6)
+    assert stats["min"] == values.min() and stats["max"] == values.max()
+
+
+def rows(day, values):
+    start = to_epoch_ms(datetime.combine(day, time(8)))
+    records = np.empty(len(values), dtype=RECORD_DTYPE)
+    records["ts"] = start + 60_000 * np.arange(len(values))
+    records["value"] = values
+    return records
+
+
+def test_late_readings_rebuild_persisted_partials(tmp_path):
+    vitals = VitalSignStore(str(tmp_path / "vitals"))
+    aggregates = AggregateStore(vitals, str(tmp_path / "aggregates"))
+    day = datetime.now().date() - timedelta(days=10)
+    vitals.append_rows("user-1", day, "heart_rate", rows(day, [60.0, 70.0]))
+    monday = day - timedelta(days=day.weekday())
+    # Another process over the same files, with its own cache
+    other = AggregateStore(VitalSignStore(str(tmp_path / "vitals")), str(tmp_path / "aggregates"))
+    for store in (aggregates, other):
+        assert store.period_statistics("user-1", monday, monday + timedelta(days=6))["heart_rate"]["count"] == 2
+
+    vitals.append_rows("user-1", day, "heart_rate", rows(day, [80.0]))
+    for store in (aggregates, other):
+        stats = store.period_statistics("user-1", monday, monday + timedelta(days=6))["heart_rate"]
+        assert stats["count"] == 3
+        assert stats["mean"] == pytest.approx(70.0)
+
+
+def test_failing_listener_does_not_fail_the_write(tmp_path):
+    vitals = VitalSignStore(str(tmp_path))
+    seen = []
+
+    def broken(*args):
+        raise RuntimeError("derived store unavailable")
+
+    vitals.add_listener(broken)
+    vitals.add_listener(lambda user_id, day, series, records: seen.append(len(records)))
+    day = date(2024, 1, 2)
+    assert vitals.append_rows("user-1", day, "heart_rate", rows(day, [61.0, 62.0])) == 2
+    assert seen == [2]
+    start = datetime.combine(day, time.min)
+    assert vitals.count_range("user-1", "heart_rate", start, start + timedelta(days=1)) == 2
+
+
+def test_build_and_late_reading_in_two_workers_do_not_interleave(tmp_path):
+    day = datetime.now().date() - timedelta(days=3)
+    vitals_a = VitalSignStore(str(tmp_path / "vitals"))
+    vitals_a.append_rows("user-1", day, "heart_rate", rows(day, [60.0, 70.0]))
+    # Two workers with their own stores, locks and caches over the same directories
+    worker_a = AggregateStore(vitals_a, str(tmp_path / "aggregates"))
+    vitals_b = VitalSignStore(str(tmp_path / "vitals"))
+    AggregateStore(vitals_b, str(tmp_path / "aggregates"))
+
+    scanned, resume = threading.Event(), threading.Event()
+    scan_day = worker_a._scan_day
+
+    def slow_scan(*args):
+        partial = scan_day(*args)
+        scanned.set()
+        resume.wait(5)
+        return partial
+
+    worker_a._scan_day = slow_scan
+    build = threading.Thread(target=worker_a.daily_partial, args=("user-1", "heart_rate", day))
+    build.start()
+    scanned.wait(5)
+    # A late reading lands in worker B after worker A read the store
+    late = threading.Thread(
+        target=vitals_b.append_rows, args=("user-1", day, "heart_rate", rows(day + timedelta(hours=1), [80.0]))
+    )
+    late.start()
+    late.join(0.2)
+    assert late.is_alive(), "the late reading's drop must wait for the build to save"
+    resume.set()
+    build.join()
+    late.join()
+
+    reader = AggregateStore(VitalSignStore(str(tmp_path / "vitals")), str(tmp_path / "aggregates"))
+    assert partial_statistics("heart_rate", reader.daily_partial("user-1", "heart_rate", day))["count"] == 3
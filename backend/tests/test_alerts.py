@@ -0,0 +1,151 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.alerts import DEFAULT_RULES, AlertEngine, AlertRule, AlertRuleOverride
+from app.services.vitals_store import RECORD_DTYPE, to_epoch_ms
+
+TACHYCARDIA = AlertRule(
+    name="tachycardia", metric="heart_rate", condition="above", threshold=120, count=3, window=5,
+    message="Heart rate above {threshold:g} in {count} of {window}",
+)
+CRISIS = AlertRule(
+    name="crisis", metric="systolic", condition="above", threshold=180, severity="critical",
+    message="Systolic {value:g}",
+)
+
+
+def rows(*values, age=timedelta(0)):
+    records = np.empty(len(values), dtype=RECORD_DTYPE)
+    start = to_epoch_ms(datetime.now() - age)
+    records["ts"] = start + 1000 * np.arange(len(values))
+    records["value"] = values
+    return records
+
+
+def engine(**kwargs):
+    kwargs.setdefault("rules", [TACHYCARDIA, CRISIS])
+    kwargs.setdefault("cooldown_seconds", 0)
+    kwargs.setdefault("max_per_hour", 100)
+    return AlertEngine(email_service=None, **kwargs)
+
+
+def feed(alerts, series, *values, user="user-1", **kwargs):
+    """Append readings one call each, as separate requests would"""
+    for value in values:
+        alerts.on_append(user, date.today(), series, rows(value, **kwargs))
+    return [alert.rule for alert in reversed(alerts.recent(user))]
+
+
+def test_rule_fires_when_count_of_window_is_reached_across_appends():
+    alerts = engine()
+    assert feed(alerts, "heart_rate", 130, 80, 125) == []
+    assert feed(alerts, "heart_rate", 122) == ["tachycardia"]
+    [alert] = alerts.recent("user-1")
+    assert alert.value == 122 and alert.message == "Heart rate above 120 in 3 of 5"
+
+
+def test_rule_fires_once_while_the_condition_keeps_holding():
+    alerts = engine()
+    feed(alerts, "heart_rate", 130, 130, 130, 130, 130, 130)
+    assert alerts.stats["fired"] == 1
+
+
+def test_hits_further_apart_than_the_window_never_fire():
+    alerts = engine()
+    feed(alerts, "heart_rate", 130, 70, 70, 70, 70, 130, 70, 70, 70, 70, 130)
+    assert alerts.stats["fired"] == 0
+    # Once the window clears the user keeps no state for the rule
+    feed(alerts, "heart_rate", 70, 70, 70, 70)
+    assert alerts._windows == {}
+
+
+def test_one_batch_is_evaluated_like_separate_readings():
+    alerts = engine()
+    alerts.on_append("user-1", date.today(), "heart_rate", rows(130, 70, 130, 70, 130, 70, 70, 70, 70, 130, 130, 130))
+    fired = alerts.recent("user-1")
+    assert [alert.value for alert in reversed(fired)] == [130, 130]
+
+
+def test_rule_rearms_after_the_condition_clears():
+    alerts = engine()
+    feed(alerts, "heart_rate", 130, 130, 130, 70, 70, 70, 70, 70, 130, 130, 130)
+    assert alerts.stats["fired"] == 2
+
+
+def test_users_have_independent_windows():
+    alerts = engine()
+    feed(alerts, "heart_rate", 130, 130, user="user-1")
+    feed(alerts, "heart_rate", 130, user="user-2")
+    assert alerts.stats["fired"] == 0
+
+
+def test_cooldown_throttles_repeat_alerts():
+    alerts = engine(cooldown_seconds=900)
+    feed(alerts, "heart_rate", 130, 130, 130, 70, 70, 70, 70, 70, 130, 130, 130)
+    assert alerts.stats["fired"] == 1
+    assert alerts.stats["throttled"] == 1
+
+
+def test_hourly_cap_spares_critical_alerts():
+    alerts = engine(max_per_hour=1)
+    feed(alerts, "heart_rate", 130, 130, 130, 70, 70, 70, 70, 70, 130, 130, 130)
+    assert alerts.stats["fired"] == 1 and alerts.stats["throttled"] == 1
+    feed(alerts, "systolic", 190, 120, 195)
+    assert [alert.rule for alert in alerts.recent("user-1")][:2] == ["crisis", "crisis"]
+
+
+def test_old_readings_fill_the_window_without_alerting():
+    alerts = engine()
+    feed(alerts, "heart_rate", 130, 130, 130, age=timedelta(hours=2))
+    assert alerts.stats["fired"] == 0
+    # Still holding from the import, so a new high reading does not start an alert
+    feed(alerts, "heart_rate", 130)
+    assert alerts.stats["fired"] == 0
+
+
+def test_override_changes_the_threshold_and_persists(tmp_path):
+    path = tmp_path / "rules.json"
+    alerts = engine(overrides_path=str(path))
+    feed(alerts, "heart_rate", 110, 110)
+    rule = alerts.set_override("user-1", "tachycardia", AlertRuleOverride(threshold=100))
+    assert rule.threshold == 100
+    # The override starts a fresh window: earlier readings do not count
+    assert feed(alerts, "heart_rate", 110, 110) == []
+    assert feed(alerts, "heart_rate", 110) == ["tachycardia"]
+
+    reloaded = engine(overrides_path=str(path))
+    assert reloaded.rules_for("user-1", "heart_rate")[0].threshold == 100
+    assert reloaded.rules_for("user-2", "heart_rate")[0].threshold == 120
+
+
+def test_alerts_are_emailed_unless_the_user_opted_out():
+    sent = []
+
+    class EmailService:
+        async def send_health_alert(self, email, alert_data):
+            sent.append((email, alert_data["message"]))
+
+    users = {
+        "user-1": SimpleNamespace(email="one@example.com", preferences={}),
+        "user-2": SimpleNamespace(email="two@example.com", preferences={"alertEmails": False}),
+    }
+
+    async def lookup(user_id):
+        return users.get(user_id)
+
+    async def run():
+        alerts = AlertEngine(EmailService(), rules=DEFAULT_RULES, user_lookup=lookup)
+        alerts.start()
+        for user in ("user-1", "user-2"):
+            alerts.on_append(user, date.today(), "systolic", rows(200))
+        await alerts.stop()
+        return alerts
+
+    alerts = asyncio.run(run())
+
+    assert sent == [("one@example.com", "Systolic blood pressure of 200 mmHg is above 180 mmHg.")]
+    assert alerts.stats["delivered"] == 1 and alerts.stats["opted_out"] == 1
+    assert [alert.delivered for alert in alerts.recent("user-1")] == [True]
@@ -0,0 +1,75 @@
+import json
+import struct
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.services.columnar import MAGIC, decode, encode
+
+
+def header(data):
+    (length,) = struct.unpack_from("<I", data, 4)
+    return json.loads(data[8:8 + length])
+
+
+def test_round_trip_keeps_shape_and_values():
+    payload = {
+        "userId": "user-1",
+        "generatedAt": datetime(2024, 5, 1, 12, 30),
+        "series": {
+            "heartRate": {
+                "timestamps": np.array([1_700_000_000_000, 1_700_000_001_000, 1_700_000_065_000], dtype=np.int64),
+                "values": np.array([61.5, 64.25, 70.0], dtype=np.float32),
+            },
+            "empty": [],
+            "labels": ["a", "b"],
+        },
+        "counts": [3, 1, 2],
+        "ratios": [0.5, 1, 0.25],
+        "flags": [True, False],
+        "note": None,
+    }
+    decoded = decode(encode(payload))
+    heart = decoded["series"]["heartRate"]
+    assert heart["timestamps"].dtype == np.int64
+    assert heart["timestamps"].tolist() == payload["series"]["heartRate"]["timestamps"].tolist()
+    assert heart["values"].tolist() == [61.5, 64.25, 70.0]
+    # Unsorted integers are stored as plain int64
+    assert decoded["counts"].dtype == np.int64 and decoded["counts"].tolist() == [3, 1, 2]
+    assert decoded["ratios"].dtype == np.float32 and decoded["ratios"].tolist() == [0.5, 1.0, 0.25]
+    assert decoded["series"]["empty"] == [] and decoded["series"]["labels"] == ["a", "b"]
+    assert decoded["flags"] == [True, False] and decoded["note"] is None
+    assert decoded["generatedAt"] == "2024-05-01T12:30:00" and decoded["userId"] == "user-1"
+
+
+@pytest.mark.parametrize("values, step_type", [
+    ([1_700_000_000_000 + 1000 * i for i in range(100)], "int32"),
+    # A gap of 2**31 ms or more needs 64-bit steps
+    ([0, 5, 2 ** 31, 2 ** 31 + 7, 2 ** 40], "int64"),
+    ([-(2 ** 62), 0, 2 ** 62], "int64"),
+    ([42], "int32"),
+    ([7, 7, 7], "int32"),
+])
+def test_sorted_integers_are_delta_encoded(values, step_type):
+    array = np.array(values, dtype=np.int64)
+    data = encode({"ts": array})
+    column, = header(data)["columns"]
+    assert column["encoding"] == "delta" and column["type"] == step_type
+    assert column["base"] == values[0] and column["length"] == len(values)
+    decoded = decode(data)["ts"]
+    assert decoded.dtype == np.int64 and decoded.tolist() == values
+
+
+def test_columns_are_aligned_for_typed_array_views():
+    data = encode({"a": np.arange(3, dtype=np.float32), "b": [1, 5, 9], "c": np.array([2.5], dtype=np.float32)})
+    (length,) = struct.unpack_from("<I", data, 4)
+    body = 8 + length + (-(8 + length) % 8)
+    assert data[:4] == MAGIC
+    assert body % 8 == 0
+    assert all(column["offset"] % 8 == 0 for column in header(data)["columns"])
+
+
+def test_decode_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        decode(b'{"not": "columnar"}')
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.services.document_cache import DocumentCache
+from app.services.pdf_extraction import PdfExtractor
+
+
+def make_pdf(*pages: str) -> bytes:
+    """A PDF with one Helvetica text page per argument"""
+    writer = PdfWriter()
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        font = writer._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }))
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        lines = " ".join(f"({line}) Tj 0 -14 Td" for line in text.splitlines())
+        contents = DecodedStreamObject()
+        contents.set_data(f"BT /F1 12 Tf 72 720 Td {lines} ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def save(tmp_path, name: str, data: bytes):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path), hashlib.sha256(data).hexdigest()
+
+
+def test_cache_round_trip_counts_and_rejects_bad_keys(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=1024 * 1024)
+    assert cache.get("document", "abc123") is None
+    cache.put("document", "abc123", [{"page": 0}])
+    assert cache.get("document", "abc123") == [{"page": 0}]
+    assert cache.snapshot()["hits"]["document"] == 1
+    assert cache.snapshot()["misses"]["document"] == 1
+    with pytest.raises(ValueError):
+        cache.path("page", "../escape")
+    with pytest.raises(ValueError):
+        cache.path("other", "abc123")
+
+
+def test_eviction_removes_least_recently_used_entries(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=1000)
+    payload = "x" * 280
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put("page", key, payload)
+        past = time.time() - 100 + i
+        os.utime(cache.path("page", key), (past, past))
+    # Reading bumps the entry, so "bb2" is now the oldest
+    assert cache.lookup("page", "aa1") == payload
+
+    cache.put("page", "dd4", payload)
+
+    assert cache.lookup("page", "bb2") is None
+    assert cache.lookup("page", "aa1") == payload
+    assert cache.lookup("page", "dd4") == payload
+    assert cache.snapshot()["evictions"] >= 1
+    assert cache.snapshot()["bytes"] <= 900
+
+
+def test_repeated_documents_and_known_pages_skip_parsing(tmp_path):
+    cache = DocumentCache(str(tmp_path / "cache"))
+    extractor = PdfExtractor(upload_dir=str(tmp_path / "uploads"), max_workers=1, cache=cache)
+    vitals_page = "Blood Pressure: 128/84 mmHg\nPulse 72 bpm\nSpO2 98%"
+
+    path, digest = save(tmp_path, "first.pdf", make_pdf(vitals_page, "Resp Rate 16 breaths per minute"))
+    first = asyncio.run(extractor.extract(path, digest, "first.pdf", "user-1"))
+    assert not first.cached and first.cached_pages == 0
+    assert first.text_pages == 2
+    assert first.vitals["heartRate"] == "72 bpm"
+
+    # Same bytes again: served whole from the document cache without opening the file
+    os.remove(path)
+    again = asyncio.run(extractor.extract(path, digest, "first.pdf", "user-1"))
+    assert again.cached and again.cached_pages == 2
+    assert again.vitals == first.vitals
+
+    # A new document sharing one page reuses that page's matches
+    path, digest = save(tmp_path, "second.pdf", make_pdf("Temperature 98.6 F", vitals_page))
+    second = asyncio.run(extractor.extract(path, digest, "second.pdf", "user-1"))
+    assert not second.cached and second.cached_pages == 1
+    assert second.vitals["heartRate"] == "72 bpm"
+    assert cache.snapshot()["hits"]["page"] == 1
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from app.services.downsampling import lttb, minmax
+
+
+def reference_lttb(x, y, threshold):
+    """Straight transcription of Steinarsson's algorithm, one point at a time"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1 if i < threshold - 3 else n - 1
+        next_lo = hi
+        next_hi = int((i + 2) * every) + 1 if i + 1 < threshold - 3 else n - 1
+        if i == threshold - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+            avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def reference_minmax(x, low, high, bins):
+    """Per-bin extremes found with plain loops, emitted in time order"""
+    span = float(x[-1] - x[0]) or 1.0
+    groups = {}
+    for i, xi in enumerate(x):
+        groups.setdefault(min(int((xi - x[0]) / span * bins), bins - 1), []).append(i)
+    xs, values = [], []
+    for b in sorted(groups):
+        members = groups[b]
+        lowest = min(members, key=lambda i: (low[i], i))
+        highest = min(members, key=lambda i: (-high[i], i))
+        if lowest == highest and low[lowest] == high[highest]:
+            points = [(lowest, low[lowest])]
+        elif lowest <= highest:
+            points = [(lowest, low[lowest]), (highest, high[highest])]
+        else:
+            points = [(highest, high[highest]), (lowest, low[lowest])]
+        for i, value in points:
+            xs.append(x[i])
+            values.append(value)
+    return xs, values
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (101, 10), (1000, 57), (5000, 500), (7, 7), (50, 2)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n + threshold)
+    x = np.sort(rng.uniform(0, 1e6, n))
+    y = np.cumsum(rng.normal(size=n))
+    assert lttb(x, y, threshold).tolist() == reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_endpoints_in_order():
+    rng = np.random.default_rng(0)
+    x = np.arange(2000, dtype=np.int64) * 1000
+    indices = lttb(x, rng.normal(size=2000), 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 1999
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n, bins", [(1000, 10), (997, 64), (300, 149), (50, 1)])
+def test_minmax_matches_reference(n, bins):
+    rng = np.random.default_rng(n * bins)
+    x = np.sort(rng.integers(0, 10 ** 9, n))
+    # Rounded values so bins hold ties
+    values = np.round(rng.normal(70, 10, n))
+    xs, out = minmax(x, values, values, bins)
+    ref_x, ref_values = reference_minmax(x.tolist(), values.tolist(), values.tolist(), bins)
+    assert xs.tolist() == ref_x
+    assert out.tolist() == ref_values
+    assert len(out) <= 2 * bins
+
+
+def test_minmax_of_rolled_up_buckets():
+    rng = np.random.default_rng(1)
+    n = 800
+    x = np.arange(n, dtype=np.int64) * 60_000
+    low = rng.uniform(50, 70, n)
+    high = low + rng.uniform(0, 30, n)
+    xs, out = minmax(x, low, high, 40)
+    ref_x, ref_values = reference_minmax(x.tolist(), low.tolist(), high.tolist(), 40)
+    assert xs.tolist() == ref_x
+    assert out.tolist() == ref_values
+    assert out.min() == low.min() and out.max() == high.max()
+
+
+def test_minmax_returns_few_points_unchanged():
+    x = np.array([1, 2, 3], dtype=np.int64)
+    values = np.array([5.0, 4.0, 6.0])
+    xs, out = minmax(x, values, values, 10)
+    assert xs.tolist() == [1, 2, 3] and out.tolist() == [5.0, 4.0, 6.0]
+    assert len(minmax(np.empty(0), np.empty(0), np.empty(0), 10)[0]) == 0
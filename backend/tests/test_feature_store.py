@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.feature_store import FeatureStore
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, from_epoch_ms, to_epoch_ms
+
+USER = "user-1"
+
+
+def rows(hours_ago, values):
+    now = datetime.now().replace(microsecond=0)
+    records = np.empty(len(values), dtype=RECORD_DTYPE)
+    records["ts"] = [to_epoch_ms(now - timedelta(hours=h, minutes=i)) for i, h in enumerate(hours_ago)]
+    records["value"] = values
+    return records
+
+
+def append(store, records):
+    # One partition per day, as the store groups them
+    days = np.array([from_epoch_ms(int(ts)).date() for ts in records["ts"]])
+    for day in sorted(set(days)):
+        store.append_rows(USER, day, "heart_rate", records[days == day])
+
+
+def worker(tmp_path):
+    """One API worker's stores over the shared data directories"""
+    vitals = VitalSignStore(str(tmp_path / "vitals"))
+    return vitals, FeatureStore(vitals, str(tmp_path / "features"), persist_interval=3600)
+
+
+def fresh(tmp_path):
+    return worker(tmp_path)[1]._build(USER)
+
+
+def assert_same_statistics(features, expected):
+    np.testing.assert_allclose(features.partials, expected.partials, rtol=1e-9)
+    np.testing.assert_allclose(features.last_reading_ms, expected.last_reading_ms)
+
+
+def test_appends_are_folded_in_memory_and_persisted(tmp_path):
+    vitals, features = worker(tmp_path)
+    append(vitals, rows([30, 20], [60.0, 64.0]))
+    assert features.statistics(USER)["heart_rate"]["count"] > 0
+    append(vitals, rows([1], [90.0]))
+    assert features.stats["folds"] == 1
+    features.close()
+    assert_same_statistics(worker(tmp_path)[1].get(USER), fresh(tmp_path))
+
+
+def test_rows_already_seen_by_the_backfill_are_not_folded_twice(tmp_path):
+    vitals, features = worker(tmp_path)
+    records = rows([3, 2], [70.0, 72.0])
+    # Written by the store, but its listener call still waits for the backfill to finish
+    VitalSignStore(str(tmp_path / "vitals")).append_rows(USER, datetime.now().date(), "heart_rate", records)
+    before = features.get(USER).partials.copy()
+    features.on_append(USER, datetime.now().date(), "heart_rate", records)
+    np.testing.assert_array_equal(features.get(USER).partials, before)
+    assert features.stats["folds"] == 0
+
+
+def test_workers_see_each_others_readings(tmp_path):
+    vitals_a, features_a = worker(tmp_path)
+    vitals_b, features_b = worker(tmp_path)
+    append(vitals_a, rows([48], [60.0]))
+    features_a.get(USER)
+    features_a.flush()
+    assert features_b.get(USER).statistics()["heart_rate"]["count"] == pytest.approx(
+        features_a.get(USER).statistics()["heart_rate"]["count"]
+    )
+
+    # Both fold a reading of their own before either flushes
+    append(vitals_a, rows([5], [80.0]))
+    append(vitals_b, rows([4], [100.0]))
+    features_a.flush()
+    features_b.flush()
+    assert features_b.stats["rebuilt"] == 1
+    expected = fresh(tmp_path)
+    for features in (features_a, features_b):
+        assert_same_statistics(features.get(USER), expected)
+    assert_same_statistics(worker(tmp_path)[1].get(USER), expected)
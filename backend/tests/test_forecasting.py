@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.forecasting import _FILE_CLOCK_SLACK_NS, ForecastService
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, to_epoch_ms
+
+USER = "user-1"
+
+
+def reading(days_ago, value):
+    ts = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    records = np.zeros(1, dtype=RECORD_DTYPE)
+    records["ts"], records["value"] = to_epoch_ms(ts), value
+    return ts.date(), records
+
+
+def append(vitals, days_ago, value):
+    day, records = reading(days_ago, value)
+    vitals.append_rows(USER, day, "heart_rate", records)
+
+
+def settle():
+    # Forecasts started within the file clock's slack of a reading are not cached
+    time.sleep(2 * _FILE_CLOCK_SLACK_NS / 1e9)
+
+
+def worker(tmp_path, shared=True):
+    vitals = VitalSignStore(str(tmp_path / "vitals"))
+    return vitals, ForecastService(vital_store=vitals, root_dir=str(tmp_path / "forecasts") if shared else None)
+
+
+def test_a_reading_in_one_worker_invalidates_every_worker(tmp_path):
+    vitals_a, worker_a = worker(tmp_path)
+    _, worker_b = worker(tmp_path)
+    for days_ago in range(5, 0, -1):
+        append(vitals_a, days_ago, 70.0)
+    settle()
+    (forecast,) = worker_a.forecast_many([USER])
+    assert worker_b._lookup(USER) == forecast
+
+    append(vitals_a, 0, 90.0)
+    assert worker_a._lookup(USER) is None
+    assert worker_b._lookup(USER) is None
+    settle()
+    (fresh,) = worker_b.forecast_many([USER])
+    assert fresh.last_observed["heart_rate"] > forecast.last_observed["heart_rate"]
+    assert worker_a._lookup(USER) == fresh
+
+
+@pytest.mark.parametrize("shared", [True, False])
+def test_forecast_of_readings_superseded_while_computing_is_not_cached(tmp_path, shared):
+    vitals, service = worker(tmp_path, shared)
+    append(vitals, 2, 70.0)
+    load_series = service._load_series
+
+    def load_then_receive_a_reading(*args):
+        series = load_series(*args)
+        append(vitals, 0, 95.0)
+        return series
+
+    service._load_series = load_then_receive_a_reading
+    (stale,) = service.forecast_many([USER])
+    assert stale.last_observed["heart_rate"] == 70.0
+    assert service._lookup(USER) is None
+
+    service._load_series = load_series
+    settle()
+    (fresh,) = service.forecast_many([USER])
+    assert service._lookup(USER) == fresh
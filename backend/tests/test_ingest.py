@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.ingest import IngestBackpressure, IngestBuffer, parse_readings, validate_readings
+from app.services.vitals_store import VitalSignStore, to_epoch_ms
+
+NOW = datetime.now().replace(microsecond=0)
+
+
+def reading(value=70, type="heart_rate", **fields):
+    return {"user_id": "user-1", "type": type, "value": value, "timestamp": NOW.isoformat(), **fields}
+
+
+def test_parse_readings_accepts_arrays_and_ndjson():
+    assert parse_readings(b'[{"a": 1}, {"a": 2}]') == [{"a": 1}, {"a": 2}]
+    assert parse_readings(b'{"a": 1}\n\n{"a": 2}\n', "application/x-ndjson") == [{"a": 1}, {"a": 2}]
+    assert parse_readings(b"  ") == []
+
+
+def test_validate_readings_reports_rejections_by_index():
+    readings = [
+        reading(72),
+        "not an object",
+        reading(500),
+        reading({"systolic": 120, "diastolic": 300}, type="blood_pressure"),
+        reading({"systolic": 121, "diastolic": 79}, type="blood_pressure"),
+        reading(72, timestamp=(NOW + timedelta(days=3)).isoformat()),
+        reading(72, user_id="../etc"),
+    ]
+    partitions, accepted, rejected = validate_readings(readings)
+
+    assert accepted == 2
+    assert [r.index for r in rejected] == [1, 2, 3, 5, 6]
+    assert "heart_rate value 500" in rejected[1].reason
+    # Blood pressure is rejected as a unit: no systolic row from reading 3
+    assert "diastolic" in rejected[2].reason
+    assert rejected[3].reason == "timestamp outside the accepted window"
+    day = NOW.date()
+    assert partitions[("user-1", day, "heart_rate")]["value"].tolist() == [72.0]
+    assert partitions[("user-1", day, "systolic")]["value"].tolist() == [121.0]
+    assert partitions[("user-1", day, "diastolic")]["ts"].tolist() == [to_epoch_ms(NOW)]
+
+
+def test_concurrent_submits_share_one_group_commit(tmp_path):
+    store = VitalSignStore(str(tmp_path))
+    partitions = [validate_readings([reading(60 + i)])[0] for i in range(5)]
+
+    async def run():
+        buffer = IngestBuffer(store, flush_interval=10)
+        await asyncio.gather(*(buffer.submit(p) for p in partitions))
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+
+    assert buffer.stats["flushes"] == 1
+    assert buffer.stats["committed"] == 5
+    values = store.get_series("user-1", "heart_rate", NOW, NOW + timedelta(seconds=1))
+    assert sorted(values.tolist()) == [60.0, 61.0, 62.0, 63.0, 64.0]
+
+
+def test_full_buffer_applies_backpressure(tmp_path):
+    store = VitalSignStore(str(tmp_path))
+    partitions = validate_readings([reading(60), reading(61)])[0]
+
+    async def run():
+        buffer = IngestBuffer(store, flush_interval=10, max_pending_rows=3)
+        await buffer.submit(partitions, wait=False)
+        with pytest.raises(IngestBackpressure) as exc:
+            await buffer.submit(partitions, wait=False)
+        assert exc.value.retry_after >= 1
+        assert buffer.pending_rows == 2
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+
+    assert buffer.stats["rejected_busy"] == 1
+    assert buffer.stats["committed"] == 2
+    assert buffer.pending_rows == 0
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.mail_queue import (
+    DeadLetterStore,
+    LocalTransport,
+    MailQueue,
+    OutboundEmail,
+    ResendTransport,
+    TransportError,
+)
+
+
+def email(to: str) -> OutboundEmail:
+    return OutboundEmail(to=[to], subject="Alert", html="<p>hi</p>", text="hi")
+
+
+def run_queue(transport, messages, **kwargs):
+    async def run():
+        queue = MailQueue(
+            transport, rate_per_second=1000, workers=1, backoff_base=0.001,
+            dead_letters=DeadLetterStore(), **kwargs
+        )
+        queue.start()
+        for message in messages:
+            await queue.enqueue(message)
+        await queue.stop()
+        return queue
+
+    return asyncio.run(run())
+
+
+class RejectingTransport(LocalTransport):
+    """Rejects any batch holding an address listed in ``bad``, like Resend's 422"""
+
+    def __init__(self, bad):
+        super().__init__()
+        self.bad = set(bad)
+        self.calls = []
+
+    async def send_batch(self, messages):
+        self.calls.append([m.to[0] for m in messages])
+        if any(m.to[0] in self.bad for m in messages):
+            raise TransportError("Resend rejected batch (422)", retryable=False)
+        await super().send_batch(messages)
+
+
+def test_transient_failures_are_retried_until_sent():
+    transport = LocalTransport(fail_next=2)
+    queue = run_queue(transport, [email("a@example.com")])
+
+    assert [m.to for m in transport.sent] == [["a@example.com"]]
+    assert transport.sent[0].attempts == 2
+    assert queue.stats["retried"] == 2
+    assert queue.dead_letters.messages == []
+
+
+def test_messages_exhausting_retries_are_dead_lettered():
+    transport = LocalTransport(fail_next=100)
+    queue = run_queue(transport, [email("a@example.com")], max_retries=2)
+
+    assert transport.sent == []
+    [dead] = queue.dead_letters.messages
+    assert dead.attempts == 3
+    assert dead.last_error == "Simulated transport failure"
+    assert queue.stats["dead_lettered"] == 1
+
+
+def test_rejected_batch_only_dead_letters_the_bad_message():
+    transport = RejectingTransport(bad={"bad"})
+    messages = [email("a@example.com"), email("bad"), email("c@example.com")]
+    queue = run_queue(transport, messages)
+
+    assert transport.calls[0] == ["a@example.com", "bad", "c@example.com"]
+    assert sorted(m.to[0] for m in transport.sent) == ["a@example.com", "c@example.com"]
+    assert [m.to[0] for m in queue.dead_letters.messages] == ["bad"]
+    assert queue.dead_letters.messages[0].attempts == 1
+    assert queue.stats["split_batches"] == 1
+    assert queue.stats["retried"] == 0
+
+
+def test_resend_batches_carry_an_idempotency_key_stable_across_retries():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503, text="unavailable")
+        return httpx.Response(200, json={"data": []})
+
+    async def run():
+        transport = ResendTransport("key")
+        await transport.client.aclose()
+        transport.client = httpx.AsyncClient(
+            base_url="https://api.resend.test", transport=httpx.MockTransport(handler)
+        )
+        messages = [email("a@example.com"), email("b@example.com")]
+        try:
+            await transport.send_batch(messages)
+        except TransportError as e:
+            assert e.retryable
+        await transport.send_batch(messages)
+        await transport.send_batch(messages[:1])
+        await transport.close()
+
+    asyncio.run(run())
+
+    batch_keys = {r.headers["Idempotency-Key"] for r in requests[:2]}
+    assert len(batch_keys) == 1
+    assert requests[2].headers["Idempotency-Key"] not in batch_keys
+    assert requests[0].url.path == "/emails/batch"
+    assert len(json.loads(requests[0].content)) == 2
+    assert requests[2].url.path == "/emails"
@@ -0,0 +1,78 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import main
+from app.services.metrics import Histogram, MetricsMiddleware, MetricsRegistry
+
+
+def test_histogram_quantile_interpolates_within_buckets():
+    histogram = Histogram("latency", "test", (0.1, 0.2, 0.4))
+    assert histogram.quantile(0.5) is None
+    for value in (0.05, 0.15, 0.15, 0.3):
+        histogram.observe((), value)
+    assert histogram.quantile(0.5) == pytest.approx(0.15)
+    assert histogram.quantile(1.0) == 0.4
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.request_finished("GET", "/api/reports/{report_id}", 200, 0.003, 0, 512)
+    registry.register_collector("cache", lambda: {"hits": 3, "hit_ratio": 0.75, "by_kind": {"page": 2}, "name": "x"})
+    try:
+        with registry.span("report.pdf"):
+            raise ValueError("render failed")
+    except ValueError:
+        pass
+
+    text = registry.render()
+
+    labels = 'method="GET",route="/api/reports/{report_id}"'
+    assert f'vitalsign_http_requests_total{{{labels},status="200"}} 1' in text
+    assert f'vitalsign_http_request_duration_seconds_bucket{{{labels},le="0.0025"}} 0' in text
+    assert f'vitalsign_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in text
+    assert f'vitalsign_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert 'vitalsign_span_errors_total{span="report.pdf"} 1' in text
+    assert 'vitalsign_service_stat{service="cache",stat="hit_ratio"} 0.75' in text
+    assert 'vitalsign_service_stat{service="cache",stat="by_kind_page"} 2' in text
+    assert 'stat="name"' not in text
+    assert registry.in_flight_requests() == -1
+
+
+def test_middleware_labels_requests_by_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.post("/items/{item_id}")
+    async def update(item_id: str, request: Request):
+        return {"item_id": item_id, "size": len(await request.body())}
+
+    client = TestClient(app)
+    client.post("/items/1", content=b"x" * 10)
+    client.post("/items/2", content=b"x" * 10)
+    client.get("/nowhere")
+
+    text = registry.render()
+    assert 'vitalsign_http_requests_total{method="POST",route="/items/{item_id}",status="200"} 2' in text
+    assert 'vitalsign_http_request_size_bytes_sum{method="POST",route="/items/{item_id}"} 20' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "/items/1" not in text
+    assert registry.in_flight_requests() == 0
+
+
+def test_metrics_endpoint_requires_a_token(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    monkeypatch.delenv("ADMIN_API_TOKEN", raising=False)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    monkeypatch.setenv("ADMIN_API_TOKEN", "admin-secret")
+    assert client.get("/metrics").status_code == 401
+    denied = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert denied.status_code == 401 and denied.headers["WWW-Authenticate"] == "Bearer"
+    for token in ("scrape-secret", "admin-secret"):
+        response = client.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert "vitalsign_http_requests_total" in response.text
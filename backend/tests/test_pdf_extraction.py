@@ -0,0 +1,86 @@
+import asyncio
+import io
+import os
+import time
+
+import pytest
+
+from app.services.pdf_extraction import UPLOAD_MAX_AGE_SECONDS, PdfExtractor, match_text
+
+PAGE = """
+Patient Name: Jane Doe
+MRN: AB-12345
+Date of Service: 03/14/2024
+Blood Pressure: 128/84 mmHg   Pulse 72 bpm   Resp Rate 16   SpO2 98%
+Temperature 98.6 F
+Fasting Glucose 5.5 mmol/L
+Hemoglobin 13.2 g/dL (12.0 - 15.5)
+LDL 162 mg/dL <100
+Page 2 of 3
+"""
+
+
+class Upload:
+    """The part of UploadFile that save_upload reads"""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    async def read(self, size: int) -> bytes:
+        return self._data.read(size)
+
+
+def test_vitals_and_labs_are_matched_and_normalized():
+    found = match_text(PAGE)
+    assert found["patient_name"] == "Jane Doe"
+    assert found["patient_id"] == "AB-12345"
+    assert found["date"] == "2024-03-14"
+    vitals = {vital_type: value for vital_type, (_, value, _) in found["vitals"].items()}
+    assert vitals == {
+        "blood_pressure": {"systolic": 128, "diastolic": 84},
+        "heart_rate": 72.0,
+        "respiratory_rate": 16.0,
+        "oxygen_saturation": 98.0,
+        "temperature": 37.0,
+    }
+    labs = {lab["name"]: lab for lab in found["labs"]}
+    assert labs["Glucose"] == {"name": "Glucose", "value": "99.1 mg/dL", "range": "70-100 mg/dL", "status": "normal"}
+    assert labs["Hemoglobin"]["range"] == "12-15.5 g/dL" and labs["Hemoglobin"]["status"] == "normal"
+    assert labs["LDL"]["range"] == "<100 mg/dL" and labs["LDL"]["status"] == "high"
+
+
+def test_implausible_values_are_not_taken_for_vitals():
+    found = match_text("HR 400 bpm, later pulse 64. BP 40/90 then BP 120/80")
+    assert found["vitals"]["heart_rate"][1] == 64.0
+    assert found["vitals"]["blood_pressure"][1] == {"systolic": 120, "diastolic": 80}
+
+
+def test_uploads_are_private_to_each_request_and_discarded(tmp_path):
+    extractor = PdfExtractor(upload_dir=str(tmp_path), max_workers=1)
+    data = b"%PDF-1.4\n" + b"0" * 100
+    first, digest = asyncio.run(extractor.save_upload(Upload(data)))
+    second, same_digest = asyncio.run(extractor.save_upload(Upload(data)))
+    assert digest == same_digest and first != second
+    extractor.discard_upload(first)
+    assert not os.path.exists(first) and open(second, "rb").read() == data
+    extractor.discard_upload(second)
+    extractor.discard_upload(second)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("data, message", [(b"hello", "not a PDF"), (b"%PDF-" + b"0" * 2048, "exceeds"), (b"", "empty")])
+def test_rejected_uploads_leave_nothing_behind(tmp_path, data, message):
+    extractor = PdfExtractor(upload_dir=str(tmp_path), max_workers=1)
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(extractor.save_upload(Upload(data), max_bytes=1024))
+    assert os.listdir(tmp_path) == []
+
+
+def test_uploads_left_by_a_crash_are_swept(tmp_path):
+    stale, recent = tmp_path / "stale.pdf", tmp_path / "recent.pdf"
+    stale.write_bytes(b"%PDF-")
+    recent.write_bytes(b"%PDF-")
+    old = time.time() - UPLOAD_MAX_AGE_SECONDS - 60
+    os.utime(stale, (old, old))
+    PdfExtractor(upload_dir=str(tmp_path), max_workers=1)
+    assert os.listdir(tmp_path) == ["recent.pdf"]
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.admin import get_profiler, router
+from app.services.profiler import Profile, SamplingProfiler
+
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+async def parked(event: asyncio.Event):
+    await event.wait()
+
+
+def test_profile_renders_collapsed_and_speedscope():
+    profile = Profile(interval=0.01)
+    outer, inner = ("main", "app/main.py", 1), ("work;load", "app/work.py", 10)
+    profile.add("thread MainThread", (outer, inner))
+    profile.add("thread MainThread", (outer, inner))
+    profile.add("asyncio tasks", (("<await Future>", "", 0),))
+
+    assert profile.collapsed().splitlines() == [
+        "asyncio tasks;<await Future> 1",
+        "thread MainThread;main (app/main.py:1);work:load (app/work.py:10) 2",
+    ]
+    document = json.loads(profile.speedscope())
+    assert [p["name"] for p in document["profiles"]] == ["asyncio tasks", "thread MainThread"]
+    assert document["profiles"][1]["weights"] == [0.02]
+    frames = document["shared"]["frames"]
+    assert [frames[i]["name"] for i in document["profiles"][1]["samples"][0]] == ["main", "work;load"]
+    assert frames[0] == {"name": "<await Future>"}
+
+
+def test_capture_samples_threads_and_suspended_tasks():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="busy-worker")
+    worker.start()
+
+    async def run():
+        event = asyncio.Event()
+        task = asyncio.create_task(parked(event))
+        profile = await SamplingProfiler().capture(0.05, 0.005)
+        event.set()
+        await task
+        return profile
+
+    try:
+        profile = asyncio.run(run())
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.sample_count >= 5
+    assert any(frame[0] == "spin" for stack in profile.stacks["thread busy-worker"] for frame in stack)
+    assert any(stack[0][0] == "parked" for stack in profile.stacks["asyncio tasks"])
+
+
+def test_one_capture_at_a_time_and_bounded_duration():
+    profiler = SamplingProfiler(max_seconds=0.05)
+
+    async def run():
+        first = asyncio.create_task(profiler.capture(30, 0.01, tasks=False))
+        await asyncio.sleep(0.01)
+        assert profiler.running
+        with pytest.raises(RuntimeError):
+            await profiler.capture(1, 0.01)
+        return await first
+
+    profile = asyncio.run(run())
+    assert profile.duration < 1
+    assert not profiler.running
+
+
+def test_admin_endpoints_need_the_admin_token(monkeypatch):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_profiler] = lambda: SamplingProfiler(max_seconds=0.02)
+    client = TestClient(app)
+
+    monkeypatch.delenv("ADMIN_API_TOKEN", raising=False)
+    assert client.post("/api/admin/profile").status_code == 404
+    assert client.get("/api/testing/performance").status_code == 404
+
+    monkeypatch.setenv("ADMIN_API_TOKEN", "admin-secret")
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    assert client.post("/api/admin/profile").status_code == 401
+    # The scrape-only token does not open admin endpoints
+    scrape = {"Authorization": "Bearer scrape-secret"}
+    assert client.get("/api/testing/performance", headers=scrape).status_code == 401
+
+    admin = {"Authorization": "Bearer admin-secret"}
+    response = client.post("/api/admin/profile?format=collapsed&interval_ms=5", headers=admin)
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == 'attachment; filename="profile.folded"'
+    assert int(response.headers["X-Profile-Samples"]) >= 1
+    performance = client.get("/api/testing/performance", headers=admin).json()
+    assert performance["profiler"] == {"running": False, "maxSeconds": 0.02}
+    assert "cpuUsage" in performance and "requestsInFlight" in performance
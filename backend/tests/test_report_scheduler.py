@@ -0,0 +1,160 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from app.services.batch_reports import BatchJobResult, BatchRunSummary
+from app.services.report_scheduler import JobJournal, ReportScheduler
+from app.services.task_queue import LocalTaskQueue
+
+INTERRUPTED = "report-weekly-user-a-1-2026-10-12"
+ALREADY_GENERATED = "report-daily-u2-2026-10-16"
+FAILED = "report-monthly-u3-2026-10-01"
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.reports = {}
+
+    async def get_report(self, report_id):
+        return self.reports.get(report_id)
+
+
+class FakeReportGenerator:
+    """Just the calls the scheduler makes, with reports kept in memory"""
+
+    def __init__(self):
+        self.db = FakeDatabase()
+        self.generated = []
+
+    def add(self, report_id, user_id, report_type, status):
+        self.db.reports[report_id] = SimpleNamespace(id=report_id, user_id=user_id, type=report_type, status=status)
+
+    async def _get_all_users(self):
+        return []
+
+    async def create_scheduled_report(self, user_id, report_type, day: date):
+        report_id = f"report-{report_type}-{user_id}-{day.isoformat()}"
+        self.add(report_id, user_id, report_type, "scheduled")
+        return self.db.reports[report_id]
+
+    async def invalidate_cached_report(self, user_id, report_id):
+        pass
+
+    async def generate_report(self, report_id):
+        self.generated.append(report_id)
+        self.db.reports[report_id].status = "generated"
+        return self.db.reports[report_id]
+
+    async def set_report_status(self, report_id, status):
+        self.db.reports[report_id].status = status
+
+    async def _run_batch(self, batch_runner, reports):
+        return await batch_runner.run_async(reports)
+
+
+class FakeBatchRunner:
+    """Generates in place of the process pool, failing the reports it is told to"""
+
+    def __init__(self, generator, failing=()):
+        self.generator = generator
+        self.failing = set(failing)
+        self.batches = []
+
+    async def run_async(self, reports):
+        self.batches.append([report.id for report in reports])
+        results = []
+        for report in reports:
+            # What the pool's workers see when they start
+            assert self.generator.db.reports[report.id].status == "generating"
+            if report.id in self.failing:
+                results.append(BatchJobResult(
+                    report_id=report.id, user_id=report.user_id, type=report.type, status="failed", error="no data"
+                ))
+            else:
+                await self.generator.generate_report(report.id)
+                results.append(BatchJobResult(
+                    report_id=report.id, user_id=report.user_id, type=report.type, status="generated"
+                ))
+        return BatchRunSummary(
+            total=len(results), generated=len(results) - len(self.failing), failed=len(self.failing),
+            duration_seconds=0.0, results=results
+        )
+
+
+def interrupted_run(tmp_path):
+    """A journal left by a process that claimed three jobs and died"""
+    journal = JobJournal(str(tmp_path / "jobs.jsonl"))
+    journal.record([(INTERRUPTED, "2026-10-12"), (ALREADY_GENERATED, "2026-10-16"), (FAILED, "2026-10-01")], "claimed")
+    generator = FakeReportGenerator()
+    generator.add(ALREADY_GENERATED, "u2", "daily", "generated")
+    generator.add(FAILED, "u3", "monthly", "failed")
+    return generator
+
+
+async def recover(scheduler):
+    await scheduler.run_due()
+    await asyncio.gather(*scheduler._dispatches)
+    states = dict(scheduler.journal.states)
+    await scheduler.stop()
+    return states
+
+
+def test_recovery_resends_only_unfinished_reports(tmp_path):
+    generator = interrupted_run(tmp_path)
+    scheduler = ReportScheduler(generator, data_dir=str(tmp_path), interval_seconds=0)
+    states = asyncio.run(recover(scheduler))
+    # The report with no stored row is rebuilt from its key, dashes in the user ID included
+    assert sorted(generator.generated) == sorted([INTERRUPTED, FAILED])
+    assert generator.db.reports[INTERRUPTED].user_id == "user-a-1"
+    assert states == {INTERRUPTED: "done", ALREADY_GENERATED: "done", FAILED: "done"}
+    assert scheduler.stats["recovered"] == 3 and scheduler.stats["generated"] == 2
+
+
+def test_recovered_reports_run_as_tracked_tasks(tmp_path):
+    generator = interrupted_run(tmp_path)
+
+    async def run():
+        queue = LocalTaskQueue(lambda name, args: generator.generate_report(*args))
+        scheduler = ReportScheduler(generator, task_queue=queue, data_dir=str(tmp_path), interval_seconds=0)
+        states = await recover(scheduler)
+        statuses = {report_id: await queue.status(report_id) for report_id in (INTERRUPTED, FAILED, ALREADY_GENERATED)}
+        await queue.stop()
+        return states, statuses
+
+    states, statuses = asyncio.run(run())
+    assert statuses[INTERRUPTED].state == "success" and statuses[FAILED].state == "success"
+    assert statuses[ALREADY_GENERATED] is None
+    assert set(states.values()) == {"done"}
+
+
+def test_without_a_broker_reports_run_on_the_batch_pool_as_tracked_tasks(tmp_path):
+    generator = interrupted_run(tmp_path)
+    batch_runner = FakeBatchRunner(generator, failing=[FAILED])
+
+    async def never_on_the_event_loop(name, args):
+        raise AssertionError(f"{name} ran on the API event loop")
+
+    async def run():
+        queue = LocalTaskQueue(never_on_the_event_loop)
+        scheduler = ReportScheduler(
+            generator, batch_runner=batch_runner, task_queue=queue, data_dir=str(tmp_path), interval_seconds=0
+        )
+        states = await recover(scheduler)
+        statuses = {report_id: await queue.status(report_id) for report_id in (INTERRUPTED, FAILED)}
+        await queue.stop()
+        return states, statuses
+
+    states, statuses = asyncio.run(run())
+    assert batch_runner.batches == [[INTERRUPTED, FAILED]]
+    assert statuses[INTERRUPTED].state == "success" and statuses[INTERRUPTED].result["report_id"] == INTERRUPTED
+    assert statuses[FAILED].state == "failure" and statuses[FAILED].error == "no data"
+    assert generator.db.reports[FAILED].status == "failed"
+    assert states[INTERRUPTED] == "done" and states[FAILED] == "failed"
+
+
+def test_a_second_restart_sends_nothing(tmp_path):
+    generator = interrupted_run(tmp_path)
+    asyncio.run(recover(ReportScheduler(generator, data_dir=str(tmp_path), interval_seconds=0)))
+    generator.generated.clear()
+    asyncio.run(recover(ReportScheduler(generator, data_dir=str(tmp_path), interval_seconds=0)))
+    assert generator.generated == []
@@ -0,0 +1,67 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.cached_responses import cached_json_response
+from app.api.conditional import etag_matches
+from app.services.response_cache import ResponseCache
+
+
+def make_client(cache):
+    app = FastAPI()
+    loads = []
+
+    @app.get("/reports/{user_id}")
+    async def reports(user_id: str, request: Request):
+        async def load():
+            loads.append(user_id)
+            return {"user_id": user_id, "load": len(loads)}, {"X-Total-Count": "1"}
+
+        return await cached_json_response(request, cache, f"user:{user_id}", ("reports",), load)
+
+    @app.post("/reports/{user_id}/invalidate")
+    async def invalidate(user_id: str):
+        await cache.invalidate(f"user:{user_id}")
+
+    return TestClient(app), loads
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_cached_response_hits_revalidates_and_invalidates():
+    client, loads = make_client(ResponseCache(ttl=60))
+
+    first = client.get("/reports/u1")
+    assert first.headers["X-Cache"] == "MISS"
+    assert first.headers["X-Total-Count"] == "1"
+
+    second = client.get("/reports/u1")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    not_modified = client.get("/reports/u1", headers={"If-None-Match": first.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    client.post("/reports/u1/invalidate")
+    third = client.get("/reports/u1")
+    assert third.headers["X-Cache"] == "MISS"
+    assert third.json()["load"] == 2
+    assert loads == ["u1", "u1"]
+
+
+def test_scopes_are_invalidated_independently():
+    client, loads = make_client(ResponseCache(ttl=60))
+    client.get("/reports/u1")
+    client.get("/reports/u2")
+
+    client.post("/reports/u1/invalidate")
+
+    assert client.get("/reports/u1").headers["X-Cache"] == "MISS"
+    assert client.get("/reports/u2").headers["X-Cache"] == "HIT"
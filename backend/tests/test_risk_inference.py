@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.services.risk_inference import RiskBatcher
+from app.services.risk_models import FEATURE_DEFAULTS, RISK_TYPES, load_models, predict_all
+
+
+class CountingModel:
+    """Scores each row by its first feature and records every call's batch size"""
+
+    def __init__(self, calls, fail=False):
+        self.calls = calls
+        self.fail = fail
+        self.version = "test"
+
+    def predict(self, features):
+        self.calls.append(len(features))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return features[:, 0] / 100
+
+
+def counting_models(fail=False):
+    calls = []
+    return {name: CountingModel(calls, fail) for name in RISK_TYPES}, calls
+
+
+def rows(*values):
+    return np.array([[value] + [0.0] * (len(FEATURE_DEFAULTS) - 1) for value in values])
+
+
+def test_concurrent_requests_share_one_model_call():
+    models, calls = counting_models()
+
+    async def run():
+        batcher = RiskBatcher(models, max_batch_size=64, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.predict(rows(i, i + 1)) for i in range(10)))
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    assert calls == [20] * len(RISK_TYPES)
+    assert batcher.stats["batches"] == 1 and batcher.stats["requests"] == 10
+    for i, scores in enumerate(results):
+        np.testing.assert_allclose(scores[:, 0], [i / 100, (i + 1) / 100])
+        assert scores.shape == (2, len(RISK_TYPES))
+
+
+def test_batches_are_capped_at_max_batch_size():
+    models, calls = counting_models()
+
+    async def run():
+        batcher = RiskBatcher(models, max_batch_size=4, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.predict(rows(i)) for i in range(10)))
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    assert batcher.stats["largest_batch"] == 4
+    assert batcher.stats["rows"] == 10
+    assert [float(scores[0, 0]) for scores in results] == [i / 100 for i in range(10)]
+
+
+def test_model_failure_reaches_every_caller_and_the_batcher_recovers():
+    models, _ = counting_models(fail=True)
+
+    async def run():
+        batcher = RiskBatcher(models, max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.predict(rows(1)), batcher.predict(rows(2)), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        for model in models.values():
+            model.fail = False
+        scores = await batcher.predict(rows(30))
+        await batcher.stop()
+        return scores
+
+    assert float(asyncio.run(run())[0, 0]) == pytest.approx(0.3)
+
+
+def test_batcher_rebinds_to_a_new_event_loop():
+    models, calls = counting_models()
+    batcher = RiskBatcher(models, max_wait=0)
+    first = asyncio.run(batcher.predict(rows(10)))
+    second = asyncio.run(batcher.predict(rows(20)))
+    assert float(first[0, 0]) == pytest.approx(0.1)
+    assert float(second[0, 0]) == pytest.approx(0.2)
+
+
+def test_load_models_prefers_artifacts_and_falls_back_to_baseline(tmp_path):
+    (tmp_path / "hypertension.json").write_text(json.dumps({
+        "version": "bp-2", "intercept": 0.0, "terms": {"systolic_mean": [120.0, 0.1]}
+    }))
+    (tmp_path / "stress_related.json").write_text("{not json")
+
+    models = load_models(str(tmp_path))
+
+    assert models["hypertension"].version == "bp-2"
+    assert models["heart_disease"].version == "baseline-1"
+    assert models["stress_related"].version == "baseline-1"
+    scores = predict_all(models, np.vstack([FEATURE_DEFAULTS, FEATURE_DEFAULTS]))
+    assert scores.shape == (2, len(RISK_TYPES))
+    assert np.all((scores >= 0) & (scores <= 1))
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.rollups import TIERS, RollupStore, bucket_edges, partition_days, raw_buckets, rollup
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, to_epoch_ms
+
+DAYS = [date(2024, 3, 30), date(2024, 3, 31), date(2024, 4, 1)]
+
+
+@pytest.fixture
+def readings():
+    edges = bucket_edges("day", DAYS)
+    rng = np.random.default_rng(7)
+    ts = np.sort(rng.integers(edges[0], edges[-1], 50_000))
+    values = rng.normal(72, 12, len(ts)).astype(np.float32)
+    return ts, values
+
+
+def brute_force(ts, values, edges):
+    """(start, count, sum, min, max) of every non-empty bucket, one bucket at a time"""
+    buckets = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        inside = values[(ts >= start) & (ts < end)]
+        if len(inside):
+            buckets.append((start, len(inside), float(inside.astype(np.float64).sum()), inside.min(), inside.max()))
+    return buckets
+
+
+def test_tiers_sum_to_raw_counts(readings):
+    ts, values = readings
+    minute = rollup(raw_buckets(ts, values), bucket_edges("minute", DAYS))
+    hour = rollup(minute, bucket_edges("hour", DAYS))
+    day = rollup(hour, bucket_edges("day", DAYS))
+    for tier in (minute, hour, day):
+        assert int(tier["count"].sum()) == len(ts)
+        assert tier["sum"].sum() == pytest.approx(values.astype(np.float64).sum(), rel=1e-9)
+        assert tier["min"].min() == values.min() and tier["max"].max() == values.max()
+        assert np.all(np.diff(tier["ts"]) > 0)
+
+
+@pytest.mark.parametrize("tier", list(TIERS))
+def test_rollup_matches_brute_force(readings, tier):
+    ts, values = readings
+    edges = bucket_edges(tier, DAYS)
+    result = rollup(raw_buckets(ts, values), edges)
+    expected = brute_force(ts, values, edges)
+    assert result["ts"].tolist() == [bucket[0] for bucket in expected]
+    assert result["count"].tolist() == [bucket[1] for bucket in expected]
+    assert result["sum"] == pytest.approx([bucket[2] for bucket in expected], rel=1e-9)
+    assert result["min"].tolist() == [bucket[3] for bucket in expected]
+    assert result["max"].tolist() == [bucket[4] for bucket in expected]
+
+
+def test_rolling_up_in_tiers_equals_rolling_up_raw(readings):
+    ts, values = readings
+    raw = raw_buckets(ts, values)
+    hour_edges = bucket_edges("hour", DAYS)
+    tiered = rollup(rollup(raw, bucket_edges("minute", DAYS)), hour_edges)
+    direct = rollup(raw, hour_edges)
+    assert tiered["ts"].tolist() == direct["ts"].tolist()
+    assert tiered["count"].tolist() == direct["count"].tolist()
+    assert tiered["sum"] == pytest.approx(direct["sum"], rel=1e-9)
+
+
+def test_rollup_drops_readings_outside_the_edges(readings):
+    ts, values = readings
+    edges = bucket_edges("hour", DAYS[1:2])
+    result = rollup(raw_buckets(ts, values), edges)
+    assert int(result["count"].sum()) == int(np.count_nonzero((ts >= edges[0]) & (ts < edges[-1])))
+    assert len(rollup(raw_buckets(ts[:0], values[:0]), edges)) == 0
+
+
+def test_partitions_cover_whole_periods():
+    assert len(partition_days("hour", date(2024, 2, 1))) == 29
+    assert len(partition_days("day", date(2023, 1, 1))) == 365
+    assert partition_days("minute", date(2024, 2, 1)) == [date(2024, 2, 1)]
+
+
+def test_late_readings_reach_every_worker(tmp_path):
+    day = datetime.now().date() - timedelta(days=2)
+    start = datetime.combine(day, datetime.min.time())
+    records = np.zeros(2, dtype=RECORD_DTYPE)
+    records["ts"] = [to_epoch_ms(start + timedelta(hours=8)), to_epoch_ms(start + timedelta(hours=9))]
+    records["value"] = [60.0, 70.0]
+    vitals_a = VitalSignStore(str(tmp_path / "vitals"))
+    vitals_a.append_rows("user-1", day, "heart_rate", records)
+    # Two workers with their own caches over the same directories
+    worker_a = RollupStore(vitals_a, str(tmp_path / "rollups"))
+    worker_b = RollupStore(VitalSignStore(str(tmp_path / "vitals")), str(tmp_path / "rollups"))
+    end = start + timedelta(days=1)
+    for store in (worker_a, worker_b):
+        assert store.buckets("user-1", "heart_rate", "hour", start, end)["count"].sum() == 2
+
+    late = records[:1].copy()
+    late["ts"] += 30 * 60_000
+    vitals_a.append_rows("user-1", day, "heart_rate", late)
+    for store in (worker_a, worker_b):
+        for tier in TIERS:
+            assert store.buckets("user-1", "heart_rate", tier, start, end)["count"].sum() == 3
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.services.rppg import RPPGSession, analyze_signal, estimate_many
+
+FPS = 30.0
+
+
+def synthetic_scan(bpm=72.0, breaths=15.0, seconds=30.0, fps=FPS, seed=0):
+    """ROI means with a pulse in green and breathing in overall brightness"""
+    t = np.arange(int(seconds * fps)) / fps
+    rng = np.random.default_rng(seed)
+    brightness = 1 + 0.01 * np.sin(2 * np.pi * breaths / 60 * t)
+    pulse = 0.004 * np.sin(2 * np.pi * bpm / 60 * t)
+    rgb = np.stack([150 * brightness, 110 * brightness * (1 + pulse), 90 * brightness], axis=1)
+    return rgb + rng.normal(0, 0.05, rgb.shape), t
+
+
+def test_analyze_signal_recovers_heart_and_respiratory_rate():
+    rgb, t = synthetic_scan()
+    estimate = analyze_signal(rgb.tolist(), fps=FPS)
+
+    assert estimate.heart_rate == pytest.approx(72, abs=2)
+    assert estimate.respiratory_rate == pytest.approx(15, abs=1.5)
+    assert estimate.quality > 0.5
+    assert estimate.samples == len(t)
+
+
+def test_irregular_timestamps_are_resampled():
+    rgb, t = synthetic_scan(bpm=90, seconds=20)
+    jitter = np.random.default_rng(1).uniform(-0.012, 0.012, len(t))
+    estimate = analyze_signal(rgb.tolist(), timestamps=(t + jitter).tolist())
+
+    assert estimate.heart_rate == pytest.approx(90, abs=3)
+
+
+def test_short_scans_report_no_rates():
+    rgb, _ = synthetic_scan(seconds=3)
+    estimate = analyze_signal(rgb.tolist(), fps=FPS)
+
+    assert estimate.heart_rate is None
+    assert estimate.respiratory_rate is None
+    with pytest.raises(ValueError):
+        analyze_signal(rgb.tolist())
+
+
+def test_session_ring_buffer_keeps_the_latest_window_in_order():
+    session = RPPGSession(fps_hint=FPS, window_seconds=10)
+    rgb, t = synthetic_scan(seconds=25)
+    for start in range(0, len(t), 70):
+        session.push_many(rgb[start:start + 70], t[start:start + 70])
+
+    window_rgb, window_ts = session.window()
+    assert np.all(np.diff(window_ts) > 0)
+    assert window_ts[-1] == t[-1]
+    assert window_ts[-1] - window_ts[0] <= 10
+    np.testing.assert_array_equal(window_rgb, rgb[-len(window_ts):])
+
+
+def test_estimate_many_matches_single_session_estimates():
+    sessions = []
+    for bpm in (66, 84, 102):
+        session = RPPGSession(fps_hint=FPS, window_seconds=20)
+        rgb, t = synthetic_scan(bpm=bpm, seconds=20)
+        session.push_many(rgb, t)
+        sessions.append(session)
+    idle = RPPGSession()
+
+    estimates = estimate_many(sessions + [idle])
+
+    assert [e.heart_rate for e in estimates[:3]] == [s.estimate().heart_rate for s in sessions]
+    assert [e.heart_rate for e in estimates[:3]] == pytest.approx([66, 84, 102], abs=2)
+    assert estimates[3].heart_rate is None and estimates[3].samples == 0
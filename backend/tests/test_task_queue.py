@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.tasks import get_task_queue, router
+from app.services.task_queue import CeleryTaskQueue, LocalTaskQueue, queue_concurrency, run_task
+
+
+def test_queue_concurrency_reads_overrides():
+    assert queue_concurrency("") == {"reports": 2, "email": 8}
+    assert queue_concurrency("reports=4, email=0,extra=3") == {"reports": 4, "email": 1, "extra": 3}
+
+
+def test_local_queue_records_results_and_failures():
+    async def runner(name, args):
+        if args[0] == "boom":
+            raise RuntimeError("generation failed")
+        return {"report_id": args[0]}
+
+    async def run():
+        queue = LocalTaskQueue(runner, concurrency={"reports": 1, "email": 1})
+        ok = await queue.submit("reports.generate", "r1")
+        bad = await queue.submit("reports.generate", "boom")
+        statuses = [await queue.wait(ok), await queue.wait(bad)]
+        await queue.stop()
+        return queue, statuses
+
+    queue, (ok, bad) = asyncio.run(run())
+
+    assert ok.state == "success" and ok.result == {"report_id": "r1"} and ok.queue == "reports"
+    assert bad.state == "failure" and bad.error == "generation failed"
+    assert ok.finished_at is not None
+    assert queue.stats == {"submitted": 2, "succeeded": 1, "failed": 1}
+
+
+def test_pending_task_ids_are_not_queued_twice():
+    calls = []
+    release = None
+
+    async def runner(name, args):
+        calls.append(args)
+        await release.wait()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        queue = LocalTaskQueue(runner, concurrency={"reports": 1, "email": 1})
+        await queue.submit("reports.generate", "r1", task_id="report:r1")
+        await queue.submit("reports.generate", "r1", task_id="report:r1")
+        await asyncio.sleep(0)
+        assert (await queue.status("report:r1")).state == "started"
+        release.set()
+        await queue.wait("report:r1")
+        # Finished tasks may run again
+        await queue.submit("reports.generate", "r1", task_id="report:r1")
+        await queue.stop()
+
+    asyncio.run(run())
+    assert calls == [["r1"], ["r1"]]
+
+
+def test_tracked_tasks_and_status_eviction():
+    async def runner(name, args):
+        return None
+
+    queue = LocalTaskQueue(runner, max_results=2)
+    status = queue.track("reports.generate", "report:r1")
+    assert asyncio.run(queue.status("report:r1")).state == "started"
+    queue.finish(status, error="pool crashed")
+    assert status.state == "failure" and status.error == "pool crashed"
+
+    queue.track("reports.generate", "report:r2")
+    queue.track("reports.generate", "report:r3")
+    assert asyncio.run(queue.status("report:r1")) is None
+    assert asyncio.run(queue.status("report:r3")).state == "started"
+
+
+def test_report_task_marks_the_report_failed_on_error():
+    statuses = []
+
+    class Generator:
+        async def set_report_status(self, report_id, status):
+            statuses.append((report_id, status))
+
+        async def generate_report(self, report_id):
+            raise RuntimeError("no data")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_task("reports.generate", ["r1"], Generator(), None))
+    assert statuses == [("r1", "generating"), ("r1", "failed")]
+    with pytest.raises(ValueError):
+        asyncio.run(run_task("email.send", ["delete_everything", {}], None, object()))
+
+
+def test_celery_states_are_mapped():
+    done = datetime(2024, 1, 1)
+    results = {
+        "a": SimpleNamespace(state="STARTED", result=None, date_done=None, name="reports.generate"),
+        "b": SimpleNamespace(state="SUCCESS", result={"ok": True}, date_done=done),
+        "c": SimpleNamespace(state="REVOKED", result=RuntimeError("terminated"), date_done=done),
+    }
+    queue = CeleryTaskQueue(SimpleNamespace(AsyncResult=results.__getitem__))
+
+    started, succeeded, revoked = (asyncio.run(queue.status(task_id)) for task_id in "abc")
+    assert started.state == "started" and started.name == "reports.generate"
+    assert succeeded.state == "success" and succeeded.result == {"ok": True}
+    assert revoked.state == "failure" and revoked.error == "terminated" and revoked.result is None
+
+
+def test_task_status_endpoint():
+    async def runner(name, args):
+        return None
+
+    queue = LocalTaskQueue(runner)
+    queue.track("email.send", "email-1")
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_task_queue] = lambda: queue
+    client = TestClient(app)
+
+    response = client.get("/api/tasks/email-1")
+    assert response.status_code == 200
+    assert response.json()["state"] == "started" and response.json()["queue"] == "email"
+    assert client.get("/api/tasks/missing").status_code == 404
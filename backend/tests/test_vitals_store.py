@@ -0,0 +1,38 @@
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from app.services.vitals_store import RECORD_DTYPE, VitalSignStore, to_epoch_ms
+
+DAY = date(2024, 1, 2)
+START = datetime.combine(DAY, time.min)
+
+
+def rows(values, minute=0):
+    records = np.empty(len(values), dtype=RECORD_DTYPE)
+    records["ts"] = to_epoch_ms(START) + 60_000 * (minute + np.arange(len(values)))
+    records["value"] = values
+    return records
+
+
+def test_append_after_a_torn_write_stays_aligned(tmp_path):
+    store = VitalSignStore(str(tmp_path))
+    store.append_rows("user-1", DAY, "heart_rate", rows([61.0, 62.0]))
+    path = store._partition_path("user-1", DAY, "heart_rate")
+    # A crash three bytes into the next record
+    with open(path, "ab") as f:
+        f.write(rows([99.0], minute=2).tobytes()[:3])
+
+    store.append_rows("user-1", DAY, "heart_rate", rows([63.0, 64.0], minute=2))
+    ts, values = store.get_range("user-1", "heart_rate", START, START + timedelta(days=1))
+    assert values.tolist() == [61.0, 62.0, 63.0, 64.0]
+    assert ts.tolist() == rows([0, 0, 0, 0])["ts"].tolist()
+    assert store.count_range("user-1", "heart_rate", START, START + timedelta(days=1)) == 4
+
+
+def test_range_edges_are_half_open(tmp_path):
+    store = VitalSignStore(str(tmp_path))
+    store.append_rows("user-1", DAY, "heart_rate", rows([60.0, 61.0, 62.0]))
+    first, last = START + timedelta(minutes=1), START + timedelta(minutes=2)
+    assert store.get_series("user-1", "heart_rate", first, last).tolist() == [61.0]
+    assert store.count_range("user-1", "heart_rate", START, last) == 2
@@ -65,12 +65,26 @@ export const fetchCoverageReport = async (format = 'json') => {
   }
 };
 
-// Fetch performance metrics
-export const fetchPerformanceMetrics = async () => {
+// The admin endpoints take the server's ADMIN_API_TOKEN, not the login token;
+// it is kept for this browser session only
+const ADMIN_TOKEN_KEY = 'adminApiToken';
+
+export const getAdminToken = () => sessionStorage.getItem(ADMIN_TOKEN_KEY);
+
+export const setAdminToken = (token) => {
+  if (token) {
+    sessionStorage.setItem(ADMIN_TOKEN_KEY, token);
+  } else {
+    sessionStorage.removeItem(ADMIN_TOKEN_KEY);
+  }
+};
+
+// Fetch performance metrics (admin API)
+export const fetchPerformanceMetrics = async (adminToken = getAdminToken()) => {
   try {
     const response = await axios.get(`${API_BASE_URL}/testing/performance`, {
       headers: {
-        Authorization: `Bearer ${localStorage.getItem('token')}`
+        Authorization: `Bearer ${adminToken}`
       }
     });
     return response.data;
@@ -5,7 +5,34 @@ import LoadingSpinner from '../../components/ui/LoadingSpinner';
 import TestStatusCard from '../../components/admin/TestStatusCard';
 import TestResultsTable from '../../components/admin/TestResultsTable';
 import PerformanceMetrics from '../../components/admin/PerformanceMetrics';
-import { fetchTestResults, runTests } from '../../api/testingApi';
+import {
+  fetchPerformanceMetrics,
+  fetchTestResults,
+  getAdminToken,
+  runTests,
+  setAdminToken
+} from '../../api/testingApi';
+
+// Page timings come from this browser; the API only knows its own CPU, memory and latency
+const browserPageTimings = () => {
+  const seconds = (ms) => (ms > 0 ? Math.round(ms / 100) / 10 : null);
+  const [navigation] = performance.getEntriesByType('navigation');
+  const paint = performance.getEntriesByName('first-contentful-paint')[0];
+  return {
+    loadTime: navigation ? seconds(navigation.loadEventEnd) : null,
+    firstContentfulPaint: paint ? seconds(paint.startTime) : null,
+    timeToInteractive: navigation ? seconds(navigation.domInteractive) : null
+  };
+};
+
+const withoutNulls = (metrics) => Object.fromEntries(Object.entries(metrics).filter(([, value]) => value !== null));
+
+const metricsErrorMessage = (err) => {
+  const status = err.response && err.response.status;
+  if (status === 401) return 'The admin API token was rejected.';
+  if (status === 404) return 'The admin API is disabled on this server (ADMIN_API_TOKEN is not set).';
+  return `Could not load server metrics: ${err.message}`;
+};
 
 const TestingDashboard = () => {
   const [loading, setLoading] = useState(true);
@@ -13,6 +40,36 @@ const TestingDashboard = () => {
   const [error, setError] = useState(null);
   const [runningTests, setRunningTests] = useState(false);
   const [testType, setTestType] = useState('all'); // 'all', 'unit', 'integration', 'e2e'
+  const [adminToken, setAdminTokenState] = useState(getAdminToken() || '');
+  const [tokenInput, setTokenInput] = useState('');
+  const [serverMetrics, setServerMetrics] = useState(null);
+  const [metricsError, setMetricsError] = useState(null);
+
+  useEffect(() => {
+    if (!adminToken) {
+      setServerMetrics(null);
+      setMetricsError('Enter the admin API token to show live server metrics.');
+      return;
+    }
+    const loadServerMetrics = async () => {
+      try {
+        const metrics = await fetchPerformanceMetrics(adminToken);
+        setServerMetrics({ ...withoutNulls(metrics), ...withoutNulls(browserPageTimings()) });
+        setMetricsError(null);
+      } catch (err) {
+        setServerMetrics(null);
+        setMetricsError(metricsErrorMessage(err));
+      }
+    };
+    loadServerMetrics();
+  }, [adminToken]);
+
+  const handleAdminTokenSubmit = (e) => {
+    e.preventDefault();
+    setAdminToken(tokenInput.trim());
+    setAdminTokenState(tokenInput.trim());
+    setTokenInput('');
+  };
 
   useEffect(() => {
     const loadTestData = async () => {
@@ -283,7 +340,29 @@ const TestingDashboard = () => {
               <h2 className="text-xl font-semibold mb-4 text-gray-800 dark:text-white">
                 Performance Metrics
               </h2>
-              <PerformanceMetrics metrics={testData.performance} />
+              {metricsError && (
+                <div className="mb-4 p-3 rounded-lg bg-yellow-50 dark:bg-yellow-900/30 border border-yellow-200 dark:border-yellow-800 text-sm text-yellow-800 dark:text-yellow-200">
+                  {metricsError} Showing sample numbers.
+                </div>
+              )}
+              <PerformanceMetrics metrics={{ ...testData.performance, ...serverMetrics }} />
+              <form onSubmit={handleAdminTokenSubmit} className="mt-4 flex gap-2">
+                <input
+                  type="password"
+                  value={tokenInput}
+                  onChange={(e) => setTokenInput(e.target.value)}
+                  placeholder={adminToken ? 'Admin API token (saved)' : 'Admin API token'}
+                  autoComplete="off"
+                  className="flex-1 p-2 border border-gray-300 dark:border-gray-600 rounded-lg 
+                           bg-white dark:bg-gray-700 text-gray-900 dark:text-white text-sm"
+                />
+                <button
+                  type="submit"
+                  className="px-3 py-2 rounded-lg bg-blue-600 hover:bg-blue-700 text-white text-sm"
+                >
+                  {tokenInput || !adminToken ? 'Use token' : 'Forget token'}
+                </button>
+              </form>
             </div>
           </motion.div>
         </div>